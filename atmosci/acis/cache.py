@@ -0,0 +1,363 @@
+""" On-disk cache for ACIS web services responses.
+
+Responses are stored gzip compressed in a cache directory. Each entry is
+content addressed by the SHA1 digest of the service url and the canonical
+(key sorted, whitespace free) JSON of the query, so identical requests
+map to the same entry regardless of how the query dictionary was built.
+Error responses are never cached.
+
+Queries for dates that are older than the latest date available from
+ACIS are unlikely to change and are kept for archive_ttl seconds. Queries
+that include the latest available date (or later) are kept for only
+recent_ttl seconds. When the total size of the cache exceeds max_bytes,
+the least recently used entries are evicted. The size of the cache is
+tracked as entries are added and the cache directory is only scanned when
+the limit is exceeded or after every evict_interval new entries.
+"""
+
+import os
+import glob
+import gzip
+import time
+import datetime
+import hashlib
+import threading
+
+try:
+    import simplejson as json
+except ImportError:
+    import json
+
+
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+ARCHIVE_TTL = 30 * 86400 # 30 days
+RECENT_TTL = 3600 # 1 hour
+MAX_CACHE_BYTES = 1024 * 1024 * 1024 # 1 GB
+# number of new entries between scans of the cache directory
+EVICT_INTERVAL = 100
+CACHE_FILE_EXTENSION = '.json.gz'
+# responses that begin with one of these are not cached
+ERROR_MARKERS = ('"error"', 'DOCTYPE HTML')
+# responses that contain this anywhere are not cached
+FAILURE_MARKER = '[Failure instance:'
+
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+def canonicalJson(value):
+    """ JSON string with sorted keys and no whitespace """
+    if isinstance(value, basestring): value = json.loads(value)
+    return json.dumps(value, separators=(',', ':'), sort_keys=True)
+
+def asQueryDate(date_str):
+    return datetime.date(*[int(part) for part in date_str[:10].split('-')])
+
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+class AcisResponseCache(object):
+    """ Content addressed, size limited cache of ACIS responses.
+
+    Arguments
+    --------------------------------------------------------------------
+    cache_dirpath : directory where cached responses are stored
+    max_bytes     : maximum total size of compressed responses
+    archive_ttl   : seconds to keep responses that only contain dates
+                    older than the latest available date
+    recent_ttl    : seconds to keep all other responses
+    latest_available_date : latest date with data available from ACIS,
+                    defaults to yesterday
+    evict_interval : number of new entries between scans for expired
+                    entries and entries added by other processes
+    """
+
+    def __init__(self, cache_dirpath, max_bytes=MAX_CACHE_BYTES,
+                       archive_ttl=ARCHIVE_TTL, recent_ttl=RECENT_TTL,
+                       latest_available_date=None,
+                       evict_interval=EVICT_INTERVAL):
+        self.cache_dirpath = cache_dirpath
+        if not os.path.exists(cache_dirpath):
+            try:
+                os.makedirs(cache_dirpath)
+            except OSError: # created by another process
+                if not os.path.isdir(cache_dirpath): raise
+        self.archive_ttl = archive_ttl
+        self.evict_interval = evict_interval
+        self.max_bytes = max_bytes
+        self.recent_ttl = recent_ttl
+        if latest_available_date is None:
+            latest_available_date = \
+                datetime.date.today() - datetime.timedelta(days=1)
+        self.latest_available_date = latest_available_date
+        self._lock = threading.Lock()
+        # running total of entry sizes, None until the directory is scanned
+        self._total_bytes = None
+        self._num_added = 0
+
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+    def cacheKey(self, endpoint, json_string):
+        query = '%s %s' % (endpoint, canonicalJson(json_string))
+        return hashlib.sha1(query).hexdigest()
+
+    def timeToLive(self, json_string):
+        """ Number of seconds a response to the query may be cached """
+        query = json.loads(json_string)
+        date_str = query.get('edate', query.get('date', query.get('sdate')))
+        if date_str is None: return self.recent_ttl
+        try:
+            last_date = asQueryDate(date_str)
+        except (TypeError, ValueError): # e.g. "por" for period of record
+            return self.recent_ttl
+        if last_date < self.latest_available_date: return self.archive_ttl
+        return self.recent_ttl
+
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+    def get(self, endpoint, json_string):
+        """ Returns the cached response string or None """
+        cache_file = self.open(endpoint, json_string)
+        if cache_file is None: return None
+        try:
+            return cache_file.read()
+        finally:
+            cache_file.close()
+
+    def open(self, endpoint, json_string):
+        """ Returns an open, decompressing file for reading a cached
+        response or None when the query is not in the cache.
+        """
+        filepath = self._entryFilepath(self.cacheKey(endpoint, json_string))
+        if filepath is None: return None
+        try:
+            # track last use for LRU eviction
+            os.utime(filepath, None)
+            return gzip.open(filepath, 'rb')
+        except (IOError, OSError): # evicted by another process
+            return None
+
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+    def put(self, endpoint, json_string, response_string):
+        writer = self.writer(endpoint, json_string)
+        writer.write(response_string)
+        writer.commit()
+
+    def writer(self, endpoint, json_string):
+        """ Returns an AcisCacheWriter for streaming a response into the
+        cache. Nothing is visible in the cache until commit is called.
+        """
+        key = self.cacheKey(endpoint, json_string)
+        expires = int(time.time() + self.timeToLive(json_string))
+        filename = '%s.%d%s' % (key, expires, CACHE_FILE_EXTENSION)
+        return AcisCacheWriter(self, key,
+                               os.path.join(self.cache_dirpath, filename))
+
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+    def evict(self, max_bytes=None):
+        """ Remove expired entries and the least recently used entries
+        until the cache is smaller than max_bytes.
+        """
+        if max_bytes is None: max_bytes = self.max_bytes
+        now = time.time()
+        entries = [ ]
+        total_bytes = 0
+        self._lock.acquire()
+        try:
+            for filepath in self._allEntries():
+                try:
+                    stat = os.stat(filepath)
+                except OSError:
+                    continue
+                if self._expires(filepath) <= now:
+                    self._remove(filepath)
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, filepath))
+                total_bytes += stat.st_size
+
+            entries.sort()
+            while total_bytes > max_bytes and entries:
+                mtime, size, filepath = entries.pop(0)
+                self._remove(filepath)
+                total_bytes -= size
+            self._total_bytes = total_bytes
+            self._num_added = 0
+        finally:
+            self._lock.release()
+        return total_bytes
+
+    def clear(self):
+        self.evict(0)
+
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+    def _entryAdded(self, added_bytes, removed_bytes=0):
+        """ Updates the running size of the cache after a commit and scans
+        the cache directory only when it is needed.
+        """
+        self._lock.acquire()
+        try:
+            self._num_added += 1
+            if self._total_bytes is not None:
+                self._total_bytes += added_bytes - removed_bytes
+            scan = (self._total_bytes is None or
+                    self._total_bytes > self.max_bytes or
+                    self._num_added >= self.evict_interval)
+        finally:
+            self._lock.release()
+        if scan: self.evict()
+
+    def _allEntries(self):
+        pattern = os.path.join(self.cache_dirpath, '*' + CACHE_FILE_EXTENSION)
+        return glob.glob(pattern)
+
+    def _entryFilepath(self, key):
+        """ Returns the path of the newest unexpired entry for the key,
+        removing any expired entries.
+        """
+        now = time.time()
+        found = None
+        pattern = os.path.join(self.cache_dirpath,
+                               '%s.*%s' % (key, CACHE_FILE_EXTENSION))
+        for filepath in sorted(glob.glob(pattern), key=self._expires):
+            if self._expires(filepath) <= now: self._remove(filepath)
+            else: found = filepath
+        return found
+
+    def _expires(self, filepath):
+        filename = os.path.basename(filepath)[:-len(CACHE_FILE_EXTENSION)]
+        try:
+            return int(filename.split('.')[1])
+        except (IndexError, ValueError):
+            return 0
+
+    def _remove(self, filepath):
+        try:
+            os.remove(filepath)
+        except OSError:
+            pass
+
+
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+class AcisCacheWriter(object):
+    """ Writes a response to a temporary file in the cache directory,
+    compressing it as it is written.
+    """
+
+    def __init__(self, cache, key, filepath):
+        self.cache = cache
+        self.key = key
+        self.filepath = filepath
+        self.tmp_filepath = '%s.%d.%d.tmp' % (filepath, os.getpid(),
+                                              id(self))
+        self.gzfile = gzip.open(self.tmp_filepath, 'wb')
+        self.failed = False
+        self.head = ''
+
+    def isError(self):
+        if self.failed: return True
+        for marker in ERROR_MARKERS:
+            if marker in self.head: return True
+        return False
+
+    def write(self, data):
+        if len(self.head) < 256: self.head += data[:256]
+        if FAILURE_MARKER in data: self.failed = True
+        self.gzfile.write(data)
+
+    def abort(self):
+        if self.gzfile is not None:
+            self.gzfile.close()
+            self.gzfile = None
+            self.cache._remove(self.tmp_filepath)
+
+    def commit(self):
+        if self.isError():
+            self.abort()
+            return
+        self.gzfile.close()
+        self.gzfile = None
+        # replaces any previous entries for the same query
+        pattern = os.path.join(self.cache.cache_dirpath,
+                               '%s.*%s' % (self.key, CACHE_FILE_EXTENSION))
+        removed_bytes = 0
+        for filepath in glob.glob(pattern):
+            try:
+                removed_bytes += os.path.getsize(filepath)
+            except OSError:
+                continue
+            self.cache._remove(filepath)
+        added_bytes = os.path.getsize(self.tmp_filepath)
+        os.rename(self.tmp_filepath, self.filepath)
+        self.cache._entryAdded(added_bytes, removed_bytes)
+
+
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+class CachedAcisResponse(object):
+    """ Stands in for the urllib2 response when a query is served from the
+    cache.
+    """
+
+    def __init__(self, url, cache_file):
+        self.url = url
+        self.cache_file = cache_file
+
+    def close(self):
+        self.cache_file.close()
+
+    def getcode(self):
+        return 200
+
+    def geturl(self):
+        return self.url
+
+    def read(self, num_bytes=-1):
+        return self.cache_file.read(num_bytes)
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+class CachingAcisResponse(object):
+    """ Wraps a urllib2 response and copies everything read from it into
+    the cache. The entry is committed when the response has been read to
+    the end, or when it is closed after a reader that stops at the end of
+    the JSON document (e.g. AcisGridStreamDecoder) calls documentComplete.
+    """
+
+    def __init__(self, response, writer):
+        self.response = response
+        self.writer = writer
+        self.complete = False
+
+    def close(self):
+        # an incompletely read response is never cached
+        if self.writer is not None:
+            if self.complete: self.writer.commit()
+            else: self.writer.abort()
+            self.writer = None
+        self.response.close()
+
+    def documentComplete(self):
+        """ Called by readers when the whole JSON document has been read,
+        even though the response may not have been read to EOF.
+        """
+        self.complete = True
+
+    def getcode(self):
+        return self.response.getcode()
+
+    def geturl(self):
+        return self.response.geturl()
+
+    def info(self):
+        return self.response.info()
+
+    def read(self, num_bytes=-1):
+        data = self.response.read(num_bytes)
+        if self.writer is not None:
+            if data: self.writer.write(data)
+            if not data or num_bytes is None or num_bytes < 0:
+                self.writer.commit()
+                self.writer = None
+        return data
@@ -9,6 +9,7 @@ except ImportError:
     import json
 
 from atmosci.utils.timeutils import asDatetimeDate
+from atmosci.acis.cache import CachedAcisResponse, CachingAcisResponse
 
 # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
 
@@ -27,8 +28,10 @@ class AcisWebServicesClient(object):
 
     def __init__(self, base_url=DEFAULT_URL, valid_elems=DEFAULT_ELEMS,
                        loc_keys=ALL_LOC_KEYS, date_required=True, 
-                       verbose=False, debug=False):
+                       cache=None, verbose=False, debug=False):
         self.base_url = base_url
+        # optional AcisResponseCache
+        self.cache = cache
         self.date_required = date_required
         self.debug = debug
         self.prev_query = None
@@ -58,6 +61,32 @@ class AcisWebServicesClient(object):
     def submitQuery(self, query_type, json_string):
         ERROR_MSG = 'Error processing response to query : %s %s'
         debug = self.debug
+
+        response, url = self.openQuery(query_type, json_string)
+        try:
+            response_string = response.read()
+        except Exception as e:
+            setattr(e, 'details', ERROR_MSG % ('POST',url))
+            raise e
+        if debug: print 'response', response_string
+
+        # track last successful query
+        self.prev_query = json_string
+
+        return response_string, response
+
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+    def openQuery(self, query_type, json_string):
+        """ Submit a query and return the open response without reading
+        it, so that large responses can be decoded as they arrive.
+
+        Returns
+        --------------------------------------------------------------------
+        tuple : (open response object, url including encoded query)
+        """
+        ERROR_MSG = 'Error processing response to query : %s %s'
+        debug = self.debug
         verbose = self.verbose or self.debug
 
         if debug:
@@ -79,6 +108,14 @@ class AcisWebServicesClient(object):
             if query_type.startswith('/'): url += query_type
             else: url += '/' + query_type
 
+        endpoint = url
+        if self.cache is not None:
+            cache_file = self.cache.open(endpoint, json_string)
+            if cache_file is not None:
+                if verbose: print 'CACHED', url
+                url += ' json=' + urllib.urlencode({'params':json_string})
+                return CachedAcisResponse(url, cache_file), url
+
         if verbose:
             print 'POST', url
             print 'params =', json_string
@@ -97,17 +134,16 @@ class AcisWebServicesClient(object):
             setattr(e, 'details', ERROR_MSG % ('POST',url))
             raise e
 
-        try:
-            response_string = response.read()
-        except Exception as e:
-            setattr(e, 'details', ERROR_MSG % ('POST',url))
-            raise e
-        if debug: print 'response', response_string
+        if self.cache is not None:
+            # response is saved in the cache as it is read
+            writer = self.cache.writer(endpoint, json_string)
+            response = CachingAcisResponse(response, writer)
 
-        # track last successful query
-        self.prev_query = json_string
+        return response, url
 
-        return response_string, response
+    def openRequest(self, query_type, **request_dict):
+        query_json = self.jsonFromRequest(query_type, request_dict)
+        return self.openQuery(query_type, query_json)
 
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 
@@ -1,10 +1,15 @@
 
 import datetime
+import threading
+import Queue
 
 import numpy as N
 
+from atmosci.acis.cache import AcisResponseCache
 from atmosci.acis.client import AcisWebServicesClient, json
 from atmosci.acis.gridinfo import acisGridNumber
+from atmosci.acis.gridstream import AcisGridStreamDecoder
+from atmosci.utils.timeutils import asDatetimeDate
 
 # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
 
@@ -16,11 +21,11 @@ VALID_ELEMS = ['maxt','mint','pcpn','cdd','cddNN','hdd','hddNN','gdd','gddNN']
 class AcisGridDataClient(AcisWebServicesClient):
 
     def __init__(self, base_url=DEFAULT_URL, valid_elems=VALID_ELEMS,
-                       verbose=False, debug=False):
+                       cache=None, verbose=False, debug=False):
         super(AcisGridDataClient, self).\
         __init__(base_url=base_url, valid_elems=valid_elems,
                  loc_keys=('bbox','loc','state'), date_required=True,
-                 verbose=verbose, debug=debug)
+                 cache=cache, verbose=verbose, debug=debug)
         #!TODO " list of valid metadata
 
     def request(self, grid_id, **request_dict):
@@ -41,30 +46,10 @@ class AcisGridDownloadMixin:
                               include_dates=True, **kwargs):
         debug = kwargs.get('debug',False)
         verbose = kwargs.get('verbose',debug)
-        if 'bbox' in kwargs:
-            bbox = kwargs['bbox']
-            if isinstance(bbox, tuple):
-                bbox = list(bbox)
-            if isinstance(bbox, list):
-                bbox = str(bbox)[1:-1]
-            bbox = bbox.replace(' ','')
-            request = { "bbox":"%s" % bbox, }
-        elif 'point' in kwargs:
-            point = kwargs['point']
-            if isinstance(point, tuple):
-                bbox = list(point)
-            if isinstance(point, list):
-                point = str(point)[1:-1]
-            point = point.replace(' ','')
-            request = { "point":"%s" % point, }
-        elif 'state' in kwargs:
-            request = { "state":kwargs['state'], }
-        else:
-            errmsg = 'No area bounds criteria specified.'
-            errmsg += ' One of "point", "bbox" or "state" is required.'
-            raise KeyError, errmsg
+        request = self._acisAreaRequest(**kwargs)
 
-        client = AcisGridDataClient(debug=debug)
+        client = AcisGridDataClient(cache=self._acisResponseCache(**kwargs),
+                                    debug=debug)
         _start_date = client.acisDateString(start_date)
         if end_date is not None:
             _end_date = client.acisDateString(end_date)
@@ -92,6 +77,138 @@ class AcisGridDownloadMixin:
 
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 
+    def getAcisGridDataByChunks(self, acis_grid_id, elems, start_date,
+                                      end_date, include_dates=True,
+                                      chunk_days=7, max_threads=4, **kwargs):
+        """ Download grids for a date range in chunks of chunk_days days.
+        Chunks are requested concurrently by a bounded pool of threads
+        and each response is decoded as it arrives, directly into a
+        preallocated (days, ny, nx) array for each element.
+
+        Accepts the same arguments as getAcisGridData plus :
+
+        chunk_days  : number of days in each request
+        max_threads : maximum number of concurrent requests
+        base_url    : url of the ACIS web services server (optional)
+        cache       : AcisResponseCache or path to a cache directory
+                      (optional, also accepted by getAcisGridData)
+
+        Returns
+        --------------------------------------------------------------------
+        dictionary : same as getAcisGridData except that element grids
+                     are always 3D. Days missing from the responses are
+                     filled with N.nan.
+        """
+        debug = kwargs.get('debug',False)
+        verbose = kwargs.get('verbose',debug)
+        base_url = kwargs.get('base_url', DEFAULT_URL)
+        cache = self._acisResponseCache(**kwargs)
+        area = self._acisAreaRequest(**kwargs)
+
+        if isinstance(elems, basestring): _elems = elems.split(',')
+        else: _elems = list(elems)
+
+        meta = kwargs.get('meta', None)
+        if isinstance(meta, (list,tuple)): meta = ','.join(meta)
+
+        start_date = asDatetimeDate(start_date)
+        end_date = asDatetimeDate(end_date)
+        num_days = (end_date - start_date).days + 1
+        if num_days < 1:
+            errmsg = 'End date (%s) is before start date (%s).'
+            raise ValueError, errmsg % (str(end_date), str(start_date))
+
+        chunks = Queue.Queue()
+        chunk_start = start_date
+        while chunk_start <= end_date:
+            chunk_end = min(chunk_start + \
+                            datetime.timedelta(days=chunk_days-1), end_date)
+            chunks.put((chunk_start, chunk_end))
+            chunk_start = chunk_end + datetime.timedelta(days=1)
+
+        grids = { }
+        lock = threading.Lock()
+        errors = [ ]
+        meta_values = { }
+
+        def saveGrid(day_index, date_string, elem_index, grid):
+            day = (self.acisStringToDate(date_string) - start_date).days
+            elem = _elems[elem_index]
+            lock.acquire()
+            try:
+                # allocate when the grid shape is known
+                if elem not in grids:
+                    grids[elem] = N.empty((num_days,) + N.shape(grid),
+                                          dtype=float)
+                    grids[elem].fill(N.nan)
+            finally:
+                lock.release()
+            grids[elem][day] = grid
+
+        def worker():
+            client = AcisGridDataClient(base_url=base_url, cache=cache,
+                                        debug=debug)
+            while True:
+                try:
+                    chunk_start, chunk_end = chunks.get_nowait()
+                except Queue.Empty:
+                    return
+                request = dict(area)
+                request['sdate'] = client.acisDateString(chunk_start)
+                request['edate'] = client.acisDateString(chunk_end)
+                request['elems'] = elems
+                # metadata grids are the same for every chunk
+                if meta is not None and chunk_start == start_date:
+                    request['meta'] = meta
+                if verbose:
+                    print 'getAcisGridDataByChunks :\n', request
+                try:
+                    response, url = client.openRequest('GridData',
+                                         grid=acisGridNumber(acis_grid_id),
+                                         **request)
+                    try:
+                        decoder = AcisGridStreamDecoder(response)
+                        values = decoder.decode(saveGrid)
+                    finally:
+                        response.close()
+                    if 'meta' in values: meta_values.update(values['meta'])
+                except Exception as e:
+                    lock.acquire()
+                    errors.append((chunk_start, chunk_end, e))
+                    lock.release()
+
+        num_threads = max(1, min(max_threads, chunks.qsize()))
+        threads = [threading.Thread(target=worker) for n in range(num_threads)]
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+        for thread in threads: thread.join()
+
+        if errors:
+            chunk_start, chunk_end, error = errors[0]
+            errmsg = 'ACIS grid request for %s thru %s failed : %s'
+            raise IOError, errmsg % (str(chunk_start), str(chunk_end),
+                                     str(error))
+
+        if include_dates:
+            data_dict = { 'dates': tuple([start_date + \
+                                          datetime.timedelta(days=day)
+                                          for day in range(num_days)]), }
+        else: data_dict = { }
+        for elem_name in _elems:
+            data_dict[elem_name] = grids.get(elem_name, None)
+
+        if meta is not None:
+            for key in ('elev','lat','lon'):
+                if key in meta_values:
+                    meta_values[key] = \
+                        self.unpackAcisGrid(key, meta_values[key])
+            data_dict.update(meta_values)
+
+        return data_dict
+
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
     def acisStringToDate(self, acis_date_str):
         return datetime.date(*[int(part) for part in acis_date_str.split('-')])
 
@@ -141,6 +258,39 @@ class AcisGridDownloadMixin:
 
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 
+    def _acisResponseCache(self, **kwargs):
+        cache = kwargs.get('cache', None)
+        if isinstance(cache, basestring): return AcisResponseCache(cache)
+        return cache
+
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+    def _acisAreaRequest(self, **kwargs):
+        if 'bbox' in kwargs:
+            bbox = kwargs['bbox']
+            if isinstance(bbox, tuple):
+                bbox = list(bbox)
+            if isinstance(bbox, list):
+                bbox = str(bbox)[1:-1]
+            bbox = bbox.replace(' ','')
+            return { "bbox":"%s" % bbox, }
+        elif 'point' in kwargs:
+            point = kwargs['point']
+            if isinstance(point, tuple):
+                bbox = list(point)
+            if isinstance(point, list):
+                point = str(point)[1:-1]
+            point = point.replace(' ','')
+            return { "point":"%s" % point, }
+        elif 'state' in kwargs:
+            return { "state":kwargs['state'], }
+        else:
+            errmsg = 'No area bounds criteria specified.'
+            errmsg += ' One of "point", "bbox" or "state" is required.'
+            raise KeyError, errmsg
+
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
     def unpackAcisGrid(self, elem, grid):
         narray = N.array(grid)
         narray = narray.astype(float)
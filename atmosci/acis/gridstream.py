@@ -0,0 +1,238 @@
+""" Incremental decoder for ACIS GridData responses.
+
+A GridData response has the form :
+
+    {"meta": {...}, "data": [["YYYY-MM-DD", grid, grid, ...], ...]}
+
+where each grid is a list of rows and each row is a list of numbers. The
+decoder reads the response in blocks and converts each row directly into
+a NumPy array as soon as it is complete, so the full response string and
+the nested Python lists produced by json.loads are never held in memory.
+Values other than the "data" array (e.g. "meta" or "error") are small and
+are decoded with json.
+"""
+
+try:
+    import simplejson as json
+except ImportError:
+    import json
+
+import numpy as N
+
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+READ_BLOCK_SIZE = 256 * 1024
+WHITESPACE = ' \t\r\n'
+
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+class AcisGridStreamDecoder(object):
+    """ Decodes an ACIS GridData response from a file-like object.
+
+    Arguments
+    --------------------------------------------------------------------
+    stream     : file-like object with a read(num_bytes) method, e.g. the
+                 response returned by AcisWebServicesClient.openQuery
+    block_size : number of bytes read from the stream at a time
+    """
+
+    def __init__(self, stream, block_size=READ_BLOCK_SIZE):
+        self.stream = stream
+        self.block_size = block_size
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+        self.values = { }
+
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+    def decode(self, grid_callback):
+        """ Decode the response, passing each grid to grid_callback as
+        soon as it has been read.
+
+        grid_callback(day_index, date_string, elem_index, grid)
+            day_index   : position of the day in the response's data array
+            date_string : date as returned by ACIS (YYYY-MM-DD)
+            elem_index  : position of the element in the request's elems
+            grid        : 2D NumPy array of floats, or a float for point
+                          requests
+
+        Returns
+        --------------------------------------------------------------------
+        dictionary : all top level values other than "data" (e.g. "meta"),
+                     decoded with json
+        """
+        self._expect('{')
+        if self._peek() == '}':
+            self._advance()
+            self._documentComplete()
+            return self.values
+
+        while True:
+            key = self._readString()
+            self._expect(':')
+            if key == 'data': self._decodeData(grid_callback)
+            else: self.values[key] = json.loads(self._readValueText())
+            char = self._next()
+            if char == '}': break
+            if char != ',': self._syntaxError(',', char)
+
+        if 'error' in self.values:
+            raise ValueError, 'ACIS error : %s' % self.values['error']
+        self._documentComplete()
+        return self.values
+
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+    def _decodeData(self, grid_callback):
+        self._expect('[')
+        if self._peek() == ']':
+            self._advance()
+            return
+
+        day_index = 0
+        while True:
+            self._expect('[')
+            date_string = self._readString()
+            elem_index = 0
+            char = self._next()
+            while char == ',':
+                grid_callback(day_index, date_string, elem_index,
+                              self._readGrid())
+                elem_index += 1
+                char = self._next()
+            if char != ']': self._syntaxError(']', char)
+            day_index += 1
+            char = self._next()
+            if char == ']': break
+            if char != ',': self._syntaxError(',', char)
+
+    def _readGrid(self):
+        if self._peek() != '[':
+            # point requests return a single value instead of a grid
+            return float(json.loads(self._readValueText()))
+
+        self._advance()
+        rows = [ ]
+        if self._peek() == ']':
+            self._advance()
+            return N.array(rows, dtype=float)
+        while True:
+            rows.append(self._readRow())
+            char = self._next()
+            if char == ']': break
+            if char != ',': self._syntaxError(',', char)
+        return N.array(rows, dtype=float)
+
+    def _readRow(self):
+        self._expect('[')
+        end = self._find(']')
+        row = N.fromstring(self.buffer[self.pos:end], dtype=float, sep=',')
+        self.pos = end + 1
+        return row
+
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+    def _readString(self):
+        if self._peek() != '"': self._syntaxError('"', self._peek())
+        end = self._find('"', 1)
+        # skip escaped quotes
+        while self.buffer[end-1] == '\\':
+            end = self._find('"', end - self.pos + 1)
+        text = self.buffer[self.pos:end+1]
+        self.pos = end + 1
+        return json.loads(text)
+
+    def _readValueText(self):
+        """ Returns the raw text of the next JSON value """
+        self._peek()
+        start = self.pos
+        depth = 0
+        in_string = False
+        index = start
+        while True:
+            if index >= len(self.buffer):
+                # _fill may discard consumed text, so keep the offsets
+                offset = index - start
+                self.pos = start
+                if not self._fill(): break
+                start = self.pos
+                index = start + offset
+                continue
+            char = self.buffer[index]
+            if in_string:
+                if char == '\\': index += 1
+                elif char == '"': in_string = False
+            elif char == '"': in_string = True
+            elif char in '[{': depth += 1
+            elif char in ']}':
+                if depth == 0: break
+                depth -= 1
+                if depth == 0:
+                    index += 1
+                    break
+            elif char == ',' and depth == 0: break
+            index += 1
+        self.pos = index
+        return self.buffer[start:index]
+
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+    def _documentComplete(self):
+        # the decoder stops at the end of the document instead of reading
+        # the stream to EOF, let streams that care (e.g. a caching
+        # response) know that the document was read successfully
+        complete = getattr(self.stream, 'documentComplete', None)
+        if complete is not None: complete()
+
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+    def _advance(self):
+        self.pos += 1
+
+    def _expect(self, expected):
+        char = self._next()
+        if char != expected: self._syntaxError(expected, char)
+
+    def _fill(self):
+        """ Read the next block from the stream, discarding text that has
+        already been decoded. Returns False at end of stream.
+        """
+        if self.eof: return False
+        block = self.stream.read(self.block_size)
+        if not block:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + block
+        self.pos = 0
+        return True
+
+    def _find(self, char, offset=0):
+        """ Returns the buffer index of the next occurrence of char at or
+        after self.pos + offset, reading from the stream as needed.
+        """
+        index = self.buffer.find(char, self.pos + offset)
+        while index < 0:
+            searched = max(len(self.buffer) - self.pos, offset)
+            if not self._fill():
+                errmsg = 'Unexpected end of ACIS response, expected "%s"'
+                raise ValueError, errmsg % char
+            index = self.buffer.find(char, self.pos + searched)
+        return index
+
+    def _next(self):
+        char = self._peek()
+        self.pos += 1
+        return char
+
+    def _peek(self):
+        while True:
+            while self.pos < len(self.buffer):
+                char = self.buffer[self.pos]
+                if char not in WHITESPACE: return char
+                self.pos += 1
+            if not self._fill(): return ''
+
+    def _syntaxError(self, expected, found):
+        errmsg = 'Invalid ACIS response : expected "%s" but found "%s"'
+        raise ValueError, errmsg % (expected, found)
@@ -0,0 +1,116 @@
+#! /Volumes/Transport/venv2/ndfd/bin/python
+
+""" Minimal local stand-in for the ACIS GridData web service.
+
+Responds to POST /GridData with synthetic grids for every date in the
+requested range so that chunked downloads can be tested without access to
+ACIS. The value at each node is the day of year plus the element number,
+except for the last node of each grid, which is always missing (-999).
+
+    fake_acis_grid_server.py -p 8765 -y 200 -x 300
+
+    factory.getAcisGridDataByChunks(1, 'mint,maxt', start, end,
+                 bbox='-80,40,-70,45', base_url='http://localhost:8765/')
+"""
+
+import datetime
+import json
+import time
+import urlparse
+
+from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+from SocketServer import ThreadingMixIn
+
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+from optparse import OptionParser
+parser = OptionParser()
+parser.add_option('-d', action='store', type='float', dest='delay',
+                  default=0., help='seconds to wait before responding')
+parser.add_option('-p', action='store', type='int', dest='port', default=8765)
+parser.add_option('-x', action='store', type='int', dest='num_cols',
+                  default=10)
+parser.add_option('-y', action='store', type='int', dest='num_rows',
+                  default=8)
+parser.add_option('-v', action='store_true', dest='verbose', default=False)
+
+options, args = parser.parse_args()
+
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+def acisDate(date_str):
+    return datetime.date(*[int(part) for part in date_str.split('-')])
+
+def fakeGrid(value):
+    rows = [ ]
+    for row in range(options.num_rows):
+        rows.append([value for col in range(options.num_cols)])
+    rows[-1][-1] = -999
+    return rows
+
+def coordGrid(first, step, by_row):
+    rows = [ ]
+    for row in range(options.num_rows):
+        if by_row: rows.append([first + row*step] * options.num_cols)
+        else: rows.append([first + col*step for col in range(options.num_cols)])
+    return rows
+
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+class FakeAcisHandler(BaseHTTPRequestHandler):
+
+    def do_POST(self):
+        if not self.path.rstrip('/').endswith('GridData'):
+            self.send_error(404)
+            return
+
+        length = int(self.headers.getheader('Content-Length', 0))
+        form = urlparse.parse_qs(self.rfile.read(length))
+        params = json.loads(form['params'][0])
+        if options.verbose: print 'request :', params
+
+        if 'date' in params:
+            start_date = end_date = acisDate(params['date'])
+        else:
+            start_date = acisDate(params['sdate'])
+            end_date = acisDate(params['edate'])
+        num_elems = len(params['elems'])
+
+        data = [ ]
+        date = start_date
+        while date <= end_date:
+            doy = date.timetuple().tm_yday
+            day = [date.strftime('%Y-%m-%d'),]
+            for elem in range(num_elems):
+                day.append(fakeGrid(doy + elem))
+            data.append(day)
+            date += datetime.timedelta(days=1)
+
+        result = { 'data': data }
+        if 'meta' in params:
+            result['meta'] = { 'lat': coordGrid(40., 0.04167, True),
+                               'lon': coordGrid(-80., 0.04167, False) }
+
+        if options.delay > 0: time.sleep(options.delay)
+        body = json.dumps(result)
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if options.verbose:
+            BaseHTTPRequestHandler.log_message(self, format, *args)
+
+class ThreadedHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+server = ThreadedHTTPServer(('localhost', options.port), FakeAcisHandler)
+print 'fake ACIS GridData server on port', options.port
+try:
+    server.serve_forever()
+except KeyboardInterrupt:
+    server.server_close()
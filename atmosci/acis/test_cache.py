@@ -0,0 +1,171 @@
+""" Regression tests for atmosci.acis.cache
+
+    python -m pytest atmosci/acis/test_cache.py
+"""
+
+import datetime
+import json
+import threading
+import urlparse
+from StringIO import StringIO
+
+from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+
+import numpy as N
+
+from atmosci.acis.cache import AcisResponseCache, CachingAcisResponse
+from atmosci.acis.griddata import AcisGridDownloadMixin
+from atmosci.acis.gridstream import AcisGridStreamDecoder
+
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+ENDPOINT = 'http://localhost/GridData'
+QUERY = '{"grid":"1","sdate":"2017-04-01","edate":"2017-04-02","elems":"maxt"}'
+RESPONSE = '{"data":[["2017-04-01",[[1,2],[3,4]]],["2017-04-02",[[5,6],[7,8]]]]}\n'
+
+class FakeResponse(object):
+    """ Stands in for a urllib2 response """
+    def __init__(self, text):
+        self.stream = StringIO(text)
+    def close(self):
+        self.stream.close()
+    def getcode(self):
+        return 200
+    def geturl(self):
+        return ENDPOINT
+    def read(self, num_bytes=-1):
+        return self.stream.read(num_bytes)
+
+def ignoreGrid(day_index, date_string, elem_index, grid):
+    pass
+
+def archiveCache(dirpath, **kwargs):
+    return AcisResponseCache(dirpath,
+                             latest_available_date=datetime.date(2018,1,1),
+                             **kwargs)
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+def test_streamed_response_is_cached(tmpdir):
+    cache = archiveCache(str(tmpdir))
+    response = CachingAcisResponse(FakeResponse(RESPONSE),
+                                   cache.writer(ENDPOINT, QUERY))
+    # small blocks, the decoder stops at the final "}" and never sees EOF
+    AcisGridStreamDecoder(response, block_size=16).decode(ignoreGrid)
+    response.close()
+    assert cache.get(ENDPOINT, QUERY) == RESPONSE
+
+def test_incomplete_response_is_not_cached(tmpdir):
+    cache = archiveCache(str(tmpdir))
+    response = CachingAcisResponse(FakeResponse(RESPONSE),
+                                   cache.writer(ENDPOINT, QUERY))
+    response.read(20)
+    response.close()
+    assert cache.get(ENDPOINT, QUERY) is None
+
+def test_error_response_is_not_cached(tmpdir):
+    cache = archiveCache(str(tmpdir))
+    response = CachingAcisResponse(FakeResponse('{"error":"bad grid"}'),
+                                   cache.writer(ENDPOINT, QUERY))
+    try:
+        AcisGridStreamDecoder(response).decode(ignoreGrid)
+    except ValueError:
+        pass
+    response.close()
+    assert cache.get(ENDPOINT, QUERY) is None
+
+def test_commits_do_not_scan_cache(tmpdir):
+    cache = archiveCache(str(tmpdir), evict_interval=5)
+    scans = [ ]
+    all_entries = cache._allEntries
+    def countingScan():
+        scans.append(1)
+        return all_entries()
+    cache._allEntries = countingScan
+    for day in range(1, 11):
+        query = QUERY.replace('04-01', '04-%02d' % day)
+        cache.put(ENDPOINT, query, RESPONSE)
+    # first commit and every 5th after that
+    assert len(scans) == 2
+    assert cache._total_bytes == sum([entry.size()
+                                      for entry in tmpdir.listdir()])
+
+def test_eviction_keeps_cache_under_limit(tmpdir):
+    cache = archiveCache(str(tmpdir))
+    cache.put(ENDPOINT, QUERY, RESPONSE)
+    # room for about 3 entries, sizes vary with the tmp filename that
+    # gzip writes into each entry's header
+    cache.max_bytes = cache._total_bytes * 3
+    queries = [QUERY]
+    for day in range(2, 8):
+        queries.append(QUERY.replace('04-01', '04-%02d' % day))
+        cache.put(ENDPOINT, queries[-1], RESPONSE)
+        sizes = [entry.size() for entry in tmpdir.listdir()]
+        assert cache._total_bytes == sum(sizes) <= cache.max_bytes
+    # only the least recently used entries were evicted
+    assert 2 <= len(sizes) <= 3
+    kept = len(sizes)
+    for query in queries[-kept:]:
+        assert cache.get(ENDPOINT, query) == RESPONSE
+    for query in queries[:-kept]:
+        assert cache.get(ENDPOINT, query) is None
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+class GridDataHandler(BaseHTTPRequestHandler):
+    """ Answers GridData requests with a 2x3 grid for each day """
+    requests = [ ]
+
+    def do_POST(self):
+        length = int(self.headers.getheader('Content-Length', 0))
+        params = json.loads(
+                 urlparse.parse_qs(self.rfile.read(length))['params'][0])
+        self.requests.append(params)
+        date = datetime.date(*[int(part) for part in
+                               params['sdate'].split('-')])
+        end_date = datetime.date(*[int(part) for part in
+                                   params['edate'].split('-')])
+        data = [ ]
+        while date <= end_date:
+            doy = date.timetuple().tm_yday
+            data.append([date.strftime('%Y-%m-%d'), [[doy]*3, [doy]*3]])
+            date += datetime.timedelta(days=1)
+        body = json.dumps({ 'data': data })
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class ChunkDownloader(AcisGridDownloadMixin):
+    pass
+
+def test_chunk_download_is_served_from_cache(tmpdir):
+    server = HTTPServer(('localhost', 0), GridDataHandler)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    base_url = 'http://localhost:%d/' % server.server_address[1]
+    del GridDataHandler.requests[:]
+    cache = archiveCache(str(tmpdir))
+    downloader = ChunkDownloader()
+    try:
+        results = [ ]
+        for attempt in range(2):
+            results.append(downloader.getAcisGridDataByChunks(1, 'maxt',
+                           datetime.date(2017,4,1), datetime.date(2017,4,6),
+                           chunk_days=3, max_threads=2, bbox='-80,40,-79,41',
+                           base_url=base_url, cache=cache))
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    # both chunks were requested once, the second download was all hits
+    assert len(GridDataHandler.requests) == 2
+    first, second = results
+    assert first['maxt'].shape == (6, 2, 3)
+    assert N.array_equal(first['maxt'], second['maxt'])
+    assert N.array_equal(first['maxt'][:,0,0], N.arange(91, 97))
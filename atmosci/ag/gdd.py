@@ -1,4 +1,6 @@
 
+import datetime
+
 import numpy as N
 
 
@@ -428,7 +430,7 @@ class GDDAccumulator(GDDCalculatorMethods, object):
     def accumulate(self, daily_gdd, axis=0):
         if self.accumulated_gdd is not None:
             return self.accumulateGDD(daily_gdd, axis) + \
-                   self._previouslyAccumulated(daily_grid.shape)
+                   self._previouslyAccumulated(daily_gdd.shape)
         else: return self.accumulateGDD(daily_gdd, axis)
 
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
@@ -442,6 +444,127 @@ class GDDAccumulator(GDDCalculatorMethods, object):
             else: return self.accumulated_gdd[-1,:,:]
 
 
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+class StreamingGDDAccumulator(GDDCalculatorMethods, object):
+    """ Accumulates GDD one chunk of days at a time. Only a running 2D
+    grid of accumulated GDD is carried between chunks, so memory use
+    depends on the chunk size instead of the length of the season.
+    """
+
+    def __init__(self, low_threshold, high_threshold=None,
+                       previously_accumulated_gdd=None):
+        if high_threshold is None:
+            self.threshold = low_threshold
+        else: self.threshold = (low_threshold, high_threshold)
+        self.accumulated = previously_accumulated_gdd
+
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+    def __call__(self, mint, maxt):
+        """ Calculate daily and accumulated GDD for a chunk of days.
+
+        Arguments
+        --------------------------------------------------------------------
+        mint : NumPy array of minimum temperature, 2D (single day) or 3D
+               with time as the first dimension
+        maxt : NumPy array of maximum temperature, same shape as mint
+
+        Returns
+        --------------------------------------------------------------------
+        tuple : 3D NumPy arrays of daily GDD and accumulated GDD
+        """
+        avgt = self.calcAvgTemp(maxt, mint)
+        daily_gdd = self.calcGDD(avgt, self.threshold)
+        if daily_gdd.ndim == 2: daily_gdd = daily_gdd[N.newaxis,:,:]
+
+        accumulated_gdd = N.cumsum(daily_gdd, axis=0)
+        if self.accumulated is not None: accumulated_gdd += self.accumulated
+        self.accumulated = accumulated_gdd[-1].copy()
+
+        return daily_gdd, accumulated_gdd
+
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+    def resume(self, gdd_manager, accum_path, start_date=None):
+        """ Initialize the running accumulator from a GDD file.
+
+        Arguments
+        --------------------------------------------------------------------
+        gdd_manager : time grid file manager for the GDD file
+        accum_path  : path to accumulated GDD dataset in the file
+        start_date  : first date to be calculated. If None, calculation
+                      resumes on the day after the dataset's last valid
+                      date.
+
+        Returns
+        --------------------------------------------------------------------
+        datetime.date : first date that needs to be calculated
+        """
+        first_date = gdd_manager.getAttributeAsDate(accum_path, 'start_date')
+        if first_date is None:
+            first_date = gdd_manager.getAttributeAsDate('__file__',
+                                                        'start_date')
+        if start_date is None:
+            last_valid = gdd_manager.getAttributeAsDate(accum_path,
+                                                        'last_valid_date')
+            if last_valid is None: start_date = first_date
+            else: start_date = last_valid + datetime.timedelta(days=1)
+        elif isinstance(start_date, datetime.datetime):
+            start_date = start_date.date()
+
+        if start_date > first_date:
+            prev_date = start_date - datetime.timedelta(days=1)
+            self.accumulated = gdd_manager.dataForTime(accum_path, prev_date)
+        else: self.accumulated = None
+        return start_date
+
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+    def updateGDDFile(self, temp_reader, gdd_manager, daily_path, accum_path,
+                            end_date, start_date=None, chunk_days=14,
+                            **kwargs):
+        """ Calculate GDD directly from the temperature extremes in a
+        temperature grid file and write the results to a GDD file. Both
+        files are processed in chunks of chunk_days days and each chunk is
+        written to each GDD dataset in a single time slice. Calculation
+        resumes from the accumulated dataset's last valid date unless
+        start_date is passed.
+
+        Arguments
+        --------------------------------------------------------------------
+        temp_reader : temperature file reader with TempextAccessMethods
+        gdd_manager : GDD file manager, must be open for writing
+        daily_path  : path to daily GDD dataset in the GDD file
+        accum_path  : path to accumulated GDD dataset in the GDD file
+        end_date    : last date to be calculated
+        start_date  : first date to be calculated (optional)
+        chunk_days  : number of days read and written at once
+        kwargs      : passed to temp_reader.tempExtremes
+
+        Returns
+        --------------------------------------------------------------------
+        tuple : first and last dates updated, (None, None) when the GDD
+                file was already up to date
+        """
+        if isinstance(end_date, datetime.datetime): end_date = end_date.date()
+        start_date = self.resume(gdd_manager, accum_path, start_date)
+        if start_date > end_date: return None, None
+
+        chunk_start = start_date
+        while chunk_start <= end_date:
+            chunk_end = min(chunk_start + \
+                            datetime.timedelta(days=chunk_days-1), end_date)
+            mint, maxt = temp_reader.tempExtremes(chunk_start, chunk_end,
+                                                  **kwargs)
+            daily_gdd, accumulated_gdd = self(mint, maxt)
+            gdd_manager.updateDataset(daily_path, chunk_start, daily_gdd)
+            gdd_manager.updateDataset(accum_path, chunk_start, accumulated_gdd)
+            chunk_start = chunk_end + datetime.timedelta(days=1)
+
+        return start_date, end_date
+
+
 # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
 # clone of GDDAccumulator ... provides consistency with other modules
 # that require different methods ofr handling arrays and 3D grids
@@ -47,13 +47,13 @@ class LinvillArrayModel(LinvillDaylenModel):
         nodes = N.where(rad_lats > LAT40_RADS)
         if len(nodes[0]) > 0:
             daylens[nodes] = \
-            self._daylightAtLatsGT40(clim_day, rad_lats[nodes])
+            self._daylightAtLatGT40(clim_day, rad_lats[nodes])
 
         # adjust grid nodes <= 40 degrees latitude
         nodes = N.where(rad_lats <= LAT40_RADS)
         if len(nodes[0]) > 0:
             daylens[nodes] = \
-            self._daylightAtLatsGT40(clim_day, rad_lats[nodes])
+            self._daylightAtLatLE40(clim_day, rad_lats[nodes])
 
         # drop the decimal hours before returning
         return daylens
@@ -1,16 +1,51 @@
-
+import datetime
 from dateutil.relativedelta import relativedelta
 ONE_DAY = relativedelta(days=1)
 import numpy as N
 
 from .array import LinvillArrayModel
+from .model import LAT40_RADS
+
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+def linvillHourlyFactors():
+    """ Build the table of Linvill hourly temperature factors.
+
+    Every hourly temperature in the Linvill model can be written as
+    mint + ((maxt - mint) * factor) where the factor depends only on the
+    length of the day and the hour. Since day length is a whole number
+    of hours, all possible factors fit in a table.
+
+    Returns
+    =======
+    2D numpy array, dtype=float, shape=(25, 24)
+            factor for each day length (row) and hour of the day (column)
+    """
+    daylens = N.arange(25, dtype=float)[:,N.newaxis]
+    hours = N.arange(24, dtype=float)[N.newaxis,:]
+
+    # daytime hours follow a sine curve, min temp is at the first hour
+    day = N.sin( (N.pi * hours) / (daylens + 4.) )
+
+    # night time temps decay logarithmically from the temp at sunset
+    sunset = N.sin( (N.pi * (daylens - 1.)) / (daylens + 4.) )
+    night_hour = N.maximum(hours - daylens, 0.)
+    night_hours = N.maximum(24. - daylens, 1.)
+    night = sunset * (1. - (N.log(night_hour + 1.) / night_hours))
+
+    factors = N.where(hours < daylens, day, night)
+    # a day must have at least one hour of daylight
+    factors[0] = factors[1]
+    return factors
+
+LINVILL_HOURLY_FACTORS = linvillHourlyFactors()
 
 # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
 
 class Linvill3DGridModel(LinvillArrayModel):
     """ Class to calculate the length of a day (or group of days) and
     estimate hourly temperatures at each latitude in a grid of latitudes.
-    
+
     Based on the model described in :
         Linvill, Dale E. (1990), "Calculating Chilling Hours and Chill
         Units from Daily Maximum and Minimum Temperature Observations"
@@ -37,53 +72,176 @@ class Linvill3DGridModel(LinvillArrayModel):
         3D numpy array, dtype=int, shape=(num days, rad_lats.shape)
                 length of day for each date at each grid node.
         """
-        # convert date to factored climatoligcal day
-        clim_days = \
-        self.climatologicalDayGrid(first_date, last_date, rad_lats.shape)
+        num_days = (last_date - first_date).days + 1
+        clim_days = self.climatologicalDayArray(first_date, num_days)
+        daylens = self.dayLengthTable(clim_days, rad_lats)
+        return daylens + N.zeros((num_days,) + rad_lats.shape, dtype=int)
 
-        # daylight hours
-        daylens = N.zeroslike(clim_days)
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+    def dayLengthTable(self, clim_days, rad_lats):
+        """ Determine the number of hours of daylight for each of a
+        sequence of climatological days at each latitude in a grid.
+        Day lengths are calculated once for each unique climatological
+        day. When every row of the grid has a constant latitude, they
+        are also calculated only once per row.
+
+        Arguments
+        =========
+        clim_days : 1D numpy array, dtype=int
+                    Linvill model climatological days
+        rad_lats : 2D numpy array, dtype=float
+                   grid of latitudes in radians
+
+        Returns
+        =======
+        3D numpy array, dtype=int
+                length of day for each climatological day at each
+                latitude. Shape is (num days, num rows, 1) when all rows
+                have a constant latitude, otherwise it is
+                (num days, rad_lats.shape). Either shape broadcasts
+                against (num days, rad_lats.shape).
+        """
+        rad_lats = N.asarray(rad_lats, dtype=float)
+        if N.all(rad_lats == rad_lats[:,:1]): rad_lats = rad_lats[:,:1]
 
-        # adjust grid nodes > 40 degrees latitude
-        nodes = N.where(rad_lats > LAT40_RADS)
-        if len(nodes[0]) > 0:
-            daylens[nodes] = \
-            self._daylightAtLatsGT40(clim_day_factor,rad_lats[nodes])
+        unique_days, day_indexes = N.unique(clim_days, return_inverse=True)
+        cos_days = N.cos( (unique_days * 0.0172) - 1.95 )
+        cos_days = cos_days.reshape((-1,) + (1,) * rad_lats.ndim)
 
-        # adjust grid nodes <= 40 degrees latitude
-        nodes = N.where(rad_lats <= LAT40_RADS)
-        if len(nodes[0]) > 0:
-            daylens[nodes] = \
-            self._daylightAtLatsGT40(clim_day_factor,rad_lats[nodes])
+        tan_lats = N.tan(rad_lats)
+        gt_40 = ( cos_days * ((tan_lats**2 * 1.7643) + 1.6164) ) + 12.25
+        le_40 = ( cos_days * (tan_lats * 3.34) ) + 12.14
+        daylight = N.where(rad_lats > LAT40_RADS, gt_40, le_40)
 
-        # drop the decimal hours before returning
-        return daylens.astype(int)
+        # drop the decimal hours
+        daylens = N.clip(daylight.astype(int), 1, 24)
+        return daylens[day_indexes]
 
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 
+    def climatologicalDayArray(self, first_date, num_days):
+        """ Returns a 1D numpy array, dtype=int, containing the Linvill
+        climatological day for each of num_days consecutive dates.
+        """
+        dates = [first_date + datetime.timedelta(days=day)
+                 for day in range(num_days)]
+        return N.array([self.climatologicalDay(date) for date in dates],
+                       dtype=int)
+
     def climatologicalDayGrid(self, first_date, last_date, grid_shape):
-        clim_days = tuple(climatologicalDaysInRange(first_date, last_date))
-        template_grid = N.array(grid_shape, dtype=float)
-        clim_day_grid = \
-        N.array((clim_days.size,) + grid_shape, dtype=float)
+        num_days = (last_date - first_date).days + 1
+        clim_days = self.climatologicalDayArray(first_date, num_days)
+        clim_days = clim_days.reshape((num_days,) + (1,) * len(grid_shape))
+        return clim_days + N.zeros((num_days,) + tuple(grid_shape),
+                                   dtype=float)
+
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+    def hourlyTempGrids(self, daylens, maxt, mint, units='F', dtype=float,
+                              out=None):
+        """ Estimate the temperature at each hour for a block of days at
+        every node in a grid.
+
+        Arguments
+        =========
+        daylens : 3D numpy array, dtype=int
+                  number of hours of daylight, must broadcast against maxt
+        maxt : 3D numpy array, shape=(num days, num rows, num columns)
+               maximum temprature for each day at each node
+        mint : 3D numpy array, shape=(num days, num rows, num columns)
+               minimum temprature for each day at each node
+        units : str
+                units for input temperatures.
+                must be one of 'F' for Fahrenheit, 'C' for Celsius
+        dtype : numpy dtype of returned temperatures
+        out : optional 4D numpy array to receive the temperatures
+
+        Returns
+        =======
+        4D numpy array, shape=(num days, 24, num rows, num columns)
 
-        for indx, clim_day in enumerate(clim_days):
-            template_grid.fill(clim_day)
-            clim_day_grid[indx] = template_grid
-        return clim_day_grid
+        NOTE: calculations are done in degrees Celsius and returned
+              temperatures are always in Celsius
+        """
+        _maxt, _mint = self.maxMinTempAsCelsius(N.asarray(maxt, dtype=dtype),
+                                                N.asarray(mint, dtype=dtype),
+                                                units)
+        temp_diff = _maxt - _mint
+
+        hourly_shape = (_maxt.shape[0], 24) + _maxt.shape[1:]
+        if out is None: out = N.empty(hourly_shape, dtype=dtype)
+        factors = LINVILL_HOURLY_FACTORS.astype(dtype)
+        for hour in range(24):
+            # factors for this hour at every node, by day length
+            hour_factors = factors[:,hour][daylens]
+            N.multiply(temp_diff, hour_factors, out[:,hour])
+            out[:,hour] += _mint
+        return out
 
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 
-    def tempGridsToHourly(self, start_date, lats, maxt, mint, units='F'):
-        hourly_shape = (maxt.shape[0], 24) + maxt.shape[1:]
-        print maxt.shape, hourly_shape
-        hourly_grid = N.empty(hourly_shape, dtype=float)
-        date = start_date
-        for day in range(maxt.shape[0]):
-            print 'day', day
-            daylen = self.dayLength(date, lats[day])
-            hourly_grid[day] = \
-                self.hourlyTempsForDay(daylen, maxt[day], mint[day], units)
-            date += ONE_DAY
-        return hourly_grid
+    def iterHourlyTempGrids(self, start_date, lats, maxt, mint, units='F',
+                                  dtype=float, chunk_days=31):
+        """ Generator that estimates hourly temperatures for a sequence of
+        daily temperature grids in blocks of chunk_days days. Only one
+        block of daily and hourly grids is in memory at a time, so maxt
+        and mint may be Hdf5 datasets.
+
+        Yields
+        ======
+        tuple : (index of first day in block, 4D numpy array of hourly
+                 temperatures in Celsius with shape (days in block, 24,
+                 num rows, num columns))
+        """
+        if lats.ndim == 3: lats = lats[0]
+        num_days = maxt.shape[0]
+        clim_days = self.climatologicalDayArray(start_date, num_days)
+        daylens = self.dayLengthTable(clim_days, self.latToRadians(lats))
+
+        if chunk_days is None: chunk_days = num_days
+        for first_day in range(0, num_days, chunk_days):
+            last_day = min(first_day + chunk_days, num_days)
+            yield first_day, self.hourlyTempGrids(daylens[first_day:last_day],
+                                                  maxt[first_day:last_day],
+                                                  mint[first_day:last_day],
+                                                  units, dtype)
+
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 
+    def tempGridsToHourly(self, start_date, lats, maxt, mint, units='F',
+                                dtype=float, chunk_days=31):
+        """ Estimate hourly temperatures for a sequence of daily maximum
+        and minimum temperature grids.
+
+        Arguments
+        =========
+        start_date : datetime.date or datetime.datetime
+                     date of first grid in maxt and mint
+        lats : 2D numpy array, latitude in degrees at each grid node
+        maxt : 3D numpy array, shape=(num days, num rows, num columns)
+        mint : 3D numpy array, shape=(num days, num rows, num columns)
+        units : str, units for maxt and mint, 'F' or 'C'
+        dtype : numpy dtype of returned temperatures (e.g. N.float32)
+        chunk_days : number of days calculated at a time
+
+        Returns
+        =======
+        4D numpy array, shape=(num days, 24, num rows, num columns)
+                estimated temperatures in Celsius
+        """
+        if lats.ndim == 3: lats = lats[0]
+        num_days = maxt.shape[0]
+        clim_days = self.climatologicalDayArray(start_date, num_days)
+        daylens = self.dayLengthTable(clim_days, self.latToRadians(lats))
+
+        hourly_shape = (num_days, 24) + maxt.shape[1:]
+        hourly_grid = N.empty(hourly_shape, dtype=dtype)
+        if chunk_days is None: chunk_days = num_days
+        for first_day in range(0, num_days, chunk_days):
+            last_day = min(first_day + chunk_days, num_days)
+            self.hourlyTempGrids(daylens[first_day:last_day],
+                                 maxt[first_day:last_day],
+                                 mint[first_day:last_day], units, dtype,
+                                 out=hourly_grid[first_day:last_day])
+        return hourly_grid
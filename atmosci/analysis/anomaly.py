@@ -7,95 +7,177 @@ import numpy as N
 NEIGHBORHOOD = ( (-1,0),(1,0),(0,1),(0,-1),(1,1),(1,-1),
                  (-1,1),(-1,-1),(0,2),(0,-2),(2,0),(-2,0) )
 
+# max number of elements in the point x neighbor masks used by
+# ArrayAnomalyFinder, larger requests are processed in blocks of points
+MAX_MASK_SIZE = 4000000
+
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+def _shiftSlices(offset, size):
+    """ Returns (destination, source) slices that align each index in
+    the destination with the index that is offset from it in the source.
+    """
+    if offset >= 0: return slice(0, size - offset), slice(offset, size)
+    return slice(-offset, size), slice(0, size + offset)
+
+def neighborhoodStats(grid, neighborhood=NEIGHBORHOOD):
+    """ Computes the number of valid neighbors and their mean and standard
+    deviation for every node in a 2D grid at once.
+
+    Neighbors that fall outside the grid or are not finite are excluded
+    from the statistics. Mean and standard deviation are NaN for nodes
+    without any valid neighbors.
+
+    Returns
+    --------------------------------------------------------------------
+    tuple : (counts, means, stddevs), each the same shape as grid
+    """
+    grid = N.asarray(grid, dtype=float)
+    valid = N.isfinite(grid)
+    values = N.where(valid, grid, 0.)
+    num_rows, num_cols = grid.shape
+
+    counts = N.zeros(grid.shape, dtype=int)
+    sums = N.zeros(grid.shape, dtype=float)
+    shifts = [ ]
+    for offset_0, offset_1 in neighborhood:
+        if abs(offset_0) >= num_rows or abs(offset_1) >= num_cols: continue
+        dest_0, src_0 = _shiftSlices(offset_0, num_rows)
+        dest_1, src_1 = _shiftSlices(offset_1, num_cols)
+        dest = (dest_0, dest_1)
+        src = (src_0, src_1)
+        counts[dest] += valid[src]
+        sums[dest] += values[src]
+        shifts.append((dest, src))
+
+    with N.errstate(divide='ignore', invalid='ignore'):
+        means = sums / counts
+        # second pass so deviations match N.std of the neighbor values
+        squares = N.zeros(grid.shape, dtype=float)
+        for dest, src in shifts:
+            diffs = N.where(valid[src], values[src] - means[dest], 0.)
+            squares[dest] += diffs * diffs
+        stddevs = N.sqrt(squares / counts)
+
+    return counts, means, stddevs
+
 # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
 
 class ArrayAnomalyFinder(object):
+    """ Finds values that are suspiciously far from the mean of the values
+    at their neighbors. Neighbors are all points whose lon/lat are within
+    search_radius of the suspicious point.
+
+    belowMinThreshold and aboveMaxThreshold return (values, indexes) where
+    values is an array of the anomalous values and indexes is a tuple of
+    index arrays in the same form as returned by N.where. When a report
+    file is passed, details for each suspicious point are written to it
+    as they are analyzed.
+    """
 
     def __init__(self, data_key, data_manager, search_radius, report_file=None):
         self.data_key = data_key
         self.data_manager = data_manager
-        
+
         data, attrs = data_manager.getData(data_key)
         self._data = data
         self._lons, self._lats = data_manager.getLonLat()
         self._data_units = attrs.get('units',None)
-        
+
         self.search_radius = search_radius
         self.report_file = report_file
 
     def belowMinThreshold(self, threshold, allowed_deviation=1.):
-        suspicious = N.where(self._data <= threshold)
-        if len(self._data.shape) > 1:
-            return self._analyze(list(zip(*suspicious)), allowed_deviation)
-        else:
-            return self._analyze(suspicious, allowed_deviation)
+        return self._analyze(self._data <= threshold, allowed_deviation)
 
     def aboveMaxThreshold(self, threshold, allowed_deviation=1.):
-        suspicious = N.where(self._data >= threshold)
-        if len(self._data.shape) > 1:
-            return self._analyze(list(zip(*suspicious)), allowed_deviation)
-        else:
-            return self._analyze(suspicious, allowed_deviation)
+        return self._analyze(self._data >= threshold, allowed_deviation)
 
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 
     def _analyze(self, suspicious, allowed_deviation):
-        indexes = []
-        values = []
-        anomaly = 0 
-
-        for indx in suspicious:
-            if self.report_file is not None:
-                anomaly += 1
-                self.report_file.write('\n\nsuspicious value %d :' % anomaly)
-                self._reportPointData(indx, '???')
-
-            suspicious_value = self._getDataValue(indx)
-            neighbor_data = self._getNeighborData(indx)
+        indexes = N.where(suspicious)
+        values = self._data[indexes]
+        counts, means, stddevs = self._neighborStats(indexes)
+
+        with N.errstate(invalid='ignore'):
+            deviations = values - means
+            tolerances = allowed_deviation * stddevs
             # must have more than 2 neighbors for the statistics to make sense
-            if len(neighbor_data) > 2:
-                neighbor_data = N.array(neighbor_data)
-                neighbor_mean = N.mean(neighbor_data)
-                neighbor_stddev = N.std(neighbor_data)
-                deviation = suspicious_value - neighbor_mean
-                tolerance = (allowed_deviation * neighbor_stddev)
-                if self.report_file is not None:
-                    value = '%8.3f' % neighbor_mean
-                    self.report_file.write('\n>>> neighbor mean = %s' %
-                                           value.strip())
-                    value = '%8.3f' % neighbor_stddev
-                    self.report_file.write('\n>>> standard deviation = +-%s' %
-                                           value.strip())
-                    value = '%8.3f' % tolerance
-                    self.report_file.write('\n>>> allowed deviation = +-%s' %
-                                           value.strip())
-                    value = '%8.3f' % deviation
-                    self.report_file.write('\n>>> actual deviation = %s' %
-                                           value.strip())
-                if abs(deviation) > tolerance:
-                    indexes.append(indx)
-                    values.append(suspicious_value)
-
-        return values, indexes
-
-    def _getDataValue(self, indx):
-        return self._data[indx]
-
-    def _getNeighborData(self, indx):
+            anomalies = (counts > 2) & (N.abs(deviations) > tolerances)
+
+        if self.report_file is not None:
+            self._report(indexes, counts, means, stddevs, tolerances,
+                         deviations)
+
+        return values[anomalies], tuple([indx[anomalies] for indx in indexes])
+
+    def _neighborIndexes(self, indx):
         radius = self.search_radius
         lon = self._lons[indx]
         lat = self._lats[indx]
         indexes = N.where( (self._lons >= lon - radius) &
                            (self._lons <= lon + radius) &
                            (self._lats >= lat - radius) &
-                           (self._lats <= lat + radius) )
-        indexes = [_indx for _indx in indexes[0] if _indx != indx]
+                           (self._lats <= lat + radius) )[0]
+        return indexes[indexes != indx]
 
-        if self.report_file is not None:
-            for _indx in indexes:
-                self._reportPointData(_indx)
+    def _neighborStats(self, indexes):
+        indexes = indexes[0]
+        num_points = len(indexes)
+        counts = N.zeros(num_points, dtype=int)
+        means = N.empty(num_points, dtype=float)
+        stddevs = N.empty(num_points, dtype=float)
+        if num_points == 0: return counts, means, stddevs
 
-        return self._data[indexes]
+        radius = self.search_radius
+        data = N.asarray(self._data, dtype=float)
+        valid = N.isfinite(data)
+        values = N.where(valid, data, 0.)
+        block = max(1, MAX_MASK_SIZE // max(1, len(data)))
+
+        for start in range(0, num_points, block):
+            points = indexes[start:start+block]
+            lons = self._lons[points][:,N.newaxis]
+            lats = self._lats[points][:,N.newaxis]
+            # one row of neighbor flags for each suspicious point
+            mask = ( (self._lons >= lons - radius) &
+                     (self._lons <= lons + radius) &
+                     (self._lats >= lats - radius) &
+                     (self._lats <= lats + radius) & valid )
+            mask[N.arange(len(points)), points] = False
+
+            count = mask.sum(axis=1)
+            with N.errstate(divide='ignore', invalid='ignore'):
+                mean = N.where(mask, values, 0.).sum(axis=1) / count
+                diffs = N.where(mask, values - mean[:,N.newaxis], 0.)
+                stddev = N.sqrt((diffs * diffs).sum(axis=1) / count)
+
+            end = start + len(points)
+            counts[start:end] = count
+            means[start:end] = mean
+            stddevs[start:end] = stddev
+
+        return counts, means, stddevs
+
+    def _report(self, indexes, counts, means, stddevs, tolerances, deviations):
+        write = self.report_file.write
+        for anomaly, indx in enumerate(zip(*indexes)):
+            if len(indx) == 1: indx = indx[0]
+            write('\n\nsuspicious value %d :' % (anomaly + 1))
+            self._reportPointData(indx, '???')
+            for neighbor in self._neighborIndexes(indx):
+                self._reportPointData(neighbor)
+
+            if counts[anomaly] > 2:
+                value = '%8.3f' % means[anomaly]
+                write('\n>>> neighbor mean = %s' % value.strip())
+                value = '%8.3f' % stddevs[anomaly]
+                write('\n>>> standard deviation = +-%s' % value.strip())
+                value = '%8.3f' % tolerances[anomaly]
+                write('\n>>> allowed deviation = +-%s' % value.strip())
+                value = '%8.3f' % deviations[anomaly]
+                write('\n>>> actual deviation = %s' % value.strip())
 
     def _reportPointData(self, indx, leadin='...'):
         self.report_file.write('\n%s %d  %7.3f  %8.3f  %6.3f' %
@@ -106,6 +188,10 @@ class ArrayAnomalyFinder(object):
 # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
 
 class GridAnomalyFinder(ArrayAnomalyFinder):
+    """ Anomaly finder for 2D grids where neighbors are the nodes at a
+    fixed set of (row, column) offsets. Neighborhood statistics are
+    computed for the whole grid the first time they are needed.
+    """
 
     def __init__(self, data_key, data_manager, report_file=None,
                        neighborhood=NEIGHBORHOOD):
@@ -113,31 +199,23 @@ class GridAnomalyFinder(ArrayAnomalyFinder):
                                     report_file)
         self._neighborhood = neighborhood
         self._size_of_neighborhood = len(neighborhood)
-
-    def _getDataValue(self, indx):
-        return self._data[indx[0],indx[1]]
-
-    def _getNeighborData(self, indx):
-        index_0 = indx[0]
-        index_1 = indx[1]
-        neighbor_data = [ ]
-
-        for _indx in range(self._size_of_neighborhood):
-            offset_0, offset_1 = self._neighborhood[_indx]
-            n_index_0 = index_0 + offset_0
-            n_index_1 = index_1 + offset_1
-            try:
-                value = self._data[n_index_0,n_index_1]
-            except:
-                continue
-            if self.report_file is not None:
-                self._reportPointData((n_index_0,n_index_1))
-
-            # only add if the data is real
-            if N.isfinite(value):
-                neighbor_data.append(value)
-
-        return neighbor_data
+        self._grid_stats = None
+
+    def _neighborIndexes(self, indx):
+        num_rows, num_cols = self._data.shape
+        neighbors = [ ]
+        for offset_0, offset_1 in self._neighborhood:
+            n_index_0 = indx[0] + offset_0
+            n_index_1 = indx[1] + offset_1
+            if 0 <= n_index_0 < num_rows and 0 <= n_index_1 < num_cols:
+                neighbors.append((n_index_0, n_index_1))
+        return neighbors
+
+    def _neighborStats(self, indexes):
+        if self._grid_stats is None:
+            self._grid_stats = neighborhoodStats(self._data, self._neighborhood)
+        counts, means, stddevs = self._grid_stats
+        return counts[indexes], means[indexes], stddevs[indexes]
 
     def _reportPointData(self, indx, leadin='...'):
         index_0 = indx[0]
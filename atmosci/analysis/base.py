@@ -14,6 +14,7 @@ class BaseDetector(object):
         if N.isnan(missing_value):
             def _countMissing(sequence):
                 return len(N.where(N.isnan(sequence))[0])
+            def _missingMask(sequence): return N.isnan(sequence)
             def _isEqual(value_1, value_2):
                 if N.isnan(value_1) : return N.isnan(value_2)
                 return value_1 == value_2
@@ -21,12 +22,15 @@ class BaseDetector(object):
         else:
             def _countMissing(sequence):
                 return len(N.where(sequence == missing_value)[0])
+            def _missingMask(sequence): return sequence == missing_value
             def _isEqual(value_1, value_2): return value_1 == value_2
             def _isMissing(value): return value == missing_value
 
         self.isEqual = _isEqual
         self.isMissing = _isMissing
         self.countMissing = _countMissing
+        self.missingMask = _missingMask
+        self._int_missing_value = missing_value
 
         self.detected = None
         self.filters = None
@@ -58,7 +62,43 @@ class BaseDetector(object):
         else:
             return self._detect(data_array, start_index, end_index)
 
+    def detectAll(self, data_array, axis=0, start_index=0, end_index=None):
+        """ Runs detection on every series along axis of an array at once,
+        e.g. the time series at every node of a (time, rows, columns) block.
+
+        Returns a dictionary that maps the index of each series where
+        something was detected to a tuple in the same form as detect().
+        """
+        data_array = N.asarray(data_array)
+        data_array = N.rollaxis(data_array, axis, data_array.ndim)
+        shape = data_array.shape[:-1]
+        series = data_array.reshape(-1, data_array.shape[-1])
+        if end_index is None: end_index = series.shape[1]
+
+        if self.data_type == int:
+            series = N.where(N.isfinite(series), series,
+                             self._int_missing_value).astype(int)
+
+        detected = { }
+        found = self._detectSeries(series, start_index, end_index)
+        for indx, results in enumerate(found):
+            if not results: continue
+            if shape:
+                node = tuple([int(i) for i in N.unravel_index(indx, shape)])
+            else: node = ()
+            detected[node] = results
+        return detected
+
+    # - - - - - - - - - - - - - - - - - -  - - - - - - - - - - - - - - - - - -
+
     def _detect(self, data_array, start_index, end_index):
+        series = N.asarray(data_array)[N.newaxis,:]
+        return self._detectSeries(series, start_index, end_index)[0]
+
+    def _detectSeries(self, series, start_index, end_index):
+        """ Detect in every row of a 2D (series, values) array. Returns
+        a list with one tuple of results for each row.
+        """
         # do the real work
         raise NotImplementedError
 
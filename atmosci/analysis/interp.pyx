@@ -171,4 +171,9 @@ def mq(double unknown_x, double unknown_y,
     return Hg
     #interpolated = N.reshape(Hg,(x_size,y_size))[0][0]
     #return interpolated
-    
+
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+# batched interpolation for arrays of unknown points
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+include "interp_targets.pxi"
@@ -7,7 +7,12 @@ from Cython.Distutils import build_ext
 import numpy
 
 
-ext_modules = [Extension("interp", ["interp.pyx"])]
+# batched interpolation functions use OpenMP threads via cython.parallel
+# and are shared with the other interp module through interp_targets.pxi
+ext_modules = [Extension("interp", ["interp.pyx"],
+                         depends=["interp_targets.pxi"],
+                         extra_compile_args=['-fopenmp'],
+                         extra_link_args=['-fopenmp'])]
 
 setup(
   name = 'Custom Interpolation Routines',
@@ -0,0 +1,236 @@
+# Batched interpolation functions shared by atmosci/analysis/interp.pyx
+# and atmosci/ndfd/locationfilter/interp.pyx. This file is included at the
+# end of each of those modules, after cython, numpy (as N) and scipy's
+# linalg have been imported.
+
+from cython.parallel import prange
+from libc.math cimport isinf, isnan, INFINITY
+
+from multiprocessing import cpu_count
+
+from scipy.spatial import cKDTree
+
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+# batched interpolation for arrays of unknown points, e.g. every node in a
+# target grid. Known values may be a 1D array (num_known) or a 2D array
+# (time steps, num_known) and results have shape (num targets) or
+# (time steps, num targets) where num targets is the shape of unknown_x.
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+# max number of elements in a (targets x known points) matrix, larger
+# requests are processed in blocks of targets
+MAX_MATRIX_SIZE = 4000000
+
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+def knownNeighbors(unknown_x, unknown_y, known_x_coords, known_y_coords,
+                   max_neighbors=None):
+    """ Finds the known points closest to each unknown point.
+
+    returns:
+    -------
+        2D array of indexes into the known points with one row for each
+        unknown point. When max_neighbors is None (or not less than the
+        number of known points), a single row with every known point is
+        returned and it applies to all unknown points.
+    """
+    known_x = N.asarray(known_x_coords, dtype=N.float64).ravel()
+    known_y = N.asarray(known_y_coords, dtype=N.float64).ravel()
+    num_known = known_x.shape[0]
+    if max_neighbors is None or max_neighbors >= num_known:
+        return N.arange(num_known, dtype=N.intp).reshape((1, num_known))
+
+    tree = cKDTree(N.column_stack((known_x, known_y)))
+    unknown = N.column_stack((N.asarray(unknown_x, dtype=N.float64).ravel(),
+                              N.asarray(unknown_y, dtype=N.float64).ravel()))
+    distances, indexes = tree.query(unknown, k=max_neighbors)
+    if max_neighbors == 1: indexes = indexes[:,N.newaxis]
+    return N.ascontiguousarray(indexes, dtype=N.intp)
+
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef double _idwEstimate(double unknown_x, double unknown_y,
+                         double[:] x, double[:] y, double[:] values,
+                         Py_ssize_t[:] neighbors) nogil:
+    cdef Py_ssize_t n, i
+    cdef Py_ssize_t num_known = values.shape[0]
+    cdef double x_diff, y_diff, dist_sq, value
+    cdef double numerator = 0.
+    cdef double denominator = 0.
+
+    for n in range(neighbors.shape[0]):
+        i = neighbors[n]
+        # cKDTree flags missing neighbors with the number of known points
+        if i < 0 or i >= num_known: continue
+        value = values[i]
+        if isnan(value) or isinf(value): continue
+        x_diff = unknown_x - x[i]
+        y_diff = unknown_y - y[i]
+        dist_sq = (x_diff*x_diff) + (y_diff*y_diff)
+        if dist_sq > 0.:
+            numerator += value / dist_sq
+            denominator += 1. / dist_sq
+
+    if denominator != 0.: return numerator / denominator
+    return INFINITY
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def _idwKernel(double[:] unknown_x, double[:] unknown_y,
+               double[:] known_x, double[:] known_y, double[:] known_values,
+               Py_ssize_t[:,:] neighbors, double[:] estimates,
+               int num_threads):
+    cdef Py_ssize_t t
+    cdef Py_ssize_t num_targets = unknown_x.shape[0]
+    cdef bint shared = neighbors.shape[0] == 1
+
+    for t in prange(num_targets, nogil=True, num_threads=num_threads,
+                    schedule='static'):
+        if shared:
+            estimates[t] = _idwEstimate(unknown_x[t], unknown_y[t], known_x,
+                                        known_y, known_values, neighbors[0])
+        else:
+            estimates[t] = _idwEstimate(unknown_x[t], unknown_y[t], known_x,
+                                        known_y, known_values, neighbors[t])
+
+def idwTargets(unknown_x, unknown_y, known_x_coords, known_y_coords,
+               known_values, max_neighbors=None, num_threads=None):
+    """ Inverse Distance Weighted Average at an array of unknown points.
+    Gives the same result as calling idw for each unknown point, but the
+    targets are processed in parallel threads by compiled code.
+
+    arguments:
+    ---------
+        unknown_x      : array of x coordinates of locations to estimate
+        unknown_y      : array of y coordinates of locations to estimate
+        known_x_coords : 1D array of x coordinates of points with known values
+        known_y_coords : 1D array of y coordinates of points with known values
+        known_values   : 1D array of known values at each x,y point or 2D
+                         array with known values for each time step
+        max_neighbors  : number of closest known points used for each
+                         estimate, None = use all known points
+        num_threads    : number of parallel threads, None = number of CPUs
+    """
+    target_shape = N.shape(unknown_x)
+    x = N.ascontiguousarray(unknown_x, dtype=N.float64).ravel()
+    y = N.ascontiguousarray(unknown_y, dtype=N.float64).ravel()
+    known_x = N.ascontiguousarray(known_x_coords, dtype=N.float64).ravel()
+    known_y = N.ascontiguousarray(known_y_coords, dtype=N.float64).ravel()
+    values = N.ascontiguousarray(known_values, dtype=N.float64)
+    neighbors = knownNeighbors(x, y, known_x, known_y, max_neighbors)
+    if num_threads is None: num_threads = cpu_count()
+
+    # weights depend only on geometry, so neighbors are reused for every
+    # time step
+    steps = values.reshape((-1, values.shape[-1]))
+    estimates = N.empty((steps.shape[0], x.shape[0]), dtype=N.float64)
+    for step in range(steps.shape[0]):
+        _idwKernel(x, y, known_x, known_y, steps[step], neighbors,
+                   estimates[step], num_threads)
+    return estimates.reshape(values.shape[:-1] + target_shape)
+
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+class MultiquadricSystem(object):
+    """ Multiquadric interpolation system for a fixed set of known points.
+
+    The Qij matrix is built and LU factored once when the system is created.
+    The factors are then reused for every call to interpolate, regardless
+    of the number of unknown points or time steps.
+
+    arguments:
+    ---------
+        known_x_coords : 1D array of x coordinates of points with known values
+        known_y_coords : 1D array of y coordinates of points with known values
+        c_param        : multiquadric shape parameter
+        smooth_lambda  : smoothing parameter, original value = 0.0025
+        mean_error     : mean error value for the variable being analyzed.
+    """
+
+    def __init__(self, known_x_coords, known_y_coords, double c_param,
+                       double smooth_lambda=0.0025, double mean_error=0.5):
+        self.known_x = N.asarray(known_x_coords, dtype=N.float64).ravel()
+        self.known_y = N.asarray(known_y_coords, dtype=N.float64).ravel()
+        self.num_known = self.known_x.shape[0]
+        self.c_sq = c_param * c_param
+
+        Qij = self._distanceFactors(self.known_x, self.known_y)
+        # Account for observational uncertainty
+        Qij[N.diag_indices(self.num_known)] += \
+            self.num_known * smooth_lambda * mean_error
+        self._lu_factor = linalg.lu_factor(Qij)
+
+    def interpolate(self, unknown_x, unknown_y, known_values):
+        """ Interpolates values at an array of unknown points. known_values
+        may be a 1D array (num_known) or a 2D array with known values for
+        each time step (time steps, num_known).
+        """
+        values = N.asarray(known_values, dtype=N.float64)
+        # ALPHAi for every time step at once
+        alpha = linalg.lu_solve(self._lu_factor, values.T)
+
+        target_shape = N.shape(unknown_x)
+        x = N.asarray(unknown_x, dtype=N.float64).ravel()
+        y = N.asarray(unknown_y, dtype=N.float64).ravel()
+        estimates = N.empty(values.shape[:-1] + (x.shape[0],), dtype=N.float64)
+
+        block = max(1, MAX_MATRIX_SIZE // self.num_known)
+        for start in range(0, x.shape[0], block):
+            end = min(start + block, x.shape[0])
+            Qgi = self._distanceFactors(x[start:end], y[start:end])
+            estimates[...,start:end] = N.dot(Qgi, alpha).T
+        return estimates.reshape(values.shape[:-1] + target_shape)
+
+    def _distanceFactors(self, x, y):
+        x_diff = x[:,N.newaxis] - self.known_x
+        y_diff = y[:,N.newaxis] - self.known_y
+        squares = (x_diff*x_diff) + (y_diff*y_diff)
+        return -1.0 * N.sqrt((squares / self.c_sq) + 1.0)
+
+def mqTargets(unknown_x, unknown_y, known_x_coords, known_y_coords,
+              known_values, double c_param, double smooth_lambda=0.0025,
+              double mean_error=0.5, max_neighbors=None):
+    """ Multiquadric Interpolation at an array of unknown points.
+
+    When max_neighbors is None, a single MultiquadricSystem is built
+    for all known points and the result for each unknown point is the same
+    as calling mq. Otherwise each unknown point uses its max_neighbors
+    closest known points. Unknown points that have the same set of
+    neighbors share one system, so each system is factored only once.
+
+    See idwTargets and mq for descriptions of the arguments.
+    """
+    target_shape = N.shape(unknown_x)
+    x = N.asarray(unknown_x, dtype=N.float64).ravel()
+    y = N.asarray(unknown_y, dtype=N.float64).ravel()
+    known_x = N.asarray(known_x_coords, dtype=N.float64).ravel()
+    known_y = N.asarray(known_y_coords, dtype=N.float64).ravel()
+    values = N.asarray(known_values, dtype=N.float64)
+
+    neighbors = knownNeighbors(x, y, known_x, known_y, max_neighbors)
+    if neighbors.shape[0] == 1:
+        system = MultiquadricSystem(known_x, known_y, c_param, smooth_lambda,
+                                    mean_error)
+        return system.interpolate(x, y, values) \
+                     .reshape(values.shape[:-1] + target_shape)
+
+    # group unknown points by their set of neighbors
+    neighbors.sort(axis=1)
+    order = N.lexsort(neighbors.T[::-1])
+    ordered = neighbors[order]
+    starts = N.flatnonzero(N.any(ordered[1:] != ordered[:-1], axis=1)) + 1
+    starts = N.concatenate(([0], starts))
+    ends = N.concatenate((starts[1:], [len(order)]))
+
+    estimates = N.empty(values.shape[:-1] + (x.shape[0],), dtype=N.float64)
+    for start, end in zip(starts, ends):
+        known = ordered[start]
+        known = known[known < known_x.shape[0]]
+        targets = order[start:end]
+        system = MultiquadricSystem(known_x[known], known_y[known], c_param,
+                                    smooth_lambda, mean_error)
+        estimates[...,targets] = \
+            system.interpolate(x[targets], y[targets], values[...,known])
+    return estimates.reshape(values.shape[:-1] + target_shape)
@@ -1,39 +1,86 @@
 
+import datetime
+
 import numpy as N
 
-def movingAverage(span, narray):
-    nsize = len(narray)
-    maxi = nsize - 1
-    avg_array = N.empty(nsize)
-    i = 0
-    while i < nsize:
-        if i > span:
-            j = i - span
-        else:
-            j = 0
-        if i < maxi:
-            k = i + span
-        else:
-            k = -1
-        avg_array[i] = N.mean(narray[j:k])
-        i+=1
-    return avg_array
-
-def movingSum(span, narray):
-    nsize = len(narray)
-    maxi = nsize - 1
-    sum_array = N.empty(nsize)
-    i = 0
-    while i < nsize:
-        if i > span:
-            j = i - span
-        else:
-            j = 0
-        if i < maxi:
-            k = i + span
-        else:
-            k = -1
-        sum_array[i] = N.sum(narray[j:k])
-        i+=1
-    return sum_array
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+#
+# The window at index i includes the values from i - span up to, but not
+# including, i + span. Windows are truncated at either end of the array.
+# Values that are not finite are ignored, so averages are normalized by
+# the number of valid values in each window. Windows without any valid
+# values are NaN, except that a span of 0 makes every window empty and
+# empty windows sum to 0.
+#
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+def _windowSums(span, narray, axis):
+    """ Returns the sum and count of valid values in the window at every
+    index along axis. Both arrays have axis moved to the front.
+    """
+    data = N.asarray(narray, dtype=float)
+    data = N.rollaxis(data, axis % data.ndim, 0)
+    valid = N.isfinite(data)
+    size = data.shape[0]
+
+    # cumulative sums with a leading zero so each window is one subtraction
+    shape = (size + 1,) + data.shape[1:]
+    sums = N.zeros(shape, dtype=float)
+    N.cumsum(N.where(valid, data, 0.), axis=0, out=sums[1:])
+    counts = N.zeros(shape, dtype=int)
+    N.cumsum(valid, axis=0, out=counts[1:])
+
+    indexes = N.arange(size)
+    starts = N.maximum(indexes - span, 0)
+    ends = N.minimum(indexes + span, size)
+    return sums[ends] - sums[starts], counts[ends] - counts[starts]
+
+def _restoreAxis(windows, narray, axis):
+    ndim = N.ndim(narray)
+    return N.rollaxis(windows, 0, (axis % ndim) + 1)
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+def movingAverage(span, narray, axis=0):
+    sums, counts = _windowSums(span, narray, axis)
+    with N.errstate(divide='ignore', invalid='ignore'):
+        averages = sums / counts
+    return _restoreAxis(averages, narray, axis)
+
+def movingSum(span, narray, axis=0):
+    if span == 0: return N.zeros(N.shape(narray), dtype=float)
+    sums, counts = _windowSums(span, narray, axis)
+    sums[counts == 0] = N.nan
+    return _restoreAxis(sums, narray, axis)
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+def movingWindowChunks(reader, dataset_path, start_date, end_date, span,
+                       function=movingAverage, chunk_size=31, **kwargs):
+    """ Generator that applies a moving window function to a daily time
+    grid dataset without reading the full date range at once. Data is
+    read with the reader's timeSlice method, chunk_size days at a time
+    plus enough days on either side to fill the windows.
+
+    Yields (first date in chunk, results for chunk). Results are the same
+    as applying function to the time slice from start_date to end_date.
+    Additional keyword arguments are passed to timeSlice.
+    """
+    view = reader.getDatasetAttribute(dataset_path, 'view', 'tyx')
+    axis = view.index('t')
+    num_days = (end_date - start_date).days + 1
+    one_day = datetime.timedelta(days=1)
+
+    chunk_start = 0
+    while chunk_start < num_days:
+        chunk_end = min(chunk_start + chunk_size, num_days)
+        read_start = max(chunk_start - span, 0)
+        read_end = min(chunk_end + max(span - 1, 0), num_days)
+        data = reader.timeSlice(dataset_path, start_date + read_start*one_day,
+                                start_date + (read_end-1)*one_day, **kwargs)
 
+        results = function(span, data, axis)
+        chunk = [slice(None) for dim in results.shape]
+        chunk[axis] = slice(chunk_start - read_start, chunk_end - read_start)
+        yield start_date + chunk_start*one_day, results[tuple(chunk)]
+        chunk_start = chunk_end
@@ -42,26 +42,60 @@ class SequenceDetector(BaseDetector):
 
     # - - - - - - - - - - - - - - - - - -  - - - - - - - - - - - - - - - - - -
 
-    def _detect(self, data_array, start_index, end_index):
-        runs = [ ]
-        count = 1
-        indx = start_index
-        previous = data_array[0]
-
-        while indx < end_index:
-            value = data_array[indx]
-            if self.isMissing(previous) and self.isMissing(value):
-                count += 1
-            elif self._isEquivalent(value, previous):
-                count += 1
+    def _detectSeries(self, series, start_index, end_index):
+        """ Finds runs in every row of series using run length encoding
+        of the breaks between runs. Each run is returned as
+        (value, count, index of last value in run).
+        """
+        series = series[:,start_index:end_index]
+        num_series, num_values = series.shape
+        found = [ [ ] for row in range(num_series) ]
+
+        if num_values > 1:
+            starts = N.flatnonzero(self._runBreaks(series))
+            counts = N.diff(N.append(starts, series.size))
+            runs = counts > 1
+            values = series.ravel()
+            for start, count in zip(starts[runs], counts[runs]):
+                row, indx = divmod(int(start), num_values)
+                last = start_index + indx + int(count) - 1
+                found[row].append( (values[start], int(count), last) )
+
+        return [tuple(row_runs) for row_runs in found]
+
+    def _runBreaks(self, series):
+        """ Returns a boolean array that is True wherever a new run starts,
+        i.e. at the beginning of each row and wherever a value is not
+        equivalent to the first value (anchor) of the current run.
+        """
+        missing = self.missingMask(series)
+        breaks = N.ones(series.shape, dtype=bool)
+        with N.errstate(invalid='ignore'):
+            if N.isinf(self.tolerance) or self.tolerance == 0:
+                # equivalence is transitive, so comparing each value to
+                # the one before it is the same as comparing to the anchor
+                before = series[:,:-1]
+                after = series[:,1:]
+                if N.isinf(self.tolerance): same = after == before
+                else: same = N.trunc(after) == N.trunc(before)
+                # consecutive missing values are always a run
+                same |= missing[:,1:] & missing[:,:-1]
+                breaks[:,1:] = ~same
             else:
-                if count > 1:
-                    runs.append( (previous, count, indx-1) )
-                previous = value
-                count = 1
-            indx += 1
-
-        return tuple(runs)
+                # values within tolerance of each other may drift away
+                # from the anchor, so step through the values for all
+                # rows at once and move the anchor when a run breaks
+                anchors = series[:,0].copy()
+                anchor_missing = missing[:,0].copy()
+                for indx in range(1, series.shape[1]):
+                    values = series[:,indx]
+                    same = N.abs(values - anchors) <= self.tolerance
+                    same |= anchor_missing & missing[:,indx]
+                    new_run = ~same
+                    breaks[:,indx] = new_run
+                    anchors[new_run] = values[new_run]
+                    anchor_missing[new_run] = missing[new_run,indx]
+        return breaks
 
     # - - - - - - - - - - - - - - - - - -  - - - - - - - - - - - - - - - - - -
 
@@ -24,22 +24,39 @@ class SpikeDetector(BaseDetector):
 
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 
-    def _detect(self, data_array, start_index, end_index):
-        """ Detect all spikes in the data_array
+    def _detectSeries(self, series, start_index, end_index):
+        """ Detect all spikes in every row of series. Spikes are found at
+        once for all rows by comparing the signs of the differences on
+        either side of each value.
         """
-        spikes = [ ]
-        start_seq = start_index
-        end_seq = start_index + 2
-
-        while end_seq < end_index:
-            spike = self._detectSpike(data_array[start_seq:end_seq+1])
-            if spike is not None:
-                spike_index = start_seq + 1
-                spikes.append((spike, spike_index, data_array[spike_index]))
-            start_seq += 1
-            end_seq += 1
-
-        return tuple(spikes)
+        series = series[:,start_index:end_index]
+        num_series, num_values = series.shape
+        found = [ [ ] for row in range(num_series) ]
+        if num_values < 3: return [ ( ) for row in found ]
+
+        missing = self.missingMask(series)
+        diffs = self._differences(series)
+        before = diffs[:,:-1]
+        after = diffs[:,1:]
+        middle = series[:,1:-1]
+
+        with N.errstate(invalid='ignore'):
+            # Doesn't work with missing values
+            spikes = ~(missing[:,:-2] | missing[:,1:-1] | missing[:,2:])
+            # no spike if middle value equals the value on either side of it
+            spikes &= (middle != series[:,:-2]) & (middle != series[:,2:])
+            # no spike if either difference is zero
+            spikes &= (N.abs(before) >= 1) & (N.abs(after) >= 1)
+            # spike occurs when the differences have different signs
+            spikes &= (before > 0) != (after > 0)
+
+        rows, indexes = N.nonzero(spikes)
+        for row, indx in zip(rows, indexes):
+            spike = (before[row,indx], after[row,indx])
+            found[row].append((spike, start_index + int(indx) + 1,
+                               middle[row,indx]))
+
+        return [tuple(row_spikes) for row_spikes in found]
 
     def _detectSpike(self, spike):
         """ A spike is a spike of  3 values where the middle value is
@@ -76,6 +93,12 @@ class SpikeDetector(BaseDetector):
         # seems silly, but makes it much easier to build subclasses
         return two_values[1] - two_values[0]
 
+    def _differences(self, series):
+        """ array equivalent of _difference for every pair of consecutive
+        values in each row of series
+        """
+        return N.diff(series, axis=1)
+
     # - - - - - - - - - - - - - - - - - -  - - - - - - - - - - - - - - - - - -
 
     def applyFilters(self, filters=None):
@@ -171,3 +194,10 @@ class CircularAngleSpikeDetector(SpikeDetector):
             return (two_angles[1] + 360) - two_angles[0] 
         return two_angles[1] - (two_angles[0] + 360)
 
+    def _differences(self, series):
+        before = series[:,:-1]
+        after = series[:,1:]
+        angles = after - before
+        with N.errstate(invalid='ignore'):
+            return N.where(N.abs(angles) <= 180, angles,
+                           N.where(before > after, angles + 360, angles - 360))
@@ -0,0 +1,88 @@
+""" Regression tests for atmosci.analysis.anomaly
+
+    python -m pytest atmosci/analysis/test_anomaly.py
+"""
+
+import numpy as N
+
+from atmosci.analysis import anomaly
+from atmosci.analysis.anomaly import ArrayAnomalyFinder, GridAnomalyFinder, \
+                                     NEIGHBORHOOD, neighborhoodStats
+
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+class FakeDataManager(object):
+    """ Stands in for a data manager, only getData and getLonLat are used
+    """
+    def __init__(self, data, lons, lats):
+        self.data = data
+        self.lons = lons
+        self.lats = lats
+    def getData(self, data_key):
+        return self.data, { 'units':'F' }
+    def getLonLat(self):
+        return self.lons, self.lats
+
+def testGrid():
+    lons, lats = N.meshgrid(N.linspace(-80., -75., 9), N.linspace(40., 43., 7))
+    grid = 50. + (2. * (lons + 80.)) - lats
+    grid[3,4] = 95.
+    grid[0,1] = N.nan
+    return grid, lons, lats
+
+def loopStats(grid, neighborhood=NEIGHBORHOOD):
+    counts = N.zeros(grid.shape, dtype=int)
+    means = N.full(grid.shape, N.nan)
+    stddevs = N.full(grid.shape, N.nan)
+    for row in range(grid.shape[0]):
+        for col in range(grid.shape[1]):
+            values = [ ]
+            for offset_0, offset_1 in neighborhood:
+                y = row + offset_0
+                x = col + offset_1
+                if 0 <= y < grid.shape[0] and 0 <= x < grid.shape[1] \
+                and N.isfinite(grid[y,x]):
+                    values.append(grid[y,x])
+            counts[row,col] = len(values)
+            if values:
+                means[row,col] = N.mean(values)
+                stddevs[row,col] = N.std(values)
+    return counts, means, stddevs
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+def test_neighborhood_stats_match_loop():
+    grid = testGrid()[0]
+    for expected, result in zip(loopStats(grid), neighborhoodStats(grid)):
+        N.testing.assert_allclose(result, expected, equal_nan=True)
+
+def test_neighbors_do_not_wrap_around_edges():
+    grid = N.zeros((5,5))
+    grid[:,-1] = 100.
+    grid[-1,:] = 100.
+    counts, means, stddevs = neighborhoodStats(grid, ((0,-1),(-1,0)))
+    assert counts[0,0] == 0 and N.isnan(means[0,0])
+    assert means[1,1] == 0.
+    assert counts[0,1] == 1 and means[0,1] == 0.
+
+def test_grid_finder_finds_spike():
+    grid, lons, lats = testGrid()
+    finder = GridAnomalyFinder('temp', FakeDataManager(grid, lons, lats))
+    values, indexes = finder.aboveMaxThreshold(80.)
+    N.testing.assert_array_equal(values, [95.])
+    assert [list(indx) for indx in indexes] == [[3], [4]]
+    values, indexes = finder.belowMinThreshold(0.)
+    assert len(values) == 0 and len(indexes) == 2
+
+def test_array_finder_blocks_match(monkeypatch):
+    grid, lons, lats = testGrid()
+    manager = FakeDataManager(grid.ravel(), lons.ravel(), lats.ravel())
+    finder = ArrayAnomalyFinder('temp', manager, 0.8)
+    suspicious = N.where(grid.ravel() >= 20.)
+    expected = finder._neighborStats(suspicious)
+    monkeypatch.setattr(anomaly, 'MAX_MASK_SIZE', grid.size * 3)
+    for full, blocked in zip(expected, finder._neighborStats(suspicious)):
+        N.testing.assert_allclose(blocked, full, equal_nan=True)
+    values, indexes = finder.aboveMaxThreshold(80.)
+    N.testing.assert_array_equal(values, [95.])
+    assert list(indexes[0]) == [N.ravel_multi_index((3,4), grid.shape)]
@@ -0,0 +1,83 @@
+""" Regression tests for atmosci.analysis.moving
+
+    python -m pytest atmosci/analysis/test_moving.py
+"""
+
+import datetime
+import warnings
+
+import numpy as N
+
+from atmosci.analysis.moving import movingAverage, movingSum, \
+                                    movingWindowChunks
+
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+def loopWindows(function, span, series):
+    """ one window at a time, [i - span, i + span) truncated at both ends
+    """
+    results = N.empty(len(series))
+    for indx in range(len(series)):
+        window = series[max(indx - span, 0):min(indx + span, len(series))]
+        window = window[N.isfinite(window)]
+        if len(window) == 0:
+            if function is N.sum and span == 0: results[indx] = 0.
+            else: results[indx] = N.nan
+        else: results[indx] = function(window)
+    return results
+
+def series():
+    values = N.random.RandomState(9).normal(10., 3., 40)
+    values[[3, 17, 18, 19, 20, 21, 22, 23]] = N.nan
+    return values
+
+class DailyReader(object):
+    """ Stands in for a daily time grid file reader """
+    def __init__(self, data, start_date):
+        self.data = data
+        self.start_date = start_date
+    def getDatasetAttribute(self, dataset_path, name, default=None):
+        return 'tyx'
+    def timeSlice(self, dataset_path, start_date, end_date, **kwargs):
+        start = (start_date - self.start_date).days
+        end = (end_date - self.start_date).days + 1
+        return self.data[start:end]
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+def test_windows_match_loop():
+    values = series()
+    for span in (1, 2, 3, 7, 50):
+        N.testing.assert_allclose(movingSum(span, values),
+                                  loopWindows(N.sum, span, values))
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            averages = movingAverage(span, values)
+        N.testing.assert_allclose(averages,
+                                  loopWindows(N.mean, span, values))
+
+def test_zero_span():
+    values = series()
+    N.testing.assert_array_equal(movingSum(0, values), N.zeros(len(values)))
+    assert N.isnan(movingAverage(0, values)).all()
+    assert movingSum(0, values.reshape(5,8), axis=1).shape == (5,8)
+
+def test_windows_along_any_axis():
+    grid = N.random.RandomState(2).normal(size=(3,30,4))
+    sums = movingSum(4, grid, axis=1)
+    assert sums.shape == grid.shape
+    for y in range(3):
+        for x in range(4):
+            N.testing.assert_allclose(sums[y,:,x],
+                                      loopWindows(N.sum, 4, grid[y,:,x]))
+
+def test_chunks_match_full_range():
+    start_date = datetime.date(2017, 3, 1)
+    data = N.random.RandomState(5).normal(size=(75,3,4))
+    reader = DailyReader(data, start_date)
+    end_date = start_date + datetime.timedelta(days=74)
+    for function in (movingAverage, movingSum):
+        chunks = [results for first_date, results in
+                  movingWindowChunks(reader, 'temps', start_date, end_date,
+                                     5, function, chunk_size=10)]
+        N.testing.assert_allclose(N.concatenate(chunks), function(5, data))
@@ -0,0 +1,74 @@
+""" Regression tests for run detection in atmosci.analysis.sequence
+
+    python -m pytest atmosci/analysis/test_sequence.py
+"""
+
+import numpy as N
+
+from atmosci.analysis.sequence import SequenceDetector
+
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+def loopRuns(detector, values):
+    """ one value at a time, each value is compared to the first value
+    of the run it would extend
+    """
+    runs = [ ]
+    anchor = values[0]
+    count = 1
+    for indx in range(1, len(values)):
+        value = values[indx]
+        anchor_missing = detector.isMissing(anchor)
+        if anchor_missing and detector.isMissing(value):
+            count += 1
+        elif not (anchor_missing or detector.isMissing(value)) and \
+             detector._isEquivalent(value, anchor):
+            count += 1
+        else:
+            if count > 1: runs.append( (anchor, count, indx-1) )
+            anchor = value
+            count = 1
+    if count > 1: runs.append( (anchor, count, len(values)-1) )
+    return tuple(runs)
+
+def sameRuns(found, expected):
+    assert len(found) == len(expected)
+    for run, expected_run in zip(found, expected):
+        assert run[1:] == expected_run[1:]
+        assert run[0] == expected_run[0] or \
+               (N.isnan(run[0]) and N.isnan(expected_run[0]))
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+def test_identical_values():
+    detector = SequenceDetector(float, N.nan)
+    data = N.array([1., 1., 1., 2., 3., 3., N.nan, N.nan, N.nan, 4.])
+    sameRuns(detector.detect(data), ((1.,3,2), (3.,2,5), (N.nan,3,8)))
+
+def test_tolerance_is_relative_to_first_value_of_run():
+    detector = SequenceDetector(float, N.nan, tolerance=0.5)
+    # each value is within 0.5 of the one before it, but not of the first
+    data = N.array([10., 10.4, 10.8, 11.2, 11.6, 12.0])
+    sameRuns(detector.detect(data), ((10.,2,1), (10.8,2,3), (11.6,2,5)))
+
+def test_runs_end_at_missing_values():
+    detector = SequenceDetector(float, -999., tolerance=0.5)
+    data = N.array([5., 5.2, -999., -999., 5.1, 5.3, 5.7])
+    sameRuns(detector.detect(data), ((5.,2,1), (-999.,2,3), (5.1,2,5)))
+
+def test_matches_value_by_value_detection():
+    values = N.around(N.cumsum(N.random.RandomState(7).normal(0., .3, 400)), 1)
+    values[[20,21,22,90,200,201]] = N.nan
+    for tolerance in (N.inf, 0, 1, 0.25, 0.5):
+        detector = SequenceDetector(float, N.nan, tolerance)
+        sameRuns(detector.detect(values), loopRuns(detector, values))
+
+def test_detect_all_matches_detect():
+    block = N.around(N.random.RandomState(3).normal(0., .4, (30,4,5)), 0)
+    detector = SequenceDetector(float, N.nan, tolerance=0.5)
+    detected = detector.detectAll(block, axis=0)
+    for y in range(4):
+        for x in range(5):
+            expected = loopRuns(detector, block[:,y,x])
+            if expected: sameRuns(detected[(y,x)], expected)
+            else: assert (y,x) not in detected
@@ -0,0 +1,49 @@
+""" Regression tests for spike detection in atmosci.analysis.spike
+
+    python -m pytest atmosci/analysis/test_spike.py
+"""
+
+import warnings
+
+import numpy as N
+
+from atmosci.analysis.spike import CircularAngleSpikeDetector, SpikeDetector
+
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+def loopSpikes(detector, values):
+    spikes = [ ]
+    for indx in range(1, len(values)-1):
+        spike = detector._detectSpike(values[indx-1:indx+2])
+        if spike is not None: spikes.append((spike, indx, values[indx]))
+    return tuple(spikes)
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+def test_linear_spikes():
+    detector = SpikeDetector(float, N.nan)
+    data = N.array([10., 20., 10., 10., 5., N.nan, 7., 15., 15.])
+    assert detector.detect(data) == (((10.,-10.), 1, 20.),)
+
+def test_circular_spikes_wrap_around_north():
+    detector = CircularAngleSpikeDetector(float, N.nan)
+    data = N.array([350., 10., 340., 20., 30.])
+    spikes = detector.detect(data)
+    assert [spike[1] for spike in spikes] == [1, 2]
+    assert spikes[0][0] == (20., -30.)
+
+def test_matches_value_by_value_detection():
+    values = N.random.RandomState(11).randint(0, 360, 200).astype(float)
+    values[[5,6,50,120]] = N.nan
+    for detector in (SpikeDetector(float, N.nan),
+                     CircularAngleSpikeDetector(float, N.nan)):
+        assert detector.detect(values) == loopSpikes(detector, values)
+
+def test_missing_values_do_not_warn():
+    detector = CircularAngleSpikeDetector(float, N.nan)
+    block = N.random.RandomState(5).randint(0, 360, (24,3,3)).astype(float)
+    block[3:6,1,1] = N.nan
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        detected = detector.detectAll(block, axis=0)
+    assert detected
@@ -0,0 +1,128 @@
+""" Chunk layouts for 3D time series grid datasets.
+
+Supported layouts :
+
+    grid   : one full grid per time step, e.g. (1, ny, nx). Fastest way to
+             read or write whole grids, but reading the time series at a
+             single node decompresses every grid in the dataset.
+    tiled  : blocks of (T, by, bx) time steps, rows and columns. Point
+             series and bbox reads only decompress the tiles that they
+             overlap, full grid reads decompress ny/by * nx/bx tiles.
+    series : the full time span for tiles of (by, bx) nodes. Fastest for
+             point series, slowest for full grids.
+
+When no layout is specified, time-first datasets use the "grid" layout
+and time-last datasets use a "series" layout with 1 x 1 tiles. These are
+the chunks that have always been used by the file builders.
+"""
+
+from fractions import gcd
+import itertools
+
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+CHUNK_LAYOUTS = ('grid', 'series', 'tiled')
+# (time steps, rows, columns) ... None = full extent of dimension
+DEFAULT_CHUNK_TILES = { 'series':(None, 16, 16), 'tiled':(24, 32, 32) }
+# largest block that is read into memory when copying between layouts
+MAX_COPY_BLOCK_BYTES = 256 * 1024 * 1024
+
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+def asChunkTile(tile, default=None):
+    """ Converts a tile specification to a tuple of 3 ints (or None).
+    Accepts a tuple/list or a comma separated string, e.g. "24,32,32".
+    """
+    if tile is None: return default
+    if isinstance(tile, basestring):
+        tile = [size.strip() for size in tile.split(',')]
+        tile = [None if size in ('', 'None') else int(size) for size in tile]
+    if len(tile) != 3:
+        errmsg = 'Chunk tile must have 3 dimensions (time, rows, columns) : %s'
+        raise ValueError, errmsg % str(tile)
+    return tuple([None if size is None else int(size) for size in tile])
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+def timeGridChunks(shape, view, layout=None, tile=None):
+    """ Returns the chunk shape for a 3D time series grid dataset.
+
+    Arguments
+    --------------------------------------------------------------------
+    shape  : shape of the dataset
+    view   : dataset view, e.g. 'tyx' or 'yxt'
+    layout : name of chunk layout, one of CHUNK_LAYOUTS
+    tile   : (time steps, rows, columns) for "tiled" and "series"
+             layouts, sizes larger than the dataset are reduced to fit
+
+    Returns
+    --------------------------------------------------------------------
+    tuple : chunk shape in the same dimension order as the dataset, or
+            None when the dataset is not a 3D time series.
+    """
+    if len(shape) != 3 or not view or 't' not in view: return None
+    time_axis = view.index('t')
+    num_times = shape[time_axis]
+    num_rows, num_cols = [shape[axis] for axis in range(3) if axis != time_axis]
+
+    if layout is None:
+        if time_axis == 0: layout = 'grid'
+        elif time_axis == 2: layout, tile = 'series', (None, 1, 1)
+        else: return None
+
+    if layout == 'grid':
+        chunks = (1, num_rows, num_cols)
+    elif layout in DEFAULT_CHUNK_TILES:
+        times, rows, cols = asChunkTile(tile, DEFAULT_CHUNK_TILES[layout])
+        if layout == 'series' or times is None: times = num_times
+        if rows is None: rows = num_rows
+        if cols is None: cols = num_cols
+        chunks = (max(1, min(times, num_times)), max(1, min(rows, num_rows)),
+                  max(1, min(cols, num_cols)))
+    else:
+        errmsg = 'Unsupported chunk layout "%s". Must be one of %s'
+        raise ValueError, errmsg % (layout, str(CHUNK_LAYOUTS))
+
+    if time_axis == 0: return chunks
+    elif time_axis == 1: return (chunks[1], chunks[0], chunks[2])
+    return (chunks[1], chunks[2], chunks[0])
+
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+def copyBlockShape(shape, chunks, new_chunks, itemsize,
+                   max_bytes=MAX_COPY_BLOCK_BYTES):
+    """ Returns the shape of the blocks used to copy a dataset with
+    chunks to a dataset with new_chunks. Each dimension is the least
+    common multiple of the two chunk sizes, so every block covers whole
+    chunks in both layouts and no chunk is read or written twice.
+    When that block would be larger than max_bytes, dimensions are
+    reduced (first dimension first) to multiples of the new chunks.
+    None for either set of chunks means the dataset is contiguous, it
+    is copied in slabs along the first dimension.
+    """
+    slab = (1,) + tuple(shape[1:])
+    if chunks is None: chunks = slab
+    if new_chunks is None: new_chunks = slab
+    block = [ ]
+    for size, old, new in zip(shape, chunks, new_chunks):
+        block.append(max(1, min(size, (old * new) // gcd(old, new))))
+
+    for axis in range(len(block)):
+        num_bytes = itemsize
+        for size in block: num_bytes *= size
+        if num_bytes <= max_bytes: break
+        new = min(new_chunks[axis], block[axis])
+        others = num_bytes // block[axis]
+        block[axis] = max(new, (max_bytes // others // new) * new)
+    return tuple(block)
+
+def copyBlocks(shape, block_shape):
+    """ Generates the tuple of slices for each block of block_shape
+    in a dataset of shape, the last block along a dimension may be
+    smaller than block_shape.
+    """
+    starts = [range(0, size, step) for size, step in zip(shape, block_shape)]
+    for corner in itertools.product(*starts):
+        yield tuple([slice(start, min(start + step, size))
+                     for start, step, size in zip(corner, block_shape, shape)])
@@ -11,6 +11,7 @@ from atmosci.utils.timeutils import dateAsString, matchDateType
 
 from atmosci.hdf5.grid import Hdf5GridFileReader, Hdf5GridFileManager
 from atmosci.hdf5.grid import Hdf5GridFileBuilder
+from atmosci.hdf5.mixin import boundedIndex
 
 # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
 
@@ -27,25 +28,22 @@ class Hdf5DateGridReaderMixin:
     def dataAtNode(self, dataset_path, lon, lat, start_date=None,
                          end_date=None, **kwargs):
         y, x = self.ll2index(lon, lat)
-        if start_date is None:
-            data = self.getDataset(dataset_path).value[:, y, x]
+        if start_date is None: slab = (slice(None), y, x)
         else:
             if end_date is None:
-                indx = self.indexForDate(dataset_path, date)
-                data = self.getDataset(dataset_path).value[indx, y, x]
+                slab = (self.indexForDate(dataset_path, start_date), y, x)
             else:
                 start, end = \
                 self.indexesForDates(dataset_path, start_date, end_date)
-                data = self.getDataset(dataset_path).value[start:end, y, x]
-        return self._processDataOut(dataset_path, data, **kwargs)
+                slab = (slice(start, end), y, x)
+        return self.getSlab(dataset_path, slab, **kwargs)
     getDataAtNode = dataAtNode # backwards compatibility
 
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 
     def dataForDate(self, dataset_path, date, **kwargs):
         indx = self.indexForDate(dataset_path, date)
-        dataset = self.getDataset(dataset_path)
-        return self._processDataOut(dataset_path, dataset[indx], **kwargs)
+        return self.getSlab(dataset_path, (indx,), **kwargs)
     getDataForDate = dataForDate # backwards compatibility
     
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
@@ -89,9 +87,8 @@ class Hdf5DateGridReaderMixin:
 
     def dateSlice(self, dataset_path, start_date, end_date, **kwargs):
         start, end = self.indexesForDates(dataset_path, start_date, end_date)
-        dataset = self.getDataset(dataset_path)
-        data = self._dateSlice(dataset, start, end)
-        return self._processDataOut(dataset_path, data, **kwargs)
+        return self.getSlab(dataset_path, (boundedIndex(start, end),),
+                            **kwargs)
     getDateSlice = dateSlice # backwards compatibility
 
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
@@ -101,10 +98,9 @@ class Hdf5DateGridReaderMixin:
         min_y, min_x = self.ll2index(min_lon, min_lat)
         max_y, max_x = self.ll2index(max_lon, max_lat)
         start, end = self.indexesForDates(dataset_path, start_date, end_date)
-        dataset = self.getDataset(dataset_path)
-        data = \
-        self._slice3DDataset(dataset, start, end, min_y, max_y, min_x, max_x)
-        return self._processDataOut(dataset_path, data, **kwargs)
+        slab = (boundedIndex(start, end), boundedIndex(min_y, max_y),
+                boundedIndex(min_x, max_x))
+        return self.getSlab(dataset_path, slab, **kwargs)
     get3DSlice = dataSlice # backwards compatibility
 
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
@@ -152,87 +148,15 @@ class Hdf5DateGridReaderMixin:
     # - - - # - - - # - - - # - - - # - - - # - - - # - - - # - - - # - - - #
 
     def _dateSlice(self, dataset, start_index, end_index):
-        dataset_dims = len(dataset.shape)
-        if end_index == start_index:
-            if dataset_dims == 1: return dataset[start_index]
-            elif dataset_dims == 2: return dataset[start_index, :]
-            else: return dataset[start_index, :, :]
-        else:
-            if dataset_dims == 1: return dataset[start_index:end_index]
-            elif dataset_dims == 2:
-                return dataset[start_index:end_index, :]
-            else:
-                return dataset[start_index:end_index, :, :]
+        slab = (boundedIndex(start_index, end_index),)
+        return self._readSlab_(dataset, slab)
 
    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 
     def _slice3DDataset(self, dataset, start, end, min_y, max_y, min_x, max_x):
-        if end == start: # single date
-            if max_y == min_y:
-                if max_x == min_x: # retrieve data for one node
-                    return dataset[start, min_y, min_x]
-                elif max_x < dataset.shape[2]:
-                    return dataset[start, min_y, min_x:max_x]
-                else: # max_x >= dataset.shape[2]
-                    return dataset[start, min_y, min_x:]
-            elif max_y < dataset.shape[1]:
-                if max_x == min_x:
-                    return dataset[start, min_y:max_y, min_x]
-                elif max_x < dataset.shape[2]:
-                    return dataset[start, min_y:max_y, min_x:max_x]
-                else: # max_x >= dataset.shape[2]
-                    return dataset[start, min_y:max_y, min_x:]
-            else: # max_y >= dataset.shape[1]
-                if max_x == min_x:
-                    return dataset[start, min_y:, min_x]
-                elif max_x < dataset.shape[2]:
-                    return dataset[start, min_y:, min_x:max_x]
-                else: # max_x >= dataset.shape[2]
-                    return dataset[start, min_y:, min_x:]
-        elif end < dataset.shape[0]:
-            if max_y == min_y:
-                if max_x == min_x: # retrieve data for one node
-                    return dataset[start:end, min_y, min_x]
-                elif max_x < dataset.shape[2]:
-                    return dataset[start:end, min_y, min_x:max_x]
-                else: # max_x >= dataset.shape[2]
-                    return dataset[start:end, min_y, min_x:]
-            elif max_y < dataset.shape[1]:
-                if max_x == min_x:
-                    return dataset[start:end, min_y:max_y, min_x]
-                elif max_x < dataset.shape[2]:
-                    return dataset[start:end, min_y:max_y, min_x:max_x]
-                else: # max_x >= dataset.shape[2]
-                    return dataset[start:end, min_y:max_y, min_x:]
-            else: # max_y >= dataset.shape[1]
-                if max_x == min_x:
-                    return dataset[start:end, min_y:, min_x]
-                elif max_x < dataset.shape[2]:
-                    return dataset[start:end, min_y:, min_x:max_x]
-                else: # max_x >= dataset.shape[2]
-                    return dataset[start:end, min_y:, min_x:]
-        else: # end > dataset.shape[0] ... retrieve all dates to end of dataset
-            if max_y == min_y:
-                if max_x == min_x: # retrieve data for one node
-                    return dataset[start:, min_y, min_x]
-                elif max_x < dataset.shape[2]:
-                    return dataset[start:, min_y, min_x:max_x]
-                else: # max_x >= dataset.shape[2]
-                    return dataset[start:, min_y, min_x:]
-            elif max_y < dataset.shape[1]:
-                if max_x == min_x:
-                    return dataset[start:, min_y:max_y, min_x]
-                elif max_x < dataset.shape[2]:
-                    return dataset[start:, min_y:max_y, min_x:max_x]
-                else: # max_x >= dataset.shape[2]
-                    return dataset[start:, min_y:max_y, min_x:]
-            else: # max_y >= dataset.shape[1]
-                if max_x == min_x:
-                    return dataset[start:, min_y:, min_x]
-                elif max_x < dataset.shape[2]:
-                    return dataset[start:, min_y:, min_x:max_x]
-                else: # max_x >= dataset.shape[2]
-                    return dataset[start:, min_y:, min_x:]
+        slab = (boundedIndex(start, end), boundedIndex(min_y, max_y),
+                boundedIndex(min_x, max_x))
+        return self._readSlab_(dataset, slab)
 
     # - - - # - - - # - - - # - - - # - - - # - - - # - - - # - - - # - - - #
 
@@ -4,18 +4,66 @@
 import os
 from datetime import datetime
 
-import h5py
 import numpy as N
+
+from atmosci.utils.lazy import lazyImport
+h5py = lazyImport('h5py')
+
 from atmosci.utils.data import safedict, dictToWhere, listToWhere
 from atmosci.utils.timeutils import asDatetime
 from atmosci.utils.units import convertUnits
 
 from atmosci.hdf5.mixin import Hdf5DataReaderMixin, Hdf5DataWriterMixin
+from atmosci.hdf5.mixin import hyperslab, hyperslabShape
 
 # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
 
 from atmosci.hdf5.mixin import BOGUS_VALUE
 
+# process-wide cache of the hierarchy, file attributes and other information
+# that readers load when a file is opened, keyed by absolute file path
+HDF5_FILE_INFO_CACHE = { }
+HDF5_FILE_INFO_CACHE_ORDER = [ ]
+HDF5_FILE_INFO_CACHE_SIZE = 32
+
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+def hdf5FileSignature(filepath):
+    """ Returns (size, modification time) of a file or None when it does
+    not exist. Used to verify that cached information is still valid.
+    """
+    try:
+        stat = os.stat(filepath)
+    except OSError:
+        return None
+    return (stat.st_size, stat.st_mtime)
+
+def hdf5FileInfo(filepath):
+    """ Returns the cached information dictionary for a file. A new, empty
+    dictionary is cached when the file has changed since the information
+    was cached.
+    """
+    filepath = os.path.abspath(filepath)
+    signature = hdf5FileSignature(filepath)
+    info = HDF5_FILE_INFO_CACHE.get(filepath, None)
+    if info is not None and signature is not None \
+    and info['signature'] == signature:
+        return info
+
+    info = { 'signature':signature, }
+    if filepath not in HDF5_FILE_INFO_CACHE:
+        HDF5_FILE_INFO_CACHE_ORDER.append(filepath)
+        while len(HDF5_FILE_INFO_CACHE_ORDER) > HDF5_FILE_INFO_CACHE_SIZE:
+            del HDF5_FILE_INFO_CACHE[HDF5_FILE_INFO_CACHE_ORDER.pop(0)]
+    HDF5_FILE_INFO_CACHE[filepath] = info
+    return info
+
+def discardHdf5FileInfo(filepath):
+    filepath = os.path.abspath(filepath)
+    if filepath in HDF5_FILE_INFO_CACHE:
+        del HDF5_FILE_INFO_CACHE[filepath]
+        HDF5_FILE_INFO_CACHE_ORDER.remove(filepath)
+
 # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
 
 class Hdf5FileReader(Hdf5DataReaderMixin, object):
@@ -27,6 +75,10 @@ class Hdf5FileReader(Hdf5DataReaderMixin, object):
         self.__hdf5_file = None
         self.__hdf5_filepath = None
         self.__hdf5_filemode = None
+        self.__file_info = None
+        self.__held_file = None
+        self.__reopened = False
+        self._keep_open = False
 
         self._dataset_names = [ ]
         self._group_names = [ ]
@@ -140,7 +192,30 @@ class Hdf5FileReader(Hdf5DataReaderMixin, object):
     def getData(self, dataset_path, **kwargs):
         self.assertFileOpen()
         data = self._getData_(self.file, dataset_path, **kwargs)
-        return self._processDataOut(dataset_path, data, **kwargs)
+        return self._processSlabOut(dataset_path, data, **kwargs)
+
+    def getSlab(self, dataset_path, slab, out=None, **kwargs):
+        """ Returns the data in a hyperslab of a dataset. slab may be any
+        index specification accepted by hyperslab(), e.g. a tuple of ints
+        and slices. When out is an array created by slabBuffer, data is
+        read directly into it, so repeated reads of the same size do not
+        allocate new arrays. Unpacking and conversions requested in kwargs
+        (e.g. units) are applied to the data in out, which must have a
+        dtype that can hold the converted values.
+        """
+        self.assertFileOpen()
+        dataset = self._getDataset_(self.file, dataset_path)
+        data = self._readSlab_(dataset, hyperslab(slab), out)
+        return self._processSlabOut(dataset_path, data, out=out, **kwargs)
+
+    def slabBuffer(self, dataset_path, slab, dtype=None):
+        """ Returns an uninitialized array that can be reused as the out
+        argument to getSlab for hyperslabs with the same shape as slab.
+        """
+        self.assertFileOpen()
+        dataset = self._getDataset_(self.file, dataset_path)
+        if dtype is None: dtype = dataset.dtype
+        return N.empty(hyperslabShape(hyperslab(slab), dataset.shape), dtype)
 
     def getDataWhere(self, dataset_path, criteria=None, **kwatgs):
         datasets = [ ]
@@ -222,12 +297,34 @@ class Hdf5FileReader(Hdf5DataReaderMixin, object):
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 
     def close(self):
+        if self._keep_open and self.__hdf5_file is not None:
+            # hold the h5py file so that it can be reopened by _open_
+            if self.isWritable(): self.__hdf5_file.flush()
+            self.__held_file = (self.__hdf5_file, self.__hdf5_filemode,
+                                hdf5FileSignature(self.filepath))
+            self.__hdf5_file = None
+            self.__hdf5_filemode = None
+            self.__file_info = None
+            return
+
         mangled_attr = self._mangle_('__hdf5_file')
         if hasattr(self, mangled_attr) and self.file is not None:
             self._clearManagerAttributes_()
             self._close_(self.file)
+        # cached information may not reflect changes made to the file
+        if self.isWritable(): discardHdf5FileInfo(self.filepath)
         self.__hdf5_file = None
         self.__hdf5_filemode = None
+        self.__file_info = None
+
+    def keepFileOpen(self, keep_open=True):
+        """ In keep open mode, close() does not close the h5py file. When
+        the file is reopened in the same mode and nobody else has changed
+        it, the same h5py file is used again and the file hierarchy is not
+        reloaded.
+        """
+        self._keep_open = keep_open
+        if not keep_open: self._releaseHeldFile_()
 
     def fileHasAttribute(self, attr_name):
         self.assertFileOpen()
@@ -408,6 +505,25 @@ class Hdf5FileReader(Hdf5DataReaderMixin, object):
         data = self._unpackData(dataset_path, data, **kwargs)
         return self._postUnpack(dataset_path, data, **kwargs)
 
+    def _processSlabOut(self, dataset_path, data, out=None, **kwargs):
+        """ Same as _processDataOut, except that when data was read into
+        an out array, the processed data is stored back into out.
+        """
+        if out is None:
+            return self._processDataOut(dataset_path, data, **kwargs)
+        out_dtype = kwargs.get('dtype', None)
+        if out_dtype is not None and N.dtype(out_dtype) != out.dtype:
+            errmsg = 'Output array dtype %s does not match requested dtype %s'
+            raise ValueError, errmsg % (out.dtype, N.dtype(out_dtype))
+        data = self._processDataOut(dataset_path, data, **kwargs)
+        if data is out: return out
+        if not N.can_cast(N.asarray(data).dtype, out.dtype, 'same_kind'):
+            errmsg = 'Cannot store %s data from "%s" in %s output array'
+            raise TypeError, errmsg % (N.asarray(data).dtype, dataset_path,
+                                       out.dtype)
+        out[...] = data
+        return out
+
     def _getUnpacker(self, dataset_path):
         return self.unpackers.get(dataset_path,
                                   self.unpackers.get('default', None))
@@ -421,6 +537,7 @@ class Hdf5FileReader(Hdf5DataReaderMixin, object):
         if units is not None:
             if out_units != units:
                 return convertUnits(data, units, out_units)
+            return data
         else:
             errmsg = '"%s" dataset has no attribute named "units"'
             raise AttributeError, errmsg % dataset_path
@@ -511,12 +628,40 @@ class Hdf5FileReader(Hdf5DataReaderMixin, object):
     def _clearManagerAttributes_(self):
         pass
 
+    def _fileInfo_(self):
+        """ Returns a dictionary of information about the open file that
+        is shared by all readers in the process. It is replaced whenever
+        the file's size or modification time changes.
+        """
+        if self.__file_info is None:
+            if self.__reopened or self.isWritable():
+                # not shared, changes made through this reader are not
+                # reflected in the file signature until it is closed
+                self.__file_info = { }
+            else: self.__file_info = hdf5FileInfo(self.filepath)
+        return self.__file_info
+
+    def _isReopened_(self):
+        """ True when the h5py file held by keepFileOpen was reused by the
+        most recent open. Hierarchy registered by this reader is current.
+        """
+        return self.__reopened
+
     def _loadManagerAttributes_(self):
         self.assertFileOpen()
-        groups, datasets = self.getFileHierarchy(grouped=True)
+        if self.__reopened:
+            # names were maintained by this instance while the file was held
+            groups, datasets = self._group_names, self._dataset_names
+            attributes = self.getFileAttributes()
+        else:
+            info = hdf5FileInfo(self.filepath)
+            if 'hierarchy' not in info:
+                info['hierarchy'] = self.getFileHierarchy(grouped=True)
+                info['attributes'] = dict(self.getFileAttributes())
+            groups, datasets = info['hierarchy']
+            attributes = info['attributes']
         self._dataset_names = list(datasets)
         self._group_names = list(groups)
-        attributes = self.getFileAttributes()
         for attr_name, attr_value in attributes.items():
             if attr_name in ('created', 'updated'):
                 try:
@@ -526,11 +671,30 @@ class Hdf5FileReader(Hdf5DataReaderMixin, object):
             else: self.__dict__[attr_name] = attr_value
 
     def _open_(self, filepath, mode, load=True):
-        self.__hdf5_file = self._openFile_(filepath, mode)
+        self.__reopened = False
+        self.__file_info = None
+        if self.__held_file is not None:
+            hdf5_file, held_mode, signature = self.__held_file
+            if held_mode == mode and filepath == self.__hdf5_filepath \
+            and hdf5_file.id.valid \
+            and hdf5FileSignature(filepath) == signature:
+                self.__held_file = None
+                self.__reopened = True
+            else: self._releaseHeldFile_()
+        if not self.__reopened:
+            hdf5_file = self._openFile_(filepath, mode)
+        self.__hdf5_file = hdf5_file
         self.__hdf5_filepath = filepath
         self.__hdf5_filemode = mode
         self._loadManagerAttributes_()
 
+    def _releaseHeldFile_(self):
+        if self.__held_file is not None:
+            hdf5_file, held_mode, signature = self.__held_file
+            self.__held_file = None
+            if hdf5_file.id.valid: self._close_(hdf5_file)
+            if held_mode in ('a','w'): discardHdf5FileInfo(self.filepath)
+
 
 # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
 
@@ -632,6 +796,16 @@ class Hdf5FileManager(Hdf5DataWriterMixin, Hdf5FileReader):
         new_size = (max_index,) + old_shape[1:]
         self.file[dataset_path].resize(new_size)
 
+    def updateSlab(self, dataset_path, data, slab, **kwargs):
+        """ Writes data into a hyperslab of an existing dataset. slab may
+        be any index specification accepted by hyperslab().
+        """
+        self.assertFileWritable()
+        dataset = self._getDataset_(self.file, dataset_path)
+        data = self._processDataIn(dataset_path, data, **kwargs)
+        self._writeSlab_(dataset, data, hyperslab(slab))
+        return dataset
+
     def updateDataset(self, dataset_path, numpy_array, attributes={}, **kwargs):
         self.assertFileWritable()
         
@@ -7,6 +7,8 @@ import math
 import numpy as N
 
 from atmosci.hdf5.file import Hdf5FileReader, Hdf5FileManager
+from atmosci.hdf5.mixin import boundedIndex
+from atmosci.utils.nodeindex import gridNodeIndex
 
 # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
 
@@ -18,7 +20,7 @@ class Hdf5GridFileMixin:
         self.assertFileOpen()
         data = self._getData_(self.file, dataset_name, **kwargs)
         if kwargs.get('raw',False): return data
-        return self._processDataOut(dataset_name, data, **kwargs)
+        return self._processSlabOut(dataset_name, data, **kwargs)
 
     def getDataInBounds(self, dataset_name, **kwargs):
         self.assertFileOpen()
@@ -31,10 +33,8 @@ class Hdf5GridFileMixin:
                          **kwargs):
         min_y, min_x = self.ll2index(min_lon, min_lat)
         max_y, max_x = self.ll2index(max_lon, max_lat)
-        dataset = self.getDataset(dataset_name)
-        data = self._slice2DDataset(dataset, min_y, max_y, min_x, max_x)
-        if kwargs.get('raw',False): return data
-        return self._processDataOut(dataset_name, data, **kwargs)
+        slab = self._slab2D(min_y, max_y, min_x, max_x)
+        return self.getSlab(dataset_name, slab, **kwargs)
 
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 
@@ -82,6 +82,30 @@ class Hdf5GridFileMixin:
     def indexOfClosestNode(self, lon, lat):
         return self._indexOfClosestNode(lon, lat)
 
+    def indexesOfClosestNodes(self, lons, lats, radius=None):
+        """ Returns arrays of y and x indexes of the grid nodes closest to
+        each lon/lat point. Points farther than radius from any node have
+        indexes of -1.
+        """
+        distances, y, x = self.nodeIndex().nearest(lons, lats,
+                                                   max_distance=radius)
+        return y, x
+
+    def nodeIndex(self):
+        """ Returns the spatial index for the grid's lon/lat nodes. It is
+        built on first use, kept until the lon/lat grids are reloaded and
+        saved next to files opened read-only.
+        """
+        cached = getattr(self, '_node_index', None)
+        if cached is not None and cached[0] is self.lons \
+        and cached[1] is self.lats:
+            return cached[2]
+        if self.filemode == 'r': filepath = self.filepath
+        else: filepath = None
+        node_index = gridNodeIndex(self.lons, self.lats, filepath)
+        self._node_index = (self.lons, self.lats, node_index)
+        return node_index
+
     def index2ll(self, y, x):
         """ Returns the lon/lat coordinates of grid node at the y/x index
         """
@@ -197,57 +221,19 @@ class Hdf5GridFileMixin:
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 
     def _indexOfClosestNode(self, target_lon, target_lat, tolerance=None):
-        # "closeness" is dependent on the projection and grid spacing of
-        # the data ... this implementation is decent for grids in the
-        # continental U.S. with small node spacing (~ 5km or less) such
-        # as the ACIS 5 km Lambert Conformal grids supplied by NRCC.
-        # It should really be implemented in a subclass using a method
-        # that is specific to the grid type in use.
-
-        # try for anexact fit
-        indexes = N.where( (self.lons == target_lon) &
-                           (self.lats == target_lat) )
-        if len(indexes[0]) > 0:
-            return indexes[0][0], indexes[1][0]
-
-        # search using user-requested tolerance
+        # "closeness" is measured in decimal degrees, which is decent for
+        # grids in the continental U.S. with small node spacing (~ 5km or
+        # less) such as the ACIS 5 km Lambert Conformal grids supplied by
+        # NRCC. The closest node must be within the user-requested
+        # tolerance or the search radius specified in the file attributes.
+        distance, y, x = self.nodeIndex().nearest(target_lon, target_lat)
+        if tolerance is None: tolerance = self.node_search_radius
         if tolerance is not None:
-            # first try to find a uique node within the tolerance
-            indexes = N.where( (self.lons >= (target_lon - tolerance)) &
-                               (self.lons <= (target_lon + tolerance)) )
-            unique_lons = N.unique(self.lons[indexes])
-
-            indexes = N.where( (self.lats >= (target_lat - tolerance)) &
-                               (self.lats <= (target_lat + tolerance)) )
-            unique_lats = N.unique(self.lats[indexes])
-            if len(unique_lons) == 1 and len(unique_lats) == 1:
-                indexes = N.where( (self.lons == unique_lons[0]) &
-                                   (self.lats == unique_lats[0]) )
-                return indexes[0][0], indexes[1][0]
-
-            # no unique node witin tolerance, find any within tolerance 
-            indexes = N.where( (self.lons >= (target_lon - tolerance)) &
-                               (self.lons <= (target_lon + tolerance)) &
-                               (self.lats >= (target_lat - tolerance)) &
-                               (self.lats <= (target_lat + tolerance)) )
-            
-            if len(indexes[0]) == 1 and len(indexes[1]) == 1:
-                return indexes[0][0], indexes[1][0]
-
-        # search using radius specified in the file attributes
-        else:
-            radius = self.node_search_radius
-            indexes = N.where( (self.lons >= (target_lon - radius)) &
-                               (self.lons <= (target_lon + radius)) &
-                               (self.lats >= (target_lat - radius)) &
-                               (self.lats <= (target_lat + radius)) )
-        # find node that is least distance from target coordinates
-        distances = \
-        self.distanceBetweenNodes(self.lons[indexes], self.lats[indexes],
-                                  target_lon, target_lat)
-        indx = N.where(distances == distances.min())[0][0]
-        return indexes[0][indx], indexes[1][indx]
-
+            if y < 0 or abs(self.lons[y,x] - target_lon) > tolerance \
+            or abs(self.lats[y,x] - target_lat) > tolerance:
+                errmsg = 'No grid node within %s degrees of (%s, %s)'
+                raise ValueError, errmsg % (tolerance, target_lon, target_lat)
+        return y, x
 
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 
@@ -297,39 +283,17 @@ class Hdf5GridFileMixin:
 
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 
+    def _slab2D(self, min_y, max_y, min_x, max_x):
+        # max indexes are inclusive
+        if max_y == min_y: y = min_y
+        else: y = slice(min_y, max_y+1)
+        if max_x == min_x: x = min_x
+        else: x = slice(min_x, max_x+1)
+        return (y, x)
+
     def _slice2DDataset(self, dataset, min_y, max_y, min_x, max_x):
-        max_avail_x = dataset.shape[1] - 1
-        max_avail_y = dataset.shape[0] - 1
-
-        if max_x < max_avail_x : # max_x < dataset.shape[1]
-            if max_y < max_avail_y : # max_y < dataset.shape[0]
-                if max_x == min_x :
-                    if max_y == min_y : # retrieve data for one node
-                        return dataset[min_y, min_x]
-                    # retrieve data for all y indexes in range
-                    return dataset[min_y:max_y+1, min_x]
-                else:
-                    if max_y == min_y :
-                        # retrieve data for x indexes in range
-                        return dataset[min_y, min_x:max_x+1]
-                    # retrieve data for all x & y indexes in range
-                    return dataset[min_y:max_y+1, min_x:max_x+1]
-            else: # max_y >= dataset.shape[0]
-                # retrieve y indexes to end of shape[0]
-                if max_x == min_x : # single x index
-                    return dataset[min_y:, min_x]
-                else: # x indexes in range, y indexes to end of shape[0]
-                    return dataset[min_y:, min_x:max_x+1]
-
-        else: # max_x >= dataset.shape[1]
-            if max_y < max_avail_y : # max_y < dataset.shape[0]
-                # retrieve x indexes to end of dataset.shape[1]
-                if max_y == min_y : # single y coordinate
-                    return dataset[min_y, min_x:]
-                # retrieve data for y indexes in range, x indexes to end
-                return dataset[min_y:max_y+1, min_x:]
-            else: # retrieve x and y indexes to end of dataset
-                return dataset[min_y:, min_x:]
+        slab = self._slab2D(min_y, max_y, min_x, max_x)
+        return self._readSlab_(dataset, slab)
 
     # - - - # - - - # - - - # - - - # - - - # - - - # - - - # - - - # - - - #
 
@@ -444,28 +408,9 @@ class Hdf5GridFileManager(Hdf5FileManager, Hdf5GridFileMixin):
 
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 
-    def _insert2DSlice(dataset, data, min_y, max_y, min_x, max_x):
-        if max_y == min_y:
-            if max_x == min_x: # retrieve data for one node
-                dataset[min_y, min_x] = data
-            elif max_x < dataset.shape[1]:
-                dataset[min_y, min_x:max_x] = data
-            else: # max_x >= dataset.shape[1]
-                dataset[min_y, min_x:] = data
-        elif max_y < dataset.shape[0]:
-            if max_x == min_x:
-                dataset[min_y:max_y, min_x] = data
-            elif max_x < dataset.shape[1]:
-                dataset[min_y:max_y, min_x:max_x] = data
-            else: # max_x >= dataset.shape[1]
-                dataset[min_y:max_y, min_x:] = data
-        else: # max_y >= dataset.shape[0]
-            if max_x == min_x:
-                dataset[min_y:, min_x] = data
-            elif max_x < dataset.shape[1]:
-                dataset[min_y:, min_x:max_x] = data
-            else: # max_x >= dataset.shape[1]
-                dataset[min_y:, min_x:] = data
+    def _insert2DSlice(self, dataset, data, min_y, max_y, min_x, max_x):
+        slab = (boundedIndex(min_y, max_y), boundedIndex(min_x, max_x))
+        self._writeSlab_(dataset, data, slab)
 
     # - - - # - - - # - - - # - - - # - - - # - - - # - - - # - - - # - - - #
 
@@ -8,6 +8,7 @@ import numpy as N
 from atmosci.utils import tzutils
 
 from atmosci.hdf5.grid import Hdf5GridFileReader, Hdf5GridFileManager
+from atmosci.hdf5.mixin import boundedIndex
 
 # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
 
@@ -173,8 +174,8 @@ class Hdf5HourlyGridReaderMethods(TimeZoneManagementMethods):
         min_y, min_x = self.ll2index(min_lon, min_lat)
         max_y, max_x = self.ll2index(max_lon, max_lat)
 
-        data = self._areaSlice(dataset, min_y, min_x, max_y, max_x, **kwargs)
-        return self._processDataOut(dataset_path, data, **kwargs)
+        slab = self._areaSlab(dataset, min_y, min_x, max_y, max_x)
+        return self.getSlab(dataset_path, slab, **kwargs)
 
     get2Dslice = areaSlice
 
@@ -211,9 +212,7 @@ class Hdf5HourlyGridReaderMethods(TimeZoneManagementMethods):
             NumPy array containing the retrieved data.
         """
         y, x = self.ll2index(lon, lat)
-        dataset = self.getDataset(dataset_path)
-        data = self._dataAtNode(dataset, y, x)
-        return self._processDataOut(dataset_path, data, **kwargs)
+        return self.getSlab(dataset_path, (Ellipsis, y, x), **kwargs)
 
     getNodeData = dataAtNode
 
@@ -246,8 +245,7 @@ class Hdf5HourlyGridReaderMethods(TimeZoneManagementMethods):
             NumPy array containing the retrieved data.
         """
         index = self.indexForTime(dataset_path, hour, **kwargs)
-        data = self.getDataset(dataset_path).value[index,:,:]
-        return self._processDataOut(dataset_path, data, **kwargs)
+        return self.getSlab(dataset_path, (index,), **kwargs)
 
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 
@@ -282,8 +280,7 @@ class Hdf5HourlyGridReaderMethods(TimeZoneManagementMethods):
         """
         y, x = self.ll2index(lon, lat)
         index = self.indexForTime(dataset_path, hour, **kwargs)
-        data = self.getDataset(dataset_path)[index, y, x]
-        return self._processDataOut(dataset_path, data, **kwargs)
+        return self.getSlab(dataset_path, (index, y, x), **kwargs)
 
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 
@@ -327,10 +324,9 @@ class Hdf5HourlyGridReaderMethods(TimeZoneManagementMethods):
         max_y, max_x = self.ll2index(max_lon, max_lat)
         start, end = self.indexesForTimes(dataset_path, start_time,
                                           end_time, **kwargs)
-        dataset = self.getDataset(dataset_path)
-        data = self._slice3DDataset(dataset, start, end, min_y, max_y,
-                                    min_x, max_x)
-        return self._processDataOut(dataset_path, data, **kwargs)
+        slab = (boundedIndex(start, end), boundedIndex(min_y, max_y),
+                boundedIndex(min_x, max_x))
+        return self.getSlab(dataset_path, slab, **kwargs)
 
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 
@@ -646,51 +642,23 @@ class Hdf5HourlyGridReaderMethods(TimeZoneManagementMethods):
         """
         start, end = \
             self.indexesForTimes(dataset_path, start_time, end_time, **kwargs)
-        data = self.getDataset(dataset_path)[start:end, :, :]
-        return self._processDataOut(dataset_path, data, **kwargs)
+        return self.getSlab(dataset_path, (slice(start, end),), **kwargs)
 
     # - - - # - - - # - - - # - - - # - - - # - - - # - - - # - - - # - - - #
 
-    def _areaSlice(self, dataset, min_y, min_x, max_y, max_x, **kwargs):
-        shape = dataset.shape
-        ndims = len(shape)
+    def _areaSlab(self, dataset, min_y, min_x, max_y, max_x):
+        ndims = len(dataset.shape)
         errmsg = 'Cannot subset %dD dataset using lon,lat bounds.'
         assert(ndims in (2,3)), errmsg % ndims
 
         if ndims == 3:
-            if max_y == min_y:
-                if max_x == min_x: # retrieve data for one node
-                    return dataset[:, min_y, min_x]
-                elif max_x < shape[2]:
-                    return dataset[:, min_y, min_x:max_x]
-                else: # max_x >= dataset.shape[2]
-                    return dataset[:, min_y, min_x:]
-            elif max_y < shape[1]:
-                if max_x == min_x:
-                    return dataset[:, min_y:max_y, min_x]
-                elif max_x < shape[2]:
-                    return dataset[:, min_y:max_y, min_x:max_x]
-                else: # max_x >= dataset.shape[2]
-                    return dataset[:, min_y:max_y, min_x:]
-            else: # max_y >= dataset.shape[1]
-                if max_x == min_x:
-                    return dataset[:, min_y:, min_x]
-                elif max_x < shape[2]:
-                    return dataset[:, min_y:, min_x:max_x]
-                else: # max_x >= dataset.shape[2]
-                    return dataset[:, min_y:, min_x:]
-
-        elif ndims == 2:
-            if max_y < shape[0]:
-                if max_x < shape[1]:
-                    return dataset[min_y:max_y, min_x:max_x]
-                else:
-                    return dataset[min_y:max_y, min_x:]
-            else:
-                if max_x < shape[1]:
-                    return dataset[min_y:, min_x:max_x]
-                else:
-                    return dataset[min_y:, min_x:]
+            return (slice(None), boundedIndex(min_y, max_y),
+                    boundedIndex(min_x, max_x))
+        return (slice(min_y, max_y), slice(min_x, max_x))
+
+    def _areaSlice(self, dataset, min_y, min_x, max_y, max_x, **kwargs):
+        slab = self._areaSlab(dataset, min_y, min_x, max_y, max_x)
+        return self._readSlab_(dataset, slab)
         
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 
@@ -734,72 +702,9 @@ class Hdf5HourlyGridReaderMethods(TimeZoneManagementMethods):
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 
     def _slice3DDataset(self, dataset, start, end, min_y, max_y, min_x, max_x):
-        if end == start: # single date
-            if max_y == min_y:
-                if max_x == min_x: # retrieve data for one node
-                    return dataset[start, min_y, min_x]
-                elif max_x < dataset.shape[2]:
-                    return dataset[start, min_y, min_x:max_x]
-                else: # max_x >= dataset.shape[2]
-                    return dataset[start, min_y, min_x:]
-            elif max_y < dataset.shape[1]:
-                if max_x == min_x:
-                    return dataset[start, min_y:max_y, min_x]
-                elif max_x < dataset.shape[2]:
-                    return dataset[start, min_y:max_y, min_x:max_x]
-                else: # max_x >= dataset.shape[2]
-                    return dataset[start, min_y:max_y, min_x:]
-            else: # max_y >= dataset.shape[1]
-                if max_x == min_x:
-                    return dataset[start, min_y:, min_x]
-                elif max_x < dataset.shape[2]:
-                    return dataset[start, min_y:, min_x:max_x]
-                else: # max_x >= dataset.shape[2]
-                    return dataset[start, min_y:, min_x:]
-        elif end < dataset.shape[0]:
-            if max_y == min_y:
-                if max_x == min_x: # retrieve data for one node
-                    return dataset[start:end, min_y, min_x]
-                elif max_x < dataset.shape[2]:
-                    return dataset[start:end, min_y, min_x:max_x]
-                else: # max_x >= dataset.shape[2]
-                    return dataset[start:end, min_y, min_x:]
-            elif max_y < dataset.shape[1]:
-                if max_x == min_x:
-                    return dataset[start:end, min_y:max_y, min_x]
-                elif max_x < dataset.shape[2]:
-                    return dataset[start:end, min_y:max_y, min_x:max_x]
-                else: # max_x >= dataset.shape[2]
-                    return dataset[start:end, min_y:max_y, min_x:]
-            else: # max_y >= dataset.shape[1]
-                if max_x == min_x:
-                    return dataset[start:end, min_y:, min_x]
-                elif max_x < dataset.shape[2]:
-                    return dataset[start:end, min_y:, min_x:max_x]
-                else: # max_x >= dataset.shape[2]
-                    return dataset[start:end, min_y:, min_x:]
-        else: # end > dataset.shape[0] ... retrieve all dates to end of dataset
-            if max_y == min_y:
-                if max_x == min_x: # retrieve data for one node
-                    return dataset[start:, min_y, min_x]
-                elif max_x < dataset.shape[2]:
-                    return dataset[start:, min_y, min_x:max_x]
-                else: # max_x >= dataset.shape[2]
-                    return dataset[start:, min_y, min_x:]
-            elif max_y < dataset.shape[1]:
-                if max_x == min_x:
-                    return dataset[start:, min_y:max_y, min_x]
-                elif max_x < dataset.shape[2]:
-                    return dataset[start:, min_y:max_y, min_x:max_x]
-                else: # max_x >= dataset.shape[2]
-                    return dataset[start:, min_y:max_y, min_x:]
-            else: # max_y >= dataset.shape[1]
-                if max_x == min_x:
-                    return dataset[start:, min_y:, min_x]
-                elif max_x < dataset.shape[2]:
-                    return dataset[start:, min_y:, min_x:max_x]
-                else: # max_x >= dataset.shape[2]
-                    return dataset[start:, min_y:, min_x:]
+        slab = (boundedIndex(start, end), boundedIndex(min_y, max_y),
+                boundedIndex(min_x, max_x))
+        return self._readSlab_(dataset, slab)
 
     # - - - # - - - # - - - # - - - # - - - # - - - # - - - # - - - # - - - #
 
@@ -822,15 +727,21 @@ class Hdf5HourlyGridReaderMethods(TimeZoneManagementMethods):
         if end_time is not None:
             self.end_time = tzutils.asHourInTimezone(end_time, tzinfo)
 
-        timezone_map = { }
+        # timezones and time attributes are shared by readers of the same
+        # file until the file changes
+        info = self._fileInfo_()
+        if self._isReopened_(): # keep this instance's caches
+            timezone_map = self.timezone_cache
+        else:
+            timezone_map = info.setdefault('timezone_map', { })
+            self.time_attr_cache = info.setdefault('time_attrs', { })
         for path in self._dataset_names:
+            if path in timezone_map: continue
             timezone = self.datasetAttribute(path, 'timezone', None)
             if timezone is None: timezone_map[path] = DEFAULT_TZINFO
             else: timezone_map[path] = tzutils.asTimezoneObj(timezone)
         self.timezone_cache = timezone_map
 
-        self.time_attr_cache = { }
-
 
 # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
 
@@ -1011,57 +922,14 @@ class Hdf5HourlyGridManagerMethods(Hdf5HourlyGridReaderMethods):
 
     # - - - # - - - # - - - # - - - # - - - # - - - # - - - # - - - # - - - #
 
-    def _insert2DSlice(dataset, data, min_y, max_y, min_x, max_x):
-        shape = dataset.shape
-        ndims = len(shape)
+    def _insert2DSlice(self, dataset, data, min_y, max_y, min_x, max_x):
+        ndims = len(dataset.shape)
         errmsg = 'Cannot insert into %dD dataset using lon,lat bounds.'
         assert(ndims in (2,3)), errmsg % ndims
 
-        if ndims == 3:
-            if max_y == min_y:
-                if max_x == min_x: # retrieve data for one node
-                    dataset[:, min_y, min_x] = data
-                elif max_x < shape[1]:
-                    dataset[:, min_y, min_x:max_x] = data
-                else: # max_x >= dataset.shape[1]
-                    dataset[:, min_y, min_x:] = data
-            elif max_y < shape[0]:
-                if max_x == min_x:
-                    dataset[:, min_y:max_y, min_x] = data
-                elif max_x < shape[1]:
-                    dataset[:, min_y:max_y, min_x:max_x] = data
-                else: # max_x >= dataset.shape[1]
-                    dataset[:, min_y:max_y, min_x:] = data
-            else: # max_y >= dataset.shape[0]
-                if max_x == min_x:
-                    dataset[:, min_y:, min_x] = data
-                elif max_x < shape[1]:
-                    dataset[:, min_y:, min_x:max_x] = data
-                else: # max_x >= dataset.shape[1]
-                    dataset[:, min_y:, min_x:] = data
-        elif ndims == 2:
-            if max_y == min_y:
-                if max_x == min_x: # retrieve data for one node
-                    dataset[min_y, min_x] = data
-                elif max_x < shape[1]:
-                    dataset[min_y, min_x:max_x] = data
-                else: # max_x >= dataset.shape[1]
-                    dataset[min_y, min_x:] = data
-            elif max_y < shape[0]:
-                if max_x == min_x:
-                    dataset[min_y:max_y, min_x] = data
-                elif max_x < shape[1]:
-                    dataset[min_y:max_y, min_x:max_x] = data
-                else: # max_x >= dataset.shape[1]
-                    dataset[min_y:max_y, min_x:] = data
-            else: # max_y >= dataset.shape[0]
-                if max_x == min_x:
-                    dataset[min_y:, min_x] = data
-                elif max_x < shape[1]:
-                    dataset[min_y:, min_x:max_x] = data
-                else: # max_x >= dataset.shape[1]
-                    dataset[min_y:, min_x:] = data
-
+        slab = (boundedIndex(min_y, max_y), boundedIndex(min_x, max_x))
+        if ndims == 3: slab = (slice(None),) + slab
+        self._writeSlab_(dataset, data, slab)
         return dataset
 
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
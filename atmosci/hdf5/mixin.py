@@ -4,9 +4,11 @@
 import os
 from datetime import datetime
 
-import h5py
 import numpy as N
 
+from atmosci.utils.lazy import lazyImport
+h5py = lazyImport('h5py')
+
 from atmosci.utils.data import safestring, safevalue, safedict
 from atmosci.utils.data import safeDataKey, dictToWhere, listToWhere
 
@@ -64,6 +66,81 @@ def walkToObject(root_object, object_key):
     if len(path) == 1: return _object
     else: return walkToObject(_object, path[1:])
 
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+def boundedIndex(first, last):
+    """ Returns the index for one dimension of a hyperslab : first when
+    last == first, otherwise a slice from first up to (but not including)
+    last. Slices that extend past the end of a dimension stop at the end.
+    """
+    if last == first: return first
+    return slice(first, last)
+
+def hyperslab(indexes):
+    """ Converts a sequence of index specifications into a tuple that can
+    be used to index h5py datasets and numpy arrays directly. Each item may
+    be an int, a slice, Ellipsis, a (start, stop[, step]) tuple or list, a
+    string such as ':', '5' or '2:10', or an array of indexes.
+    """
+    if isinstance(indexes, (int, long, slice)): return (indexes,)
+    slab = [ ]
+    for indx in indexes:
+        if isinstance(indx, (tuple,list)):
+            if len(indx) == 1: slab.append(int(indx[0]))
+            else: slab.append(slice(*[_sliceIndex(it) for it in indx]))
+        elif isinstance(indx, basestring):
+            indx = indx.strip()
+            if indx == '...': slab.append(Ellipsis)
+            elif ':' in indx:
+                slab.append(slice(*[_sliceIndex(it) for it in indx.split(':')]))
+            else: slab.append(int(indx))
+        elif isinstance(indx, (slice, type(Ellipsis))): slab.append(indx)
+        elif isinstance(indx, N.ndarray) and indx.ndim > 0: slab.append(indx)
+        else: slab.append(int(indx))
+    return tuple(slab)
+
+def _sliceIndex(indx):
+    if indx is None: return None
+    if isinstance(indx, basestring):
+        indx = indx.strip()
+        if indx in ('', 'None'): return None
+    return int(indx)
+
+def hyperslabShape(slab, shape):
+    """ Returns the shape of the array selected by a hyperslab from a
+    dataset or array with the given shape. An array of indexes adds its
+    own shape to the result (the count of True values for a boolean
+    mask). As with h5py, only one array index is allowed in a hyperslab.
+    """
+    slab = list(slab)
+    ellipses = [where for where, indx in enumerate(slab) if indx is Ellipsis]
+    if ellipses:
+        where = ellipses[0]
+        fill = [slice(None)] * (len(shape) - len(slab) + 1)
+        slab = slab[:where] + fill + slab[where+1:]
+    else: slab = slab + [slice(None)] * (len(shape) - len(slab))
+    if len(slab) > len(shape):
+        errmsg = 'Hyperslab %s has too many indexes for shape %s'
+        raise IndexError, errmsg % (str(tuple(slab)), str(shape))
+    if len(_arrayIndexes(slab)) > 1:
+        errmsg = 'Hyperslab %s has more than one array index'
+        raise IndexError, errmsg % str(tuple(slab))
+
+    slab_shape = [ ]
+    for indx, size in zip(slab, shape):
+        if isinstance(indx, slice):
+            start, stop, step = indx.indices(size)
+            slab_shape.append(len(xrange(start, stop, step)))
+        elif isinstance(indx, N.ndarray) and indx.ndim > 0:
+            if indx.dtype.kind == 'b':
+                slab_shape.append(int(N.count_nonzero(indx)))
+            else: slab_shape.extend(indx.shape)
+    return tuple(slab_shape)
+
+def _arrayIndexes(slab):
+    return [indx for indx in slab
+            if isinstance(indx, N.ndarray) and indx.ndim > 0]
+
 # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
 
 class Hdf5DataReaderMixin:
@@ -96,26 +173,35 @@ class Hdf5DataReaderMixin:
 
     def _getData_(self, parent, dataset_name, **kwargs):
         dataset = self._getDataset_(parent, dataset_name)
+        out = kwargs.get('out', None)
         # index subset in kwargs
         if 'indexes' in kwargs:
-            index_strings = [ ]
-            for indx in kwargs['indexes']:
-                if isinstance(indx, (tuple,list)):
-                    index_strings.append(':'.join([str(it) for it in indx]))
-                else: index_strings.append(str(indx))
-            subset = ','.join(index_strings)
-            return eval('dataset[%s]' % subset)
+            return self._readSlab_(dataset, hyperslab(kwargs['indexes']), out)
         # index to single element
         elif 'index' in kwargs:
-            indx = int(kwargs['index'])
-            dimensions = len(dataset.shape)
-            if dimensions > 1:
-                indexes = ','.join([':' for dim in range(dimensions-1)])
-                return eval('dataset[%d,%s]' % (indx, indexes))
-            else: return dataset[indx]
+            return self._readSlab_(dataset, (int(kwargs['index']),), out)
         # no indexes, return entire dataset
+        elif out is not None: return self._readSlab_(dataset, (), out)
         else: return dataset[()]
 
+    def _readSlab_(self, dataset, slab, out=None):
+        """ Reads a hyperslab (tuple of ints and slices) from a dataset.
+        When out is a numpy array with the shape of the hyperslab, data is
+        read directly into it and out is returned.
+        """
+        if out is None: return dataset[slab]
+        if out.shape != hyperslabShape(slab, dataset.shape):
+            errmsg = 'Output array shape %s does not match shape of %s slab %s'
+            raise ValueError, errmsg % (str(out.shape), dataset.name,
+                                        str(hyperslabShape(slab, dataset.shape)))
+        if out.size == 0: return out
+        # h5py can only read simple selections directly into a buffer
+        if not out.flags.c_contiguous or _arrayIndexes(slab):
+            out[...] = dataset[slab]
+        elif len(slab) > 0: dataset.read_direct(out, source_sel=slab)
+        else: dataset.read_direct(out)
+        return out
+
 
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
     # root-level dataset access
@@ -415,9 +501,7 @@ class Hdf5DataWriterMixin:
 
         # replace the entire dataset
         if numpy_array.shape == dataset.shape:
-            indexes = ','.join([':' for dim in range(array_dimensions)])
-            update_string = 'dataset[%s] = numpy_array[%s]' % (indexes,indexes)
-            exec(update_string)
+            self._writeSlab_(dataset, numpy_array, ())
             if attributes:
                 self._setObjectAttributes_(dataset, attributes)
             return dataset
@@ -433,19 +517,13 @@ class Hdf5DataWriterMixin:
 
         # new data goes into multi-dimensional slice
         if 'indexes' in kwargs:
-            index_strings = [ ]
-            for indx in kwargs['indexes']:
-                if isinstance(indx, (tuple,list)):
-                    index_strings.append(':'.join([str(it) for it in indx]))
-                else: index_strings.append(str(indx))
-            subset = ','.join(index_strings)
-            update_string = 'dataset[%s] = numpy_array' % subset
+            slab = hyperslab(kwargs['indexes'])
             try:
-                exec(update_string)
+                self._writeSlab_(dataset, numpy_array, slab)
             except:
                 errmsg = \
-                    'Cannot insert %s array at [%s] in dataset of shape %s'
-                raise IndexError, errmsg % (str(numpy_array.shape), subset,
+                    'Cannot insert %s array at %s in dataset of shape %s'
+                raise IndexError, errmsg % (str(numpy_array.shape), str(slab),
                                             str(dataset.shape))
 
             if attributes:
@@ -455,14 +533,8 @@ class Hdf5DataWriterMixin:
         # new data replaces entire content slice at index in first dimension
         elif 'index' in kwargs:
             indx = kwargs['index']
-            from_indexes = ','.join([':' for dim in range(array_dimensions)])
-            from_array = 'numpy_array[%s]' % from_indexes
             if array_dimensions < dataset_dimensions:
-                indexes = \
-                    ','.join([':' for dim in range(dataset_dimensions-1)])
-                to_array = 'dataset[%d,%s]' % (int(indx), indexes)
-                update_string = 'dataset[%s] = numpy_array[%s]' % subset
-                exec(update_string)
+                self._writeSlab_(dataset, numpy_array, (int(indx),))
                 if attributes:
                     self._setObjectAttributes_(dataset, attributes)
                 return dataset
@@ -478,6 +550,19 @@ class Hdf5DataWriterMixin:
             raise IndexError, errmsg % (str(numpy_array.shape),
                                             str(dataset.shape))
 
+    def _writeSlab_(self, dataset, data, slab):
+        """ Writes data into a hyperslab (tuple of ints and slices) of a
+        dataset. Numeric arrays that exactly fill the hyperslab are written
+        directly from their buffer, anything else is broadcast by h5py.
+        """
+        if isinstance(data, N.ndarray) and data.dtype.kind in 'biuf' \
+        and data.flags.c_contiguous and data.size > 0 \
+        and not _arrayIndexes(slab) \
+        and data.shape == hyperslabShape(slab, dataset.shape):
+            if len(slab) > 0: dataset.write_direct(data, dest_sel=slab)
+            else: dataset.write_direct(data)
+        else: dataset[slab] = data
+
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 
     def _deleteDatasetAttribute_(self, parent, dataset_name, attr_name):
@@ -5,6 +5,7 @@ from copy import copy, deepcopy
 import numpy as N
 
 from atmosci.utils.timeutils import asDatetimeDate, asAcisQueryDate, ONE_DAY
+from atmosci.hdf5.chunks import timeGridChunks
 
 # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
 
@@ -514,10 +515,9 @@ class GridFileBuildMethods:
         if chunks is not None: return chunks
         chunks = dataset.get('chunks', None)
         if chunks is not None: return chunks
-        if len(shape) == 3:
-            if view[0] == 't': return (1, shape[1], shape[2])
-            elif view[2] == 't': return (1, 1, shape[2])
-        return None
+        layout = kwargs.get('chunk_layout', dataset.get('chunk_layout', None))
+        tile = kwargs.get('chunk_tile', dataset.get('chunk_tile', None))
+        return timeGridChunks(shape, view, layout, tile)
 
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 
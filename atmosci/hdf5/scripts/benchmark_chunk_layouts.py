@@ -0,0 +1,116 @@
+#! /Volumes/Transport/venv2/ndfd/bin/python
+
+""" Compare read latency of point series, bbox and full grid reads from
+3D time series datasets written with different chunk layouts.
+
+Uses a synthetic gzip compressed grid by default. When a file path and
+dataset name are passed, that dataset is copied to each layout instead.
+
+    benchmark_chunk_layouts.py -t 2160 -y 300 -x 400
+    benchmark_chunk_layouts.py -l 'grid;tiled:24,64,64' temps.h5 temps.maxt
+"""
+
+import os
+import tempfile
+import time
+
+import h5py
+import numpy as N
+
+from atmosci.hdf5.chunks import asChunkTile, timeGridChunks
+
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+from optparse import OptionParser
+parser = OptionParser()
+parser.add_option('-b', action='store', type='int', dest='bbox_size',
+                  default=20, help='rows and columns in bbox reads')
+parser.add_option('-l', action='store', dest='layouts',
+                  default='grid;tiled;series',
+                  help='layouts separated by ";", tiles follow a colon')
+parser.add_option('-n', action='store', type='int', dest='num_reads',
+                  default=20, help='number of reads of each kind')
+parser.add_option('-t', action='store', type='int', dest='num_times',
+                  default=24*90)
+parser.add_option('-x', action='store', type='int', dest='num_cols',
+                  default=300)
+parser.add_option('-y', action='store', type='int', dest='num_rows',
+                  default=200)
+options, args = parser.parse_args()
+
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+def parseLayouts(layouts_arg):
+    layouts = [ ]
+    for layout in layouts_arg.split(';'):
+        layout = layout.strip()
+        if ':' in layout:
+            name, tile = layout.split(':')
+            layouts.append((name, asChunkTile(tile)))
+        else: layouts.append((layout, None))
+    return layouts
+
+def sourceData():
+    if args:
+        source_file = h5py.File(args[0], 'r')
+        data = source_file[args[1].replace('.','/')][...]
+        source_file.close()
+        return data
+    # smooth field plus noise compresses like real temperature grids
+    shape = (options.num_times, options.num_rows, options.num_cols)
+    times = N.arange(shape[0], dtype=float)[:,N.newaxis,N.newaxis]
+    rows = N.arange(shape[1], dtype=float)[N.newaxis,:,N.newaxis]
+    cols = N.arange(shape[2], dtype=float)[N.newaxis,N.newaxis,:]
+    data = 50. + 20. * N.sin(times / 24. * N.pi) - (rows * 0.1) + (cols * 0.05)
+    data += N.random.normal(0., 1., shape)
+    return N.round(data * 10.).astype(N.int16)
+
+def timeReads(dataset, reads):
+    start = time.time()
+    for read in reads: dataset[read]
+    return (time.time() - start) / len(reads)
+
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+data = sourceData()
+num_times, num_rows, num_cols = data.shape
+print 'dataset shape', data.shape, data.dtype
+
+random = N.random.RandomState(1)
+bbox = min(options.bbox_size, num_rows, num_cols)
+num_reads = options.num_reads
+point_reads = [(slice(None), random.randint(num_rows), random.randint(num_cols))
+               for n in range(num_reads)]
+bbox_reads = [ ]
+for n in range(num_reads):
+    y = random.randint(num_rows - bbox + 1)
+    x = random.randint(num_cols - bbox + 1)
+    bbox_reads.append((slice(None), slice(y, y+bbox), slice(x, x+bbox)))
+grid_reads = [random.randint(num_times) for n in range(num_reads)]
+
+work_dir = tempfile.mkdtemp()
+header = '%-24s %-18s %10s %12s %12s %12s'
+print header % ('layout', 'chunks', 'size MB', 'point ms', 'bbox ms', 'grid ms')
+for layout, tile in parseLayouts(options.layouts):
+    chunks = timeGridChunks(data.shape, 'tyx', layout, tile)
+    filepath = os.path.join(work_dir, '%s.h5' % layout)
+    h5file = h5py.File(filepath, 'w')
+    h5file.create_dataset('data', data=data, chunks=chunks,
+                          compression='gzip')
+    h5file.close()
+    size = os.path.getsize(filepath) / (1024. * 1024.)
+
+    # reopen for each kind of read so the chunk cache starts empty
+    times = [ ]
+    for reads in (point_reads, bbox_reads, grid_reads):
+        h5file = h5py.File(filepath, 'r')
+        times.append(timeReads(h5file['data'], reads) * 1000.)
+        h5file.close()
+    os.remove(filepath)
+
+    if tile is not None: name = '%s:%s' % (layout, ','.join(map(str, tile)))
+    else: name = layout
+    print '%-24s %-18s %10.1f %12.2f %12.2f %12.2f' % \
+          ((name, str(chunks), size) + tuple(times))
+
+os.rmdir(work_dir)
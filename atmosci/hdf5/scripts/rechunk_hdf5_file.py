@@ -0,0 +1,109 @@
+#! /Volumes/Transport/venv2/ndfd/bin/python
+
+""" Rewrite the 3D time series datasets in an Hdf5 file with a new chunk
+layout. The file is copied to a temporary file in the same directory,
+which then replaces the original.
+
+    rechunk_hdf5_file.py -l tiled -t 24,32,32 reported_temps.h5
+    rechunk_hdf5_file.py -l series -d temps.maxt,temps.mint temps.h5
+"""
+
+import os
+
+import numpy as N
+
+from atmosci.hdf5.file import Hdf5FileReader, Hdf5FileManager
+from atmosci.hdf5.chunks import CHUNK_LAYOUTS, asChunkTile, copyBlocks, \
+                                copyBlockShape, timeGridChunks
+
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+from optparse import OptionParser
+parser = OptionParser()
+parser.add_option('-b', action='store_true', dest='backup', default=False,
+                  help='keep original file with ".bak" extension')
+parser.add_option('-c', action='store', dest='compression', default=None,
+                  help='compression for rechunked datasets, default is the '
+                       'compression of each original dataset')
+parser.add_option('-d', action='store', dest='datasets', default=None,
+                  help='comma separated list of datasets to rechunk')
+parser.add_option('-l', action='store', dest='layout', default='tiled',
+                  help='chunk layout, one of %s' % str(CHUNK_LAYOUTS))
+parser.add_option('-t', action='store', dest='tile', default=None,
+                  help='chunk tile "times,rows,columns"')
+parser.add_option('-v', action='store', dest='view', default='tyx',
+                  help='view used when dataset does not have a view attribute')
+options, args = parser.parse_args()
+
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+filepath = os.path.abspath(os.path.normpath(args[0]))
+tmp_filepath = filepath + '.rechunk.tmp'
+if os.path.exists(tmp_filepath): os.remove(tmp_filepath)
+
+layout = options.layout
+tile = asChunkTile(options.tile)
+if options.datasets is not None:
+    rechunk = [name.strip() for name in options.datasets.split(',')]
+else: rechunk = None
+
+print "Rechunking datasets in '%s'" % filepath
+reader = Hdf5FileReader(filepath)
+
+manager = Hdf5FileManager(tmp_filepath, 'a')
+manager.setFileAttributes(**dict(reader.getFileAttributes()))
+
+for name in reader.group_names:
+    attrs = reader.getGroupAttributes(name)
+    manager.open('a')
+    manager.createGroup(name)
+    manager.setGroupAttributes(name, **attrs)
+    manager.close()
+
+for name in reader.dataset_names:
+    dataset = reader.getDataset(name)
+    attrs = dict(dataset.attrs)
+    chunks = dataset.chunks
+    if rechunk is None or name in rechunk:
+        view = attrs.get('view', options.view)
+        new_chunks = timeGridChunks(dataset.shape, view, layout, tile)
+        if new_chunks is not None: chunks = new_chunks
+
+    create_args = { }
+    if chunks is not None:
+        create_args['chunks'] = chunks
+        compression = options.compression or dataset.compression
+        if compression is not None:
+            create_args['compression'] = compression
+            if dataset.compression_opts is not None \
+            and compression == dataset.compression:
+                create_args['compression_opts'] = dataset.compression_opts
+        if dataset.shuffle: create_args['shuffle'] = True
+    if dataset.maxshape != dataset.shape:
+        create_args['maxshape'] = dataset.maxshape
+    print "    '%s' : %s >> %s" % (name, str(dataset.chunks), str(chunks))
+
+    manager.open('a')
+    manager.createEmptyDataset(name, dataset.shape, dataset.dtype,
+                               dataset.fillvalue, **create_args)
+    new_dataset = manager.getDataset(name)
+    if len(dataset.shape) > 0 and dataset.size > 0:
+        # copy in blocks that cover whole chunks in both layouts, reusing
+        # one buffer so that only a block is ever in memory
+        block_shape = copyBlockShape(dataset.shape, dataset.chunks, chunks,
+                                     dataset.dtype.itemsize)
+        buffer = N.empty(block_shape, dtype=dataset.dtype)
+        for block in copyBlocks(dataset.shape, block_shape):
+            in_buffer = tuple([slice(0, slc.stop - slc.start)
+                               for slc in block])
+            dataset.read_direct(buffer, block, in_buffer)
+            new_dataset.write_direct(buffer, in_buffer, block)
+    else: new_dataset[()] = dataset[()]
+    manager.setDatasetAttributes(name, **attrs)
+    manager.close()
+
+reader.close()
+
+if options.backup: os.rename(filepath, filepath + '.bak')
+os.rename(tmp_filepath, filepath)
+print 'Done.'
@@ -0,0 +1,45 @@
+""" Regression tests for atmosci.hdf5.chunks
+
+    python -m pytest atmosci/hdf5/test_chunks.py
+"""
+
+import numpy as N
+
+from atmosci.hdf5.chunks import copyBlocks, copyBlockShape, timeGridChunks
+
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+def test_time_grid_chunks():
+    assert timeGridChunks((720,100,120), 'tyx') == (1,100,120)
+    assert timeGridChunks((720,100,120), 'tyx', 'tiled') == (24,32,32)
+    assert timeGridChunks((100,120,720), 'yxt', 'tiled', (48,10,20)) == \
+           (10,20,48)
+    assert timeGridChunks((100,120), 'yx') is None
+
+def test_block_is_common_multiple_of_both_chunks():
+    block = copyBlockShape((720,100,120), (1,100,120), (24,32,32), 4)
+    assert block == (24,100,120)
+    block = copyBlockShape((720,100,120), (24,32,32), (36,20,48), 4)
+    assert block == (72,100,96)
+    # unless the block spans the full dimension
+    for size, old, new in zip(block[::2], (24,32), (36,48)):
+        assert size % old == 0 and size % new == 0
+
+def test_block_is_limited_to_max_bytes():
+    block = copyBlockShape((8760,500,600), (1,500,600), (8760,4,4), 4,
+                           max_bytes=64*1024*1024)
+    assert block[0] * block[1] * block[2] * 4 <= 64*1024*1024
+    # still whole chunks of the new layout
+    assert block[0] % 8760 == 0
+    assert block[1] % 4 == 0 and block[2] % 4 == 0
+
+def test_contiguous_datasets_copy_in_slabs():
+    assert copyBlockShape((50,10,20), None, None, 8) == (1,10,20)
+    assert copyBlockShape((50,10,20), None, (5,5,5), 8) == (5,10,20)
+
+def test_blocks_cover_dataset_once():
+    shape = (50,17,23)
+    covered = N.zeros(shape, dtype=int)
+    for block in copyBlocks(shape, (24,8,10)):
+        covered[block] += 1
+    assert (covered == 1).all()
@@ -0,0 +1,226 @@
+""" Regression tests for hyperslab access and the file information cache
+in atmosci.hdf5.file
+
+    python -m pytest atmosci/hdf5/test_file.py
+"""
+
+import datetime
+import os
+
+import numpy as N
+import h5py
+import pytest
+
+from atmosci.hdf5.dategrid import Hdf5DateGridReaderMixin
+from atmosci.hdf5.file import Hdf5FileReader, Hdf5FileManager, \
+                              hdf5FileInfo
+from atmosci.hdf5.hourgrid import Hdf5HourlyGridFileReader
+
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+TEMPS = N.arange(5*4*6, dtype=N.int16).reshape((5,4,6)) + 32
+
+def buildFile(tmpdir):
+    filepath = str(tmpdir.join('temps.h5'))
+    h5_file = h5py.File(filepath, 'w')
+    dataset = h5_file.create_dataset('temps', data=TEMPS)
+    dataset.attrs['units'] = 'F'
+    dataset.attrs['start_date'] = '2017-04-01'
+    dataset.attrs['end_date'] = '2017-04-05'
+    h5_file.close()
+    return filepath
+
+class DateGridReader(Hdf5DateGridReaderMixin, Hdf5FileReader):
+    start_date = datetime.date(2017,4,1)
+    end_date = datetime.date(2017,4,5)
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+def test_get_slab_reuses_buffer(tmpdir):
+    reader = Hdf5FileReader(buildFile(tmpdir))
+    buffer = reader.slabBuffer('temps', (0, slice(1,3)))
+    assert buffer.shape == (2, 6) and buffer.dtype == N.int16
+    for day in range(TEMPS.shape[0]):
+        data = reader.getSlab('temps', (day, slice(1,3)), out=buffer)
+        assert data is buffer
+        N.testing.assert_array_equal(buffer, TEMPS[day,1:3])
+    indexes = N.array([0,2,5])
+    buffer = reader.slabBuffer('temps', (Ellipsis, indexes))
+    reader.getSlab('temps', (Ellipsis, indexes), out=buffer)
+    N.testing.assert_array_equal(buffer, TEMPS[...,indexes])
+    reader.close()
+
+def test_get_slab_converts_units_in_buffer(tmpdir):
+    reader = Hdf5FileReader(buildFile(tmpdir))
+    expected = (TEMPS[2] - 32) * 5. / 9.
+    N.testing.assert_allclose(reader.getSlab('temps', (2,), units='C'),
+                              expected)
+    buffer = reader.slabBuffer('temps', (2,), dtype=float)
+    data = reader.getSlab('temps', (2,), out=buffer, units='C')
+    assert data is buffer
+    N.testing.assert_allclose(buffer, expected)
+    # converted data will not fit in a buffer of raw values
+    with pytest.raises(TypeError):
+        reader.getSlab('temps', (2,), out=reader.slabBuffer('temps', (2,)),
+                       units='C')
+    with pytest.raises(ValueError):
+        reader.getSlab('temps', (2,), out=buffer, dtype=N.int16)
+    reader.close()
+
+def test_update_slab(tmpdir):
+    manager = Hdf5FileManager(buildFile(tmpdir), 'a')
+    manager.updateSlab('temps', N.zeros((4,6), dtype=N.int16), (1,))
+    manager.updateSlab('temps', 7, (slice(3,5), 0, slice(None)))
+    data = manager.getData('temps')
+    manager.close()
+    expected = TEMPS.copy()
+    expected[1] = 0
+    expected[3:5,0,:] = 7
+    N.testing.assert_array_equal(data, expected)
+
+def test_date_grid_readers_use_slabs(tmpdir):
+    reader = DateGridReader(buildFile(tmpdir))
+    day = datetime.date(2017,4,3)
+    N.testing.assert_array_equal(reader.dataForDate('temps', day), TEMPS[2])
+    buffer = N.empty((4,6), dtype=float)
+    data = reader.dataForDate('temps', day, out=buffer, units='C')
+    assert data is buffer
+    N.testing.assert_allclose(buffer, (TEMPS[2] - 32) * 5. / 9.)
+    N.testing.assert_array_equal(
+        reader.dateSlice('temps', day, datetime.date(2017,4,4)), TEMPS[2:4])
+    reader.close()
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+def countHierarchyLoads(monkeypatch):
+    loads = [ ]
+    get_hierarchy = Hdf5FileReader.getFileHierarchy
+    def countingHierarchy(self, *args, **kwargs):
+        loads.append(self.filepath)
+        return get_hierarchy(self, *args, **kwargs)
+    monkeypatch.setattr(Hdf5FileReader, 'getFileHierarchy', countingHierarchy)
+    return loads
+
+def addDataset(filepath, name):
+    manager = Hdf5FileManager(filepath, 'a')
+    manager.createDataset(name, N.ones((2,3)))
+    manager.close()
+
+def test_reopen_reuses_cached_info(tmpdir, monkeypatch):
+    filepath = buildFile(tmpdir)
+    loads = countHierarchyLoads(monkeypatch)
+    for attempt in range(3):
+        reader = Hdf5FileReader(filepath)
+        assert reader.dataset_names == ['temps']
+        reader.close()
+    assert len(loads) == 1
+    assert hdf5FileInfo(filepath) is hdf5FileInfo(filepath)
+
+def test_changed_file_invalidates_cached_info(tmpdir):
+    filepath = buildFile(tmpdir)
+    reader = Hdf5FileReader(filepath)
+    reader.close()
+    info = hdf5FileInfo(filepath)
+    assert 'hierarchy' in info
+
+    addDataset(filepath, 'extra')
+    assert hdf5FileInfo(filepath) is not info
+    reader = Hdf5FileReader(filepath)
+    assert sorted(reader.dataset_names) == ['extra', 'temps']
+    reader.close()
+
+    # changes made without a manager are found by the file signature
+    info = hdf5FileInfo(filepath)
+    h5_file = h5py.File(filepath, 'a')
+    h5_file.create_dataset('more', data=N.zeros(1000))
+    h5_file.close()
+    stat = os.stat(filepath)
+    os.utime(filepath, (stat.st_atime, stat.st_mtime + 10))
+    assert hdf5FileInfo(filepath) is not info
+    reader = Hdf5FileReader(filepath)
+    assert sorted(reader.dataset_names) == ['extra', 'more', 'temps']
+    reader.close()
+
+def test_keep_open_reuses_held_file(tmpdir, monkeypatch):
+    filepath = buildFile(tmpdir)
+    manager = Hdf5FileManager(filepath, 'a')
+    manager.keepFileOpen()
+    h5_file = manager.file
+    manager.updateSlab('temps', 0, (0,))
+    manager.close()
+    assert manager.file is None and h5_file.id.valid
+
+    loads = countHierarchyLoads(monkeypatch)
+    manager.open('a')
+    assert manager.file is h5_file and manager._isReopened_()
+    assert len(loads) == 0
+    N.testing.assert_array_equal(manager.getData('temps')[0], 0)
+    manager.close()
+
+    # a different mode opens a new file and closes the held one
+    manager.open('r')
+    assert manager.file is not h5_file and not h5_file.id.valid
+    assert not manager._isReopened_()
+    reader_file = manager.file
+    manager.close()
+    manager.keepFileOpen(False)
+    assert not reader_file.id.valid
+
+def test_keep_open_does_not_reuse_changed_file(tmpdir):
+    filepath = buildFile(tmpdir)
+    reader = Hdf5FileReader(filepath)
+    reader.keepFileOpen()
+    h5_file = reader.file
+    reader.close()
+    stat = os.stat(filepath)
+    os.utime(filepath, (stat.st_atime, stat.st_mtime + 10))
+    reader.open('r')
+    assert reader.file is not h5_file and not h5_file.id.valid
+    reader.keepFileOpen(False)
+    reader.close()
+    assert reader.file is None
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+def buildHourFile(tmpdir):
+    filepath = str(tmpdir.join('hours.h5'))
+    h5_file = h5py.File(filepath, 'w')
+    h5_file.attrs['timezone'] = 'UTC'
+    h5_file.attrs['start_time'] = '2017-04-01:00'
+    h5_file.attrs['end_time'] = '2017-04-01:23'
+    lons, lats = N.meshgrid(N.linspace(-80.,-70.,5), N.linspace(40.,44.,4))
+    h5_file.create_dataset('lon', data=lons)
+    h5_file.create_dataset('lat', data=lats)
+    dataset = h5_file.create_dataset('temp', data=N.zeros((24,4,5)))
+    dataset.attrs['timezone'] = 'US/Central'
+    dataset.attrs['start_time'] = '2017-04-01:00'
+    h5_file.create_dataset('rhum', data=N.zeros((24,4,5)))
+    h5_file.close()
+    return filepath
+
+def test_hour_grid_readers_share_time_caches(tmpdir):
+    filepath = buildHourFile(tmpdir)
+    reader = Hdf5HourlyGridFileReader(filepath)
+    assert reader.timezone_cache['temp'].zone == 'US/Central'
+    assert reader.timezone_cache['rhum'].zone == 'US/Eastern'
+    start_time = reader.timeAttributes('temp')['start_time']
+    reader.close()
+
+    reader = Hdf5HourlyGridFileReader(filepath)
+    assert reader.time_attr_cache['temp']['start_time'] == start_time
+    assert reader.time_attr_cache['temp']['start_time'].tzinfo.zone == \
+           'US/Central'
+    timezone_map = reader.timezone_cache
+    reader.close()
+
+    # a new dataset changes the file and the shared caches are rebuilt
+    manager = Hdf5FileManager(filepath, 'a')
+    manager.createDataset('dewpt', N.zeros((24,4,5)))
+    manager.setDatasetAttribute('dewpt', 'timezone', 'US/Pacific')
+    manager.close()
+    reader = Hdf5HourlyGridFileReader(filepath)
+    assert reader.timezone_cache is not timezone_map
+    assert reader.timezone_cache['dewpt'].zone == 'US/Pacific'
+    assert reader.timezone_cache['temp'].zone == 'US/Central'
+    assert 'temp' not in reader.time_attr_cache
+    reader.close()
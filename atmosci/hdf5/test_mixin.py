@@ -0,0 +1,56 @@
+""" Regression tests for the hyperslab functions in atmosci.hdf5.mixin
+
+    python -m pytest atmosci/hdf5/test_mixin.py
+"""
+
+import numpy as N
+import pytest
+
+from atmosci.hdf5.mixin import boundedIndex, hyperslab, hyperslabShape
+
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+SHAPE = (24, 10, 12)
+
+def assertShapeMatchesNumpy(slab, shape=SHAPE):
+    data = N.zeros(shape)
+    assert hyperslabShape(slab, shape) == data[slab].shape
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+def test_hyperslab_converts_index_specs():
+    assert hyperslab(5) == (5,)
+    assert hyperslab([':', '2:10', '3']) == \
+           (slice(None), slice(2,10), 3)
+    assert hyperslab([(2,8), (4,), [0,12,2]]) == \
+           (slice(2,8), 4, slice(0,12,2))
+    assert hyperslab(('...', 1)) == (Ellipsis, 1)
+    assert hyperslab([N.int64(3), ' : 4 ']) == (3, slice(None,4))
+    indexes = N.array([1,3,5])
+    assert hyperslab((indexes, 2))[0] is indexes
+
+def test_bounded_index():
+    assert boundedIndex(3, 3) == 3
+    assert boundedIndex(3, 7) == slice(3, 7)
+    assert N.zeros(SHAPE)[boundedIndex(20, 30)].shape == (4, 10, 12)
+
+def test_hyperslab_shape_matches_numpy():
+    for slab in ((), (5,), (slice(2,8),), (5, slice(None), 3),
+                 (slice(None,None,5), slice(1,-1), slice(20,30)),
+                 (Ellipsis, 4), (2, Ellipsis), (2, Ellipsis, 1, 1),
+                 (slice(8,2),)):
+        assertShapeMatchesNumpy(slab)
+
+def test_hyperslab_shape_includes_array_indexes():
+    for slab in ((N.array([1,4,9]),), (3, N.array([0,2]), slice(2,6)),
+                 (Ellipsis, N.array([[0,1],[2,3]])),
+                 (slice(None), N.arange(10) % 3 == 0)):
+        assertShapeMatchesNumpy(slab)
+    # Ellipsis is found by identity, not by comparing it with arrays
+    assert hyperslabShape((N.array([1,2]), Ellipsis), SHAPE) == (2, 10, 12)
+
+def test_hyperslab_shape_rejects_bad_slabs():
+    with pytest.raises(IndexError):
+        hyperslabShape((N.array([1,2]), N.array([3,4])), SHAPE)
+    with pytest.raises(IndexError):
+        hyperslabShape((1, 2, 3, 4), SHAPE)
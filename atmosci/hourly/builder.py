@@ -1,9 +1,6 @@
 
 import datetime
 
-import numpy as N
-import h5py
-
 from atmosci.utils import tzutils
 
 from atmosci.hourly.grid import HourlyGridFileManager
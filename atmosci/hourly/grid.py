@@ -11,6 +11,7 @@ except:
     nanMedian = scipy_stats.nanmedian
 
 from atmosci.utils import tzutils
+from atmosci.utils.gridstats import fillStatsFields
 
 from atmosci.hdf5.hourgrid import Hdf5HourlyGridFileReader, \
                                   Hdf5HourlyGridFileManager
@@ -41,6 +42,38 @@ def timeStatsProvenanceGenerator(source, hour, timestamp, data):
             N.nanmean(data), nanMedian(data,axis=None),
             timestamp, source)
 
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+# Vectorized provenance generators
+#
+# block generators fill every record in a structured array at once using
+# statistics computed along axis 0 of a 3D block (time is 1st dimension)
+#
+# record block generator for time with value accumulation
+def timeAccumStatsProvenanceBlock(records, hours, timestamp, sources, hourly,
+                                  accumulated):
+    names = records.dtype.names
+    records[names[0]] = [tzutils.hourAsString(hour) for hour in hours]
+    index = fillStatsFields(records, 1, hourly)
+    index = fillStatsFields(records, index, accumulated)
+    records[names[index]] = timestamp
+    records[names[index+1]] = sources
+    return records
+
+def timeStampProvenanceBlock(records, hours, timestamp, sources, data):
+    names = records.dtype.names
+    records[names[0]] = [tzutils.hourAsString(hour) for hour in hours]
+    records[names[1]] = timestamp
+    records[names[2]] = sources
+    return records
+
+def timeStatsProvenanceBlock(records, hours, timestamp, sources, data):
+    names = records.dtype.names
+    records[names[0]] = [tzutils.hourAsString(hour) for hour in hours]
+    index = fillStatsFields(records, 1, data)
+    records[names[index]] = timestamp
+    records[names[index+1]] = sources
+    return records
+
 
 # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
 
@@ -197,6 +230,9 @@ class HourlyGridFileManagerMethods(HourlyGridFileReaderMethods,
         data       : 2D or 3D numpy array - data to be used to calculate
                      provenance statistics. If 3D, time must be the 1st
                      dimension.
+
+        The "sources" keyword argument may be used to pass a sequence
+        containing a different source for each hour in a 3D array.
         """
         timezone = \
             self.datasetAttribute(prov_path, 'timezone', self.default_timezone)
@@ -216,9 +252,12 @@ class HourlyGridFileManagerMethods(HourlyGridFileReaderMethods,
                 end_hour = start_hour
             else:
                 num_hours = data.shape[0]
+                sources = kwargs.get('sources', None)
+                if sources is None: sources = (source,) * num_hours
                 for hour in range(num_hours):
                     time_ = start_hour + datetime.timedelta(hours=hour)
-                    record = generator(source, time_, timestamp, data[hour])
+                    record = \
+                        generator(sources[hour], time_, timestamp, data[hour])
                     records.append(record)
                 end_hour = time_
         else:
@@ -254,7 +293,17 @@ class HourlyGridFileManagerMethods(HourlyGridFileReaderMethods,
                      will be generated for each day.
         data       : 2D or 3D grid - data to be used to calculated
                      provenance statistics. If 3D, 1st dimension must be time.
+
+        3D data is processed by a vectorized block generator when one is
+        available for the dataset. Pass vectorize=False to force use of
+        the per-hour generator.
         """
+        if data.ndim == 3 and kwargs.get('vectorize', True):
+            block_generator = self.provenanceBlockGenerator(prov_path)
+            if block_generator is not None:
+                return self.insertProvenanceBlock(prov_path, start_time, data,
+                                                  block_generator, **kwargs)
+
         start_hour, end_hour, records = \
         self.generateProvenanceRecords(prov_path, start_time, data, **kwargs)
         num_days = len(records)
@@ -271,6 +320,50 @@ class HourlyGridFileManagerMethods(HourlyGridFileReaderMethods,
 
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 
+    def insertProvenanceBlock(self, prov_path, start_time, data, generator,
+                                    **kwargs):
+        """ Inserts provenance records for every hour in a 3D data block.
+        Statistics for all hours are calculated at once and the records
+        are written directly into a structured array with the same dtype
+        as the provenance dataset.
+
+        Arguments
+        --------------------------------------------------------------------
+        prov_path  : string - path to a provenance dataset.
+        start_time : datetime - hour of the first provenance entry
+        data       : 3D grid - 1st dimension must be time. May also be
+                     a tuple of 3D grids for group provenance.
+        generator  : vectorized provenance block generator
+        """
+        if isinstance(data, tuple): arrays = data
+        else: arrays = (data,)
+
+        timezone = \
+            self.datasetAttribute(prov_path, 'timezone', self.default_timezone)
+        start_hour = tzutils.asHourInTimezone(start_time, timezone)
+        timestamp = kwargs.get('timestamp', self.timestamp)
+
+        num_hours = arrays[0].shape[0]
+        hours = [start_hour + datetime.timedelta(hours=hour)
+                 for hour in range(num_hours)]
+        end_hour = hours[-1]
+
+        sources = kwargs.get('sources', None)
+        if sources is None:
+            sources = kwargs.get('source',
+                                 self.fileAttribute('source','unknown'))
+
+        dataset = self.getDataset(prov_path)
+        records = N.empty((num_hours,), dtype=dataset.dtype)
+        generator(records, hours, timestamp, sources, *arrays)
+
+        start_index = self.indexForHour(prov_path, start_hour)
+        dataset[start_index:start_index+num_hours] = records
+
+        return start_hour, end_hour
+
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
     def insertGroupProvenance(self, path, start_time, data1, data2, **kwargs):
         """ Inserts records into a provenance dataset using statistics
         from the input data arrays. It's purpose if to overwrite previously
@@ -300,6 +393,15 @@ class HourlyGridFileManagerMethods(HourlyGridFileReaderMethods,
         """
         if self.hasDataset(path): prov_path = path
         else: prov_path = '%s.provenance' % path
+
+        if data1.ndim == 3 and kwargs.get('vectorize', True):
+            block_generator = self.provenanceBlockGenerator(prov_path)
+            if block_generator is not None:
+                start_hour, end_hour = \
+                    self.insertProvenanceBlock(prov_path, start_time,
+                             (data1, data2), block_generator, **kwargs)
+                return prov_path, start_hour, end_hour
+
         provenance = self.generateGroupProvenanceRecords(prov_path,
                                   start_time, data1, data2, **kwargs)
         start_hour, end_hour, records = provenance
@@ -391,6 +493,17 @@ class HourlyGridFileManagerMethods(HourlyGridFileReaderMethods,
         return self._provenance_generators.get(prov_path,
                                            self._provenance_generators[key])
 
+    def provenanceBlockGenerator(self, prov_path):
+        """ Returns the vectorized generator for a provenance dataset or
+        None when the dataset must use the per-hour generator.
+        """
+        # a generator registered for a specific path always wins
+        if prov_path in self._provenance_generators: return None
+        key = self.getDatasetAttribute(prov_path, 'generator',
+                   self.getDatasetAttribute(prov_path, 'provenance',
+                        'default'))
+        return self._provenance_block_generators.get(key, None)
+
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 
     def refreshDataset(self, dataset_path, start_time, data, **kwargs):
@@ -409,8 +522,12 @@ class HourlyGridFileManagerMethods(HourlyGridFileReaderMethods,
 
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 
-    def registerProvenanceGenerator(self, key, generator):
+    def registerProvenanceGenerator(self, key, generator, block=None):
         self._provenance_generators[key] = generator
+        # a replacement per-hour generator invalidates the default block
+        # generator for the same key unless a new one is also supplied
+        if block is None: self._provenance_block_generators.pop(key, None)
+        else: self._provenance_block_generators[key] = block
 
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 
@@ -655,6 +772,12 @@ class HourlyGridFileManagerMethods(HourlyGridFileReaderMethods,
             'timestamp':timeStampProvenanceGenerator,
             'timestats':timeStatsProvenanceGenerator,
         }
+        self._provenance_block_generators = {
+            'default':timeStampProvenanceBlock,
+            'timeaccum':timeAccumStatsProvenanceBlock,
+            'timestamp':timeStampProvenanceBlock,
+            'timestats':timeStatsProvenanceBlock,
+        }
 
     def _preInitHourlyFileManager_(self, **kwargs):
         self._preInitHourlyFileReader_(**kwargs)
@@ -0,0 +1,219 @@
+""" Concurrent download engine for NDFD grib files.
+
+Files are downloaded by a bounded pool of worker threads. Each download
+is a conditional GET : the Last-Modified and ETag headers from the last
+successful download are kept in a small sidecar file next to the local
+copy and are sent back as If-Modified-Since/If-None-Match so that files
+that have not changed on the server are not transferred again. Data is
+streamed to a temporary file that is renamed into place only after the
+transfer completes. Failed transfers are retried with exponential backoff
+and interrupted transfers are resumed with a Range request whenever the
+server supports it. Client errors (4xx) are not retried.
+"""
+
+import os
+import time
+import threading
+import httplib
+import Queue
+import urllib2
+
+
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+DOWNLOADED = 'downloaded'
+FAILED = 'failed'
+NOT_MODIFIED = 'not modified'
+
+CHUNK_SIZE = 256 * 1024
+HEADER_FILE_EXTENSION = '.http'
+PARTIAL_FILE_EXTENSION = '.part'
+
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+def readCacheHeaders(local_filepath):
+    """
+    Returns a dictionary containing the Last-Modified and ETag headers
+    saved after the last successful download of a file. The dictionary is
+    empty when the file or its header sidecar does not exist.
+    """
+    headers = { }
+    header_filepath = local_filepath + HEADER_FILE_EXTENSION
+    if os.path.exists(local_filepath) and os.path.exists(header_filepath):
+        header_file = open(header_filepath, 'r')
+        for line in header_file.readlines():
+            if ':' in line:
+                key, value = line.split(':', 1)
+                headers[key.strip()] = value.strip()
+        header_file.close()
+    return headers
+
+def writeCacheHeaders(local_filepath, headers):
+    header_filepath = local_filepath + HEADER_FILE_EXTENSION
+    header_file = open(header_filepath + '.tmp', 'w')
+    for key in ('ETag', 'Last-Modified'):
+        value = headers.get(key, None)
+        if value: header_file.write('%s: %s\n' % (key, value))
+    header_file.close()
+    os.rename(header_filepath + '.tmp', header_filepath)
+
+def isRetryableError(error):
+    """
+    Returns True for errors that may not happen again : timeouts, failed
+    or dropped connections and server errors (5xx). Other HTTP errors
+    (e.g. 404 Not Found) will fail the same way on every attempt.
+    """
+    if isinstance(error, urllib2.HTTPError):
+        return error.code >= 500 or error.code == 408
+    # URLError and socket errors (including timeouts) are IOErrors
+    return isinstance(error, (IOError, httplib.HTTPException))
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+def downloadFile(url, local_filepath, attempts=5, wait_seconds=10.,
+                 backoff=2., timeout=60., chunk_size=CHUNK_SIZE,
+                 conditional=True):
+    """
+    Downloads a single file.
+
+    Arguments
+    --------------------------------------------------------------------
+    url            : full url of the remote file
+    local_filepath : path where the file will be saved
+    attempts       : number of failed attempts allowed before giving up
+    wait_seconds   : time to wait after the first failed attempt
+    backoff        : multiplier applied to the wait time after each
+                     additional failure
+    conditional    : when True, the remote file is only downloaded if it
+                     has changed since the last successful download
+
+    Returns
+    --------------------------------------------------------------------
+    DOWNLOADED or NOT_MODIFIED. The exception from the last attempt is
+    raised when all attempts fail. Errors that are not retryable (see
+    isRetryableError) are raised immediately.
+    """
+    if conditional: cache_headers = readCacheHeaders(local_filepath)
+    else: cache_headers = { }
+
+    partial_filepath = local_filepath + PARTIAL_FILE_EXTENSION
+    if os.path.exists(partial_filepath): os.remove(partial_filepath)
+
+    # validator used to make sure that resumed transfers are the same file
+    validator = None
+    wait = float(wait_seconds)
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            request = urllib2.Request(url)
+            if cache_headers.get('ETag', None):
+                request.add_header('If-None-Match', cache_headers['ETag'])
+            if cache_headers.get('Last-Modified', None):
+                request.add_header('If-Modified-Since',
+                                   cache_headers['Last-Modified'])
+
+            # resume an interrupted transfer
+            if os.path.exists(partial_filepath) and validator is not None:
+                num_bytes = os.path.getsize(partial_filepath)
+                request.add_header('Range', 'bytes=%d-' % num_bytes)
+                request.add_header('If-Range', validator)
+            else: num_bytes = 0
+
+            try:
+                response = urllib2.urlopen(request, timeout=timeout)
+            except urllib2.HTTPError as e:
+                if e.code == 304: return NOT_MODIFIED
+                # requested range is beyond end of file, start over
+                if e.code == 416 and num_bytes > 0 and attempt < attempts:
+                    os.remove(partial_filepath)
+                    validator = None
+                    continue
+                raise
+
+            info = response.info()
+            headers = { 'ETag': info.getheader('ETag', None),
+                        'Last-Modified': info.getheader('Last-Modified', None) }
+            validator = headers['ETag'] or headers['Last-Modified']
+
+            # server honored the Range request, append to the partial file
+            if response.getcode() == 206 and num_bytes > 0: mode = 'ab'
+            else: mode = 'wb'
+
+            partial_file = open(partial_filepath, mode)
+            try:
+                while True:
+                    chunk = response.read(chunk_size)
+                    if not chunk: break
+                    partial_file.write(chunk)
+            finally:
+                partial_file.close()
+                response.close()
+
+            expected = info.getheader('Content-Length', None)
+            if expected is not None and mode == 'wb':
+                if os.path.getsize(partial_filepath) != int(expected):
+                    errmsg = 'Incomplete transfer of %s : %d of %s bytes.'
+                    raise IOError, errmsg % (url,
+                                   os.path.getsize(partial_filepath), expected)
+
+            os.rename(partial_filepath, local_filepath)
+            writeCacheHeaders(local_filepath, headers)
+            return DOWNLOADED
+
+        except Exception as e:
+            if attempt >= attempts or not isRetryableError(e):
+                if os.path.exists(partial_filepath):
+                    os.remove(partial_filepath)
+                raise
+            time.sleep(wait)
+            wait *= backoff
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+def downloadFiles(downloads, max_threads=4, verbose=False, **kwargs):
+    """
+    Downloads multiple files using a bounded pool of worker threads.
+
+    Arguments
+    --------------------------------------------------------------------
+    downloads   : sequence of (key, url, local_filepath) tuples
+    max_threads : maximum number of concurrent downloads
+    kwargs      : passed to downloadFile for every file
+
+    Returns
+    --------------------------------------------------------------------
+    dictionary : key -> (status, local_filepath, error message or None)
+    """
+    work_queue = Queue.Queue()
+    for download in downloads: work_queue.put(download)
+
+    results = { }
+    results_lock = threading.Lock()
+
+    def worker():
+        while True:
+            try:
+                key, url, local_filepath = work_queue.get_nowait()
+            except Queue.Empty:
+                return
+            try:
+                status = downloadFile(url, local_filepath, **kwargs)
+                result = (status, local_filepath, None)
+            except Exception as e:
+                result = (FAILED, local_filepath, '%s : %s' % (url, str(e)))
+            results_lock.acquire()
+            try:
+                results[key] = result
+                if verbose: print '%s : %s' % (result[0], url)
+            finally:
+                results_lock.release()
+
+    num_threads = max(1, min(max_threads, len(downloads)))
+    threads = [threading.Thread(target=worker) for n in range(num_threads)]
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+    for thread in threads: thread.join()
+
+    return results
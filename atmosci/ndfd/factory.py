@@ -1,7 +1,6 @@
 
 import os
 import datetime
-import urllib
 
 from atmosci.utils import tzutils
 from atmosci.utils.config import ConfigObject
@@ -231,6 +230,14 @@ class NdfdGribFactoryMethods(NDFDFactoryMethods):
 
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 
+    def ndfdGribInventory(self, fcast_date, variable, period, **kwargs):
+        from atmosci.ndfd.inventory import NdfdGribInventory
+        filepath = \
+            self.ndfdGribFilepath(fcast_date, variable, period, **kwargs)
+        return NdfdGribInventory(filepath, kwargs.get('rebuild', False))
+
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
     def ndfdGribIterator(self, fcast_date, variable, period, **kwargs):
         filepath = \
             self.ndfdGribFilepath(fcast_date, variable, period, **kwargs)
@@ -255,7 +262,7 @@ class NdfdGribFactoryMethods(NDFDFactoryMethods):
         subdirs = ndfd_source.server_subdirs
         if isinstance(subdirs, basestring):
             self.ndfd_server_subdirs = subdirs
-        else: self.ndfd_server_subdirs = os.path.join(subdirs)
+        else: self.ndfd_server_subdirs = '/'.join(subdirs)
 
         self.grib_config = ndfd_config = self.config.sources.ndfd.grib
         self.ndfd_file_template = ndfd_config.file_template
@@ -268,6 +275,9 @@ class NdfdGribFactoryMethods(NDFDFactoryMethods):
         self.setNdfdGribSource(kwargs.get('source', self.ndfd.default_source))
         self.setFileTimezone(kwargs.get('grib_timezone',
                                         self.ndfd.grib.timezone))
+        # retry settings for failed downloads
+        self.wait_attempts = int(self.ndfd.grib.get('wait_attemps', 5))
+        self.wait_seconds = float(self.ndfd.grib.get('wait_seconds', 10))
 
         self.AccessRegistrars.ndfd_grib = { 'iter': _registerNdfdGribIterator,
                                             'read': _registerNdfdGribReader }
@@ -291,33 +301,69 @@ class NdfdGribFileFactory(NdfdGribFactoryMethods, object):
 
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 
-    def downloadLatestForecast(self, variables, periods=('001-003','004-007'),
-                                     region='conus', verbose=False):
+    def downloadLatestForecast(self, variables=('maxt','mint'),
+                                     periods=('001-003','004-007'),
+                                     region='conus', verbose=False, **kwargs):
+        """
+        Downloads the latest forecast for every variable/period combination
+        using a bounded pool of download threads. Files that have not
+        changed on the server since the last download are not transferred
+        again.
+
+        Keyword arguments
+        --------------------------------------------------------------------
+        filetypes   : alternate name for the variables argument
+        max_threads : maximum number of concurrent downloads (default 4)
+        server_url  : alternate server url (e.g. a local mirror)
+
+        Returns a tuple containing the forecast date and a tuple of paths
+        to the local files that are current. Failed downloads are available
+        in the "failed_downloads" attribute.
+        """
+        from atmosci.ndfd.download import FAILED, downloadFiles
+
+        variables = kwargs.get('filetypes', variables)
+        if isinstance(variables, basestring): variables = (variables,)
+        if isinstance(periods, basestring): periods = (periods,)
+
         target_date = self.timeOfLatestForecast()
-        url_template = self.ndfdUrlTemplate()
+        url_template = self.ndfdUrlTemplate(kwargs.get('server_url', None))
         template_args = {'region':region.lower(), }
 
-        filepaths = [ ]
+        downloads = [ ]
         for variable in variables:
             template_args['variable'] = variable
             for period in periods:
                 template_args['period'] = period
                 ndfd_url = url_template % template_args
-                if verbose: print '\ndownloading :', ndfd_url
-                local_filepath = self.ndfdGribFilepath(
-                                      target_date, period, filetype)
-                if verbose: print 'to :', local_filepath
-            
-                urllib.urlretrieve(ndfd_url, local_filepath)
-                filepaths.append(local_filepath)
+                local_filepath = \
+                    self.ndfdGribFilepath(target_date, variable, period)
+                if verbose:
+                    print '\ndownloading :', ndfd_url
+                    print 'to :', local_filepath
+                downloads.append(((variable,period), ndfd_url, local_filepath))
+
+        results = downloadFiles(downloads, kwargs.get('max_threads', 4),
+                                verbose, attempts=self.wait_attempts,
+                                wait_seconds=self.wait_seconds)
+
+        filepaths = [ ]
+        self.failed_downloads = [ ]
+        for key, url, local_filepath in downloads:
+            status, local_filepath, errmsg = results[key]
+            if status == FAILED:
+                self.failed_downloads.append(key + (errmsg,))
+                if verbose: print 'FAILED :', errmsg
+            else: filepaths.append(local_filepath)
 
         return target_date, tuple(filepaths)
 
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 
-    def ndfdUrlTemplate(self):
-        return '/'.join( (self.ndfd_server, self.ndfd_subdir_path,
-                          self.ndfd_file_template) )
+    def ndfdUrlTemplate(self, server_url=None):
+        if server_url is None: server_url = self.ndfd_server
+        return '/'.join( (server_url.rstrip('/'), self.ndfd_server_subdirs,
+                          self.ndfd_source.filename) )
 
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 
@@ -523,6 +569,73 @@ class NdfdGridFactoryMethods(NDFDFactoryMethods):
 
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 
+    def updateForecastGridFiles(self, variable, region, first_time, block,
+                                      codes=None, **kwargs):
+        """
+        Writes a dense hourly forecast block to the monthly grid files.
+        The block is split at month boundaries and each file is opened
+        exactly once. Within a file, each contiguous run of non-missing
+        hours is written with a single call to updateForecastBlock.
+
+        Arguments
+        --------------------------------------------------------------------
+        variable   : string - name of forecast variable
+        region     : string or ConfigObject - grid region
+        first_time : datetime - time of the first hour in the block
+        block      : 3D numpy array - hourly grids (time is 1st dimension)
+        codes      : provenance codes from atmosci.ndfd.gapfill, one for
+                     each hour. When None, all hours are tagged as "ndfd".
+
+        Returns a list of paths to the files that were updated.
+        """
+        from atmosci.ndfd.gapfill import FORECAST, contiguousRuns, sourceTags
+
+        debug = kwargs.get('debug', False)
+        source = kwargs.get('source', self.ndfd.grid.default_source)
+        dataset_path = self.ndfdGridDatasetName(variable)
+        tags = sourceTags(kwargs.get('base_source', 'ndfd'))
+
+        num_hours = block.shape[0]
+        if codes is None: codes = (FORECAST,) * num_hours
+
+        filepaths = [ ]
+        hour = 0
+        while hour < num_hours:
+            fcast_time = first_time + datetime.timedelta(hours=hour)
+            file_time = self.asFileTime(fcast_time)
+            fcast_date = file_time.date()
+            month_end = self.monthTimespan(fcast_date)[1]
+            diff = month_end - file_time
+            end_hour = min(num_hours, hour + (diff.days * 24) +
+                                      (diff.seconds / 3600) + 1)
+
+            runs = contiguousRuns(codes, hour, end_hour)
+            if runs:
+                filepath = self.ndfdGridFilepath(fcast_date, variable, region,
+                                                 source=source)
+                if not os.path.exists(filepath):
+                    self.buildForecastGridFile(fcast_date, variable,
+                                               region=region, source=source)
+                manager = self.ndfdGridFileManager(fcast_date, variable,
+                                                   region, 'a', source=source)
+                if debug: print '\nupdating grid file :', manager.filepath
+                for run_start, run_end in runs:
+                    start_time = first_time + datetime.timedelta(hours=run_start)
+                    sources = [tags[code] for code in codes[run_start:run_end]]
+                    manager.updateForecastBlock(dataset_path, start_time,
+                                    block[run_start:run_end], sources=sources)
+                    if debug:
+                        print '    inserted %d hours starting at %s' % \
+                              (run_end - run_start, str(start_time))
+                manager.close()
+                filepaths.append(filepath)
+
+            hour = end_hour
+
+        return filepaths
+
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
     def _initNdfdGridFactory_(self, config_object, **kwargs):
         self._initNdfdFactory_(config_object, **kwargs)
         timezone = kwargs.get('grid_timezone', self.ndfd.grid.timezone)
@@ -569,7 +682,7 @@ class NdfdStaticFileFactory(SourceFileAccessorMethods, StaticFileAccessorMethods
     def __init__(self, config):
         if config is None:
             self.config = CONFIG.copy()
-        else: self.config = config.copy()
+        else: self.config = config.copy().compile()
         self.setProjectConfig('project')
         self.registry = None
         _registerNdfdStaticBuilder(self)
@@ -0,0 +1,206 @@
+""" Vectorized filling of time gaps in sparse NDFD forecast time series.
+
+NDFD forecasts have 1, 3 or 6 hour time steps depending on the variable
+and timespan. The functions in this module convert a sequence of forecast
+valid times and the corresponding stack of decoded grids into a dense
+hourly block with shape (num_hours, ny, nx). Each gap is filled with a
+single broadcast operation. The source of each hour is returned as a
+parallel array of compact provenance codes instead of per-hour tuples.
+"""
+
+import datetime
+ONE_HOUR = datetime.timedelta(hours=1)
+
+import numpy as N
+
+
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+# provenance codes for each hour in a dense block
+MISSING = 0
+FORECAST = 1
+BASE_AVG = 2
+AVG = 3
+CONSTANT = 4
+SCALED = 5
+BASE_SPREAD = 6
+SPREAD = 7
+
+SOURCE_TEMPLATES = ('missing', '%s', '%s* avg', '%s avg', '%s constant',
+                    '%s scaled', '%s* spread', '%s spread')
+
+FILL_METHODS = ('avg', 'constant', 'scale', 'spread')
+
+BAD_FILL_METHOD = '"%s" fill method is not supported. Must be one of\n'
+BAD_FILL_METHOD += '"avg", "constant", "scale" or "spread".'
+
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+def sourceTags(base_source='ndfd'):
+    """
+    Returns a tuple of source tags that can be indexed directly by the
+    provenance codes returned by fillTimeGaps.
+    """
+    tags = [ ]
+    for template in SOURCE_TEMPLATES:
+        if '%s' in template: tags.append(template % base_source)
+        else: tags.append(template)
+    return tuple(tags)
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+def hourOffsets(times, base_time):
+    """
+    Returns an int array containing the number of hours between base_time
+    and each time in the sequence.
+    """
+    offsets = [ ]
+    for this_time in times:
+        diff = this_time - base_time
+        offsets.append((diff.days * 24) + (diff.seconds / 3600))
+    return N.array(offsets, dtype=int)
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+def fillGapsInBlock(block, codes, offsets, fill_method, decimals=2):
+    """
+    Fills the time gaps in a dense hourly block in place.
+
+    Arguments
+    --------------------------------------------------------------------
+    block       : 3D array (num_hours, ny, nx) with forecast grids already
+                  inserted at the hours in offsets
+    codes       : 1D int8 array of provenance codes, updated in place
+    offsets     : sorted, unique hour offsets of the forecast grids
+    fill_method : one of "avg", "constant", "scale" or "spread"
+    """
+    if fill_method not in FILL_METHODS:
+        raise ValueError, BAD_FILL_METHOD % fill_method
+
+    for index in range(len(offsets) - 1):
+        start = offsets[index]
+        end = offsets[index+1]
+        num_hours = end - start
+        if num_hours < 2: continue
+
+        # NOTE: only hours start thru end-1 are modified, so the grid at
+        #       end is still the original forecast when the next gap
+        #       uses it as its base grid
+        base_grid = block[start]
+
+        # avg : all hours in the gap are filled by the average
+        #       calculated by dividing base grid by number of hours
+        # NOTE: the base fcast data is also replaced by the average
+        # spread : identical calculation with different provenance
+        if fill_method in ('avg', 'spread'):
+            fill = N.around(base_grid / num_hours, decimals)
+            block[start:end] = fill
+            if fill_method == 'avg':
+                codes[start] = BASE_AVG
+                codes[start+1:end] = AVG
+            else:
+                codes[start] = BASE_SPREAD
+                codes[start+1:end] = SPREAD
+
+        # constant : all hours in gap have same values as the base time
+        elif fill_method == 'constant':
+            block[start+1:end] = base_grid
+            codes[start+1:end] = CONSTANT
+
+        # scale : increment each hour in the gap by the average
+        #         difference b/w end time and base time data values
+        else:
+            step = N.around((block[end] - base_grid) / num_hours, decimals)
+            multipliers = N.arange(1, num_hours, dtype=block.dtype)
+            block[start+1:end] = base_grid + \
+                                 (step * multipliers[:, N.newaxis, N.newaxis])
+            codes[start+1:end] = SCALED
+
+    return block, codes
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+def fillTimeGaps(times, grids, fill_method, decimals=2, dtype=N.float32):
+    """
+    Builds a dense hourly block from sparse forecast times and a stack of
+    forecast grids.
+
+    Arguments
+    --------------------------------------------------------------------
+    times       : sequence of forecast valid times, one for each grid
+    grids       : 3D array or sequence of 2D grids
+    fill_method : one of "avg", "constant", "scale" or "spread". When
+                  None, gaps are left as N.nan with code MISSING.
+
+    Returns
+    --------------------------------------------------------------------
+    tuple : (first valid time, 3D block, 1D int8 provenance codes)
+
+    When a time appears more than once, the last grid for that time is
+    used. Use sourceTags() to convert provenance codes to source names.
+    """
+    if len(times) == 0:
+        raise ValueError, 'Sequence of forecast times is empty.'
+
+    # sort by time ... a stable sort keeps duplicates in their input order
+    order = sorted(range(len(times)), key=lambda index: times[index])
+    first_time = times[order[0]]
+    offsets = hourOffsets([times[index] for index in order], first_time)
+
+    # keep only the last occurrence of each duplicated time
+    if len(offsets) > 1:
+        keep = N.append(offsets[1:] != offsets[:-1], True)
+        offsets = offsets[keep]
+        order = [index for index, kept in zip(order, keep) if kept]
+
+    num_hours = offsets[-1] + 1
+    grid_shape_2D = grids[order[0]].shape
+    block = N.empty((num_hours,) + grid_shape_2D, dtype=dtype)
+    block.fill(N.nan)
+    codes = N.zeros(num_hours, dtype=N.int8)
+
+    if isinstance(grids, N.ndarray): block[offsets] = grids[order]
+    else:
+        for offset, index in zip(offsets, order):
+            block[offset] = grids[index]
+    codes[offsets] = FORECAST
+
+    if fill_method is not None:
+        fillGapsInBlock(block, codes, offsets, fill_method, decimals)
+
+    return first_time, block, codes
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+def blockToRecords(first_time, block, codes, base_source='ndfd',
+                   include_missing=False):
+    """
+    Converts a dense hourly block into a list of (source, time, grid)
+    records compatible with SmartNdfdGribFileReader.fillTimeGap. Hours
+    coded MISSING are skipped unless include_missing is True.
+    """
+    tags = sourceTags(base_source)
+    records = [ ]
+    for hour in range(len(codes)):
+        code = codes[hour]
+        if code == MISSING and not include_missing: continue
+        records.append((tags[code], first_time + (ONE_HOUR * hour),
+                        block[hour]))
+    return records
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+def contiguousRuns(codes, start=0, end=None):
+    """
+    Returns a list of (start index, end index) tuples for each run of
+    consecutive hours that are not coded MISSING. End indexes are
+    exclusive so that each tuple can be used directly as a slice.
+    """
+    if end is None: end = len(codes)
+    valid = N.asarray(codes[start:end]) != MISSING
+    # edges are where validity changes, padded so that runs touching either
+    # end of the range are closed
+    edges = N.diff(N.concatenate(([False], valid, [False])).astype(N.int8))
+    run_starts = N.where(edges == 1)[0] + start
+    run_ends = N.where(edges == -1)[0] + start
+    return zip(run_starts.tolist(), run_ends.tolist())
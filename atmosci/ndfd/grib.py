@@ -6,19 +6,25 @@ import datetime
 from dateutil.relativedelta import relativedelta
 
 import numpy as N
-import pygrib
+
+from atmosci.utils.lazy import lazyImport
+pygrib = lazyImport('pygrib')
 
 # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
 
 from atmosci.ndfd.config import CONFIG
+from atmosci.ndfd.inventory import NdfdGribInventory
+from atmosci.units import convertUnits
+from atmosci.utils.nodeindex import gridNodeIndex
 
 
 # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
 
 class NdfdGribNodeFinder(object):
-    def __init__(self, grib_lons, grib_lats):
+    def __init__(self, grib_lons, grib_lats, grid_filepath=None):
         self.grib_lons = grib_lons
         self.grib_lats = grib_lats
+        self.node_index = gridNodeIndex(grib_lons, grib_lats, grid_filepath)
 
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 
@@ -27,49 +33,36 @@ class NdfdGribNodeFinder(object):
         # the data ... this implementation is decent for grids in the
         # continental U.S. with small node spacing (~ 5km or less) such
         # as the ACIS 5 km Lambert Conformal grids supplied by NRCC.
-        # It should really be implemented in a subclass using a method
-        # that is specific to the grid type in use.
-
-        # try for anexact fit
-        indexes = N.where( (self.grib_lons == target_lon) &
-                           (self.grib_lats == target_lat) )
-        if len(indexes[0]) > 0:
-            return indexes[0][0], indexes[1][0]
-
-        # try to find a unique node within the tolerance
-        if tolerance is not None:
-            indexes = N.where( (self.grib_lons >= (target_lon - tolerance)) &
-                               (self.grib_lons <= (target_lon + tolerance)) )
-            unique_lons = N.unique(self.grib_lons[indexes])
-
-            indexes = N.where( (self.grib_lats >= (target_lat - tolerance)) &
-                               (self.grib_lats <= (target_lat + tolerance)) )
-            unique_lats = N.unique(self.grib_lats[indexes])
-
-            if len(unique_lons) == 1 and len(unique_lats) == 1:
-                indexes = N.where( (self.grib_lons == unique_lons[0]) &
-                                   (self.grib_lats == unique_lats[0]) )
-                return indexes[0][0], indexes[1][0]
-
-            # no unique node within tolerance, find any within tolerance 
-            indexes = N.where( (self.grib_lons >= (target_lon - tolerance)) &
-                               (self.grib_lons <= (target_lon + tolerance)) &
-                               (self.grib_lats >= (target_lat - tolerance)) &
-                               (self.grib_lats <= (target_lat + tolerance)) )
-            if len(indexes[0]) == 1:
-                return indexes[0][0], indexes[1][0]
-
-            if len(indexes[0]) > 1:
-                distances = self.distanceBetweenNodes(target_lon, target_lat,
-                                                      self.grib_lons[indexes],
-                                                      self.grib_lats[indexes])
-                closest = N.where(distances == distances.min())
-                return self.grib_lons[closest], self.grib_lats[closest]
+        # Without a tolerance, only an exact fit is accepted.
+        distance, y, x = self.node_index.nearest(target_lon, target_lat)
+        if distance == 0.: return y, x
+
+        if tolerance is not None and y >= 0:
+            if abs(self.grib_lons[y,x] - target_lon) <= tolerance \
+            and abs(self.grib_lats[y,x] - target_lat) <= tolerance:
+                return y, x
 
         return None, None 
 
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 
+    def indexesOfNearestNodes(self, target_lons, target_lats, radius=None):
+        """ Vectorized lookup of the nodes nearest to arrays of points.
+        Returns arrays of y and x indexes. Points that are not within
+        radius of any node have indexes of -1.
+        """
+        distances, y, x = self.node_index.nearest(target_lons, target_lats,
+                                                  max_distance=radius)
+        return y, x
+
+    def nodesWithinRadius(self, target_lon, target_lat, radius):
+        """ Returns arrays of distances, y and x indexes for all nodes
+        within radius of a point, in order of increasing distance.
+        """
+        return self.node_index.withinRadius(target_lon, target_lat, radius)
+
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
     def distanceBetweenNodes(self, target_lon, target_lat,
                                    lon_or_lons, lat_or_lats):
         lon_diffs = lon_or_lons - target_lon 
@@ -81,37 +74,41 @@ class NdfdGribNodeFinder(object):
 
 class NdfdGribFileIterator(object):
     """
-    An iterator to sequentially return messages from  a grib file
+    An iterator to sequentially return messages from  a grib file.
+
+    Messages are located using the file's byte-offset inventory and each
+    one is read only when the iterator reaches it. Pass start_time and/or
+    end_time to limit iteration to a window of valid times.
     """
 
-    def __init__(self, grib_filepath):
-        self.gribs = pygrib.open(grib_filepath)
-        self.messages = self.gribs.select()
+    def __init__(self, grib_filepath, start_time=None, end_time=None):
+        self.inventory = NdfdGribInventory(grib_filepath)
+        self.entries = self.inventory.entriesInWindow(start_time, end_time)
         self.next_message = 0
-        self.num_messages = len(self.messages)
+        self.num_messages = len(self.entries)
 
     def __iter__(self):
         return self
 
     def close(self):
-        self.gribs == None
+        self.entries = [ ]
+        self.num_messages = 0
 
     @property
     def first_message(self):
-        return self.messages[0]
+        return self.inventory.readMessages(self.entries[:1])[0]
 
     @property
     def last_message(self):
-        return self.messages[-1]
+        return self.inventory.readMessages(self.entries[-1:])[0]
 
     def next(self):
         if self.next_message < self.num_messages:
             index = self.next_message
             self.next_message += 1
-            return index, self.messages[index]
+            entries = self.entries[index:index+1]
+            return index, self.inventory.readMessages(entries)[0]
 
-        self.gribs.close()
-        self.messages == [ ]
         raise StopIteration
 
 
@@ -210,7 +207,7 @@ class NdfdGribFileReader(object):
                 data = message.values[indexes].data
                 data = data.reshape(shape)
                 data[N.where(data == 9999)] = N.nan
-                data = convertUnits(data, 'K', 'F')
+                data = convertUnits(data, 'K', 'F', out=data)
                 data_slices.append((fcast_date, data))
             else:
                 if self.verbose: print '        ignoring fcast for', fcast_date
@@ -54,8 +54,11 @@ class NdfdGridFileManagerMethods(HourlyGridFileManagerMethods):
 
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 
-    def setForecastTimes(self, dataset_path, start_time, end_time):
-        time_attrs = self.validateDataTimes(dataset_path, start_time, end_time)
+    def setForecastTimes(self, dataset_path, start_time, end_time,
+                               time_attrs=None):
+        if time_attrs is None:
+            time_attrs = \
+                self.validateDataTimes(dataset_path, start_time, end_time)
         if time_attrs['first_fcast_time'] is None:
             self.setTimeAttribute(dataset_path, 'first_fcast_time', start_time)
         last_valid_time = time_attrs['last_valid_time']
@@ -65,13 +68,39 @@ class NdfdGridFileManagerMethods(HourlyGridFileManagerMethods):
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 
     def updateForecast(self, dataset_path, start_time, data, **kwargs):
-        if len(data.shape) == 2:
-            end_time = start_time
-        else:
-            frequency = self.datasetAttribute(dataset_path,'feequency',1)
-            end_hour = (data.shape[0]-1) * frequency
-            end_time = start_time + datetime.timedelta(hours=end_hour)
-        self.validateDataTimes(dataset_path, start_time, end_time)
+        """ Writes a single hourly forecast grid (2D) or a block of hourly
+        grids (3D). See updateForecastBlock.
+        """
+        return self.updateForecastBlock(dataset_path, start_time, data,
+                                        **kwargs)
+
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+    def updateForecastBlock(self, dataset_path, start_time, data, sources=None,
+                                  **kwargs):
+        """ Writes a contiguous block of hourly forecast grids in a single
+        transaction : one hyperslab write for the data, one write for the
+        provenance records and one update of the time attributes for each
+        dataset.
+
+        Arguments
+        --------------------------------------------------------------------
+        dataset_path : string - path to the forecast dataset
+        start_time   : datetime - time of the first hour in the block
+        data         : 3D numpy array - hourly grids, time must be the 1st
+                       dimension
+        sources      : sequence of provenance sources, one for each hour.
+                       When None, the "source" keyword argument is used
+                       for all hours.
+        """
+        if data.ndim == 2: data = data.reshape((1,) + data.shape)
+        num_hours = data.shape[0]
+        end_time = start_time + datetime.timedelta(hours=num_hours-1)
+        if sources is not None and len(sources) != num_hours:
+            errmsg = 'Number of sources (%d) does not match number of hours (%d).'
+            raise ValueError, errmsg % (len(sources), num_hours)
+
+        time_attrs = self.validateDataTimes(dataset_path, start_time, end_time)
 
         processor = self.inputProcessor(dataset_path)
         if processor is not None: data = processor(data)
@@ -79,14 +108,17 @@ class NdfdGridFileManagerMethods(HourlyGridFileManagerMethods):
         # update data
         time_index = self.indexForTime(dataset_path, start_time, **kwargs)
         self._insertTimeSlice(dataset_path, data, time_index, **kwargs)
-        self.setForecastTimes(dataset_path, start_time, end_time)
+        self.setForecastTimes(dataset_path, start_time, end_time, time_attrs)
 
-        # uodate provenance when present
+        # update provenance when present
         prov_path = kwargs.get('provenance_path', 'provenance')
         if self.hasDataset(prov_path):
-            self.insertProvenance(prov_path, start_time, data, **kwargs)
+            self.insertProvenance(prov_path, start_time, data, sources=sources,
+                                  **kwargs)
             self.setForecastTimes(prov_path, start_time, end_time)
 
+        return end_time
+
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 
     def validateDataTimes(self, dataset_path, data_start_time, data_end_time):
@@ -0,0 +1,234 @@
+""" Byte-offset inventory for NDFD grib files.
+
+An inventory is built once for each downloaded grib file and saved in a
+sidecar file next to it. It records the message number, byte offset and
+length, valid time, forecast time, short name and missing value for
+every message in the file. Inventory queries never decode data values
+and readers can seek directly to the messages for a requested time
+window instead of materializing every message in the file.
+"""
+
+import os
+import struct
+import datetime
+
+from atmosci.utils.lazy import lazyImport
+pygrib = lazyImport('pygrib')
+
+
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+INVENTORY_FILE_EXTENSION = '.inv'
+INVENTORY_FIELDS = ('number', 'offset', 'length', 'valid_time',
+                    'forecast_time', 'short_name', 'missing_value')
+INVENTORY_TIME_FORMAT = '%Y%m%d%H%M'
+INVENTORY_VERSION = 'ndfd-grib-inventory 1'
+
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+def scanMessageOffsets(grib_filepath):
+    """
+    Returns a list of (byte offset, length) tuples for every GRIB message
+    in a file. Only the indicator section (section 0) of each message is
+    read, so the scan never touches the packed data.
+    """
+    offsets = [ ]
+    grib_file = open(grib_filepath, 'rb')
+    try:
+        file_size = os.fstat(grib_file.fileno()).st_size
+        offset = 0
+        while offset < file_size:
+            grib_file.seek(offset)
+            # messages may be separated by padding, search for next marker
+            header = grib_file.read(16)
+            if len(header) < 8: break
+            if header[:4] != 'GRIB':
+                block = header + grib_file.read(65536)
+                marker = block.find('GRIB')
+                if marker < 0:
+                    offset += len(block) - 3
+                    continue
+                offset += marker
+                continue
+
+            edition = ord(header[7])
+            if edition == 2:
+                if len(header) < 16: break
+                length = struct.unpack('>Q', header[8:16])[0]
+            elif edition == 1:
+                length = struct.unpack('>I', '\x00' + header[4:7])[0]
+            else:
+                errmsg = 'Unsupported GRIB edition (%d) at byte %d in %s'
+                raise ValueError, errmsg % (edition, offset, grib_filepath)
+
+            offsets.append((offset, length))
+            offset += length
+    finally:
+        grib_file.close()
+
+    return offsets
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+def buildInventory(grib_filepath):
+    """
+    Builds the inventory for a grib file. Returns a list of dictionaries,
+    one for each message, with keys listed in INVENTORY_FIELDS.
+    """
+    offsets = scanMessageOffsets(grib_filepath)
+    inventory = [ ]
+    gribs = pygrib.open(grib_filepath)
+    try:
+        if gribs.messages != len(offsets):
+            errmsg = 'Found %d messages but %d GRIB markers in %s'
+            raise ValueError, errmsg % (gribs.messages, len(offsets),
+                                        grib_filepath)
+        # iteration returns message handles, values are only decoded when
+        # the "values" attribute is requested
+        for index, grib in enumerate(gribs):
+            offset, length = offsets[index]
+            inventory.append({ 'number': grib.messagenumber,
+                               'offset': offset,
+                               'length': length,
+                               'valid_time': grib.validDate,
+                               'forecast_time': grib.forecastTime,
+                               'short_name': grib.shortName,
+                               'missing_value': float(grib.missingValue),
+                             })
+    finally:
+        gribs.close()
+
+    return inventory
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+def inventoryFilepath(grib_filepath):
+    return grib_filepath + INVENTORY_FILE_EXTENSION
+
+def fileSignature(grib_filepath):
+    stat = os.stat(grib_filepath)
+    return '%d %d' % (stat.st_size, int(stat.st_mtime))
+
+def readInventory(grib_filepath):
+    """
+    Reads the inventory sidecar for a grib file. Returns None when the
+    sidecar does not exist or is out of date.
+    """
+    inv_filepath = inventoryFilepath(grib_filepath)
+    if not os.path.exists(inv_filepath): return None
+
+    inv_file = open(inv_filepath, 'r')
+    lines = inv_file.read().splitlines()
+    inv_file.close()
+
+    if len(lines) < 2 or lines[0] != INVENTORY_VERSION: return None
+    if lines[1] != fileSignature(grib_filepath): return None
+
+    inventory = [ ]
+    for line in lines[2:]:
+        number, offset, length, valid, fcast, name, missing = line.split('\t')
+        inventory.append({ 'number': int(number),
+                           'offset': int(offset),
+                           'length': int(length),
+                           'valid_time': datetime.datetime.strptime(valid,
+                                                   INVENTORY_TIME_FORMAT),
+                           'forecast_time': int(fcast),
+                           'short_name': name,
+                           'missing_value': float(missing),
+                         })
+    return inventory
+
+def writeInventory(grib_filepath, inventory):
+    inv_filepath = inventoryFilepath(grib_filepath)
+    inv_file = open(inv_filepath + '.tmp', 'w')
+    inv_file.write('%s\n%s\n' % (INVENTORY_VERSION,
+                                 fileSignature(grib_filepath)))
+    for entry in inventory:
+        inv_file.write('%d\t%d\t%d\t%s\t%d\t%s\t%r\n' % (entry['number'],
+                       entry['offset'], entry['length'],
+                       entry['valid_time'].strftime(INVENTORY_TIME_FORMAT),
+                       entry['forecast_time'], entry['short_name'],
+                       entry['missing_value']))
+    inv_file.close()
+    os.rename(inv_filepath + '.tmp', inv_filepath)
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+def asNaiveUTC(time_obj):
+    """ grib valid times are naive UTC datetimes """
+    if getattr(time_obj, 'tzinfo', None) is None: return time_obj
+    return (time_obj - time_obj.utcoffset()).replace(tzinfo=None)
+
+
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+class NdfdGribInventory(object):
+    """
+    Inventory of the messages in an NDFD grib file with random access to
+    individual messages by byte offset.
+    """
+
+    def __init__(self, grib_filepath, rebuild=False):
+        self.grib_filepath = grib_filepath
+        inventory = None
+        if not rebuild: inventory = readInventory(grib_filepath)
+        if inventory is None:
+            inventory = buildInventory(grib_filepath)
+            try:
+                writeInventory(grib_filepath, inventory)
+            except (IOError, OSError):
+                pass # read-only directory, keep the in-memory inventory
+        self.entries = inventory
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+    @property
+    def valid_times(self):
+        return [entry['valid_time'] for entry in self.entries]
+
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+    def entriesInWindow(self, start_time=None, end_time=None):
+        """
+        Returns the inventory entries for messages with valid times in the
+        window start_time thru end_time (inclusive). Either limit may be
+        None. Times may be naive UTC or timezone aware.
+        """
+        if start_time is not None: start_time = asNaiveUTC(start_time)
+        if end_time is not None: end_time = asNaiveUTC(end_time)
+        entries = [ ]
+        for entry in self.entries:
+            valid_time = entry['valid_time']
+            if start_time is not None and valid_time < start_time: continue
+            if end_time is not None and valid_time > end_time: continue
+            entries.append(entry)
+        return entries
+
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+    def readMessages(self, entries=None):
+        """
+        Returns pygrib messages for the inventory entries. Each message is
+        read by seeking directly to its byte offset. When entries is None,
+        all messages in the file are returned.
+        """
+        if entries is None: entries = self.entries
+        messages = [ ]
+        grib_file = open(self.grib_filepath, 'rb')
+        try:
+            for entry in entries:
+                grib_file.seek(entry['offset'])
+                messages.append(pygrib.fromstring(
+                                grib_file.read(entry['length'])))
+        finally:
+            grib_file.close()
+        return messages
+
+    def messagesInWindow(self, start_time=None, end_time=None):
+        return self.readMessages(self.entriesInWindow(start_time, end_time))
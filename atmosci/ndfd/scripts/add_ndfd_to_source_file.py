@@ -7,8 +7,9 @@ import datetime
 UPDATE_START_TIME = datetime.datetime.now()
 ONE_DAY = datetime.timedelta(days=1)
 
-import numpy as N
-import pygrib
+from atmosci.utils.lazy import lazyImport
+N = lazyImport('numpy')
+pygrib = lazyImport('pygrib')
 
 from atmosci.utils.timeutils import asDatetimeDate, asAcisQueryDate, elapsedTime
 from atmosci.utils.units import convertUnits
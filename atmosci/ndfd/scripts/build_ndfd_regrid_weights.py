@@ -0,0 +1,95 @@
+#! /Volumes/Transport/venv2/ndfd/bin/python
+
+""" Builds the grib to grid regrid weight tables for a static file and
+saves them in its "ndfd" group. Run index_ndfd_grib.py first, it sets the
+grib region indexes used here.
+
+    build_ndfd_regrid_weights.py -m bilinear,idw 2017 4 10
+"""
+
+import datetime
+
+import pygrib
+
+from atmosci.utils.nodeindex import GridNodeIndex
+from atmosci.utils.regrid import REGRID_METHODS, regridWeights
+from atmosci.utils.timeutils import elapsedTime
+
+from atmosci.seasonal.factory import NDFDProjectFactory
+
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+from optparse import OptionParser
+parser = OptionParser()
+
+parser.add_option('-g', action='store', dest='grib_variable', default='maxt')
+parser.add_option('-k', action='store', type=int, dest='neighbors',
+                        default=4, help='number of neighbors for idw')
+parser.add_option('-m', action='store', dest='methods',
+                        default=','.join(REGRID_METHODS))
+parser.add_option('-p', action='store', type=float, dest='power',
+                        default=2., help='distance power for idw')
+parser.add_option('-r', action='store', dest='region', default=None)
+parser.add_option('-s', action='store', dest='source', default=None)
+parser.add_option('-t', action='store', dest='timespan', default='001-003')
+parser.add_option('-v', action='store_true', dest='verbose', default=False)
+
+options, args = parser.parse_args()
+
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+methods = [method.strip() for method in options.methods.split(',')]
+verbose = options.verbose
+
+fcast_date = datetime.date(int(args[0]), int(args[1]), int(args[2]))
+
+factory = NDFDProjectFactory()
+
+region_key = options.region
+if region_key is None:
+    region_key = factory.project.region
+source_key = options.source
+if source_key is None:
+    source_key = factory.project.source
+ndfd_config = factory.getSourceConfig('ndfd')
+
+# target grid coordinates and the grib region that was indexed
+static_mgr = factory.getStaticFileManager(source_key, region_key, mode='r')
+print '\nstatic file :', static_mgr.filepath
+lats = static_mgr.lats
+lons = static_mgr.lons
+min_y, min_x = static_mgr.groupAttribute('ndfd', 'min_indexes')
+max_y, max_x = static_mgr.groupAttribute('ndfd', 'max_indexes')
+static_mgr.close()
+
+grib_filepath = factory.forecastGribFilepath(ndfd_config, fcast_date,
+                                     options.timespan, options.grib_variable)
+print 'reading grib coordinates from', grib_filepath
+gribs = pygrib.open(grib_filepath)
+grib_lats, grib_lons = gribs.message(1).latlons()
+gribs.close()
+grib_shape = grib_lats.shape
+grib_lats = grib_lats[min_y:max_y+1, min_x:max_x+1]
+grib_lons = grib_lons[min_y:max_y+1, min_x:max_x+1]
+print 'grib region', grib_lats.shape, ': grid', lats.shape
+
+# the same node index is used for every method
+node_index = GridNodeIndex(grib_lons, grib_lats)
+
+for method in methods:
+    start_time = datetime.datetime.now()
+    regrid_weights = regridWeights(method, lons, lats, grib_lons, grib_lats,
+                                   node_index=node_index, k=options.neighbors,
+                                   power=options.power)
+    # weights are computed on the region, but are applied to full messages
+    regrid_weights = regrid_weights.offsetSource((min_y,min_x), grib_shape)
+    if verbose:
+        print '    %s : %d neighbors, %d grib nodes used' % (method,
+              regrid_weights.num_neighbors, len(regrid_weights.source_nodes))
+
+    static_mgr.open('a')
+    attributes = { }
+    if method == 'idw': attributes['power'] = options.power
+    static_mgr.saveGribRegridWeights(regrid_weights, 'ndfd', **attributes)
+    static_mgr.close()
+    print 'saved %s weights in %s' % (method, elapsedTime(start_time, True))
@@ -6,8 +6,9 @@ import urllib
 import datetime
 from dateutil.relativedelta import relativedelta
 
-import numpy as N
-import pygrib
+from atmosci.utils.lazy import lazyImport
+N = lazyImport('numpy')
+pygrib = lazyImport('pygrib')
 
 from atmosci.utils.options import stringToBbox
 from atmosci.utils.timeutils import elapsedTime, asDatetime
@@ -26,7 +26,7 @@ from atmosci.utils.timeutils import elapsedTime
 from atmosci.ndfd.config import CONFIG
 from atmosci.ndfd.factory import NdfdStaticFileFactory
 from atmosci.ndfd.grib import NdfdGribNodeFinder
-from atmosci.ndfd.static import NdfdStaticGridFileBuilder
+from atmosci.ndfd.static import NdfdStaticGridFileBuilder, mapNdfdNodes
 
 # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
 #
@@ -125,18 +125,6 @@ if verbose:
     print "acis lats shape :", acis_lats.shape
     print "acis lons shape :", acis_lons.shape
 
-# create empty arrays to contain coordinates of NDFD nodes closest to each ACIS node
-ndfd_lats = N.full(acis_lats.shape, N.nan)
-ndfd_lons = N.full(acis_lons.shape, N.nan)
-if verbose: 
-    print "ndfd static lats shape :", ndfd_lats.shape
-    print "ndfd static lons shape :", ndfd_lons.shape
-
-# arrays to track x,y indexes for nodes in NDFD coordinate datasets
-distance = N.zeros(acis_lats.shape, dtype=float)
-x_indexes = N.zeros(acis_lats.shape, dtype="<i2")
-y_indexes = N.zeros(acis_lats.shape, dtype="<i2")
-
 # get lon/lat from an existisng CONUS NDFD grib file
 
 ndfd_filepath = ndfd_factory.forecastGribFilepath(None, fcast_date, timespan,gribvar)
@@ -213,35 +201,18 @@ if debug:
     print 'min grib_lats :', grib_lats.min()
     print 'max grib_lats :', grib_lats.max()
 
-for i in range(i_coords):
-    for j in range(j_coords):
-        acis_lon = acis_lons[i,j]
-        acis_lat = acis_lats[i,j]
-        lon_diffs = neg_lons - acis_lon
-        lat_diffs = grib_lats - acis_lat
-        diffs = N.sqrt( lon_diffs **2 + lat_diffs **2 )
-        # track distance between ACIS node and nearest NDFD node
-        min_diff = diffs.min()
-        distance[i,j] = min_diff
-        # indexes into grib array for this region
-        nodes = N.where(diffs == min_diff)
-        x_indexes[i,j] = x = nodes[1][0]
-        y_indexes[i,j] = y = nodes[0][0]
-        # track corresponding grib coords in case they are needed
-        ndfd_lats[i,j] = grib_lats[y, x]
-        ndfd_lons[i,j] = neg_lons[y, x]
-
-        if extreme_debug:
-            print '\n\nmin_diff :', min_diff
-            print 'nodes :', nodes
-            print 'x_indexes :', x_indexes[i,j]
-            print 'y_indexes :', y_indexes[i,j]
-            print ' distance :', distance[i,j]
-            print ' ndfd_lat :', ndfd_lats[i,j]
-            print ' acis_lat :', acis_lats[i,j]
-            print ' ndfd_lon :', ndfd_lons[i,j]
-            print ' acis_lon :', acis_lons[i,j]
-            if j > 5: exit()
+mapped = mapNdfdNodes(acis_lons, acis_lats, neg_lons, grib_lats)
+distance = mapped['ndfd_dist']
+x_indexes = mapped['ndfd_xidx']
+y_indexes = mapped['ndfd_yidx']
+# track corresponding grib coords in case they are needed
+ndfd_lats = mapped['lat']
+ndfd_lons = mapped['lon']
+
+if extreme_debug:
+    print '\nmax distance :', distance.max()
+    print 'x_indexes :', x_indexes.min(), x_indexes.max()
+    print 'y_indexes :', y_indexes.min(), y_indexes.max()
 
 elapsed_time = elapsedTime(COORD_MAPPING_START, True)
 fmt = 'finished mapping NDFD grid nodes to ACIS grid in %s' 
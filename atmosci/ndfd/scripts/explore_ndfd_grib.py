@@ -6,8 +6,8 @@ import urllib
 import datetime
 from dateutil.relativedelta import relativedelta
 
-import numpy as N
-import pygrib
+from atmosci.utils.lazy import lazyImport
+N = lazyImport('numpy')
 
 from atmosci.utils.options import stringToBbox
 from atmosci.utils.timeutils import elapsedTime, asDatetime
@@ -71,18 +71,17 @@ print 'project region bounding box', region_bbox
 print 'exploring grib variable "%s"' % variable
 grib_filepath = factory.ndfdGribFilepath(fcast_date, variable, time_span)
 print '\nreading gribs from', grib_filepath
-gribs = pygrib.open(grib_filepath)
+grib_inventory = factory.ndfdGribInventory(fcast_date, variable, time_span)
 
 if inventory:
+    # inventory queries never decode data
     print 'grib inventory :'
-    #grib = gribs[1]
-    #for key in sorted(grib.keys()):
-    #    print '    ', key
-    for grib in gribs.select():
-        print grib.name, grib.forecastTime, grib.validDate
+    for entry in grib_inventory:
+        print entry['number'], entry['short_name'], entry['forecast_time'], \
+              entry['valid_time'], 'at byte', entry['offset']
     exit()
 
-for grib_num, grib in enumerate(gribs.select()):
+for grib_num, grib in enumerate(grib_inventory.readMessages()):
     print '\n\ngrib number %d' % grib_num
     print '    name =', grib.name
     print '    shortName =', grib.shortName
@@ -110,5 +109,3 @@ for grib_num, grib in enumerate(gribs.select()):
     values[N.where(values == missing)] = N.nan
     print '    value stats :', values.shape, N.nanmin(values), N.nanmax(values)
 
-gribs.close()
-
@@ -6,9 +6,11 @@ import urllib
 import datetime
 from dateutil.relativedelta import relativedelta
 
-import numpy as N
-import pygrib
+from atmosci.utils.lazy import lazyImport
+N = lazyImport('numpy')
+pygrib = lazyImport('pygrib')
 
+from atmosci.utils.nodeindex import gridNodeIndex
 from atmosci.utils.options import stringToBbox
 from atmosci.utils.timeutils import elapsedTime, asDatetime
 
@@ -21,35 +23,17 @@ VARNAME_MAP = { 'maxt':'Maximum temperature',
 
 # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
 
-def nearestNode(target_lon, target_lat, grid_lons, grid_lats, radius, debug):
-    indexes = N.where( (grid_lons >= (target_lon - radius)) &
-                       (grid_lons <= (target_lon + radius)) &
-                       (grid_lats >= (target_lat - radius)) &
-                       (grid_lats <= (target_lat + radius)) )
-    if len(indexes[0]) < 1:
-        if target_lon <= -120: # target is in southwest corner of source grid
-            indexes = N.where( (grid_lons < -120) & (grid_lats < 36) )
-        else: # target is in southeast corner of source grid
-            indexes = N.where( (grid_lons > -70) & (grid_lats < 36) )
-        if len(indexes[0]) < 1:
-            errmsg = 'Unable to match location %.5f, %.5f to any point in grib'
-            raise IndexError, errmsg % (target_lat,target_lon)
+def nearestNodes(target_lons, target_lats, grid_lons, grid_lats, debug):
+    # vectorized lookup of the grid node closest to every target node
+    node_index = gridNodeIndex(grid_lons, grid_lats)
+    distances, y, x = node_index.nearest(target_lons, target_lats)
+    if (y < 0).any():
+        bad = N.where(y < 0)
+        errmsg = 'Unable to match location %.5f, %.5f to any point in grib'
+        raise IndexError, errmsg % (target_lats[bad][0], target_lons[bad][0])
     if debug:
-        print '\ntarget lon', target_lon
-        print 'lon subset\n', grid_lons[indexes]
-    lon_diffs = N.absolute(grid_lons[indexes] - target_lon)
-    if debug:
-        print 'target lat', target_lat
-        print 'lat subset\n', grid_lats[indexes]
-    lat_diffs = grid_lats[indexes] - target_lat
-    distances = N.sqrt( (lon_diffs * lon_diffs) + (lat_diffs * lat_diffs) )
-    if debug: print 'distances', distances
-    indx = N.where(distances == distances.min())[0][0]
-    min_distance = distances[indx]
-    if debug: print 'distance at index %d = %.5f' % (indx, min_distance)
-    y = indexes[0][indx] 
-    x = indexes[1][indx]
-    return y, x, grid_lons[y,x], grid_lats[y,x], min_distance
+        print '\nmax distance to nearest node', distances.max()
+    return y, x, grid_lons[y,x], grid_lats[y,x], distances
 
 # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
 
@@ -209,36 +193,18 @@ if csv_filepath:
     csv_file.write('ROW, COL, NDFD Y, NDFD X, lat, NDFD lat, lon, NDFD lon, distance')
     fmt = '\n %4i, %4i, %4i, %4i, %.5f, %.5f, %.5f, %.5f, %.5f'
 
-distance = [ ]
-region_lats = [ ]
-region_lons = [ ]
-for row in range(num_rows):
-    row_dist = [ ]
-    row_lat = [ ]
-    row_lon = [ ]
-    row_x = [ ]
-    row_y = [ ]
-    for col in range(num_cols):
-        lat = lats[row,col]
-        lon = lons[row,col]
-        y, x, ndfdlon, ndfdlat, dist = \
-            nearestNode(lon, lat, ndfd_lons, ndfd_lats, search_radius, debug)
-        row_dist.append(dist)
-        row_lat.append(ndfdlat)
-        row_lon.append(ndfdlon)
-        row_x.append(x)
-        row_y.append(y)
-        if debug: print row, col, y, x, lat, ndfdlat, lon, ndfdlon, dist
-        if csv_filepath:
-            line = fmt % (row, col, y, x, lat, ndfdlat, lon, ndfdlon, dist)
-            csv_file.write(line)
-    if verbose: print status % (row, elapsedTime(index_start_time, True))
-
-    distance.append(row_dist)
-    ndfd_x.append(row_x)
-    ndfd_y.append(row_y)
-    region_lats.append(row_lat)
-    region_lons.append(row_lon)
+ndfd_y, ndfd_x, region_lons, region_lats, distance = \
+    nearestNodes(lons, lats, ndfd_lons, ndfd_lats, debug)
+
+if debug or csv_filepath:
+    for row in range(num_rows):
+        for col in range(num_cols):
+            values = (row, col, ndfd_y[row,col], ndfd_x[row,col],
+                      lats[row,col], region_lats[row,col],
+                      lons[row,col], region_lons[row,col], distance[row,col])
+            if debug: print ' '.join([str(value) for value in values])
+            if csv_filepath: csv_file.write(fmt % values)
+        if verbose: print status % (row, elapsedTime(index_start_time, True))
 
 elapsed_time = elapsedTime(index_start_time, True)
 print 'completed indexing %d rows in %s' % (num_rows,elapsed_time)
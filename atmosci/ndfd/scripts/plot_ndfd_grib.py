@@ -10,8 +10,9 @@ import matplotlib
 matplotlib.use('Agg')
 from matplotlib import pyplot
 
-import numpy as N
-import pygrib
+from atmosci.utils.lazy import lazyImport
+N = lazyImport('numpy')
+pygrib = lazyImport('pygrib')
 
 from atmosci.utils.options import stringToBbox
 from atmosci.utils.timeutils import elapsedTime, asDatetime
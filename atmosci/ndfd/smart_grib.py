@@ -4,11 +4,14 @@ import datetime
 ONE_HOUR = datetime.timedelta(hours=1)
 
 import numpy as N
-import pygrib
+
+from atmosci.utils.lazy import lazyImport
+pygrib = lazyImport('pygrib')
 
 from atmosci.utils.tzutils import asUTCTime
 
 from atmosci.ndfd.factory import NdfdGribFileFactory
+from atmosci.ndfd.gapfill import blockToRecords, fillTimeGaps
 
 
 # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
@@ -23,6 +26,16 @@ BAD_FILL_METHOD += '"avg", "constant", "scale" or "spread".'
 BAD_TIMESPAN = '"%s" is not a valid timespan. Must be one of '
 BAD_TIMESPAN += ','.join(['"%s"' % span for span in VALID_TIMESPANS])
 
+# in-process cache of grib to grid gather parameters
+# key = (static filepath, grib region)
+# value = (static file mtime, grid shape, flat gather indexes, grid mask)
+GATHER_PARAMETER_CACHE = { }
+
+# in-process cache of grib to grid regrid weight tables
+# key = (static filepath, regrid method)
+# value = (static file mtime, RegridWeights)
+REGRID_WEIGHT_CACHE = { }
+
 # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
 
 def hoursInTimespan(time1, time2, inclusive=True):
@@ -33,13 +46,139 @@ def hoursInTimespan(time1, time2, inclusive=True):
 
 # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 
-def reshapeGrid(grib_msg, missing_value, grib_indexes, grid_shape_2D,
-                grid_mask, decimals=2):
-    values = grib_msg.values[grib_indexes].reshape(grid_shape_2D)
-    if N.ma.is_masked(values): values = values.data
-    values[N.where(values >= missing_value)] = N.nan
-    values[N.where(grid_mask == True)] = N.nan
-    return N.around(values,decimals)
+def gatherIndexes(grib_indexes, grib_shape_2D):
+    """
+    Converts the [y indexes, x indexes] pair returned by the static file
+    reader's gribSourceIndexes method into a single array of indexes into
+    the flattened grib values array. An array that is already flat is
+    returned unchanged.
+    """
+    if isinstance(grib_indexes, N.ndarray) and grib_indexes.ndim == 1:
+        return grib_indexes
+    return N.ravel_multi_index(tuple(grib_indexes), tuple(grib_shape_2D))
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+def decodeGribMessages(messages, missing_value, gather_indexes, grid_shape_2D,
+                       grid_mask, decimals=2, out=None, dtype=N.float32):
+    """
+    Decodes a sequence of grib messages into a single 3D array with shape
+    (num_messages, grid_shape_2D[0], grid_shape_2D[1]). Each message is
+    decoded exactly once and gathered directly into its slot in the output
+    array using a precomputed flat index. Missing values and nodes in the
+    grid mask are set to N.nan and the whole block is rounded in place.
+
+    Arguments
+    --------------------------------------------------------------------
+    messages       : sequence of pygrib messages
+    missing_value  : grib missing value (values >= missing are set to NaN)
+    gather_indexes : 1D array of indexes into flattened grib values
+                     (see gatherIndexes)
+    grid_shape_2D  : shape of a single output grid
+    grid_mask      : boolean grid, True where nodes are masked (or None)
+    out            : optional preallocated array to decode into
+    """
+    block_shape = (len(messages),) + tuple(grid_shape_2D)
+    if out is not None and out.shape != block_shape:
+        errmsg = 'Shape of "out" array %s does not match required shape %s.'
+        raise ValueError, errmsg % (str(out.shape), str(block_shape))
+    return decodeGribMessagesToTargets(messages, missing_value,
+                  ((gather_indexes, grid_shape_2D, grid_mask),), decimals,
+                  dtype, (out,))[0]
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+def decodeGribMessagesToTargets(messages, missing_value, targets, decimals=2,
+                                dtype=N.float32, out=None):
+    """
+    Decodes each grib message exactly once and gathers it into the grids
+    for every target, so each additional target only costs a gather.
+
+    Arguments
+    --------------------------------------------------------------------
+    messages      : sequence of pygrib messages
+    missing_value : grib missing value (values >= missing are set to NaN)
+    targets       : sequence of (gather_indexes, grid_shape_2D, grid_mask)
+                    tuples (see gribToGridGatherParameters)
+    decimals      : number of decimal places to round to, None = no rounding
+    out           : optional sequence of preallocated arrays, one for each
+                    target (None in place of an array allocates it)
+
+    Returns a list containing a 3D array with shape (num_messages,) +
+    grid_shape_2D for each target, in the same order as targets.
+    """
+    num_messages = len(messages)
+    if out is None: out = (None,) * len(targets)
+    blocks = [ ]
+    gathers = [ ]
+    for index, (gather_indexes, grid_shape_2D, grid_mask) in \
+            enumerate(targets):
+        block = out[index]
+        if block is None:
+            block = N.empty((num_messages,) + tuple(grid_shape_2D),
+                            dtype=dtype)
+        blocks.append(block)
+        if grid_mask is not None:
+            flat_mask = N.asarray(grid_mask, dtype=bool).ravel()
+        else: flat_mask = None
+        gathers.append((gather_indexes, block.reshape(num_messages, -1),
+                        flat_mask, N.empty(gather_indexes.size, dtype=bool)))
+
+    for index, msg in enumerate(messages):
+        values = N.ma.getdata(msg.values).ravel()
+        for gather_indexes, flat_block, flat_mask, bad_nodes in gathers:
+            row = flat_block[index]
+            row[:] = values.take(gather_indexes)
+            N.greater_equal(row, missing_value, out=bad_nodes)
+            if flat_mask is not None:
+                N.logical_or(bad_nodes, flat_mask, out=bad_nodes)
+            row[bad_nodes] = N.nan
+        del values
+
+    if decimals is None: return blocks
+    return [N.around(decoded, decimals, out=decoded) for decoded in blocks]
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+def regridGribMessages(messages, missing_value, regrid_weights, grid_mask,
+                       decimals=2, out=None, dtype=N.float32):
+    """
+    Regrids a sequence of grib messages into a single 3D array with shape
+    (num_messages,) + regrid_weights.grid_shape. Only the grib nodes used
+    by the weight table are extracted from each decoded message and the
+    weights are applied to the whole stack in a single sparse matrix
+    product. Missing grib values are excluded from the weighted sums and
+    nodes in the grid mask are set to N.nan.
+
+    Arguments
+    --------------------------------------------------------------------
+    messages       : sequence of pygrib messages
+    missing_value  : grib missing value (values >= missing are set to NaN)
+    regrid_weights : atmosci.utils.regrid.RegridWeights instance
+    grid_mask      : boolean grid, True where nodes are masked (or None)
+    out            : optional preallocated array to regrid into
+    """
+    num_messages = len(messages)
+    block_shape = (num_messages,) + regrid_weights.grid_shape
+    if out is None:
+        out = N.empty(block_shape, dtype=dtype)
+    elif out.shape != block_shape:
+        errmsg = 'Shape of "out" array %s does not match required shape %s.'
+        raise ValueError, errmsg % (str(out.shape), str(block_shape))
+
+    source_nodes = regrid_weights.source_nodes
+    gathered = N.empty((num_messages, len(source_nodes)), dtype=float)
+    for index, msg in enumerate(messages):
+        values = N.ma.getdata(msg.values)
+        gathered[index] = values.ravel().take(source_nodes)
+    gathered[gathered >= missing_value] = N.nan
+
+    flat_block = out.reshape(num_messages, -1)
+    flat_block[:] = regrid_weights.applyToGathered(gathered)
+    if grid_mask is not None:
+        flat_block[:, N.asarray(grid_mask, dtype=bool).ravel()] = N.nan
+
+    return N.around(out, decimals, out=out)
 
 
 # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
@@ -69,136 +208,176 @@ class SmartNdfdGribFileReader(NdfdGribFileFactory):
 
         Assumes file contains a range of times for a single variable.
         """
+        # code for filling gaps between records
+        if fill_gaps:
+            units, first_time, block, codes = \
+                self.forecastBlockForRegion(fcast_date, variable, timespans,
+                                            grid_region, grid_source, True,
+                                            debug)
+            return units, blockToRecords(first_time, block, codes, 'ndfd')
+
+        # code that preserves gaps between records
         data_records = [ ]
+        units, times, grids = \
+            self.decodeTimespans(fcast_date, variable, timespans,
+                                 grid_region, grid_source)
+        for index, this_time in enumerate(times):
+            grid = grids[index]
+            data_records.append(('ndfd', this_time, grid))
+            if debug:
+                stats = (N.nanmin(grid), N.nanmax(grid))
+                print 'value stats :', this_time, stats
+
+        return units, data_records
 
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+    def decodeTimespans(self, fcast_date, variable, timespans, grid_region,
+                              grid_source, start_time=None, end_time=None):
+        """
+        Decodes every message in the grib files for each timespan in the
+        list. Returns the units, a list of forecast times and a 3D array
+        containing the grid for each forecast time.
+
+        Messages are located using each file's byte-offset inventory. When
+        start_time and/or end_time are passed, only messages with valid
+        times in that window are read.
+        """
+        units, times, grids = \
+            self.decodeTimespansForTargets(fcast_date, variable, timespans,
+                 ((grid_region, grid_source),), start_time, end_time)
+        return units, times, grids[0]
+
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+    def decodeTimespansForTargets(self, fcast_date, variable, timespans,
+                                        targets, start_time=None,
+                                        end_time=None):
+        """
+        Same as decodeTimespans except that each message is decoded once
+        and gathered into the grids for every (grid_region, grid_source)
+        pair in targets.
+
+        Returns the units, a list of forecast times and a list containing
+        a 3D array of grids for each target, in the same order as targets.
+        """
         if isinstance(timespans, basestring):
             timespans = (timespans,)
         elif not isinstance(timespans, (tuple, list)):
             errmsg = '"%s" is an invalid type for timespans argument.'
             errmsg += '\nArgument type must be one of string, list, tuple.'
-            raise TypeError, errmsg % type(timespan)
+            raise TypeError, errmsg % type(timespans)
 
         for timespan in timespans:
             if timespan not in VALID_TIMESPANS:
                 raise ValueError, BAD_TIMESPAN % timespan
 
-        # parameters for reshaping the grib arrays
-        grid_shape_2D, grib_indexes, grid_mask = \
-            self.gribToGridParameters(grid_source, grid_region)
+        # parameters for reshaping the grib arrays for each target
+        gather_params = [ ]
+        for grid_region, grid_source in targets:
+            grid_shape_2D, gather_indexes, grid_mask = \
+                self.gribToGridGatherParameters(grid_source, grid_region)
+            gather_params.append((gather_indexes, grid_shape_2D, grid_mask))
 
-        # code for filling gaps between records
-        if fill_gaps:
-            prev_record = None
+        all_times = [ ]
+        all_grids = [ [ ] for target in targets ]
+        units = None
+        for timespan in timespans:
+            inventory = self.ndfdGribInventory(fcast_date, variable, timespan)
+            entries = inventory.entriesInWindow(start_time, end_time)
+            if len(entries) == 0: continue
+            # seek directly to the messages in the time window
+            messages = inventory.readMessages(entries)
+            missing = entries[0]['missing_value']
+            units = messages[0].units
+
+            # decode every message in the window exactly once
+            blocks = decodeGribMessagesToTargets(messages, missing,
+                                                 gather_params)
+            for index, block in enumerate(blocks):
+                all_grids[index].append(block)
+            all_times.extend([asUTCTime(entry['valid_time'])
+                              for entry in entries])
+            del messages, blocks
+
+        if len(all_times) == 0:
+            errmsg = 'No %s forecast messages found for %s in timespans %s.'
+            raise LookupError, errmsg % (variable, str(fcast_date),
+                                         ','.join(timespans))
+        grids = [ ]
+        for target_grids in all_grids:
+            if len(target_grids) == 1: grids.append(target_grids[0])
+            else: grids.append(N.concatenate(target_grids, axis=0))
+        return units, all_times, grids
+
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+    def forecastBlockForRegion(self, fcast_date, variable, timespans,
+                                     grid_region, grid_source, fill_gaps=True,
+                                     debug=False):
+        """
+        Returns a dense hourly block containing all forecast times in the
+        grib files for each timespan in the list.
+
+        Returns
+        --------------------------------------------------------------------
+        tuple : (units, first valid time, 3D block [hours, ny, nx],
+                 1D int8 array of provenance codes)
 
+        Use atmosci.ndfd.gapfill.sourceTags to convert provenance codes to
+        source names. When fill_gaps is False, hours between forecast
+        times are left as N.nan.
+        """
+        units, times, grids = \
+            self.decodeTimespans(fcast_date, variable, timespans,
+                                 grid_region, grid_source)
+        if fill_gaps:
+            if isinstance(timespans, basestring): timespan = timespans
+            else: timespan = timespans[-1]
             fill_method = \
                 self.variableConfig(variable, timespan).fill_gaps_with
+        else: fill_method = None
 
-            for timespan in timespans:
-                self.openGribfile(fcast_date, variable, timespan)
-                # retrieve pointers to all messages in the file
-                messages = self.gribs.select()
-                first_msg = messages[0]
-                missing = float(first_msg.missingValue)
-                units = first_msg.units
-
-                # fill the gap between this timespan and the previous one
-                if not prev_record is None:
-                    grid = reshapeGrid(first_msg, missing, grib_indexes,
-                                       grid_shape_2D, grid_mask)
-                    next_record = ('ndfd',asUTCTime(first_msg.validDate),grid)
-                    data_records.extend(self.fillTimeGap(prev_record,
-                                             next_record, fill_method))
-
-                # update with records for the current timespan
-                data = self.dataWithoutGaps(messages, fill_method, missing,
-                            grib_indexes, grid_shape_2D, grid_mask, debug)
-                data_records.extend(data)
-
-                # track last record in previous timespan
-                msg = messages[-1]
-                grid = reshapeGrid(msg, missing, grib_indexes,
-                                        grid_shape_2D, grid_mask)
-                prev_record = ('ndfd', asUTCTime(msg.validDate), grid)
-
-                self.closeGribfile()
-        
-        # code that preserves gaps between records
-        else:
-
-            for timespan in timespans:
-                self.openGribfile(fcast_date, variable, timespan)
-                # retrieve pointers to all messages in the file
-                messages = self.gribs.select()
-                first_msg = messages[0]
-                missing = float(first_msg.missingValue)
-                units = first_msg.units
-
-                for msg in messages:
-                    grid = reshapeGrid(msg, missing, grib_indexes,
-                                       grid_shape_2D, grid_mask)
-                    this_time =  asUTCTime(msg.validDate)
-                    data_records.append(('ndfd', this_time, grid))
-                    if debug:
-                        stats = (N.nanmin(grid), N.nanmax(grid))
-                        print 'value stats :', msg.validDate, stats
-                self.closeGribfile()
+        first_time, block, codes = fillTimeGaps(times, grids, fill_method)
+        if debug:
+            print 'forecast block :', first_time, block.shape
+            print '   value range :', N.nanmin(block), N.nanmax(block)
 
-        return units, data_records
+        return units, first_time, block, codes
 
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 
-    def dataWithoutGaps(self, messages, fill_method, missing, grib_indexes,
-                              grid_shape_2D, grid_mask, debug=False):
-        data_records = [ ]
+    def forecastBlocksForTargets(self, fcast_date, variable, timespans,
+                                       targets, fill_gaps=True, debug=False):
+        """
+        Same as forecastBlockForRegion except that each grib message is
+        decoded once for all (grid_region, grid_source) pairs in targets.
 
-        first_msg = messages[0]
-        prev_grid = reshapeGrid(first_msg, missing, grib_indexes,
-                                grid_shape_2D, grid_mask)
-        prev_time = asUTCTime(first_msg.validDate)
-        prev_record = ('ndfd', prev_time, prev_grid)
-        if debug:
-            stats = (N.nanmin(prev_grid), N.nanmax(prev_grid))
-            print 'value range :', prev_time, stats
-
-        open_gap = False
-        for msg in messages[1:]:
-            grid = reshapeGrid(msg, missing, grib_indexes, grid_shape_2D,
-                               grid_mask)
-            this_time =  asUTCTime(msg.validDate)
-            this_record = ('ndfd', this_time, grid)
-            if debug:
-                stats = (N.nanmin(grid), N.nanmax(grid))
-                print 'value stats :', msg.validDate, stats
-
-            gap = hoursInTimespan(prev_time, this_time, inclusive=False)
-            if gap > 1:
-                records = \
-                    self.fillTimeGap(prev_record, this_record, fill_method)
-                # check whether previous record was replaced
-                # if the list comprehension is empty, it needs to be added
-                if not [rec for rec in records if rec[1] == prev_record[1]]:
-                    data_records.append(prev_record)
-                # add the gap records
-                data_records.extend(records)
-                # there is an open gap
-                open_gap = True
-            else: # no gap, add previous record
-                data_records.append(prev_record)
-                open_gap = False
-
-            prev_record = this_record
-            prev_time = this_time
-
-        if not open_gap: # at this point prev_record == last this_record
-            data_records.append(prev_record)
+        Returns the units and a list containing a (first valid time, 3D
+        block, provenance codes) tuple for each target, in the same order
+        as targets.
+        """
+        units, times, grids = \
+            self.decodeTimespansForTargets(fcast_date, variable, timespans,
+                                           targets)
+        if fill_gaps:
+            if isinstance(timespans, basestring): timespan = timespans
+            else: timespan = timespans[-1]
+            fill_method = \
+                self.variableConfig(variable, timespan).fill_gaps_with
+        else: fill_method = None
 
-        if debug:
-            msg = messages[-1]
-            grid = reshapeGrid(msg, missing, grib_indexes, grid_shape_2D,
-                               grid_mask)
-            print '\nlast msg :', msg.validDate, N.nanmin(grid), N.nanmax(grid)
+        blocks = [ ]
+        for index, target_grids in enumerate(grids):
+            first_time, block, codes = \
+                fillTimeGaps(times, target_grids, fill_method)
+            if debug:
+                print 'forecast block :', targets[index], first_time, \
+                      block.shape
+            blocks.append((first_time, block, codes))
+            grids[index] = None
 
-        return data_records
+        return units, blocks
 
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 
@@ -279,15 +458,112 @@ class SmartNdfdGribFileReader(NdfdGribFileFactory):
 
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 
+    def gribToGridGatherParameters(self, grid_source, grid_region):
+        """
+        Returns a (grid shape, flat gather indexes, grid mask) tuple for
+        the grid source/region combination. Results are cached in process
+        and on disk as memory-mappable .npy files in the static file
+        directory's "cache" subdirectory. Both caches are invalidated
+        whenever the static file's modification time changes.
+        """
+        static_filepath = self.staticGridFilepath(grid_source, grid_region)
+        static_mtime = os.path.getmtime(static_filepath)
+        cache_key = (static_filepath, self.grib_region)
+
+        cached = GATHER_PARAMETER_CACHE.get(cache_key, None)
+        if cached is not None and cached[0] == static_mtime:
+            return cached[1:]
+
+        cache_dirpath = os.path.join(self.staticWorkingDir(), 'cache')
+        cache_filepath = os.path.join(cache_dirpath, '%s.%s-grib' %
+                 (os.path.splitext(os.path.basename(static_filepath))[0],
+                  self.grib_region))
+        params = self._loadGatherParameters(cache_filepath, static_mtime)
+        if params is None:
+            grid_shape_2D, grib_indexes, grid_mask = \
+                self.gribToGridParameters(grid_source, grid_region)
+            dimensions = self.ndfd.grib.dimensions[self.grib_region]
+            grib_shape = (dimensions['lat'], dimensions['lon'])
+            gather_indexes = gatherIndexes(grib_indexes, grib_shape)
+            grid_mask = N.asarray(grid_mask, dtype=bool)
+            params = (tuple(grid_shape_2D), gather_indexes, grid_mask)
+            self._saveGatherParameters(cache_filepath, static_mtime, params)
+
+        GATHER_PARAMETER_CACHE[cache_key] = (static_mtime,) + params
+        return params
+
+    def _loadGatherParameters(self, cache_filepath, static_mtime):
+        meta_filepath = '%s.meta' % cache_filepath
+        if not os.path.exists(meta_filepath): return None
+        meta_file = open(meta_filepath, 'r')
+        meta = meta_file.read().split()
+        meta_file.close()
+        if len(meta) != 3 or float(meta[0]) != static_mtime: return None
+        grid_shape_2D = (int(meta[1]), int(meta[2]))
+        try:
+            gather_indexes = N.load('%s.indexes.npy' % cache_filepath,
+                                    mmap_mode='r')
+            grid_mask = N.load('%s.mask.npy' % cache_filepath, mmap_mode='r')
+        except IOError:
+            return None
+        return grid_shape_2D, gather_indexes, grid_mask
+
+    def _saveGatherParameters(self, cache_filepath, static_mtime, params):
+        grid_shape_2D, gather_indexes, grid_mask = params
+        cache_dirpath = os.path.dirname(cache_filepath)
+        if not os.path.exists(cache_dirpath): os.makedirs(cache_dirpath)
+        # write to temporary files first so that a reader running in another
+        # process never sees a partially written cache
+        for suffix, array in (('indexes',gather_indexes), ('mask',grid_mask)):
+            tmp_filepath = '%s.%s.tmp.npy' % (cache_filepath, suffix)
+            N.save(tmp_filepath, array)
+            os.rename(tmp_filepath, '%s.%s.npy' % (cache_filepath, suffix))
+        meta_filepath = '%s.meta' % cache_filepath
+        meta_file = open('%s.tmp' % meta_filepath, 'w')
+        meta_file.write('%r %d %d\n' % ((static_mtime,) + grid_shape_2D))
+        meta_file.close()
+        os.rename('%s.tmp' % meta_filepath, meta_filepath)
+
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+    def gribRegridWeights(self, grid_source, grid_region, method='bilinear'):
+        """
+        Returns the RegridWeights table for the grid source/region saved
+        in the static file. Tables are cached in process until the static
+        file's modification time changes.
+        """
+        static_filepath = self.staticGridFilepath(grid_source, grid_region)
+        static_mtime = os.path.getmtime(static_filepath)
+        cache_key = (static_filepath, method)
+
+        cached = REGRID_WEIGHT_CACHE.get(cache_key, None)
+        if cached is not None and cached[0] == static_mtime:
+            return cached[1]
+
+        reader = self.staticFileReader(grid_source, grid_region)
+        regrid_weights = reader.gribRegridWeights(method, 'ndfd')
+        reader.close()
+        del reader
+
+        REGRID_WEIGHT_CACHE[cache_key] = (static_mtime, regrid_weights)
+        return regrid_weights
+
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
     def gridForRegion(self, fcast_date, variable, timespan, grid_region,
                             grid_source, fill_gaps=False, graceful_fail=False,
-                            debug=False):
+                            debug=False, regrid_method=None):
         """
         Returns a 3D NumPy grid containing data at all nodes in the grid
         region for all messages in file.
         
         Shape of returned grid is [num_hours, num_lons, num_lats]
 
+        By default each grid node gets the value at the equivalent grib
+        node. When regrid_method is "nearest", "bilinear" or "idw", the
+        weight table for that method saved in the static file is used
+        instead.
+
         Assumes file contains a range of time periods for a single variable.
         """
         self.openGribfile(fcast_date, variable, timespan)
@@ -321,18 +597,27 @@ class SmartNdfdGribFileReader(NdfdGribFileFactory):
             print '\n'
 
         # parameters for reshaping the grib arrays
-        grid_shape_2D, grib_indexes, grid_mask = \
-            self.gribToGridParameters(grid_source, grid_region)
+        grid_shape_2D, gather_indexes, grid_mask = \
+            self.gribToGridGatherParameters(grid_source, grid_region)
+
+        # decode every message in the file exactly once
+        if regrid_method is None:
+            decoded = decodeGribMessages(messages, missing, gather_indexes,
+                                         grid_shape_2D, grid_mask)
+        else:
+            regrid_weights = self.gribRegridWeights(grid_source, grid_region,
+                                                    regrid_method)
+            decoded = regridGribMessages(messages, missing, regrid_weights,
+                                         grid_mask)
 
-        grid = N.empty((num_hours,)+grid_shape_2D, dtype=float)
+        grid = N.empty((num_hours,)+tuple(grid_shape_2D), dtype=N.float32)
         grid.fill(N.nan)
 
         times = [ ]
         prev_time = first_hour
         prev_index = None
-        for msg in messages:
-            values = reshapeGrid(msg, missing_value, grib_indexes,
-                                 grid_shape_2D, grid_mask)
+        for msg_index, msg in enumerate(messages):
+            values = decoded[msg_index]
             next_time = msg.validDate
             next_index = hoursInTimespan(next_time, first_hour, inclusive=False)
             grid[next_index,:,:] = values
@@ -350,7 +635,7 @@ class SmartNdfdGribFileReader(NdfdGribFileFactory):
             prev_record = next_record
             prev_index = next_index
 
-        gribs.close()
+        self.closeGribfile()
 
         return asUTCTime(first_hour), units, grid
 
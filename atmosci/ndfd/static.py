@@ -17,6 +17,61 @@ from atmosci.seasonal.registry import REGBASE
 #from atmosci.seasonal.static import StaticGridFileMethods
 #from atmosci.seasonal.methods.grid import GridFileManagerMethods
 from atmosci.seasonal.methods.builder import GridFileBuildMethods
+from atmosci.utils.nodeindex import GridNodeIndex
+
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+# number of target grid rows mapped at once by mapNdfdNodes
+NODE_MAPPING_BLOCK_ROWS = 64
+
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+def mapNdfdNodes(lons, lats, ndfd_lons, ndfd_lats, **kwargs):
+    """ Finds the NDFD grid node nearest to every node in a target grid.
+
+    Builds a spatial index of the NDFD nodes once, then queries it for
+    blocks of target grid rows so that memory use is bounded for any size
+    region.
+
+    Arguments
+    --------------------------------------------------------------------
+    lons, lats           : 2D coordinate grids of the target (ACIS) grid
+    ndfd_lons, ndfd_lats : 2D coordinate grids of NDFD nodes, with lons
+                           in the same -180 to 180 range as lons
+    block_rows           : number of target rows per block (optional)
+    node_index           : GridNodeIndex of the NDFD nodes (optional)
+
+    Returns
+    --------------------------------------------------------------------
+    dict : arrays with the shape of the target grid, keyed by the names
+           of the NDFD group datasets ('lat', 'lon', 'ndfd_dist',
+           'ndfd_xidx', 'ndfd_yidx'). Indexes are into the NDFD grids.
+    """
+    block_rows = kwargs.get('block_rows', NODE_MAPPING_BLOCK_ROWS)
+    node_index = kwargs.get('node_index', None)
+    if node_index is None: node_index = GridNodeIndex(ndfd_lons, ndfd_lats)
+
+    shape = lats.shape
+    mapped = { 'lat' : N.full(shape, N.nan), 'lon' : N.full(shape, N.nan),
+               'ndfd_dist' : N.zeros(shape, dtype=float),
+               'ndfd_xidx' : N.zeros(shape, dtype='<i2'),
+               'ndfd_yidx' : N.zeros(shape, dtype='<i2') }
+
+    for start in range(0, shape[0], block_rows):
+        end = min(start + block_rows, shape[0])
+        distance, y, x = node_index.nearest(lons[start:end], lats[start:end])
+        if (y < 0).any():
+            bad = N.where(y < 0)
+            errmsg = 'Unable to match location %.5f, %.5f to any NDFD node'
+            raise IndexError, errmsg % (lats[start:end][bad][0],
+                                        lons[start:end][bad][0])
+        mapped['ndfd_dist'][start:end] = distance
+        mapped['ndfd_xidx'][start:end] = x
+        mapped['ndfd_yidx'][start:end] = y
+        mapped['lat'][start:end] = ndfd_lats[y,x]
+        mapped['lon'][start:end] = ndfd_lons[y,x]
+
+    return mapped
 
 # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
 
@@ -143,21 +198,38 @@ class NdfdStaticGridFileBuilder(GridFileBuildMethods,
         # subset lat/lon grids
         reader = self.conusReader()
 
-        ndfd_lat = reader.getData('ndfd.lat')
-        lats = self._slice2DDataset(ndfd_lat, min_y, max_y, min_x, max_x)
+        # when NDFD coordinate grids are passed, map the region's nodes to
+        # them instead of copying the mapping from the CONUS file
+        ndfd_lons = kwargs.get('ndfd_lons', None)
+        if ndfd_lons is not None:
+            lats = reader._slice2DDataset(reader.lats, min_y, max_y, min_x, max_x)
+            lons = reader._slice2DDataset(reader.lons, min_y, max_y, min_x, max_x)
+            mapped = mapNdfdNodes(lons, lats, ndfd_lons, kwargs['ndfd_lats'],
+                                  **kwargs)
+            del lats, lons
+        else: mapped = None
+
+        if mapped is not None: lats = mapped['lat']
+        else:
+            ndfd_lat = reader.getData('ndfd.lat')
+            lats = self._slice2DDataset(ndfd_lat, min_y, max_y, min_x, max_x)
+            del ndfd_lat
         kwargs['shape'] = shape
         self.open(mode='a')
         self.initStaticDataset('lat', lats, True, group_name, **kwargs)
         self.close()
-        del ndfd_lat, lats
+        del lats
 
         self.open(mode='a')
-        ndfd_lon = reader.getData('ndfd.lon')
-        lons = self._slice2DDataset(ndfd_lon, min_y, max_y, min_x, max_x)
+        if mapped is not None: lons = mapped['lon']
+        else:
+            ndfd_lon = reader.getData('ndfd.lon')
+            lons = self._slice2DDataset(ndfd_lon, min_y, max_y, min_x, max_x)
+            del ndfd_lon
         kwargs['shape'] = shape
         self.initStaticDataset('lon', lons, True, group_name, **kwargs)
         self.close()
-        del ndfd_lon, lons
+        del lons
 
         datasets.remove('lon')
         datasets.remove('lat')
@@ -170,8 +242,10 @@ class NdfdStaticGridFileBuilder(GridFileBuildMethods,
         for dataset_key in datasets:
             dataset = self.config.datasets[dataset_key]
             dsname = dataset.get('path', dataset_key)
-            data = reader.getData(template % dsname)
-            data = self._slice2DDataset(data, min_y, max_y, min_x, max_x)
+            if mapped is not None: data = mapped[dataset_key]
+            else:
+                data = reader.getData(template % dsname)
+                data = self._slice2DDataset(data, min_y, max_y, min_x, max_x)
             kwargs['shape'] = shape
             self.open(mode='a')
             self.initStaticDataset(dataset_key, data, True, group_name, **kwargs)
@@ -0,0 +1,151 @@
+""" Regression tests for retries, conditional GETs and resumed transfers
+in atmosci.ndfd.download
+
+    python -m pytest atmosci/ndfd/test_download.py
+"""
+
+import os
+import threading
+import urllib2
+
+from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+
+from atmosci.ndfd.download import DOWNLOADED, NOT_MODIFIED, \
+                                  PARTIAL_FILE_EXTENSION, downloadFile
+
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+CONTENT = 'GRIB' + ('x' * 1000) + '7777'
+ETAG = '"ds.maxt.1"'
+LAST_MODIFIED = 'Tue, 04 Apr 2017 12:00:00 GMT'
+
+class GribHandler(BaseHTTPRequestHandler):
+    """ Answers each GET with the next status code in "status_codes",
+    200 once the list is used up. 'truncate' sends the headers for the
+    whole file but only half of the content. Conditional and Range
+    requests that match ETAG are answered with 304 and 206.
+    """
+    status_codes = [ ]
+    requests = [ ]
+
+    def do_GET(self):
+        self.requests.append(dict(self.headers.items()))
+        if self.status_codes: code = self.status_codes.pop(0)
+        else: code = 200
+        if code not in (200, 'truncate'):
+            self.send_error(code)
+            return
+        if self.headers.getheader('If-None-Match', None) == ETAG:
+            self.send_response(304)
+            self.end_headers()
+            return
+
+        content = CONTENT
+        byte_range = self.headers.getheader('Range', None)
+        if byte_range is not None \
+        and self.headers.getheader('If-Range', None) == ETAG:
+            start = int(byte_range.split('=')[1].rstrip('-'))
+            content = CONTENT[start:]
+            self.send_response(206)
+            self.send_header('Content-Range', 'bytes %d-%d/%d' %
+                             (start, len(CONTENT)-1, len(CONTENT)))
+        else: self.send_response(200)
+        self.send_header('Content-Length', str(len(content)))
+        self.send_header('ETag', ETAG)
+        self.send_header('Last-Modified', LAST_MODIFIED)
+        self.end_headers()
+        if code == 'truncate': content = content[:len(content)/2]
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        pass
+
+def serve(status_codes):
+    GribHandler.status_codes[:] = status_codes
+    del GribHandler.requests[:]
+    server = HTTPServer(('localhost', 0), GribHandler)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    return server, 'http://localhost:%d/ds.maxt.bin' % server.server_address[1]
+
+def stop(server):
+    server.shutdown()
+    server.server_close()
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+def test_server_errors_are_retried(tmpdir):
+    server, url = serve([503, 500])
+    filepath = str(tmpdir.join('ds.maxt.bin'))
+    try:
+        status = downloadFile(url, filepath, attempts=3, wait_seconds=0.)
+    finally:
+        stop(server)
+    assert status == DOWNLOADED
+    assert len(GribHandler.requests) == 3
+    assert open(filepath, 'rb').read() == CONTENT
+
+def test_client_errors_fail_fast(tmpdir):
+    server, url = serve([404])
+    filepath = str(tmpdir.join('ds.maxt.bin'))
+    try:
+        try:
+            downloadFile(url, filepath, attempts=5, wait_seconds=0.)
+        except urllib2.HTTPError as e:
+            assert e.code == 404
+        else: assert False, 'HTTPError was not raised'
+    finally:
+        stop(server)
+    assert len(GribHandler.requests) == 1
+    assert not tmpdir.join('ds.maxt.bin').check()
+
+def test_connection_errors_are_retried(tmpdir, monkeypatch):
+    server, url = serve([])
+    stop(server)
+    attempts = [ ]
+    urlopen = urllib2.urlopen
+    def countingUrlopen(request, *args, **kwargs):
+        attempts.append(request.get_full_url())
+        return urlopen(request, *args, **kwargs)
+    monkeypatch.setattr(urllib2, 'urlopen', countingUrlopen)
+    filepath = str(tmpdir.join('ds.maxt.bin'))
+    try:
+        downloadFile(url, filepath, attempts=3, wait_seconds=0., timeout=5.)
+    except urllib2.URLError as e:
+        assert not isinstance(e, urllib2.HTTPError)
+    else: assert False, 'URLError was not raised'
+    assert attempts == [url, url, url]
+
+def test_unchanged_file_is_not_rewritten(tmpdir):
+    server, url = serve([])
+    filepath = str(tmpdir.join('ds.maxt.bin'))
+    try:
+        assert downloadFile(url, filepath, wait_seconds=0.) == DOWNLOADED
+        os.utime(filepath, (1000000000, 1000000000))
+        assert downloadFile(url, filepath, wait_seconds=0.) == NOT_MODIFIED
+    finally:
+        stop(server)
+    first, second = GribHandler.requests
+    assert 'if-none-match' not in first
+    assert second['if-none-match'] == ETAG
+    assert second['if-modified-since'] == LAST_MODIFIED
+    assert os.path.getmtime(filepath) == 1000000000
+    assert open(filepath, 'rb').read() == CONTENT
+
+def test_interrupted_transfer_is_resumed(tmpdir):
+    server, url = serve(['truncate'])
+    filepath = str(tmpdir.join('ds.maxt.bin'))
+    try:
+        status = downloadFile(url, filepath, attempts=2, wait_seconds=0.,
+                              conditional=False)
+    finally:
+        stop(server)
+    assert status == DOWNLOADED
+    first, second = GribHandler.requests
+    assert 'range' not in first
+    # second request asks only for the bytes that were not received
+    assert second['range'] == 'bytes=%d-' % (len(CONTENT) / 2)
+    assert second['if-range'] == ETAG
+    assert open(filepath, 'rb').read() == CONTENT
+    assert not os.path.exists(filepath + PARTIAL_FILE_EXTENSION)
@@ -0,0 +1,57 @@
+""" Regression tests for atmosci.ndfd.inventory
+
+    python -m pytest atmosci/ndfd/test_inventory.py
+"""
+
+import struct
+
+import atmosci.ndfd.inventory as inventory
+from atmosci.ndfd.inventory import buildInventory, scanMessageOffsets
+
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+def grib2Message(num_bytes):
+    header = 'GRIB' + '\x00\x00\x00\x02' + struct.pack('>Q', num_bytes)
+    return header + ('x' * (num_bytes - 20)) + '7777'
+
+def grib1Message(num_bytes):
+    header = 'GRIB' + struct.pack('>I', num_bytes)[1:] + '\x01'
+    return header + ('y' * (num_bytes - 12)) + '7777'
+
+def writeGribFile(tmpdir, *messages):
+    filepath = str(tmpdir.join('ds.maxt.bin'))
+    grib_file = open(filepath, 'wb')
+    grib_file.write(''.join(messages))
+    grib_file.close()
+    return filepath
+
+class FakeGribFile(object):
+    """ Stands in for pygrib.open, it only reports the message count """
+    def __init__(self, num_messages):
+        self.messages = num_messages
+    def __iter__(self):
+        raise AssertionError('messages were read before counts were checked')
+    def close(self):
+        pass
+
+class FakePygrib(object):
+    def __init__(self, num_messages):
+        self.num_messages = num_messages
+    def open(self, grib_filepath):
+        return FakeGribFile(self.num_messages)
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+def test_scan_finds_messages_between_padding(tmpdir):
+    filepath = writeGribFile(tmpdir, grib2Message(100), '\x00' * 10,
+                             grib1Message(60), grib2Message(40))
+    assert scanMessageOffsets(filepath) == [(0,100), (110,60), (170,40)]
+
+def test_message_count_mismatch_raises_value_error(tmpdir, monkeypatch):
+    filepath = writeGribFile(tmpdir, grib2Message(100), grib2Message(100))
+    monkeypatch.setattr(inventory, 'pygrib', FakePygrib(3))
+    try:
+        buildInventory(filepath)
+    except ValueError as e:
+        assert 'Found 3 messages but 2 GRIB markers' in str(e)
+    else: assert False, 'ValueError was not raised'
@@ -0,0 +1,129 @@
+""" Regression tests for the grib decoding functions in
+atmosci.ndfd.smart_grib
+
+    python -m pytest atmosci/ndfd/test_smart_grib.py
+"""
+
+import numpy as N
+import h5py
+
+from atmosci.hdf5.file import Hdf5FileManager
+from atmosci.seasonal.static import StaticGridFileMethods, \
+                                    StaticGridFileUpdateMethods
+from atmosci.utils.regrid import regridWeights
+
+from atmosci.ndfd.smart_grib import decodeGribMessages, \
+                                    decodeGribMessagesToTargets, \
+                                    regridGribMessages
+
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+MISSING = 9999.
+
+class FakeGribMessage(object):
+    """ Stands in for a pygrib message, only values are used by decoding.
+    """
+    def __init__(self, values):
+        self.values = values
+
+class StaticFile(StaticGridFileMethods, StaticGridFileUpdateMethods,
+                 Hdf5FileManager):
+    pass
+
+def gribGrid():
+    return N.meshgrid(N.linspace(-80., -70., 50), N.linspace(38., 45., 40))
+
+def linearField(lons, lats, hour=0):
+    return 12.5 + hour + (0.75 * lons) - (1.25 * lats)
+
+def messages(lons, lats, num_hours=3):
+    return [FakeGribMessage(linearField(lons, lats, hour))
+            for hour in range(num_hours)]
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+def test_regrid_through_saved_table(tmpdir):
+    grib_lons, grib_lats = gribGrid()
+    lons, lats = N.meshgrid(N.linspace(-76.3, -74.1, 7),
+                            N.linspace(40.1, 41.5, 5))
+    # tables are built on a grib region, the same way that
+    # build_ndfd_regrid_weights.py does it
+    min_y, max_y, min_x, max_x = 10, 29, 15, 39
+    region = (slice(min_y,max_y+1), slice(min_x,max_x+1))
+    weights = regridWeights('bilinear', lons, lats, grib_lons[region],
+                            grib_lats[region])
+    weights = weights.offsetSource((min_y,min_x), grib_lons.shape)
+
+    filepath = str(tmpdir.join('static.h5'))
+    h5_file = h5py.File(filepath, 'w')
+    h5_file.create_group('ndfd')
+    h5_file.close()
+    static_file = StaticFile(filepath, 'a')
+    static_file.saveGribRegridWeights(weights, 'ndfd')
+    static_file.close()
+    static_file = StaticFile(filepath, 'r')
+    saved = static_file.gribRegridWeights('bilinear', 'ndfd')
+    static_file.close()
+
+    grid_mask = N.zeros(lons.shape, dtype=bool)
+    grid_mask[0,0] = True
+    regridded = regridGribMessages(messages(grib_lons, grib_lats), MISSING,
+                                   saved, grid_mask, decimals=4)
+    assert regridded.shape == (3,) + lons.shape
+    for hour in range(3):
+        expected = linearField(lons, lats, hour)
+        expected[0,0] = N.nan
+        assert N.allclose(regridded[hour], expected, atol=1e-3,
+                          equal_nan=True)
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+def decodeTargets():
+    grib_lons, grib_lats = gribGrid()
+    grib_msgs = messages(grib_lons, grib_lats)
+    grib_msgs[1].values[5,5] = MISSING
+    grib_msgs[2].values = N.ma.masked_greater(grib_msgs[2].values, 100.)
+    first = N.arange(0, 210, 7)
+    second = N.arange(3, 135, 11)
+    second[0] = N.ravel_multi_index((5,5), grib_lons.shape)
+    mask = N.zeros((3,4), dtype=bool)
+    mask[1,2] = True
+    return grib_msgs, ((first, (5,6), None), (second, (3,4), mask))
+
+def expectedBlock(grib_msgs, gather_indexes, grid_shape, grid_mask):
+    block = N.array([N.ma.getdata(msg.values).ravel().take(gather_indexes)
+                     for msg in grib_msgs])
+    block[block >= MISSING] = N.nan
+    block = block.reshape((len(grib_msgs),) + grid_shape)
+    if grid_mask is not None: block[:,grid_mask] = N.nan
+    return block
+
+def test_decode_to_targets():
+    grib_msgs, targets = decodeTargets()
+    blocks = decodeGribMessagesToTargets(grib_msgs, MISSING, targets, None,
+                                         float)
+    assert len(blocks) == len(targets)
+    for block, target in zip(blocks, targets):
+        N.testing.assert_array_equal(block, expectedBlock(grib_msgs, *target))
+    assert N.isnan(blocks[1][1,0,0])
+    assert not N.isnan(blocks[1][0,0,0])
+    assert not N.isnan(blocks[0]).any()
+
+def test_decode_to_targets_rounds():
+    grib_msgs, targets = decodeTargets()
+    blocks = decodeGribMessagesToTargets(grib_msgs, MISSING, targets, 1)
+    for block, target in zip(blocks, targets):
+        assert block.dtype == N.float32
+        expected = N.around(expectedBlock(grib_msgs, *target), 1)
+        N.testing.assert_allclose(block, expected, atol=1e-4)
+
+def test_single_target_decode_matches():
+    grib_msgs, targets = decodeTargets()
+    blocks = decodeGribMessagesToTargets(grib_msgs, MISSING, targets)
+    for block, target in zip(blocks, targets):
+        gather_indexes, grid_shape, grid_mask = target
+        out = N.empty((len(grib_msgs),) + grid_shape, dtype=N.float32)
+        single = decodeGribMessages(grib_msgs, MISSING, gather_indexes,
+                                    grid_shape, grid_mask, out=out)
+        assert single is out
+        N.testing.assert_array_equal(single, block)
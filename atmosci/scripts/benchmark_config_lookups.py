@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+
+""" Compare the per lookup cost of ConfigObject attribute and item access
+before and after the config tree is compiled.
+
+    benchmark_config_lookups.py -n 100000
+"""
+
+import cPickle
+import time
+
+from atmosci.ndfd.config import CONFIG
+
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+from optparse import OptionParser
+parser = OptionParser()
+
+parser.add_option('-n', action='store', type='int', dest='repeat',
+                        default=100000)
+
+options, args = parser.parse_args()
+
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+# lookups made repeatedly by factories, grib readers and file builders
+def variableConfig(config):
+    return config.sources.ndfd.variables['001-003']['temp']
+
+def dottedPath(config):
+    return config['sources.ndfd.variables.001-003.temp.units']
+
+def regionConfig(config):
+    return config.regions['NE']
+
+def datasetConfig(config):
+    return config.datasets.TEMP
+
+def gridDimensions(config):
+    return config['sources.ndfd.grid.dimensions.NE.lat']
+
+LOOKUPS = (variableConfig, dottedPath, regionConfig, datasetConfig,
+           gridDimensions)
+
+def timeit(function, config):
+    start = time.time()
+    for n in xrange(options.repeat): function(config)
+    return ((time.time() - start) / options.repeat) * 1000000.
+
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+# CONFIG is compiled and so are its copies, pickling drops compiled paths
+uncompiled = cPickle.loads(cPickle.dumps(CONFIG, cPickle.HIGHEST_PROTOCOL))
+compiled = CONFIG.copy().compile()
+
+print 'average of %d lookups' % options.repeat
+header = '%-16s %14s %14s %8s'
+print header % ('lookup', 'walk usec', 'compiled usec', 'speedup')
+for lookup in LOOKUPS:
+    if lookup(compiled) is not lookup(compiled) or \
+       lookup(compiled) != lookup(uncompiled):
+        print 'WARNING : %s results do not match' % lookup.__name__
+    walk = timeit(lookup, uncompiled)
+    fast = timeit(lookup, compiled)
+    print '%-16s %14.3f %14.3f %7.1fx' % (lookup.__name__, walk, fast,
+                                          walk / fast)
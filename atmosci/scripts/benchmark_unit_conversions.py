@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+
+""" Compare the time it takes to convert CONUS size grids using the
+formula lookup + eval path against compiled unit conversions.
+
+    benchmark_unit_conversions.py -n 20 K,F m/s,mph "kg/m^2*10,in"
+"""
+
+import time
+
+import numpy as N
+
+from atmosci.units import conversionOperator, sanitizeUnits, unitConversion
+
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+from optparse import OptionParser
+parser = OptionParser()
+
+parser.add_option('-n', action='store', type='int', dest='repeat', default=10)
+parser.add_option('-t', action='store', dest='dtype', default='float32')
+parser.add_option('-x', action='store', type='int', dest='num_cols',
+                  default=2145, help='default is NDFD CONUS grid')
+parser.add_option('-y', action='store', type='int', dest='num_rows',
+                  default=1377, help='default is NDFD CONUS grid')
+
+options, args = parser.parse_args()
+
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+def formulaLookup(data, data_units, out_units):
+    # the per call lookup and eval that every conversion used to go through,
+    # copies data instead of modifying it in place
+    from_units, from_scale = sanitizeUnits(data_units)
+    to_units, to_scale = sanitizeUnits(out_units)
+    if from_scale is not None: data = data / float(from_scale)
+    convert, arg = conversionOperator(from_units, to_units)
+    result = convert(data, arg)
+    if to_scale is not None: result = result * float(to_scale)
+    return result
+
+def timeit(function, *args, **kwargs):
+    start = time.time()
+    for n in range(options.repeat): result = function(*args, **kwargs)
+    return ((time.time() - start) / options.repeat) * 1000., result
+
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+if args: conversions = [tuple(arg.split(',')) for arg in args]
+else: conversions = [('K','F'), ('F','C'), ('m/s','mph'), ('kg/m^2','in')]
+
+shape = (options.num_rows, options.num_cols)
+data = N.random.uniform(250., 310., shape).astype(options.dtype)
+out = N.empty_like(data)
+print 'grid shape', shape, data.dtype, ': average of %d runs' % options.repeat
+
+header = '%-20s %12s %12s %12s %12s'
+print header % ('conversion', 'lookup ms', 'compiled ms', 'out= ms',
+                'max diff')
+for data_units, out_units in conversions:
+    lookup_ms, expected = timeit(formulaLookup, data, data_units, out_units)
+    convert = unitConversion(data_units, out_units)
+    compiled_ms, result = timeit(convert, data)
+    out_ms, result = timeit(convert, data, out=out)
+    diff = N.nanmax(N.abs(result - expected))
+    name = '%s > %s' % (data_units, out_units)
+    print '%-20s %12.2f %12.2f %12.2f %12.3g' % \
+          (name, lookup_ms, compiled_ms, out_ms, diff)
@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+
+""" Reports the time taken to import each module loaded by the modules
+named on the command line, including every module they import in turn.
+
+    profile_imports.py atmosci.ndfd.config atmosci.ndfd.smart_grib
+    profile_imports.py -n 30 -s self atmosci.ndfd.factory
+"""
+
+import sys, time
+import __builtin__
+
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+from optparse import OptionParser
+parser = OptionParser()
+
+parser.add_option('-m', action='store', type='float', dest='min_msec',
+                        default=1., help='ignore imports faster than this')
+parser.add_option('-n', action='store', type='int', dest='max_lines',
+                        default=40)
+parser.add_option('-s', action='store', dest='sort_by', default='total',
+                        help='sort by "total" or "self" time')
+
+options, args = parser.parse_args()
+
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+# module name : [total seconds, self seconds, depth, import order]
+TIMINGS = { }
+STACK = [ ]
+
+builtin_import = __builtin__.__import__
+
+def timedImport(name, *args, **kwargs):
+    # only the first import of a module does any real work
+    if name in sys.modules or name in TIMINGS:
+        return builtin_import(name, *args, **kwargs)
+    STACK.append(0.)
+    start = time.time()
+    try:
+        return builtin_import(name, *args, **kwargs)
+    finally:
+        elapsed = time.time() - start
+        nested = STACK.pop()
+        if STACK: STACK[-1] += elapsed
+        TIMINGS[name] = [elapsed, elapsed - nested, len(STACK), len(TIMINGS)]
+
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+__builtin__.__import__ = timedImport
+start_time = time.time()
+try:
+    for module_name in args:
+        __import__(module_name)
+finally:
+    __builtin__.__import__ = builtin_import
+elapsed_time = time.time() - start_time
+
+if options.sort_by == 'self': sort_index = 1
+else: sort_index = 0
+ordered = sorted(TIMINGS.items(), key=lambda item: item[1][sort_index],
+                 reverse=True)
+
+print '\nimported %d modules in %.1f msec' % (len(TIMINGS),
+                                             elapsed_time * 1000.)
+print '%10s %10s %5s  %s' % ('total msec', 'self msec', 'depth', 'module')
+for name, (total, self_time, depth, order) in ordered[:options.max_lines]:
+    if (total * 1000.) < options.min_msec: break
+    print '%10.1f %10.1f %5d  %s' % (total * 1000., self_time * 1000.,
+                                     depth, name)
@@ -4,10 +4,8 @@ from collections import OrderedDict
 import copy
 
 import numpy as N
-from scipy import stats as scipy_stats
 
 from atmosci.utils.config import ConfigObject, OrderedConfigObject
-from atmosci.utils.timeutils import asAcisQueryDate
 
 # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
 
@@ -17,14 +15,7 @@ from atmosci.acis.gridinfo import ACIS_GRID_DIMENSIONS, ACIS_NODE_SPACING, \
 
 # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
 
-# specialize the ConfigObject slightly
-class SeasonalConfig(ConfigObject):
-
-    def getFiletype(self, filetype_key):
-        if '.' in filetype_key:
-           filetype, other_key = filetype_key.split('.')
-           return self[filetype][other_key]
-        else: return self.filetypes[filetype_key]
+from atmosci.seasonal.configobject import SeasonalConfig
 
 # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
 
@@ -0,0 +1,17 @@
+""" Config object class used by the seasonal configs. It is kept apart
+from atmosci.seasonal.config so that loading a saved config snapshot does
+not have to build the seasonal config just to find this class.
+"""
+
+from atmosci.utils.config import ConfigObject
+
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+# specialize the ConfigObject slightly
+class SeasonalConfig(ConfigObject):
+
+    def getFiletype(self, filetype_key):
+        if '.' in filetype_key:
+           filetype, other_key = filetype_key.split('.')
+           return self[filetype][other_key]
+        else: return self.filetypes[filetype_key]
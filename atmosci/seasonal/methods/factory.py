@@ -207,7 +207,7 @@ class MinimalFactoryMethods:
 
     def _initFactoryConfig_(self, config_object, registry_object=None,
                                   project=None):
-        self.config = config_object.copy()
+        self.config = config_object.copy().compile()
 
         if project is None:
             self.setProjectConfig('project')
@@ -601,7 +601,17 @@ class TimeGridFileManagerMethods(TimeGridFileReaderMethods,
                      will be generated for each day.
         data       : 2D or 3D grid - data to be used to calculated
                      provenance statistics. If 3D, 1st dimension must be time.
+
+        3D data is processed by a vectorized block generator when one is
+        registered for the dataset. Pass vectorize=False to force use of
+        the per-day generator.
         """
+        if data.ndim == 3 and kwargs.get('vectorize', True):
+            block_generator = self.provenanceBlockGenerator(prov_path)
+            if block_generator is not None:
+                return self.insertProvenanceBlock(prov_path, start_date,
+                                          (data,), block_generator, **kwargs)
+
         records = self.generateProvenanceRecords(prov_path, start_date,
                                                  data, **kwargs)
         num_days = len(records)
@@ -646,6 +656,14 @@ class TimeGridFileManagerMethods(TimeGridFileReaderMethods,
         """
         if self.hasDataset(path): prov_path = path
         else: prov_path = '%s.provenance' % path
+
+        if data_1.ndim == 3 and kwargs.get('vectorize', True):
+            block_generator = self.provenanceBlockGenerator(prov_path)
+            if block_generator is not None:
+                num_days = self.insertProvenanceBlock(prov_path, start_date,
+                               (data_1, data_2), block_generator, **kwargs)
+                return prov_path, num_days
+
         records = self.generateGroupProvenanceRecords(prov_path, start_date,
                                                       data_1, data_2, **kwargs)
         num_days = len(records)
@@ -662,6 +680,48 @@ class TimeGridFileManagerMethods(TimeGridFileReaderMethods,
 
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 
+    def insertProvenanceBlock(self, prov_path, start_date, arrays, generator,
+                                    **kwargs):
+        """ Inserts provenance records for every day in one or more 3D data
+        blocks. Statistics for all days are calculated at once and written
+        directly into a structured array with the same dtype as the
+        provenance dataset.
+
+        Arguments
+        --------------------------------------------------------------------
+        prov_path  : string - path to a provenance dataset.
+        start_date : datetime, scalar - date/doy of first provenance entry
+        arrays     : tuple of 3D grids - 1st dimension must be time.
+        generator  : vectorized provenance block generator
+        """
+        timestamp = kwargs.get('timestamp', self.timestamp)
+        num_days = arrays[0].shape[0]
+        if isinstance(start_date, int):
+            dates = range(start_date, start_date + num_days)
+        else:
+            dates = [start_date + relativedelta(days=day)
+                     for day in range(num_days)]
+
+        dataset = self.getDataset(prov_path)
+        records = N.empty((num_days,), dtype=dataset.dtype)
+        generator(records, dates, timestamp, *arrays)
+
+        start_index = self.indexFromDate(prov_path, start_date)
+        dataset[start_index:start_index+num_days] = records
+        return num_days
+
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+    def provenanceBlockGenerator(self, prov_path):
+        """ Returns the vectorized generator registered for a provenance
+        dataset or None when the dataset must use the per-day generator.
+        """
+        prov_key = self.getDatasetAttribute(prov_path, 'key', 'stats')
+        gen_key = self.getDatasetAttribute(prov_path, 'generator', prov_key)
+        return self._getRegisteredFunction('block_generators.%s' % gen_key)
+
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
     #@property
     #def timestamp(self):
     #    return datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
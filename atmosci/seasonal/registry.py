@@ -2,13 +2,14 @@
 import os, sys
 
 import numpy as N
-from scipy import stats as scipy_stats
 try:
     nanmedian = N.nanmedian
 except:
+    from scipy import stats as scipy_stats
     nanmedian = scipy_stats.nanmedian
 
 from atmosci.utils.config import ConfigObject
+from atmosci.utils.gridstats import fillStatsFields
 from atmosci.utils.timeutils import asAcisQueryDate
 
 # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
@@ -73,6 +74,55 @@ def tempExtremesProvenanceGenerator(date, timestamp, mint, maxt, source):
              source, timestamp )
 FUNCBASE.generators.tempexts = tempExtremesProvenanceGenerator
 
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+# vectorized provenance generators
+#
+# block generators fill every record in a structured array at once using
+# statistics computed along axis 0 of a 3D block (time is 1st dimension)
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+ConfigObject('block_generators', FUNCBASE)
+
+# block generator for date series - data with accumulation
+def dateAccumStatsProvenanceBlock(records, dates, timestamp, daily,
+                                  accumulated):
+    names = records.dtype.names
+    records[names[0]] = [asAcisQueryDate(date) for date in dates]
+    index = fillStatsFields(records, 1, daily)
+    index = fillStatsFields(records, index, accumulated)
+    records[names[index]] = timestamp
+    return records
+FUNCBASE.block_generators.dateaccum = dateAccumStatsProvenanceBlock
+
+# block generator for day of year series - data with accumulation
+def doyAccumStatsProvenanceBlock(records, doys, timestamp, daily,
+                                 accumulated):
+    names = records.dtype.names
+    records[names[0]] = doys
+    index = fillStatsFields(records, 1, daily)
+    index = fillStatsFields(records, index, accumulated)
+    records[names[index]] = timestamp
+    return records
+FUNCBASE.block_generators.doyaccum = doyAccumStatsProvenanceBlock
+
+# block generator for date series statistics - no accumulation
+def dateStatsProvenanceBlock(records, dates, timestamp, data):
+    names = records.dtype.names
+    records[names[0]] = [asAcisQueryDate(date) for date in dates]
+    index = fillStatsFields(records, 1, data)
+    records[names[index]] = timestamp
+    return records
+FUNCBASE.block_generators.datestats = dateStatsProvenanceBlock
+FUNCBASE.block_generators.observed = dateStatsProvenanceBlock
+
+# block generator for day of year series statistics - no accumulation
+def doyStatsProvenanceBlock(records, doys, timestamp, data):
+    names = records.dtype.names
+    records[names[0]] = doys
+    index = fillStatsFields(records, 1, data)
+    records[names[index]] = timestamp
+    return records
+FUNCBASE.block_generators.doystats = doyStatsProvenanceBlock
+
 # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 # dataset indexers
 # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
@@ -8,13 +8,13 @@ UPDATE_START_TIME = datetime.datetime.now()
 from dateutil.relativedelta import relativedelta
 ONE_DAY = relativedelta(days=1)
 
-import numpy as N
 import pygrib
 
 from atmosci.utils.timeutils import asDatetimeDate, elapsedTime
 from atmosci.utils.units import convertUnits
 
 from atmosci.seasonal.factory import NDFDProjectFactory
+from atmosci.ndfd.smart_grib import decodeGribMessagesToTargets, gatherIndexes
 
 # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
 
@@ -103,23 +103,42 @@ target_year = target_date.year
 
 factory = NDFDProjectFactory()
 ndfd = factory.getSourceConfig('ndfd')
-region = factory.getRegionConfig(region_key)
-source = factory.getSourceConfig(source_key)
-print 'updating % source file with NDFD forecast' % source.tag
-
-# need indexes from static file for source
-reader = factory.getStaticFileReader(source, region)
-source_shape = reader.getDatasetShape('ndfd.x_indexes')
-ndfd_indexes = [ reader.getData('ndfd.y_indexes').flatten(),
-                 reader.getData('ndfd.x_indexes').flatten() ]
-reader.close()
-del reader
-
-reader = factory.getSourceFileReader(source, target_date.year, region, 'temps')
-last_obs_date = \
-    asDatetimeDate(reader.getDatasetAttribute('temps.mint', 'last_obs_date'))
-print '    last obs date', last_obs_date
-del reader
+# source and region may be comma separated lists, every region x source
+# combination is updated from a single decode of the forecast
+regions = [factory.getRegionConfig(key.strip())
+           for key in region_key.split(',')]
+sources = [factory.getSourceConfig(key.strip())
+           for key in source_key.split(',')]
+
+targets = [ ]
+for region in regions:
+    for source in sources:
+        print 'updating % source file with NDFD forecast' % source.tag
+
+        # need indexes from static file for source
+        reader = factory.getStaticFileReader(source, region)
+        source_shape = reader.getDatasetShape('ndfd.x_indexes')
+        ndfd_indexes = [ reader.getData('ndfd.y_indexes').flatten(),
+                         reader.getData('ndfd.x_indexes').flatten() ]
+        reader.close()
+        del reader
+
+        reader = factory.getSourceFileReader(source, target_date.year, region,
+                                             'temps')
+        last_obs_date = asDatetimeDate(
+                   reader.getDatasetAttribute('temps.mint', 'last_obs_date'))
+        print '    last obs date', last_obs_date
+        del reader
+
+        targets.append({ 'region':region, 'source':source,
+                         'source_shape':source_shape,
+                         'ndfd_indexes':ndfd_indexes,
+                         'last_obs_date':last_obs_date, 'fcast_start':None,
+                         'temps':{ } })
+
+# messages for dates after the earliest last obs date are needed by at
+# least one of the targets
+first_obs_date = min([target['last_obs_date'] for target in targets])
 
 # create a template for the NDFD grib file path
 filepath_template = \
@@ -138,10 +157,10 @@ warnings.filterwarnings('ignore',"invalid value encountered in less")
 warnings.filterwarnings('ignore',"Mean of empty slice")
 # MUST ALSO TURN OFF WARNING FILTERS AT END OF SCRIPT !!!!!
 
-fcast_start = None
-temps = { }
+gather_params = None
 for temp_var in ('maxt','mint'):
-    daily = [ ]
+    for target in targets:
+        target['temps'][temp_var] = [ ]
     print '\nupdating forecast for', temp_var 
 
     for time_span in ('001-003','004-007'):
@@ -149,6 +168,14 @@ for temp_var in ('maxt','mint'):
         print '\nreading :', grib_filepath
         gribs = pygrib.open(grib_filepath)
         grib = gribs.select(name=var_name_map[temp_var])
+        if gather_params is None:
+            grib_shape = (grib[0]['Ny'], grib[0]['Nx'])
+            gather_params = [ (gatherIndexes(target['ndfd_indexes'],
+                                             grib_shape),
+                               target['source_shape'], None)
+                              for target in targets ]
+        messages = [ ]
+        fcast_dates = [ ]
         for message_num in range(len(grib)):
             message = grib[message_num]
             analysis_date = message.analDate
@@ -163,56 +190,73 @@ for temp_var in ('maxt','mint'):
             fcast_date = fcast_time.date()
             print '    forecast date =', fcast_date
 
-            if fcast_date > last_obs_date:
-                data = message.values[ndfd_indexes].data
-                data = data.reshape(source_shape)
-                data[N.where(data == 9999)] = N.nan
-                data = convertUnits(data, 'K', 'F')
-                daily.append((fcast_date, data))
-                if fcast_start is None: fcast_start = fcast_date
+            if fcast_date > first_obs_date:
+                messages.append(message)
+                fcast_dates.append(fcast_date)
             print ' '
-        gribs.close()
 
-    temps[temp_var] = daily
+        # decode each message once for all of the targets
+        if len(messages) > 0:
+            blocks = decodeGribMessagesToTargets(messages, 9999,
+                                                 gather_params, None, float)
+            for target, block in zip(targets, blocks):
+                for index, fcast_date in enumerate(fcast_dates):
+                    if fcast_date > target['last_obs_date']:
+                        data = convertUnits(block[index], 'K', 'F')
+                        target['temps'][temp_var].append((fcast_date, data))
+                        if target['fcast_start'] is None:
+                            target['fcast_start'] = fcast_date
+            del blocks
+        del messages
+        gribs.close()
 
 # turn annoying numpy warnings back on
 warnings.resetwarnings()
 
 # bad forecast file, no future dates
-if fcast_start is None:
-    print "Forecast contains no data beyond last obs date", last_obs_date
-    os._exit(99)
-
-# forecast at least partialy in the current year
-if fcast_start.year == target_year:
-    min_temps, max_temps = updateForecast(temps['mint'], temps['maxt'], fcast_start,
-                                          target_year, source, region)
-else:
-    min_temps = temps['mint'] 
-    max_temps = temps['maxt']
+for target in targets:
+    if target['fcast_start'] is None:
+        print "Forecast contains no data beyond last obs date", \
+              target['last_obs_date']
+        os._exit(99)
+
+for target in targets:
+    region = target['region']
+    source = target['source']
+    temps = target['temps']
+    fcast_start = target['fcast_start']
+    target_year = target_date.year
+
+    # forecast at least partialy in the current year
+    if fcast_start.year == target_year:
+        min_temps, max_temps = updateForecast(temps['mint'], temps['maxt'],
+                                   fcast_start, target_year, source, region)
+    else:
+        min_temps = temps['mint'] 
+        max_temps = temps['maxt']
+
+    if len(mint_temps) > 0:
+        manager = factory.getSourceFileManager(source, target_year, region,
+                                               'temps', mode='a')
+        if manager.datasetHasAttr('temps.maxt', 'fcast_start'):
+            manager.deleteDatasetAttribute('temps.maxt', 'fcast_start')
+        if manager.datasetHasAttr('temps.maxt', 'fcast_end'):
+            manager.deleteDatasetAttribute('temps.maxt', 'fcast_end')
+        if manager.datasetHasAttr('temps.mint', 'fcast_start'):
+            manager.deleteDatasetAttribute('temps.mint', 'fcast_start')
+        if manager.datasetHasAttr('temps.mint', 'fcast_end'):
+            manager.deleteDatasetAttribute('temps.mint', 'fcast_end')
+        if manager.datasetHasAttr('temps.provenance', 'fcast_start'):
+            manager.deleteDatasetAttribute('temps.provenance', 'fcast_start')
+        if manager.datasetHasAttr('temps.provenance', 'fcast_end'):
+            manager.deleteDatasetAttribute('temps.provenance', 'fcast_end')
+        manager.close()
+        del manager
 
-if len(mint_temps) > 0:
-    manager = factory.getSourceFileManager(source, target_year, region,
-                                           'temps', mode='a')
-    if manager.datasetHasAttr('temps.maxt', 'fcast_start'):
-        manager.deleteDatasetAttribute('temps.maxt', 'fcast_start')
-    if manager.datasetHasAttr('temps.maxt', 'fcast_end'):
-        manager.deleteDatasetAttribute('temps.maxt', 'fcast_end')
-    if manager.datasetHasAttr('temps.mint', 'fcast_start'):
-        manager.deleteDatasetAttribute('temps.mint', 'fcast_start')
-    if manager.datasetHasAttr('temps.mint', 'fcast_end'):
-        manager.deleteDatasetAttribute('temps.mint', 'fcast_end')
-    if manager.datasetHasAttr('temps.provenance', 'fcast_start'):
-        manager.deleteDatasetAttribute('temps.provenance', 'fcast_start')
-    if manager.datasetHasAttr('temps.provenance', 'fcast_end'):
-        manager.deleteDatasetAttribute('temps.provenance', 'fcast_end')
-    manager.close()
-    del manager
-
-    fcast_start = min_temps[0][0]
-    target_year = fcast_start.year
-    min_temps, max_temps = \
-        updateForecast(min_temps, max_temps, fcast_start, target_year, source, region)
+        fcast_start = min_temps[0][0]
+        target_year = fcast_start.year
+        min_temps, max_temps = updateForecast(min_temps, max_temps,
+                                   fcast_start, target_year, source, region)
 
 elapsed_time = elapsedTime(UPDATE_START_TIME, True)
 msg = '\ncompleted NDFD forecast update for %s thru %s in %s'
@@ -6,6 +6,8 @@ from atmosci.seasonal.methods.builder import GridFileBuildMethods
 from atmosci.seasonal.methods.grid import GridFileManagerMethods
 from atmosci.seasonal.methods.grid import GridFileReaderMethods
 
+from atmosci.utils.regrid import RegridWeights
+
 # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
 
 class StaticGridFileMethods:
@@ -16,10 +18,51 @@ class StaticGridFileMethods:
                           self.getData('%s.x_indexes' % grib_source).flatten()]
         return source_shape, source_indexes
 
+    def gribRegridWeights(self, method='bilinear', grib_source='ndfd'):
+        """ Returns the RegridWeights table saved by saveGribRegridWeights.
+        """
+        indexes_path = '%s.%s_indexes' % (grib_source, method)
+        attrs = self.getDatasetAttributes(indexes_path)
+        grid_shape = self.datasetShape(indexes_path)[:-1]
+        indexes = self.getData(indexes_path)
+        weights = self.getData('%s.%s_weights' % (grib_source, method))
+        return RegridWeights(method, grid_shape, tuple(attrs['source_shape']),
+                             indexes, weights)
+
+
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+class StaticGridFileUpdateMethods:
+
+    def saveGribRegridWeights(self, regrid_weights, grib_source='ndfd',
+                                    **attributes):
+        """ Saves a RegridWeights table as a pair of datasets in the grib
+        source group, "<method>_indexes" and "<method>_weights", each with
+        shape (grid rows, grid columns, neighbors). Indexes are into the
+        flattened values of the full grib message, so the table's
+        source_shape must be the shape of the full grib (see
+        RegridWeights.offsetSource).
+        """
+        method = regrid_weights.method
+        shape = regrid_weights.grid_shape + (regrid_weights.num_neighbors,)
+        attributes['method'] = method
+        attributes['source_shape'] = regrid_weights.source_shape
+        indexes = regrid_weights.indexes.reshape(shape).astype('<i4')
+        weights = regrid_weights.weights.reshape(shape).astype('<f4')
+
+        for name, data in (('indexes',indexes), ('weights',weights)):
+            dataset_path = '%s.%s_%s' % (grib_source, method, name)
+            attributes['description'] = \
+                'regrid %s from %s grib using %s method' % (name, grib_source,
+                                                            method)
+            # creates the dataset when it is not already in the file
+            self.updateDataset(dataset_path, data, dict(attributes))
+
 
 # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
 
-class StaticGridFileBuilder(StaticGridFileMethods, GridFileBuildMethods,
+class StaticGridFileBuilder(StaticGridFileMethods,
+                            StaticGridFileUpdateMethods, GridFileBuildMethods,
                             Hdf5GridFileManager):
 
     def __init__(self, filepath, registry, project_config, filetype, source,
@@ -45,7 +88,8 @@ class StaticGridFileBuilder(StaticGridFileMethods, GridFileBuildMethods,
 
 # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
 
-class StaticGridFileManager(StaticGridFileMethods, GridFileManagerMethods,
+class StaticGridFileManager(StaticGridFileMethods,
+                            StaticGridFileUpdateMethods, GridFileManagerMethods,
                             GridFileReaderMethods, Hdf5GridFileManager):
 
     def __init__(self, filepath, registry, mode='r'):
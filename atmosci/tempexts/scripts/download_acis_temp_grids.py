@@ -12,6 +12,8 @@ from atmosci.tempexts.factory import TempextsProjectFactory
 from optparse import OptionParser
 parser = OptionParser()
 
+parser.add_option('-c', action='store', dest='cache_dir', default=None,
+                  help='directory for cached ACIS responses')
 parser.add_option('-f', action='store_true', dest='update_forecast',
                   default=False)
 
@@ -102,7 +104,7 @@ warnings.filterwarnings('ignore',"Mean of empty slice")
 # download current ACIS mint,maxt for time span
 data = factory.getAcisGridData(int(acis_grid), 'mint,maxt', start_date,
                                end_date, False, bbox=manager.data_bbox, 
-                               debug=debug)
+                               cache=options.cache_dir, debug=debug)
 if debug: print 'temp data\n', data
 
 print 'updating "temps" group'
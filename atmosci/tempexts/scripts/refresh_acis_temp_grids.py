@@ -20,6 +20,8 @@ parser.add_option('--nd', action='store', type='int', dest='num_days',
                   help='number of days to refresh after entered date',
                   default=None)
 
+parser.add_option('-c', action='store', dest='cache_dir', default=None,
+                  help='directory for cached ACIS responses')
 parser.add_option('-r', action='store', dest='region', default=None)
 parser.add_option('-s', action='store', dest='source', default=None)
 parser.add_option('-v', action='store_true', dest='verbose', default=False)
@@ -126,7 +128,7 @@ warnings.filterwarnings('ignore',"Mean of empty slice")
 # download current ACIS mint,maxt for time span
 data = factory.getAcisGridData(int(acis_grid), 'mint,maxt', start_date,
                                end_date, False, bbox=manager.data_bbox, 
-                               debug=debug)
+                               cache=options.cache_dir, debug=debug)
 if debug: print 'temp data\n', data, '\n'
 
 manager.open('a')
@@ -8,13 +8,13 @@ UPDATE_START_TIME = datetime.datetime.now()
 from dateutil.relativedelta import relativedelta
 ONE_DAY = relativedelta(days=1)
 
-import numpy as N
 import pygrib
 
 from atmosci.utils.timeutils import asDatetimeDate, elapsedTime
 from atmosci.utils.units import convertUnits
 
 from atmosci.tempexts.factory import TempextsForecastFactory
+from atmosci.ndfd.smart_grib import decodeGribMessagesToTargets, gatherIndexes
 
 # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
 
@@ -48,22 +48,37 @@ else:
 
 factory = TempextsForecastFactory()
 ndfd = factory.sourceConfig('ndfd')
-region = factory.regionConfig(region_key)
-source = factory.sourceConfig(source_key)
-print 'updating % source file with NDFD forecast' % source.tag
-
-# need indexes from static file for source
-reader = factory.staticFileReader(source, region)
-source_shape = reader.datasetShape('ndfd.x_indexes')
-ndfd_indexes = [ reader.getData('ndfd.y_indexes').flatten(),
-                 reader.getData('ndfd.x_indexes').flatten() ]
-reader.close()
-del reader
-
-reader = factory.tempextsFileReader(target_date.year, source, region)
-last_obs_date = reader.dateAttribute('temps.mint', 'last_obs_date')
-print '    last obs date', last_obs_date
-del reader
+# source and region may be comma separated lists, every region x source
+# combination is updated from a single decode of the forecast
+regions = [factory.regionConfig(key.strip()) for key in region_key.split(',')]
+sources = [factory.sourceConfig(key.strip()) for key in source_key.split(',')]
+
+targets = [ ]
+for region in regions:
+    for source in sources:
+        print 'updating % source file with NDFD forecast' % source.tag
+
+        # need indexes from static file for source
+        reader = factory.staticFileReader(source, region)
+        source_shape = reader.datasetShape('ndfd.x_indexes')
+        ndfd_indexes = [ reader.getData('ndfd.y_indexes').flatten(),
+                         reader.getData('ndfd.x_indexes').flatten() ]
+        reader.close()
+        del reader
+
+        reader = factory.tempextsFileReader(target_date.year, source, region)
+        last_obs_date = reader.dateAttribute('temps.mint', 'last_obs_date')
+        print '    last obs date', last_obs_date
+        del reader
+
+        targets.append({ 'region':region, 'source':source,
+                         'source_shape':source_shape,
+                         'ndfd_indexes':ndfd_indexes,
+                         'last_obs_date':last_obs_date, 'temps':{ } })
+
+# messages for dates after the earliest last obs date are needed by at
+# least one of the targets
+first_obs_date = min([target['last_obs_date'] for target in targets])
 
 # create a template for the NDFD grib file path
 filepath_template = \
@@ -82,9 +97,10 @@ warnings.filterwarnings('ignore',"invalid value encountered in less")
 warnings.filterwarnings('ignore',"Mean of empty slice")
 # MUST ALSO TURN OFF WARNING FILTERS AT END OF SCRIPT !!!!!
 
-temps = { }
+gather_params = None
 for temp_var in ('maxt','mint'):
-    daily = [ ]
+    for target in targets:
+        target['temps'][temp_var] = [ ]
     print '\nupdating forecast for', temp_var 
 
     for time_span in ('001-003','004-007'):
@@ -92,6 +108,14 @@ for temp_var in ('maxt','mint'):
         print '\nreading :', grib_filepath
         gribs = pygrib.open(grib_filepath)
         grib = gribs.select(name=var_name_map[temp_var])
+        if gather_params is None:
+            grib_shape = (grib[0]['Ny'], grib[0]['Nx'])
+            gather_params = [ (gatherIndexes(target['ndfd_indexes'],
+                                             grib_shape),
+                               target['source_shape'], None)
+                              for target in targets ]
+        messages = [ ]
+        fcast_dates = [ ]
         for message_num in range(len(grib)):
             message = grib[message_num]
             analysis_date = message.analDate
@@ -105,50 +129,65 @@ for temp_var in ('maxt','mint'):
             if verbose: print '        forecast datetime =', fcast_time
             fcast_date = fcast_time.date()
 
-            if fcast_date > last_obs_date:
-                data = message.values[ndfd_indexes].data
-                data = data.reshape(source_shape)
-                data[N.where(data == 9999)] = N.nan
-                data = convertUnits(data, 'K', 'F')
+            if fcast_date > first_obs_date:
                 print '        forecast date =', fcast_date
-                daily.append((fcast_date, data))
+                messages.append(message)
+                fcast_dates.append(fcast_date)
             print ' '
+
+        # decode each message once for all of the targets
+        if len(messages) > 0:
+            blocks = decodeGribMessagesToTargets(messages, 9999,
+                                                 gather_params, None, float)
+            for target, block in zip(targets, blocks):
+                for index, fcast_date in enumerate(fcast_dates):
+                    if fcast_date > target['last_obs_date']:
+                        data = convertUnits(block[index], 'K', 'F')
+                        target['temps'][temp_var].append((fcast_date, data))
+            del blocks
+        del messages
         gribs.close()
 
-    temps[temp_var] = tuple(sorted(daily, key=lambda x: x[0]))
+    for target in targets:
+        temps = target['temps']
+        temps[temp_var] = tuple(sorted(temps[temp_var], key=lambda x: x[0]))
 
 #print '\n\n', temps['mint']
 #print '\n\n', temps['maxt']
 
 target_year = fcast_date.year
-manager = \
-factory.tempextsFileManager(source, target_year, region, 'temps', mode='a')
-print '\nsaving forecast to', manager.filepath
-
-max_temps = temps['maxt']
-min_temps = temps['mint']
-
-for indx, data in enumerate(min_temps):
-    mint_date, mint = data
-    if mint_date > target_date:
-        maxt_date, maxt = max_temps[indx]
-        manager.open('a')
-        manager.updateTempGroup(mint_date, mint, maxt, ndfd.tag, forecast=True)
-        manager.close()
+for target in targets:
+    region = target['region']
+    source = target['source']
+    manager = \
+    factory.tempextsFileManager(source, target_year, region, 'temps', mode='a')
+    print '\nsaving forecast to', manager.filepath
+
+    max_temps = target['temps']['maxt']
+    min_temps = target['temps']['mint']
+
+    for indx, data in enumerate(min_temps):
+        mint_date, mint = data
+        if mint_date > target_date:
+            maxt_date, maxt = max_temps[indx]
+            manager.open('a')
+            manager.updateTempGroup(mint_date, mint, maxt, ndfd.tag,
+                                    forecast=True)
+            manager.close()
+
+    # update forecast time span
+    first_date = min_temps[0][0]
+    last_date = min_temps[-1][0]
+    manager.open('a')
+    manager.setForecastDates('temps.maxt', first_date, last_date)
+    manager.setForecastDates('temps.mint', first_date, last_date)
+    manager.setForecastDates('temps.provenance', first_date, last_date)
+    manager.close()
+    del manager
 
 # turn annoying numpy warnings back on
 warnings.resetwarnings()
 
-# update forecast time span
-first_date = min_temps[0][0]
-last_date = min_temps[-1][0]
-manager.open('a')
-manager.setForecastDates('temps.maxt', first_date, last_date)
-manager.setForecastDates('temps.mint', first_date, last_date)
-manager.setForecastDates('temps.provenance', first_date, last_date)
-manager.close()
-del manager
-
 elapsed_time = elapsedTime(UPDATE_START_TIME, True)
 msg = '\ncompleted NDFD forecast update for %s thru %s in %s'
 print msg % (first_date.strftime('%m-%d'), last_date.strftime('%m-%d, %Y'),
@@ -0,0 +1,50 @@
+""" Regression tests for compiled unit conversions in atmosci.units
+
+    python -m pytest atmosci/test_units.py
+"""
+
+import numpy as N
+
+from atmosci.units import FORMULAS, convertUnits, isSupportedConversion, \
+                          unitConversion
+
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+def test_linear_equation_is_folded():
+    convert = unitConversion('K', 'F')
+    assert len(convert.steps) == 1
+    assert N.allclose(convert.steps[0], (1.8, -459.67))
+    temps = N.array([233.15, 273.15, 310.15])
+    assert N.allclose(convert(temps), [-40., 32., 98.6])
+
+def test_scaled_units():
+    precip = N.array([0, 254, 1270], dtype=N.int16)
+    assert N.allclose(convertUnits(precip, 'mm*10', 'in'), [0., 1., 5.],
+                      atol=1e-4)
+
+def test_chained_conversion():
+    assert 'N_to_lb' not in FORMULAS
+    assert isSupportedConversion('N', 'lb')
+    assert not isSupportedConversion('N', 'F')
+    assert N.allclose(convertUnits(N.array([10.]), 'N', 'lb'),
+                      10. * 0.1019716 * 2.2046226)
+
+def test_out_buffer():
+    temps = N.array([233.15, 273.15, 310.15])
+    out = N.empty(3, dtype=N.float32)
+    result = convertUnits(temps, 'K', 'F', out=out)
+    assert result is out
+    assert N.allclose(out, [-40., 32., 98.6])
+    assert N.allclose(temps, [233.15, 273.15, 310.15])
+
+def test_integer_out_buffer_is_truncated():
+    temps = N.array([250., 300., 310.])
+    out = N.empty(3, dtype=N.int16)
+    result = convertUnits(temps, 'K', 'F', out=out)
+    assert result is out
+    N.testing.assert_array_equal(out, [-9, 80, 98])
+    N.testing.assert_array_equal(out, convertUnits(temps, 'K', 'F')
+                                      .astype(N.int16))
+
+def test_scalar_data():
+    assert abs(convertUnits(273.15, 'K', 'C')) < 1e-6
@@ -357,7 +357,12 @@ def isSupportedConversion(from_units, to_units):
     to_units = UNIT_KEY_MAP.get(to_units, to_units)
     if from_units != to_units:
         formula = FORMULAS.get('%s_to_%s' % (from_units,to_units), None)
-        if formula is None: return False
+        if formula is None:
+            # conversions may also be chained through other units
+            try:
+                _formulaChain(from_units, to_units)
+            except ValueError:
+                return False
     return True
 
 # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
@@ -372,42 +377,195 @@ def sanitizeUnits(units):
 
 # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 
-def convertUnits(data, data_units, out_units):
-    if data_units == out_units: return data
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+# compiled conversions
+#
+# Each (data units, out units) pair is resolved once into a UnitConversion,
+# which is cached in CONVERSIONS. Conversions that are not in FORMULAS are
+# chained through intermediate units. Every formula in FORMULAS is linear,
+# so the steps in a conversion (including scale factors) are folded into a
+# single multiply and add.
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
 
-    # check for scaled unit conversions
-    from_units, from_scale = sanitizeUnits(data_units)
-    to_units, to_scale = sanitizeUnits(out_units)
+CONVERSIONS = { }
+# max number of formulas chained to get from data units to out units
+MAX_CHAINED_FORMULAS = 3
 
-    is_array = isinstance(data, N.ndarray)
-    if from_scale is not None:
-        if is_array:
-            if data.dtype.kind == 'f': data /= float(from_scale)
-            elif data.dtype.kind == 'i': data /= int(from_scale)
-        else:
-            if type(data) == float: data /= float(from_scale)
-            elif type(data) == int: data /= int(from_scale)
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 
-    from_units = UNIT_KEY_MAP.get(from_units, from_units)
-    to_units = UNIT_KEY_MAP.get(to_units, to_units)
-    if from_units != to_units:
-        convert, arg = conversionOperator(from_units, to_units)
-        result = convert(data, arg)
-
-    if to_scale is not None:
-        if is_array:
-            if data.dtype.kind == 'f': result *= float(to_scale)
-            elif data.dtype.kind == 'i': result *= int(to_scale)
-        else:
-            if type(data) == float: result *= float(from_scale)
-            elif type(data) == int: result *= int(from_scale)
-    return result
+class _Linear(object):
+    """ Stands in for "x" when evaluating an equation, so that equations
+    which are linear in x evaluate to their scale and offset.
+    """
+    def __init__(self, scale=1., offset=0.):
+        self.scale = scale
+        self.offset = offset
+
+    def __add__(self, value):
+        if isinstance(value, _Linear):
+            return _Linear(self.scale + value.scale, self.offset + value.offset)
+        return _Linear(self.scale, self.offset + value)
+    __radd__ = __add__
+
+    def __sub__(self, value): return self + (-value)
+    def __rsub__(self, value): return (-self) + value
+    def __neg__(self): return _Linear(-self.scale, -self.offset)
+
+    def __mul__(self, value):
+        if isinstance(value, _Linear):
+            raise TypeError, 'equation is not linear'
+        return _Linear(self.scale * value, self.offset * value)
+    __rmul__ = __mul__
+
+    def __div__(self, value):
+        if isinstance(value, _Linear):
+            raise TypeError, 'equation is not linear'
+        return _Linear(self.scale / value, self.offset / value)
+    __truediv__ = __div__
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+def _compileFormula(formula):
+    """ Returns (scale, offset) for linear formulas, otherwise a function
+    of x compiled from the formula's equation.
+    """
+    operation, arg = formula
+    if operation == '*': return (arg, 0.)
+    if operation == '+': return (1., arg)
+    if operation == '-': return (1., -arg)
+    if operation == '==': return (1., 0.)
+    if operation == 'eq':
+        try:
+            line = eval(arg, {'__builtins__':{}}, {'x':_Linear()})
+        except (NameError, TypeError): line = None
+        if isinstance(line, _Linear): return (line.scale, line.offset)
+        return eval('lambda x: %s' % arg, {'N':N})
+    errmsg = 'Unsupported conversion operator "%s"'
+    raise ValueError, errmsg % operation
+
+def _formulaChain(from_units, to_units):
+    """ Returns the shortest list of formulas that converts from_units
+    to to_units.
+    """
+    if from_units == to_units: return [ ]
+    formula = FORMULAS.get('%s_to_%s' % (from_units,to_units), None)
+    if formula is not None: return [formula, ]
+
+    # breadth first search for a chain of conversions
+    paths = { from_units : [ ] }
+    frontier = [from_units, ]
+    for step in range(MAX_CHAINED_FORMULAS):
+        next_frontier = [ ]
+        for units in frontier:
+            prefix = '%s_to_' % units
+            for key, formula in FORMULAS.items():
+                if not key.startswith(prefix): continue
+                next_units = key[len(prefix):]
+                if next_units in paths: continue
+                paths[next_units] = paths[units] + [formula, ]
+                if next_units == to_units: return paths[next_units]
+                next_frontier.append(next_units)
+        frontier = next_frontier
+
+    errmsg = 'No formula found to convert "%s" to "%s"'
+    raise ValueError, errmsg % (from_units, to_units)
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+class UnitConversion(object):
+    """ Conversion from data_units to out_units, compiled once and then
+    applied like a NumPy ufunc :
+
+        convert = unitConversion('K', 'F')
+        temps = convert(data)
+        convert(data, out=buffer)
+
+    Input data is never modified unless it is also passed as out. Scaled
+    units (e.g. "mm*10") and conversions that require a chain of formulas
+    are supported. Integer out buffers receive the converted values
+    truncated toward zero, the same as astype().
+    """
+
+    def __init__(self, data_units, out_units):
+        self.data_units = data_units
+        self.out_units = out_units
+
+        from_units, from_scale = sanitizeUnits(data_units)
+        to_units, to_scale = sanitizeUnits(out_units)
+        from_units = UNIT_KEY_MAP.get(from_units, from_units)
+        to_units = UNIT_KEY_MAP.get(to_units, to_units)
+
+        steps = [ ]
+        if from_scale is not None: steps.append((1. / float(from_scale), 0.))
+        for formula in _formulaChain(from_units, to_units):
+            steps.append(_compileFormula(formula))
+        if to_scale is not None: steps.append((float(to_scale), 0.))
+
+        # fold consecutive linear steps into one
+        self.steps = [ ]
+        for step in steps:
+            if isinstance(step, tuple) and self.steps \
+            and isinstance(self.steps[-1], tuple):
+                scale, offset = self.steps[-1]
+                self.steps[-1] = (scale * step[0], (offset * step[0]) + step[1])
+            else: self.steps.append(step)
+        self.steps = [step for step in self.steps if step != (1., 0.)]
+
+    def __call__(self, data, out=None):
+        if not self.steps:
+            if out is None: return data
+            out[...] = data
+            return out
+
+        if out is not None and out.dtype.kind not in 'fc':
+            # ufuncs refuse to cast float results into integer buffers
+            out[...] = self(data)
+            return out
+
+        if not isinstance(data, N.ndarray) and out is None:
+            for step in self.steps:
+                if isinstance(step, tuple): data = (data * step[0]) + step[1]
+                else: data = step(data)
+            return data
+
+        result = data
+        for step in self.steps:
+            if isinstance(step, tuple):
+                scale, offset = step
+                if scale != 1.:
+                    result = N.multiply(result, scale, out=out)
+                    if offset != 0.: N.add(result, offset, out=result)
+                else: result = N.add(result, offset, out=out)
+            else:
+                result = step(result)
+                if out is not None:
+                    out[...] = result
+                    result = out
+        return result
+
+    def __repr__(self):
+        return '%s(%r, %r)' % (self.__class__.__name__, self.data_units,
+                               self.out_units)
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+def unitConversion(data_units, out_units):
+    """ Returns the compiled UnitConversion from data_units to out_units.
+    """
+    key = (data_units, out_units)
+    conversion = CONVERSIONS.get(key, None)
+    if conversion is None:
+        conversion = UnitConversion(data_units, out_units)
+        CONVERSIONS[key] = conversion
+    return conversion
+
+def convertUnits(data, data_units, out_units, out=None):
+    if data_units == out_units and out is None: return data
+    return unitConversion(data_units, out_units)(data, out)
 
 # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 
 def conversionFunction(from_units, to_units):
     if from_units is not None and to_units is not None:
-        def convert(data): return convertUnits(data, from_units, to_units)
-        return convert
+        return unitConversion(from_units, to_units)
     return None
-
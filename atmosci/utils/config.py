@@ -1,4 +1,6 @@
 
+import os, sys
+import cPickle
 from collections import OrderedDict
 from copy import deepcopy
 
@@ -6,8 +8,14 @@ from copy import deepcopy
 
 BOGUS_VALUE = "~!@#$%^&*()-+=|}{:;<>?"
 GETATTR_FAILED = hash('attribute/object path lookup failed')
-RESERVED = ('__ATTRIBUTES__', '__CHILDREN__', '__RESERVED__', 
-            'name', 'parent', 'proper_name')
+RESERVED = ('__ATTRIBUTES__', '__CHILDREN__', '__GENERATION__', '__LOOKUP__',
+            '__RESERVED__', 'name', 'parent', 'proper_name')
+
+# prebuilt configs are saved in this directory, set the environment
+# variable to an empty string to turn snapshots off
+CONFIG_SNAPSHOT_DIR = os.environ.get('ATMOSCI_CONFIG_SNAPSHOTS',
+                      os.path.join(os.path.expanduser('~'), '.atmosci', 'config'))
+CONFIG_SNAPSHOT_VERSION = 'config-snapshot 1'
 
 
 # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
@@ -42,6 +50,65 @@ def dictToConfig(dict_, name='config', parent=None):
     for key, value in dict_.items(): config[key] = value
     return config
 
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+def _snapshotFilepath(name):
+    return os.path.join(CONFIG_SNAPSHOT_DIR, '%s.config' % name)
+
+def _snapshotSignature(source_files):
+    signature = [sys.platform, sys.version_info[:2]]
+    for filepath in source_files:
+        if os.path.exists(filepath):
+            signature.append((filepath, os.path.getmtime(filepath)))
+        else: signature.append((filepath, None))
+    return tuple(signature)
+
+def loadConfigSnapshot(name, source_files):
+    """ Returns the config saved by saveConfigSnapshot when none of the
+    source files have changed since it was saved, otherwise None.
+    """
+    if not CONFIG_SNAPSHOT_DIR: return None
+    filepath = _snapshotFilepath(name)
+    if not os.path.exists(filepath): return None
+    try:
+        snapshot_file = open(filepath, 'rb')
+        try:
+            version, signature, config = cPickle.load(snapshot_file)
+        finally: snapshot_file.close()
+    except Exception:
+        # unreadable or incompatible snapshot, it will be rebuilt
+        return None
+    if version != CONFIG_SNAPSHOT_VERSION: return None
+    if signature != _snapshotSignature(source_files): return None
+    return config
+
+def saveConfigSnapshot(name, source_files, config):
+    """ Saves a fully built config so that later processes can load it
+    with loadConfigSnapshot instead of building it again. source_files
+    are the paths of the modules that build the config, the snapshot is
+    ignored once any of them change. Failure to save is not an error.
+    """
+    if not CONFIG_SNAPSHOT_DIR: return False
+    filepath = _snapshotFilepath(name)
+    # write to temporary file first so that a reader running in another
+    # process never sees a partially written snapshot
+    tmp_filepath = '%s.%d.tmp' % (filepath, os.getpid())
+    try:
+        if not os.path.exists(CONFIG_SNAPSHOT_DIR):
+            os.makedirs(CONFIG_SNAPSHOT_DIR)
+        snapshot_file = open(tmp_filepath, 'wb')
+        try:
+            cPickle.dump((CONFIG_SNAPSHOT_VERSION,
+                          _snapshotSignature(source_files), config),
+                         snapshot_file, cPickle.HIGHEST_PROTOCOL)
+        finally: snapshot_file.close()
+        os.rename(tmp_filepath, filepath)
+    except Exception:
+        if os.path.exists(tmp_filepath): os.remove(tmp_filepath)
+        return False
+    return True
+
+
 # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
 
 class ConfigIterator(object):
@@ -97,6 +164,8 @@ class ConfigObject(object):
         self.__dict__['isOrdered'] = False
         self.__dict__['__ATTRIBUTES__'] = { }
         self.__dict__['__CHILDREN__'] = { }
+        self.__dict__['__GENERATION__'] = None
+        self.__dict__['__LOOKUP__'] = None
         self.__dict__['__RESERVED__'] = RESERVED
 
         self._set_name_(name)
@@ -132,6 +201,7 @@ class ConfigObject(object):
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 
     def addChild(self, config_obj):
+        self._changed_()
         if config_obj.name in self.__dict__['__CHILDREN__']:
             del self.__dict__['__CHILDREN__'][config_obj.name]
         self.__dict__['__CHILDREN__'][config_obj.name] = config_obj
@@ -160,12 +230,17 @@ class ConfigObject(object):
     dict = property(asDict)
 
     def clear(self):
+        self._changed_()
         self.__dict__['__CHILDREN__'].clear()
 
     def copy(self, new_name=None, parent=None):
         if new_name is None: name = self.name
         else: name = new_name
         _copy = self._complete_copy_(self.__class__(name, None))
+        # copies of a compiled config are compiled, paths are cached
+        # as they are requested
+        if self.isCompiled():
+            _copy.__dict__['__LOOKUP__'] = [_copy._generation_(), { }]
         if parent is not None: # copying entire config tree
             parent.addChild(_copy)
         return _copy
@@ -222,6 +297,7 @@ class ConfigObject(object):
             raise TypeError, "Invalid type for 'obj' argument : %s" % type(obj)
 
     def link(self, config_obj, path=None, alias=None):
+        self._changed_()
         if alias is None: link_name = config_obj.name
         else: link_name = alias
         if path is None:
@@ -270,6 +346,92 @@ class ConfigObject(object):
         else:
             raise TypeError, "Invalid type for 'obj' argument : %s" % type(obj)
 
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    # compiled path lookups
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+    def compile(self):
+        """ Turns on compiled path lookups. Every dotted path below this
+        object is flattened into a single dict, so attribute and item
+        access costs one dict lookup instead of a split and a walk down
+        the tree. Children returned by a compiled lookup are compiled as
+        well, and so are copies. Any change to a config tree discards the
+        compiled paths for that tree and they are looked up again (and
+        cached) as they are requested. Returns self so that it can be used in assignments.
+        """
+        paths = { }
+        self._compile_paths_(paths, '', set())
+        if self.parent is None:
+            # paths that start with the name of a top level object refer
+            # to the object itself, they are resolved as they are requested
+            name = self.name
+            for path in paths.keys():
+                if path == name or path.startswith('%s.' % name):
+                    del paths[path]
+        self.__dict__['__LOOKUP__'] = [self._generation_(), paths]
+        return self
+
+    def isCompiled(self):
+        return self.__dict__.get('__LOOKUP__', None) is not None
+    is_compiled = property(isCompiled)
+
+    def _changed_(self):
+        # compiled paths are only valid for the current generation of
+        # the tree that contains them, changes start a new generation
+        self._root_().__dict__['__GENERATION__'] = object()
+
+    def _generation_(self):
+        return self._root_().__dict__.get('__GENERATION__', None)
+
+    def _root_(self):
+        # parent is not set until construction is complete
+        root = self
+        parent = root.__dict__.get('parent', None)
+        while parent is not None:
+            root = parent
+            parent = root.__dict__.get('parent', None)
+        return root
+
+    def _compile_paths_(self, paths, prefix, visited, generation=None):
+        if generation is None: generation = self._generation_()
+        # linked children may appear more than once in a tree
+        if id(self) in visited: return
+        visited.add(id(self))
+        for key, value in self.__dict__['__ATTRIBUTES__'].items():
+            if value is not None: paths['%s%s' % (prefix, key)] = value
+        # children take precedence over attributes with the same name
+        for key, child in self.__dict__['__CHILDREN__'].items():
+            path = '%s%s' % (prefix, key)
+            paths[path] = child
+            if child.__dict__.get('__LOOKUP__', None) is None:
+                child.__dict__['__LOOKUP__'] = [generation, { }]
+            child._compile_paths_(paths, '%s.' % path, visited, generation)
+        visited.discard(id(self))
+
+    def _lookup_(self, path, default):
+        lookup = self.__dict__.get('__LOOKUP__', None)
+        if lookup is None or not isinstance(path, basestring):
+            return self._get_value_of_(self._path_to_list_(path), default)
+
+        # same as _generation_, inlined because it is on every lookup
+        root = self.__dict__
+        while root['parent'] is not None: root = root['parent'].__dict__
+        generation = root.get('__GENERATION__', None)
+        if lookup[0] is not generation:
+            lookup[0] = generation
+            lookup[1] = { }
+        value = lookup[1].get(path, GETATTR_FAILED)
+        if value is not GETATTR_FAILED: return value
+
+        value = self._get_value_of_(path.split('.'), GETATTR_FAILED)
+        if value is GETATTR_FAILED: return default
+        # "dict" creates a new dictionary every time it is requested
+        if not path.endswith('dict'):
+            if isinstance(value, ConfigObject) and not value.isCompiled():
+                value.__dict__['__LOOKUP__'] = [generation, { }]
+            lookup[1][path] = value
+        return value
+
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
     # standard iterators are iterators over children
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
@@ -379,7 +541,7 @@ class ConfigObject(object):
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 
     def get(self, path, default=None):
-        return self._get_value_of_(self._path_to_list_(path), default)
+        return self._lookup_(path, default)
 
     def set(self, **kwargs):
         for path, _value in kwargs.items():
@@ -424,17 +586,20 @@ class ConfigObject(object):
         if len(keys) > 1 : child._construct_obj_tree_(keys[1:]) 
 
     def _delete_child_(self, name):
+        self._changed_()
         child = self.__dict__['__CHILDREN__'].get(name, None)
         if child is not None:
             child._delete_children_()
             del self.__dict__['__CHILDREN__'][name]
 
     def _delete_children_(self):
+        self._changed_()
         for key, child in self.__dict__['__CHILDREN__'].items():
             child._delete_children_()
             del self.__dict__['__CHILDREN__'][key]
 
     def _delete_tree_(self, path):
+        self._changed_()
         child = self.__dict__['__CHILDREN__'].get(path[0], None)
         if child is not None:
             if len(path) > 1:
@@ -514,6 +679,7 @@ class ConfigObject(object):
         return default
 
     def _ingest_(self, key, value, must_be_object=False):
+        self._changed_()
         if key in self.__dict__['__RESERVED__']:
             raise KeyError, 'Path contains a reserved name key "%s"' % key
         if self.has_key(key): self._delete_child_(key)
@@ -557,6 +723,8 @@ class ConfigObject(object):
         else: return str(name)
 
     def _set_name_(self, new_name):
+        # renaming changes paths, a new object is not part of a tree yet
+        if 'name' in self.__dict__: self._changed_()
         self.__dict__['name'] = new_name
         self.__dict__['proper_name'] = self._proper_name_(new_name)
 
@@ -579,6 +747,7 @@ class ConfigObject(object):
         else: return self.parent._top_()
 
     def _update_(self, obj):
+        self._changed_()
         for key, child in obj.__dict__['__CHILDREN__'].items():
             if key in self.__dict__['__CHILDREN__']:
                 self.__dict__['__CHILDREN__'][key]._update_(child)
@@ -615,16 +784,27 @@ class ConfigObject(object):
     def __delitem__(self, path):
         self._delete_tree_(self._path_to_list_(path))
 
+    # __getattr__ raises KeyError, so pickle must find these on the class
+    def __getnewargs__(self):
+        return ( )
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state['__GENERATION__'] = None
+        state['__LOOKUP__'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+
     def __getattr__(self, path):
-        value = self._get_value_of_(self._path_to_list_(path), GETATTR_FAILED)
-        try:
-            if value != GETATTR_FAILED: return value
-        except: # will get here if value is an 'object'
-            return value
+        value = self._lookup_(path, GETATTR_FAILED)
+        # identity test, comparing ConfigObjects computes their hash
+        if value is not GETATTR_FAILED: return value
         raise KeyError, '"%s" is an invalid key' % path
 
     def __getitem__(self, path):
-        value = self._get_value_of_(self._path_to_list_(path), None)
+        value = self._lookup_(path, None)
         if value is not None: return value
         raise KeyError, '"%s" is an invalid key' % path
 
@@ -702,6 +882,8 @@ class OrderedConfigObject(ConfigObject):
         self.__dict__['isOrdered'] = True
         self.__dict__['__ATTRIBUTES__'] = OrderedDict()
         self.__dict__['__CHILDREN__'] = OrderedDict()
+        self.__dict__['__GENERATION__'] = None
+        self.__dict__['__LOOKUP__'] = None
         self.__dict__['__RESERVED__'] = RESERVED
 
         self._set_name_(name)
@@ -0,0 +1,74 @@
+
+import numpy as N
+
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+def blockMedian(flat_block):
+    """
+    Median of each row in a 2D array, ignoring N.nan. Every row uses the
+    partition based median. Masked grids have N.nan at the same nodes in
+    every row, so those nodes are dropped from all rows at once. Rows
+    with different missing nodes are done one at a time. Rows that are
+    all N.nan have a median of N.nan.
+    """
+    num_rows = flat_block.shape[0]
+    medians = N.empty(num_rows, dtype=float)
+    nan_mask = N.isnan(flat_block)
+    has_nan = nan_mask.any(axis=1)
+    clean = N.where(~has_nan)[0]
+    if len(clean) > 0:
+        scratch = flat_block[clean].astype(float)
+        medians[clean] = N.median(scratch, axis=1, overwrite_input=True)
+    dirty = N.where(has_nan)[0]
+    if len(dirty) > 0:
+        nan_mask = nan_mask[dirty]
+        if (nan_mask == nan_mask[0]).all():
+            valid = N.where(~nan_mask[0])[0]
+            if len(valid) > 0:
+                scratch = flat_block[dirty][:,valid].astype(float)
+                medians[dirty] = N.median(scratch, axis=1,
+                                          overwrite_input=True)
+            else: medians[dirty] = N.nan
+        else:
+            for row, row_mask in zip(dirty, nan_mask):
+                values = flat_block[row][~row_mask]
+                if len(values) > 0: medians[row] = N.median(values)
+                else: medians[row] = N.nan
+    return medians
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+def blockStatistics(data, median=True):
+    """
+    Computes min, max, mean and median statistics for every time step in
+    a 3D block with time as the 1st dimension. All statistics are computed
+    along axis 0 in a single pass for each statistic, and N.nan values
+    are ignored.
+
+    Returns a tuple of 1D arrays : (mins, maxs, means, medians). When
+    median is False, medians is None.
+    """
+    if data.ndim == 2: data = data.reshape((1,) + data.shape)
+    flat_block = data.reshape(data.shape[0], -1)
+    mins = N.nanmin(flat_block, axis=1)
+    maxs = N.nanmax(flat_block, axis=1)
+    means = N.nanmean(flat_block, axis=1)
+    if median: medians = blockMedian(flat_block)
+    else: medians = None
+    return mins, maxs, means, medians
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+def fillStatsFields(records, first_field, data, median=True):
+    """
+    Fills consecutive fields in a structured array with the statistics
+    for each time step in a 3D block. Fields are filled in the order
+    min, max, mean and median (when median is True), starting with the
+    field at index first_field. Returns the index of the next field.
+    """
+    names = records.dtype.names
+    stats = blockStatistics(data, median)
+    if not median: stats = stats[:3]
+    for offset, values in enumerate(stats):
+        records[names[first_field + offset]] = values
+    return first_field + len(stats)
@@ -0,0 +1,58 @@
+""" Deferred imports for heavy optional dependencies.
+
+Modules such as pygrib, h5py and scipy.stats take a noticeable amount of
+time to import and many scripts never use them (e.g. --help or runs that
+find nothing to do). A LazyModule stands in for the module and imports it
+the first time one of its attributes is used.
+
+    pygrib = lazyImport('pygrib')
+    ...
+    gribs = pygrib.open(filepath) # pygrib is imported here
+"""
+
+import sys
+
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+class LazyModule(object):
+    """
+    Proxy for a module that is imported on first attribute access.
+    ImportErrors are raised at that time instead of at module load.
+    """
+
+    def __init__(self, module_name):
+        self.__dict__['_module_name_'] = module_name
+        self.__dict__['_module_'] = None
+
+    def _load_(self):
+        module = self.__dict__['_module_']
+        if module is None:
+            module_name = self.__dict__['_module_name_']
+            __import__(module_name)
+            module = sys.modules[module_name]
+            self.__dict__['_module_'] = module
+        return module
+
+    def isLoaded(self):
+        return self.__dict__['_module_'] is not None
+
+    def __getattr__(self, name):
+        return getattr(self._load_(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self._load_(), name, value)
+
+    def __repr__(self):
+        name = self.__dict__['_module_name_']
+        if self.isLoaded(): return '<lazy module "%s" (loaded)>' % name
+        return '<lazy module "%s" (not loaded)>' % name
+
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+def lazyImport(module_name):
+    """ Returns the module when it has already been imported, otherwise
+    a LazyModule that imports it when first used.
+    """
+    module = sys.modules.get(module_name, None)
+    if module is not None: return module
+    return LazyModule(module_name)
@@ -0,0 +1,310 @@
+""" Spatial index for the nodes of 2D lon/lat coordinate grids.
+
+The index is built once per grid and answers nearest-k and within-radius
+queries without scanning the full coordinate arrays. Bulk lookups for
+arrays of points are vectorized. Distances are in decimal degrees, the
+same "closeness" measure used by the rest of the grid code.
+
+When the coordinate grids were read from a file, the index may also be
+saved in a sidecar file next to it so that other processes reuse it until
+the file changes.
+"""
+
+import os
+import cPickle
+import weakref
+
+import numpy as N
+
+
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+NODE_INDEX_FILE_EXTENSION = '.nodes'
+NODE_INDEX_VERSION = 'grid-node-index 1'
+
+# max number of point/node distances computed at once without scipy
+BRUTE_FORCE_CHUNK = 4000000
+
+# scipy is slow to import, it is not imported until an index is built
+CKDTREE_CLASS = [ ]
+
+def _cKDTree():
+    """ Returns scipy.spatial.cKDTree, or None when scipy is not installed
+    """
+    if not CKDTREE_CLASS:
+        try:
+            from scipy.spatial import cKDTree
+        except ImportError:
+            cKDTree = None
+        CKDTREE_CLASS.append(cKDTree)
+    return CKDTREE_CLASS[0]
+
+# in-process cache of node indexes
+NODE_INDEX_CACHE = { }
+NODE_INDEX_CACHE_ORDER = [ ]
+NODE_INDEX_CACHE_SIZE = 8
+
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+class GridNodeIndex(object):
+    """
+    Spatial index of the nodes in a pair of 2D lon/lat grids. Nodes with
+    non-finite coordinates are excluded from the index.
+    """
+
+    def __init__(self, lons, lats):
+        lons = N.asarray(lons, dtype=float)
+        lats = N.asarray(lats, dtype=float)
+        if lons.shape != lats.shape or lons.ndim != 2:
+            errmsg = 'Shape of lon grid %s and lat grid %s must be 2D and equal.'
+            raise ValueError, errmsg % (str(lons.shape), str(lats.shape))
+
+        self.grid_shape = lons.shape
+        flat_lons = lons.ravel()
+        flat_lats = lats.ravel()
+        valid = N.isfinite(flat_lons) & N.isfinite(flat_lats)
+        if valid.all():
+            self.node_indexes = None
+            self.coords = N.column_stack((flat_lons, flat_lats))
+        else:
+            self.node_indexes = N.where(valid)[0]
+            self.coords = N.column_stack((flat_lons[valid], flat_lats[valid]))
+        self.num_nodes = len(self.coords)
+
+        cKDTree = _cKDTree()
+        if cKDTree is not None: self.tree = cKDTree(self.coords)
+        else: self.tree = None
+
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+    def nearest(self, lons, lats, k=1, max_distance=None):
+        """
+        Finds the k nodes closest to each lon/lat point.
+
+        Arguments
+        --------------------------------------------------------------------
+        lons, lats   : scalar coordinates of a single point or arrays of
+                       coordinates for multiple points
+        k            : number of nodes to find for each point
+        max_distance : when not None, nodes farther than this are ignored
+
+        Returns
+        --------------------------------------------------------------------
+        tuple : (distances, y indexes, x indexes) in order of increasing
+                distance. For a single point with k == 1, these are
+                scalars. Otherwise they are arrays with the shape of the
+                input points plus a trailing dimension of size k when k > 1.
+                Missing neighbors have an infinite distance and indexes
+                of -1.
+        """
+        lons = N.asarray(lons, dtype=float)
+        lats = N.asarray(lats, dtype=float)
+        points_shape = lons.shape
+        points = N.column_stack((lons.ravel(), lats.ravel()))
+
+        if max_distance is None: upper_bound = N.inf
+        else: upper_bound = float(max_distance)
+
+        if self.tree is not None:
+            distances, nodes = self.tree.query(points, k=k,
+                                         distance_upper_bound=upper_bound)
+        else: distances, nodes = self._bruteForceQuery(points, k, upper_bound)
+
+        distances = distances.reshape(points.shape[:1] + (k,))
+        nodes = nodes.reshape(points.shape[:1] + (k,))
+        y, x = self.gridIndexes(nodes)
+
+        if k == 1:
+            distances = distances[:,0]
+            y = y[:,0]
+            x = x[:,0]
+            if len(points_shape) == 0: return distances[0], y[0], x[0]
+            result_shape = points_shape
+        else: result_shape = points_shape + (k,)
+
+        return (distances.reshape(result_shape), y.reshape(result_shape),
+                x.reshape(result_shape))
+
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+    def nearestNode(self, lon, lat, max_distance=None):
+        """
+        Returns tuple (y, x, distance) for the node closest to a single
+        lon/lat point. y and x are None when there is no node within
+        max_distance of the point.
+        """
+        distance, y, x = self.nearest(lon, lat, 1, max_distance)
+        if y < 0: return None, None, distance
+        return int(y), int(x), distance
+
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+    def withinRadius(self, lon, lat, radius):
+        """
+        Returns tuple (distances, y indexes, x indexes) for all nodes
+        within radius of a single lon/lat point, in order of increasing
+        distance.
+        """
+        if self.tree is not None:
+            nodes = N.array(self.tree.query_ball_point((lon, lat), radius),
+                            dtype=int)
+        else:
+            nodes = N.where(self._distances(lon, lat) <= radius)[0]
+
+        distances = self._distances(lon, lat, nodes)
+        order = N.argsort(distances, kind='mergesort')
+        nodes = nodes[order]
+        y, x = self.gridIndexes(nodes)
+        return distances[order], y, x
+
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+    def gridIndexes(self, nodes):
+        """
+        Converts node numbers in the index to y, x indexes in the grid.
+        Node numbers outside the index are returned as -1.
+        """
+        nodes = N.asarray(nodes, dtype=int)
+        missing = nodes >= self.num_nodes
+        if missing.any():
+            nodes = nodes.copy()
+            nodes[missing] = 0
+        if self.node_indexes is not None: flat = self.node_indexes[nodes]
+        else: flat = nodes
+        y, x = N.unravel_index(flat, self.grid_shape)
+        if missing.any():
+            y[missing] = -1
+            x[missing] = -1
+        return y, x
+
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+    def _distances(self, lon, lat, nodes=None):
+        if nodes is None: coords = self.coords
+        else: coords = self.coords[nodes]
+        lon_diffs = coords[:,0] - lon
+        lat_diffs = coords[:,1] - lat
+        return N.sqrt( (lon_diffs * lon_diffs) + (lat_diffs * lat_diffs) )
+
+    def _bruteForceQuery(self, points, k, upper_bound):
+        num_points = len(points)
+        distances = N.empty((num_points, k), dtype=float)
+        nodes = N.empty((num_points, k), dtype=int)
+        chunk = max(1, BRUTE_FORCE_CHUNK // max(1, self.num_nodes))
+        for start in range(0, num_points, chunk):
+            end = min(start + chunk, num_points)
+            lon_diffs = self.coords[:,0] - points[start:end,0][:,N.newaxis]
+            lat_diffs = self.coords[:,1] - points[start:end,1][:,N.newaxis]
+            dists = N.sqrt( (lon_diffs * lon_diffs) + (lat_diffs * lat_diffs) )
+            if k < self.num_nodes:
+                closest = N.argpartition(dists, k-1, axis=1)[:,:k]
+            else: closest = N.tile(N.arange(self.num_nodes), (end-start, 1))
+            rows = N.arange(end-start)[:,N.newaxis]
+            order = N.argsort(dists[rows, closest], axis=1, kind='mergesort')
+            closest = closest[rows, order]
+            # pad when k is larger than the number of nodes
+            chunk_dists = N.empty((end-start, k), dtype=float)
+            chunk_dists.fill(N.inf)
+            chunk_nodes = N.empty((end-start, k), dtype=int)
+            chunk_nodes.fill(self.num_nodes)
+            found = closest.shape[1]
+            chunk_dists[:,:found] = dists[rows, closest]
+            chunk_nodes[:,:found] = closest
+            beyond = chunk_dists > upper_bound
+            chunk_dists[beyond] = N.inf
+            chunk_nodes[beyond] = self.num_nodes
+            distances[start:end] = chunk_dists
+            nodes[start:end] = chunk_nodes
+        return distances, nodes
+
+
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+def nodeIndexFilepath(grid_filepath):
+    return grid_filepath + NODE_INDEX_FILE_EXTENSION
+
+def _fileSignature(filepath):
+    stat = os.stat(filepath)
+    return '%d %d' % (stat.st_size, int(stat.st_mtime))
+
+def _loadNodeIndex(grid_filepath, signature, grid_shape):
+    index_filepath = nodeIndexFilepath(grid_filepath)
+    if not os.path.exists(index_filepath): return None
+    try:
+        index_file = open(index_filepath, 'rb')
+        try:
+            version, index_signature, node_index = cPickle.load(index_file)
+        finally:
+            index_file.close()
+    except Exception:
+        return None
+    if version != NODE_INDEX_VERSION or index_signature != signature:
+        return None
+    if node_index.grid_shape != grid_shape: return None
+    # index was saved by a process with a different scipy availability
+    if (node_index.tree is None) != (_cKDTree() is None): return None
+    return node_index
+
+def _saveNodeIndex(grid_filepath, signature, node_index):
+    index_filepath = nodeIndexFilepath(grid_filepath)
+    try:
+        index_file = open(index_filepath + '.tmp', 'wb')
+        try:
+            cPickle.dump((NODE_INDEX_VERSION, signature, node_index),
+                         index_file, cPickle.HIGHEST_PROTOCOL)
+        finally:
+            index_file.close()
+        os.rename(index_filepath + '.tmp', index_filepath)
+    except Exception:
+        # read-only directory or unpicklable tree, keep in-memory index
+        if os.path.exists(index_filepath + '.tmp'):
+            try: os.remove(index_filepath + '.tmp')
+            except OSError: pass
+
+def _cacheNodeIndex(key, entry):
+    if key not in NODE_INDEX_CACHE:
+        NODE_INDEX_CACHE_ORDER.append(key)
+        while len(NODE_INDEX_CACHE_ORDER) > NODE_INDEX_CACHE_SIZE:
+            del NODE_INDEX_CACHE[NODE_INDEX_CACHE_ORDER.pop(0)]
+    NODE_INDEX_CACHE[key] = entry
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+def gridNodeIndex(lons, lats, grid_filepath=None):
+    """
+    Returns the GridNodeIndex for a pair of lon/lat grids. Indexes are
+    cached in process for the same pair of grid arrays. When grid_filepath
+    is the path of the file the coordinate grids were read from, the index
+    is also saved next to that file and reused until the file's size or
+    modification time changes.
+    """
+    lons = N.asarray(lons)
+    if grid_filepath is not None and os.path.exists(grid_filepath):
+        grid_filepath = os.path.abspath(grid_filepath)
+        signature = _fileSignature(grid_filepath)
+        key = (grid_filepath, signature)
+        entry = NODE_INDEX_CACHE.get(key, None)
+        if entry is not None and entry.grid_shape == lons.shape: return entry
+
+        node_index = _loadNodeIndex(grid_filepath, signature, lons.shape)
+        if node_index is None:
+            node_index = GridNodeIndex(lons, lats)
+            _saveNodeIndex(grid_filepath, signature, node_index)
+        _cacheNodeIndex(key, node_index)
+        return node_index
+
+    # grids not associated with a file are cached by the identity of the
+    # arrays. Weak references confirm that a cached entry belongs to the
+    # arrays passed in and not to dead arrays that had the same ids, without
+    # keeping the grids alive. Grids that are changed in place must not be
+    # passed again after their index was built.
+    lats = N.asarray(lats)
+    key = (id(lons), id(lats))
+    entry = NODE_INDEX_CACHE.get(key, None)
+    if entry is not None:
+        lons_ref, lats_ref, node_index = entry
+        if lons_ref() is lons and lats_ref() is lats: return node_index
+
+    node_index = GridNodeIndex(lons, lats)
+    _cacheNodeIndex(key, (weakref.ref(lons), weakref.ref(lats), node_index))
+    return node_index
@@ -1,9 +1,10 @@
 
 import math
-import sys
 
 import numpy as N
 
+from atmosci.utils.nodeindex import gridNodeIndex
+
 # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
 
 RELATIVE_INDEXES = {  9 : ( (-1, -1, -1,  0, 0, 0,  1, 1, 1),
@@ -21,15 +22,24 @@ RELATIVE_INDEXES = {  9 : ( (-1, -1, -1,  0, 0, 0,  1, 1, 1),
 # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
 
 def indexOfClosestNode(target_lon, target_lat, lon_grid, lat_grid, radius):
-    indexes = N.where( (lon_grid >= (target_lon-radius)) &
-                       (lon_grid <= (target_lon+radius)) &
-                       (lat_grid >= (target_lat-radius)) &
-                       (lat_grid <= (target_lat+radius)) )
-    lon_diffs = lon_grid[indexes] - target_lon
-    lat_diffs = lat_grid[indexes] - target_lat
-    distances = N.sqrt( (lon_diffs * lon_diffs) + (lat_diffs * lat_diffs) )
-    indx = N.where(distances == distances.min())[0][0]
-    return indexes[0][indx], indexes[1][indx]
+    node_index = gridNodeIndex(lon_grid, lat_grid)
+    distance, y, x = node_index.nearest(target_lon, target_lat)
+    if y < 0 or abs(lon_grid[y,x] - target_lon) > radius \
+    or abs(lat_grid[y,x] - target_lat) > radius:
+        errmsg = 'No grid node within %s degrees of (%s, %s)'
+        raise ValueError, errmsg % (radius, target_lon, target_lat)
+    return y, x
+
+def indexesOfClosestNodes(target_lons, target_lats, lon_grid, lat_grid,
+                          radius=None):
+    """ Returns arrays of y and x indexes for the grid node closest to
+    each target point. Points that are not within radius of any node
+    have indexes of -1.
+    """
+    node_index = gridNodeIndex(lon_grid, lat_grid)
+    distances, y, x = node_index.nearest(target_lons, target_lats,
+                                         max_distance=radius)
+    return y, x
 
 def indexesOfNeighborNodes(target_lon, target_lat, relative_nodes,
                            lon_grid, lat_grid, radius):
@@ -51,8 +61,8 @@ def indexesOfNeighborNodes(target_lon, target_lat, relative_nodes,
                 y_indexes = [y+1, y+1, y, y]
                 x_indexes = [x+1, x, x, x+1]
             else: # on east/west edge of two grids
-                y_indexes = [ y+closest_y for y in RELATIVE_INDEXES[9][0] ]
-                x_indexes = [ x+closest_x for x in RELATIVE_INDEXES[9][1] ]
+                y_indexes = [ y+offset for offset in RELATIVE_INDEXES[9][0] ]
+                x_indexes = [ x+offset for offset in RELATIVE_INDEXES[9][1] ]
 
         elif target_lon > near_lon: # west half of grid
             if target_lat < near_lat: # north west quadrant of grid
@@ -62,12 +72,12 @@ def indexesOfNeighborNodes(target_lon, target_lat, relative_nodes,
                 y_indexes = [y+1, y+1, y, y]
                 x_indexes = [x, x+1, x+1, x]
             else: # on east/west edge of two grids
-                y_indexes = [ y+closest_y for y in RELATIVE_INDEXES[9][0] ]
-                x_indexes = [ x+closest_x for x in RELATIVE_INDEXES[9][1] ]
+                y_indexes = [ y+offset for offset in RELATIVE_INDEXES[9][0] ]
+                x_indexes = [ x+offset for offset in RELATIVE_INDEXES[9][1] ]
 
         else: # on north/south edge of two grids
-            y_indexes = [ y+closest_y for y in RELATIVE_INDEXES[9][0] ]
-            x_indexes = [ x+closest_x for x in RELATIVE_INDEXES[9][1] ]
+            y_indexes = [ y+offset for offset in RELATIVE_INDEXES[9][0] ]
+            x_indexes = [ x+offset for offset in RELATIVE_INDEXES[9][1] ]
 
     return [ y_indexes, x_indexes ]
 
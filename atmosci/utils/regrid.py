@@ -0,0 +1,317 @@
+""" Precomputed weight tables for regridding data from a source grid (e.g.
+an NDFD grib) to the nodes of a target grid (e.g. an ACIS grid).
+
+Each target node has a fixed number of source nodes (neighbors) and a
+weight for each of them. Tables are computed once from the lon/lat grids
+and stored in the target grid's static file. Applying a table to a stack
+of source grids is then a single gather followed by a sparse matrix
+product, regardless of the number of grids in the stack.
+
+Supported methods :
+
+    nearest  : the closest source node, weight = 1
+    bilinear : the 4 corners of the source grid cell containing the target
+               node. Targets outside the source grid use the closest node.
+    idw      : k closest source nodes weighted by inverse distance
+"""
+
+import numpy as N
+try:
+    from scipy import sparse
+except ImportError:
+    sparse = None
+
+from atmosci.utils.nodeindex import GridNodeIndex
+
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+REGRID_METHODS = ('nearest', 'bilinear', 'idw')
+
+# number of target nodes processed at once when building tables
+REGRID_BLOCK_SIZE = 250000
+
+# Newton iterations used to locate target nodes inside source grid cells
+BILINEAR_ITERATIONS = 8
+# fractional cell coordinates within this tolerance of 0 or 1 are inside
+BILINEAR_TOLERANCE = 1e-6
+
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+class RegridWeights(object):
+    """
+    Weight table that maps values on a source grid to a target grid.
+
+    Arguments
+    --------------------------------------------------------------------
+    method       : name of the method used to compute the weights
+    grid_shape   : shape of the target grid
+    source_shape : shape of the source grid
+    indexes      : (target nodes, neighbors) array of flat indexes into
+                   the source grid
+    weights      : (target nodes, neighbors) array of weights. Weights
+                   for each target node sum to 1.
+    """
+
+    def __init__(self, method, grid_shape, source_shape, indexes, weights):
+        self.method = method
+        self.grid_shape = tuple(grid_shape)
+        self.source_shape = tuple(source_shape)
+        indexes = N.asarray(indexes).reshape(-1, N.shape(indexes)[-1])
+        self.weights = N.asarray(weights, dtype=float).reshape(indexes.shape)
+        self.num_neighbors = indexes.shape[1]
+        # targets without any usable source node have no weight
+        self._unmatched = ~(self.weights.sum(axis=1) > 0.)
+
+        # only the source nodes that are actually used are gathered
+        self.source_nodes, columns = N.unique(indexes, return_inverse=True)
+        self.indexes = indexes
+        self._columns = columns.reshape(indexes.shape)
+        if sparse is not None:
+            num_targets = indexes.shape[0]
+            rows = N.repeat(N.arange(num_targets), self.num_neighbors)
+            self._matrix = sparse.csr_matrix(
+                (self.weights.ravel(), (rows, self._columns.ravel())),
+                shape=(num_targets, len(self.source_nodes)))
+        else: self._matrix = None
+
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+    def gather(self, data):
+        """ Returns the values at the source nodes used by the table.
+        data may be a single source grid or a stack of them with the time
+        dimension first.
+        """
+        data = N.asarray(data)
+        source_size = N.prod(self.source_shape)
+        stack = data.reshape((-1, source_size))
+        return stack.take(self.source_nodes, axis=1)
+
+    def apply(self, data, out=None):
+        """ Regrids a single source grid or a stack of source grids with
+        time as the first dimension. Non-finite source values are excluded
+        and the weights of the remaining neighbors are normalized.
+
+        Returns array with shape grid_shape or (times,) + grid_shape.
+        """
+        data = N.asarray(data)
+        # a stack with a single time step keeps its time dimension
+        if data.ndim > len(self.source_shape): leading = data.shape[:1]
+        else: leading = ()
+        result = self.applyToGathered(self.gather(data))
+        result = result.reshape(leading + self.grid_shape)
+        if out is None: return result
+        out[...] = result
+        return out
+
+    def offsetSource(self, origin, source_shape):
+        """ Returns a copy of the table with indexes into a larger source
+        grid with shape source_shape. origin is the (row, column) of this
+        table's first source node in the larger grid, e.g. the minimum
+        indexes of a grib region within the full grib.
+        """
+        rows, columns = N.unravel_index(self.indexes, self.source_shape)
+        indexes = N.ravel_multi_index((rows + origin[0], columns + origin[1]),
+                                      tuple(source_shape))
+        return RegridWeights(self.method, self.grid_shape, source_shape,
+                             indexes, self.weights)
+
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+    def applyToGathered(self, gathered):
+        """ Regrids a (times, len(source_nodes)) array returned by gather.
+        Returns a (times, target nodes) array.
+        """
+        valid = N.isfinite(gathered)
+        values = N.where(valid, gathered, 0.)
+        if self._matrix is not None:
+            # (targets x sources) x (sources x times), one product per stack
+            totals = N.asarray(self._matrix.dot(values.T)).T
+            if not valid.all():
+                norms = N.asarray(self._matrix.dot(valid.T.astype(float))).T
+        else:
+            totals = N.empty((len(values), len(self.indexes)), dtype=float)
+            norms = N.empty(totals.shape, dtype=float)
+            for step in range(len(values)):
+                totals[step] = (values[step][self._columns] *
+                                self.weights).sum(axis=1)
+                norms[step] = (valid[step][self._columns] *
+                               self.weights).sum(axis=1)
+        if valid.all():
+            totals[:,self._unmatched] = N.nan
+            return totals
+        with N.errstate(divide='ignore', invalid='ignore'):
+            return N.where(norms > 0., totals / norms, N.nan)
+
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+def _nodeIndex(source_lons, source_lats, node_index):
+    if node_index is None: return GridNodeIndex(source_lons, source_lats)
+    return node_index
+
+def _blocks(size):
+    for start in range(0, size, REGRID_BLOCK_SIZE):
+        yield start, min(start + REGRID_BLOCK_SIZE, size)
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+def nearestWeights(lons, lats, source_lons, source_lats, node_index=None):
+    """ Weight table that uses the closest source node for each target.
+    """
+    node_index = _nodeIndex(source_lons, source_lats, node_index)
+    distances, y, x = node_index.nearest(N.ravel(lons), N.ravel(lats))
+    missing = y < 0
+    y[missing] = 0
+    x[missing] = 0
+    weights = N.ones((len(y), 1))
+    weights[missing] = 0.
+    indexes = N.ravel_multi_index((y, x), source_lons.shape)
+    return RegridWeights('nearest', lons.shape, source_lons.shape,
+                         indexes[:,N.newaxis], weights)
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+def idwWeights(lons, lats, source_lons, source_lats, k=4, power=2.,
+               node_index=None):
+    """ Weight table that uses the k closest source nodes for each target,
+    weighted by 1 / distance**power. Targets that coincide with a source
+    node use only that node.
+    """
+    node_index = _nodeIndex(source_lons, source_lats, node_index)
+    flat_lons = N.ravel(lons)
+    flat_lats = N.ravel(lats)
+    indexes = N.empty((len(flat_lons), k), dtype=N.int64)
+    weights = N.empty((len(flat_lons), k), dtype=float)
+
+    for start, end in _blocks(len(flat_lons)):
+        distances, y, x = node_index.nearest(flat_lons[start:end],
+                                             flat_lats[start:end], k)
+        distances = distances.reshape(-1, k)
+        y = y.reshape(-1, k)
+        x = x.reshape(-1, k)
+        missing = y < 0
+        y[missing] = 0
+        x[missing] = 0
+        with N.errstate(divide='ignore'):
+            block = 1. / (distances ** power)
+        block[missing] = 0.
+        exact = distances[:,0] == 0.
+        block[exact] = 0.
+        block[exact,0] = 1.
+        weights[start:end] = block / block.sum(axis=1)[:,N.newaxis]
+        indexes[start:end] = N.ravel_multi_index((y, x), source_lons.shape)
+
+    return RegridWeights('idw', lons.shape, source_lons.shape, indexes,
+                         weights)
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+def _cellCoordinates(lons, lats, corner_lons, corner_lats):
+    """ Solves for the fractional position (s, t) of each point inside the
+    cell with corners [(y,x), (y,x+1), (y+1,x), (y+1,x+1)] using Newton's
+    method on the bilinear mapping, which works for the curvilinear
+    cells of projected grids.
+    """
+    a_lon = corner_lons[0]
+    b_lon = corner_lons[1] - corner_lons[0]
+    c_lon = corner_lons[2] - corner_lons[0]
+    d_lon = corner_lons[3] - corner_lons[1] - corner_lons[2] + corner_lons[0]
+    a_lat = corner_lats[0]
+    b_lat = corner_lats[1] - corner_lats[0]
+    c_lat = corner_lats[2] - corner_lats[0]
+    d_lat = corner_lats[3] - corner_lats[1] - corner_lats[2] + corner_lats[0]
+
+    s = N.empty(lons.shape, dtype=float)
+    s.fill(0.5)
+    t = s.copy()
+    with N.errstate(divide='ignore', invalid='ignore'):
+        for iteration in range(BILINEAR_ITERATIONS):
+            f_lon = a_lon + (b_lon * s) + (c_lon * t) + (d_lon * s * t) - lons
+            f_lat = a_lat + (b_lat * s) + (c_lat * t) + (d_lat * s * t) - lats
+            ds_lon = b_lon + (d_lon * t)
+            dt_lon = c_lon + (d_lon * s)
+            ds_lat = b_lat + (d_lat * t)
+            dt_lat = c_lat + (d_lat * s)
+            determinant = (ds_lon * dt_lat) - (dt_lon * ds_lat)
+            s = s - (((dt_lat * f_lon) - (dt_lon * f_lat)) / determinant)
+            t = t - (((ds_lon * f_lat) - (ds_lat * f_lon)) / determinant)
+    return s, t
+
+def bilinearWeights(lons, lats, source_lons, source_lats, node_index=None):
+    """ Weight table that interpolates from the 4 corners of the source
+    grid cell that contains each target node. Targets that are not inside
+    any source cell use the closest source node.
+    """
+    node_index = _nodeIndex(source_lons, source_lats, node_index)
+    num_rows, num_cols = source_lons.shape
+    flat_lons = N.ravel(lons).astype(float)
+    flat_lats = N.ravel(lats).astype(float)
+    indexes = N.empty((len(flat_lons), 4), dtype=N.int64)
+    weights = N.empty((len(flat_lons), 4), dtype=float)
+
+    for start, end in _blocks(len(flat_lons)):
+        block_lons = flat_lons[start:end]
+        block_lats = flat_lats[start:end]
+        distances, near_y, near_x = node_index.nearest(block_lons, block_lats)
+
+        # default to the nearest node
+        found = N.zeros(len(block_lons), dtype=bool)
+        cell_y = near_y.copy()
+        cell_x = near_x.copy()
+        cell_weights = N.zeros((len(block_lons), 4), dtype=float)
+        cell_weights[:,0] = 1.
+
+        # the containing cell is one of the 4 that share the nearest node
+        for offset_y, offset_x in ((-1,-1), (-1,0), (0,-1), (0,0)):
+            y = near_y + offset_y
+            x = near_x + offset_x
+            usable = (~found & (near_y >= 0) & (y >= 0) & (y < num_rows-1) &
+                      (x >= 0) & (x < num_cols-1))
+            if not usable.any(): continue
+            y = y[usable]
+            x = x[usable]
+            corners = ((y,x), (y,x+1), (y+1,x), (y+1,x+1))
+            s, t = _cellCoordinates(block_lons[usable], block_lats[usable],
+                                    [source_lons[c] for c in corners],
+                                    [source_lats[c] for c in corners])
+            inside = ((s >= -BILINEAR_TOLERANCE) & (s <= 1.+BILINEAR_TOLERANCE) &
+                      (t >= -BILINEAR_TOLERANCE) & (t <= 1.+BILINEAR_TOLERANCE))
+            s = N.clip(s[inside], 0., 1.)
+            t = N.clip(t[inside], 0., 1.)
+            targets = N.where(usable)[0][inside]
+            cell_y[targets] = y[inside]
+            cell_x[targets] = x[inside]
+            cell_weights[targets] = N.column_stack(((1.-s)*(1.-t), s*(1.-t),
+                                                    (1.-s)*t, s*t))
+            found[targets] = True
+
+        # corners of cells that do not contain the target have 0 weight
+        cell_y = N.clip(cell_y, 0, num_rows-2)
+        cell_x = N.clip(cell_x, 0, num_cols-2)
+        near = ~found
+        corner_y = N.column_stack((cell_y, cell_y, cell_y+1, cell_y+1))
+        corner_x = N.column_stack((cell_x, cell_x+1, cell_x, cell_x+1))
+        corner_y[near,0] = N.maximum(near_y[near], 0)
+        corner_x[near,0] = N.maximum(near_x[near], 0)
+        indexes[start:end] = N.ravel_multi_index((corner_y, corner_x),
+                                                 source_lons.shape)
+        weights[start:end] = cell_weights
+
+    return RegridWeights('bilinear', lons.shape, source_lons.shape, indexes,
+                         weights)
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+def regridWeights(method, lons, lats, source_lons, source_lats, **kwargs):
+    """ Computes the weight table for one of the REGRID_METHODS.
+    """
+    node_index = kwargs.get('node_index', None)
+    if method == 'nearest':
+        return nearestWeights(lons, lats, source_lons, source_lats, node_index)
+    elif method == 'bilinear':
+        return bilinearWeights(lons, lats, source_lons, source_lats, node_index)
+    elif method == 'idw':
+        return idwWeights(lons, lats, source_lons, source_lats,
+                          kwargs.get('k', 4), kwargs.get('power', 2.),
+                          node_index)
+    errmsg = 'Unsupported regrid method "%s". Must be one of %s'
+    raise ValueError, errmsg % (method, str(REGRID_METHODS))
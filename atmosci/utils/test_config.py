@@ -0,0 +1,87 @@
+""" Regression tests for compiled path lookups in atmosci.utils.config
+
+    python -m pytest atmosci/utils/test_config.py
+"""
+
+import cPickle
+
+from atmosci.utils.config import ConfigObject
+
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+PATHS = ('regions', 'regions.NE', 'regions.NE.description', 'regions.NE.data',
+         'sources.ndfd.tag', 'sources.ndfd.grid.shape', 'project.root',
+         'config.project.root', 'regions.NE.missing')
+
+def buildConfig(name='config'):
+    config = ConfigObject(name, None)
+    config.regions = { 'NE': { 'description':'Northeast',
+                               'data':'-82.7,37.2,-66.9,47.6' } }
+    config.sources = { 'ndfd': { 'tag':'NDFD', 'grid':{ 'shape':(5,7) } } }
+    config.project = { 'root':'/tmp/ndfd' }
+    return config
+
+def lookups(config):
+    return [config.get(path, None) for path in PATHS]
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+def test_compiled_lookups_match_tree_walk():
+    config = buildConfig()
+    walked = lookups(config)
+    config.compile()
+    assert config.isCompiled()
+    assert lookups(config) == walked
+    assert config.regions.NE.description == 'Northeast'
+    assert config['sources.ndfd.grid.shape'] == (5,7)
+    assert config.regions.NE.isCompiled()
+
+def test_changes_discard_compiled_paths():
+    config = buildConfig().compile()
+    assert config.regions.NE.description == 'Northeast'
+    region = config.regions.NE
+    assert region.description == 'Northeast'
+    config.regions.NE.description = 'New England'
+    assert config['regions.NE.description'] == 'New England'
+    assert region.description == 'New England'
+    del config['regions.NE']
+    assert config.get('regions.NE', None) is None
+
+def test_other_trees_keep_compiled_paths():
+    config = buildConfig().compile()
+    assert config.project.root == '/tmp/ndfd'
+    lookup = config.__dict__['__LOOKUP__']
+    assert 'project.root' in lookup[1]
+
+    other = buildConfig('other')
+    other.project.root = '/tmp/other'
+    other.newChild('extra')
+    other.copy()
+    ConfigObject('unrelated', None, 'child', value=1)
+
+    assert config.project.root == '/tmp/ndfd'
+    assert config.__dict__['__LOOKUP__'] is lookup
+    assert 'project.root' in lookup[1]
+
+def test_construction_does_not_change_generation():
+    config = buildConfig()
+    generation = config._generation_()
+    ConfigObject('unattached', None)
+    config.regions.NE.copy()
+    assert config._generation_() is generation
+
+def test_copies_stay_compiled():
+    config = buildConfig().compile()
+    copy = config.copy()
+    assert copy.isCompiled()
+    assert lookups(copy) == lookups(config)
+    copy.project.root = '/tmp/copy'
+    assert copy.project.root == '/tmp/copy'
+    assert config.project.root == '/tmp/ndfd'
+
+def test_pickled_config_is_not_compiled():
+    config = buildConfig().compile()
+    lookups(config)
+    unpickled = cPickle.loads(cPickle.dumps(config, cPickle.HIGHEST_PROTOCOL))
+    assert not unpickled.isCompiled()
+    assert lookups(unpickled) == lookups(config)
@@ -0,0 +1,66 @@
+""" Regression tests for atmosci.utils.gridstats
+
+    python -m pytest atmosci/utils/test_gridstats.py
+"""
+
+import warnings
+
+import numpy as N
+
+from atmosci.utils.gridstats import blockMedian, blockStatistics, \
+                                    fillStatsFields
+
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+def block(num_hours=6, shape=(20,30)):
+    return N.random.RandomState(4).normal(50., 10., (num_hours,) + shape)
+
+def nanMedians(flat_block):
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        return N.nanmedian(flat_block, axis=1)
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+def test_median_without_missing_values():
+    flat_block = block().reshape(6, -1)
+    N.testing.assert_allclose(blockMedian(flat_block),
+                              N.median(flat_block, axis=1))
+
+def test_median_of_masked_grids():
+    data = block()
+    # the same nodes are missing at every hour
+    data[:,:5,:] = N.nan
+    data[:,:,-3:] = N.nan
+    flat_block = data.reshape(6, -1)
+    N.testing.assert_allclose(blockMedian(flat_block), nanMedians(flat_block))
+
+def test_median_with_scattered_missing_values():
+    data = block()
+    data[:,:5,:] = N.nan
+    data[2,10,10] = N.nan
+    data[4] = N.nan
+    flat_block = data.reshape(6, -1)
+    medians = blockMedian(flat_block)
+    assert N.isnan(medians[4])
+    N.testing.assert_allclose(medians, nanMedians(flat_block))
+
+def test_input_is_not_modified():
+    data = block()
+    data[:,0,0] = N.nan
+    original = data.copy()
+    blockStatistics(data)
+    N.testing.assert_array_equal(data, original)
+
+def test_fill_stats_fields():
+    data = block(3)
+    data[:,:2,:] = N.nan
+    records = N.zeros((3,), dtype=[('hour','S10'), ('min',float),
+                                   ('max',float), ('mean',float),
+                                   ('median',float), ('source','S10')])
+    assert fillStatsFields(records, 1, data) == 5
+    flat_block = data.reshape(3, -1)
+    N.testing.assert_allclose(records['min'], N.nanmin(flat_block, axis=1))
+    N.testing.assert_allclose(records['max'], N.nanmax(flat_block, axis=1))
+    N.testing.assert_allclose(records['mean'], N.nanmean(flat_block, axis=1))
+    N.testing.assert_allclose(records['median'], nanMedians(flat_block))
@@ -0,0 +1,97 @@
+""" Regression tests for atmosci.utils.nodeindex and the proximity
+functions that use it
+
+    python -m pytest atmosci/utils/test_nodeindex.py
+"""
+
+import gc
+import weakref
+
+import numpy as N
+import h5py
+
+from atmosci.hdf5 import grid
+from atmosci.hdf5.grid import Hdf5GridFileManager
+from atmosci.utils import nodeindex
+from atmosci.utils.nodeindex import GridNodeIndex, gridNodeIndex
+from atmosci.utils.proximity import indexOfClosestNode, indexesOfNeighborNodes
+
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+def grids(offset=0.):
+    return N.meshgrid(N.linspace(-80., -70., 41) + offset,
+                      N.linspace(38., 45., 29))
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+def test_nearest_matches_brute_force():
+    lons, lats = grids()
+    node_index = GridNodeIndex(lons, lats)
+    points = N.random.RandomState(2).uniform(size=(50,2))
+    target_lons = -80. + (points[:,0] * 10.)
+    target_lats = 38. + (points[:,1] * 7.)
+    distances, y, x = node_index.nearest(target_lons, target_lats)
+    for indx in range(50):
+        all_distances = N.hypot(lons - target_lons[indx],
+                                lats - target_lats[indx])
+        assert N.isclose(distances[indx], all_distances.min())
+        assert N.isclose(all_distances[y[indx],x[indx]], all_distances.min())
+
+def test_cache_is_keyed_on_grid_arrays(monkeypatch):
+    builds = [ ]
+    class CountingIndex(GridNodeIndex):
+        def __init__(self, lons, lats):
+            builds.append(1)
+            GridNodeIndex.__init__(self, lons, lats)
+    monkeypatch.setattr(nodeindex, 'GridNodeIndex', CountingIndex)
+    lons, lats = grids()
+    node_index = gridNodeIndex(lons, lats)
+    for lookup in range(5):
+        assert gridNodeIndex(lons, lats) is node_index
+    assert len(builds) == 1
+    # other arrays get their own index, contents are never compared
+    assert gridNodeIndex(lons.copy(), lats.copy()) is not node_index
+    assert len(builds) == 2
+
+def test_grid_reader_keeps_node_index(tmpdir, monkeypatch):
+    lons, lats = grids()
+    filepath = str(tmpdir.join('grid.h5'))
+    h5_file = h5py.File(filepath, 'w')
+    h5_file.create_dataset('lon', data=lons)
+    h5_file.create_dataset('lat', data=lats)
+    h5_file.close()
+
+    lookups = [ ]
+    def countingNodeIndex(lons, lats, grid_filepath=None):
+        lookups.append(grid_filepath)
+        return gridNodeIndex(lons, lats, grid_filepath)
+    monkeypatch.setattr(grid, 'gridNodeIndex', countingNodeIndex)
+    manager = Hdf5GridFileManager(filepath, 'a')
+    try:
+        for lon in (-75.05, -74.0, -71.3):
+            manager.ll2index(lon, 41.5)
+        assert manager.ll2index(-75.05, 41.5) == (14, 20)
+    finally:
+        manager.close()
+    assert lookups == [None]
+
+def test_cache_does_not_keep_grids_alive():
+    lons, lats = grids(0.5)
+    gridNodeIndex(lons, lats)
+    lons_ref = weakref.ref(lons)
+    del lons, lats
+    gc.collect()
+    assert lons_ref() is None
+
+def test_closest_and_neighbor_nodes():
+    lons, lats = grids()
+    y, x = indexOfClosestNode(-75.05, 41.5, lons, lats, 0.2)
+    assert (y, x) == (14, 20)
+    y_indexes, x_indexes = indexesOfNeighborNodes(-75.05, 41.5, 9, lons,
+                                                  lats, 0.2)
+    assert y_indexes == [13, 13, 13, 14, 14, 14, 15, 15, 15]
+    assert x_indexes == [19, 20, 21, 19, 20, 21, 19, 20, 21]
+    # on the east/west edge between two nodes
+    y_indexes, x_indexes = indexesOfNeighborNodes(lons[14,20], 41.6, 0,
+                                                  lons, lats, 0.2)
+    assert y_indexes == [13, 13, 13, 14, 14, 14, 15, 15, 15]
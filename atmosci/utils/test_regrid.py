@@ -0,0 +1,74 @@
+""" Regression tests for atmosci.utils.regrid
+
+    python -m pytest atmosci/utils/test_regrid.py
+"""
+
+import numpy as N
+
+from atmosci.utils.regrid import RegridWeights, regridWeights
+
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+def linearField(lons, lats):
+    return 12.5 + (0.75 * lons) - (1.25 * lats)
+
+def sourceGrid():
+    return N.meshgrid(N.linspace(-80., -70., 50), N.linspace(38., 45., 40))
+
+def targetGrid():
+    return N.meshgrid(N.linspace(-76.3, -74.1, 7), N.linspace(40.1, 41.5, 5))
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+def test_bilinear_reproduces_linear_field():
+    source_lons, source_lats = sourceGrid()
+    lons, lats = targetGrid()
+    weights = regridWeights('bilinear', lons, lats, source_lons, source_lats)
+    result = weights.apply(linearField(source_lons, source_lats))
+    assert result.shape == lons.shape
+    assert N.allclose(result, linearField(lons, lats))
+
+def test_weights_sum_to_one():
+    source_lons, source_lats = sourceGrid()
+    lons, lats = targetGrid()
+    for method in ('nearest', 'bilinear', 'idw'):
+        weights = regridWeights(method, lons, lats, source_lons, source_lats)
+        assert N.allclose(weights.weights.sum(axis=1), 1.)
+
+def test_apply_keeps_single_time_step():
+    source_lons, source_lats = sourceGrid()
+    lons, lats = targetGrid()
+    weights = regridWeights('nearest', lons, lats, source_lons, source_lats)
+    stack = linearField(source_lons, source_lats)[N.newaxis,:,:]
+    assert weights.apply(stack).shape == (1,) + lons.shape
+    assert weights.apply(stack[0]).shape == lons.shape
+    assert weights.apply(N.concatenate((stack, stack))).shape == \
+           (2,) + lons.shape
+
+def test_missing_neighbors_are_renormalized():
+    weights = RegridWeights('idw', (1,2), (1,3), [[0,1],[1,2]],
+                            [[0.5,0.5],[0.25,0.75]])
+    result = weights.apply(N.array([[N.nan, 2., 4.]]))
+    assert N.allclose(result, [[2., 3.5]])
+
+def test_offset_source_matches_region_table():
+    source_lons, source_lats = sourceGrid()
+    lons, lats = targetGrid()
+    region = (slice(10,30), slice(15,40))
+    weights = regridWeights('bilinear', lons, lats, source_lons[region],
+                            source_lats[region])
+    full = weights.offsetSource((10,15), source_lons.shape)
+    assert full.source_shape == source_lons.shape
+    field = linearField(source_lons, source_lats)
+    assert N.allclose(full.apply(field), weights.apply(field[region]))
+    assert N.allclose(full.apply(field), linearField(lons, lats))
+
+def test_unmatched_nearest_targets_are_missing():
+    source_lons, source_lats = sourceGrid()
+    lons, lats = targetGrid()
+    lons[1,2] = N.nan
+    weights = regridWeights('nearest', lons, lats, source_lons, source_lats)
+    assert weights.weights[N.ravel_multi_index((1,2), lons.shape),0] == 0.
+    result = weights.apply(linearField(source_lons, source_lats))
+    assert N.isnan(result[1,2])
+    assert N.isfinite(result).sum() == lons.size - 1
@@ -121,8 +121,8 @@ def convertUnits(data, from_units, to_units):
     # scaled unit conversions
     if '*' in from_units:
         from_units, from_scale =  from_units.split('*')
-        if data.dtype.kind == 'f': data /= float(from_scale)
-        elif data.dtype.kind == 'i': data /= int(from_scale)
+        if data.dtype.kind == 'f': data = data / float(from_scale)
+        elif data.dtype.kind == 'i': data = data / int(from_scale)
         if from_units == to_units: return data
 
     if '*' in to_units: to_units, to_scale = to_units.split('*')
@@ -137,8 +137,8 @@ def convertUnits(data, from_units, to_units):
             raise ValueError, errmsg % (from_units, to_units)
 
     if to_scale is not None:
-        if data.dtype.kind == 'f': data *= float(to_scale)
-        elif data.dtype.kind == 'i': data *= int(to_scale)
+        if data.dtype.kind == 'f': data = data * float(to_scale)
+        elif data.dtype.kind == 'i': data = data * int(to_scale)
     return data
 
 def getConversionFunction(from_units, to_units):
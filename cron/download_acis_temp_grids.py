@@ -14,6 +14,8 @@ from atmosci.tempexts.factory import TempextsProjectFactory
 from optparse import OptionParser
 parser = OptionParser()
 
+parser.add_option('-c', action='store', dest='cache_dir', default=None,
+                  help='directory for cached ACIS responses')
 parser.add_option('-d', action='store_true', dest='dev_mode', default=False)
 parser.add_option('-f', action='store_true', dest='update_forecast',
                   default=False)
@@ -122,7 +124,8 @@ warnings.filterwarnings('ignore',"Mean of empty slice")
 #data = factory.getAcisGridData(int(acis_grid), 'mint,maxt', start_date,
 data = factory.getAcisGridData(int(acis_grid), 'mint,maxt', start_date,
                                end_date, False, bbox=region.data, 
-                               verbose=verbose, debug=debug)
+                               cache=options.cache_dir, verbose=verbose,
+                               debug=debug)
 print 'mint', data['mint'].shape
 if debug: print '       -999 :', N.where(data['mint'] == -999)
 data['mint'][N.where(data['mint'] == -999)] = -32768
@@ -1,6 +1,6 @@
 #! /Volumes/Transport/venv2/ndfd/bin/python
 
-import os, sys
+import sys
 import subprocess, shlex
 import warnings
 
@@ -27,9 +27,11 @@ from optparse import OptionParser
 parser = OptionParser()
 
 parser.add_option('-r', action='store', dest='grid_region',
-                        default=CONFIG.sources.ndfd.grid.region)
+                        default=CONFIG.sources.ndfd.grid.region,
+                        help='grid region or comma separated list of regions')
 parser.add_option('-s', action='store', dest='grid_source',
-                        default=CONFIG.sources.ndfd.grid.source)
+                        default=CONFIG.sources.ndfd.grid.source,
+                        help='grid source or comma separated list of sources')
 parser.add_option('-t', action='store', dest='timespan', default=None)
 
 parser.add_option('-d', action='store_true', dest='dev_mode', default=False)
@@ -87,8 +89,13 @@ grib_region = smart_grib.regionConfig(grib_region_key)
 
 grid_factory = NdfdGridFileFactory()
 if dev_mode: grid_factory.useDirpathsForMode('dev')
-grid_region = grid_factory.regionConfig(grid_region_key)
-grid_source = grid_factory.sourceConfig(grid_source_key)
+# every region x source combination is updated from a single decode
+grid_regions = [grid_factory.regionConfig(key.strip())
+                for key in grid_region_key.split(',')]
+grid_sources = [grid_factory.sourceConfig(key.strip())
+                for key in grid_source_key.split(',')]
+targets = [(grid_region, grid_source) for grid_region in grid_regions
+                                      for grid_source in grid_sources]
 grid_dataset = grid_factory.ndfdGridDatasetName(variable)
 
 # filter annoying numpy warnings
@@ -104,50 +111,25 @@ if timespan is None:
     timespans = ('001-003','004-007')
 else: timespans = (timespan,)
 
-units, data = smart_grib.dataForRegion(target_date, variable, timespans,
-                         grid_region, grid_source, fill_gaps, graceful_fail,
-                         debug)
+units, blocks = \
+    smart_grib.forecastBlocksForTargets(target_date, variable, timespans,
+                                        targets, fill_gaps, debug)
 
-if len(data) == 0:
+fcast_start, block, codes = blocks[0]
+if block.shape[0] == 0 or not N.any(codes):
     print 'NO DATA AVAILABLE FOR %s %s' % (str(target_date), timespan)
     exit()
 
-fcast_start = data[0][1]
-if len(data) > 1:
-    fcast_end = data[-1][1]
-else: fcast_end = fcast_start
-
-fcast_date = fcast_start.date()
-filepath = grid_factory.ndfdGridFilepath(fcast_date, variable, grid_region)
-if not os.path.exists(filepath):
-    grid_factory.buildForecastGridFile(fcast_date, variable, region=grid_region)
-manager = grid_factory.ndfdGridFileManager(fcast_date, variable, grid_region, 'r')
-print '\nupdating grid file :', manager.filepath
-grid_end_time = manager.timeAttribute(grid_dataset, 'end_time')
-print 'dataset end_time :', grid_end_time 
-manager.close()
-
-for source, fcast_time, grid in data:
-    if fcast_time > grid_end_time:
-        manager.close()
-        target_date = fcast_time.date()
-        #filepath = \
-        #    grid_factory.ndfdGridFilepath(target_date, variable, grid_region)
-        if not os.path.exists(filepath):
-            grid_factory.buildForecastGridFile(target_date, variable,
-                                               region=grid_region)
-        manager = \
-            grid_factory.ndfdGridFileManager(target_date, variable, grid_region)
-        print '\nupdating grid file :', manager.filepath
-        grid_end_time = manager.timeAttribute(grid_dataset, 'end_time')
-        print 'dataset end_time :', grid_end_time
-        manager.close()
-
-    if debug:
-        print 'inserting :', fcast_time, source, N.nanmin(grid), N.nanmax(grid)
-    manager.open('a')
-    manager.updateForecast(grid_dataset, fcast_time, grid, source=source)
-    manager.close()
+fcast_end = fcast_start + datetime.timedelta(hours=block.shape[0]-1)
+
+for index, (grid_region, grid_source) in enumerate(targets):
+    fcast_start, block, codes = blocks[index]
+    # write the whole forecast window, one transaction per monthly grid file
+    filepaths = grid_factory.updateForecastGridFiles(variable, grid_region,
+                             fcast_start, block, codes, source=grid_source,
+                             debug=verbose)
+    for filepath in filepaths:
+        print '\nupdated grid file :', filepath
 
 
 # turn annoying numpy warnings back on
@@ -8,13 +8,14 @@ UPDATE_START_TIME = datetime.datetime.now()
 from dateutil.relativedelta import relativedelta
 ONE_DAY = relativedelta(days=1)
 
-import numpy as N
-import pygrib
+from atmosci.utils.lazy import lazyImport
+pygrib = lazyImport('pygrib')
 
 from atmosci.utils.timeutils import asDatetimeDate, asAcisQueryDate, elapsedTime
 from atmosci.utils.units import convertUnits
 
 from atmosci.seasonal.factory import NDFDProjectFactory
+from atmosci.ndfd.smart_grib import decodeGribMessagesToTargets, gatherIndexes
 
 # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
 
@@ -26,8 +27,10 @@ INPUT_ERROR += ' and either the end date (month, day) or a number of days'
 from optparse import OptionParser
 parser = OptionParser()
 
-parser.add_option('-r', action='store', dest='region', default=None)
-parser.add_option('-s', action='store', dest='source', default='acis')
+parser.add_option('-r', action='store', dest='region', default=None,
+                        help='region or comma separated list of regions')
+parser.add_option('-s', action='store', dest='source', default='acis',
+                        help='source or comma separated list of sources')
 
 parser.add_option('-d', action='store_true', dest='dev_mode', default=False)
 parser.add_option('-v', action='store_true', dest='verbose', default=False)
@@ -59,38 +62,59 @@ elif num_args == 3:
 factory = NDFDProjectFactory()
 if dev_mode: factory.useDirpathsForMode('dev')
 ndfd = factory.getSourceConfig('ndfd')
-region = factory.getRegionConfig(region_key)
-source = factory.getSourceConfig(source_key)
-print 'updating % source file with NDFD forecast' % source.tag
-
-# need indexes from static file for source
-reader = factory.getStaticFileReader(source, region)
-source_shape = reader.getDatasetShape('ndfd.x_indexes')
-ndfd_indexes = [ reader.getData('ndfd.y_indexes').flatten(),
-                 reader.getData('ndfd.x_indexes').flatten() ]
-reader.close()
-del reader
-
-reader = factory.getSourceFileReader(source, target_date.year, region, 'temps')
-last_obs_date = \
-    asDatetimeDate(reader.getDatasetAttribute('temps.mint', 'last_obs_date'))
-last_obs_mint = reader.getDataForDate('temps.mint', last_obs_date)
-temps_filepath = reader.filepath
-reader.close()
-del reader
-
-print '    last obs date', last_obs_date
-if last_obs_date > target_date:
-    last_obs_date = target_date
-    last_obs_date_str = asAcisQueryDate(last_obs_date)
-    print '    last obs date was corrupted in', temps_filepath
-    manager = \
-        factory.getSourceFileManager(source, target_date.year, region, 'temps', mode='a')
-    manager.setDatasetAttribute('temps.maxt', 'last_obs_date', last_obs_date_str)
-    manager.setDatasetAttribute('temps.mint', 'last_obs_date', last_obs_date_str)
-    manager.close()
-    print '    last obs date changed to', last_obs_date
-    del manager
+if region_key is None: region_keys = (None,)
+else: region_keys = [key.strip() for key in region_key.split(',')]
+regions = [factory.getRegionConfig(key) for key in region_keys]
+sources = [factory.getSourceConfig(key.strip())
+           for key in source_key.split(',')]
+
+# every region x source combination is updated from a single decode
+targets = [ ]
+for region in regions:
+    for source in sources:
+        print 'updating %s %s source file with NDFD forecast' % (region.name,
+                                                                 source.tag)
+        # need indexes from static file for source
+        reader = factory.getStaticFileReader(source, region)
+        source_shape = reader.getDatasetShape('ndfd.x_indexes')
+        ndfd_indexes = [ reader.getData('ndfd.y_indexes').flatten(),
+                         reader.getData('ndfd.x_indexes').flatten() ]
+        reader.close()
+        del reader
+
+        reader = factory.getSourceFileReader(source, target_date.year, region,
+                                             'temps')
+        last_obs_date = asDatetimeDate(
+                   reader.getDatasetAttribute('temps.mint', 'last_obs_date'))
+        last_obs_mint = reader.getDataForDate('temps.mint', last_obs_date)
+        temps_filepath = reader.filepath
+        reader.close()
+        del reader
+
+        print '    last obs date', last_obs_date
+        if last_obs_date > target_date:
+            last_obs_date = target_date
+            last_obs_date_str = asAcisQueryDate(last_obs_date)
+            print '    last obs date was corrupted in', temps_filepath
+            manager = factory.getSourceFileManager(source, target_date.year,
+                                                   region, 'temps', mode='a')
+            manager.setDatasetAttribute('temps.maxt', 'last_obs_date',
+                                        last_obs_date_str)
+            manager.setDatasetAttribute('temps.mint', 'last_obs_date',
+                                        last_obs_date_str)
+            manager.close()
+            print '    last obs date changed to', last_obs_date
+            del manager
+
+        targets.append({ 'region':region, 'source':source,
+                         'source_shape':source_shape,
+                         'ndfd_indexes':ndfd_indexes,
+                         'last_obs_date':last_obs_date,
+                         'last_obs_mint':last_obs_mint, 'temps':{ } })
+
+# messages for dates after the earliest last obs date are needed by at
+# least one of the targets
+first_obs_date = min([target['last_obs_date'] for target in targets])
 
 # create a template for the NDFD grib file path
 filepath_template = \
@@ -109,10 +133,13 @@ warnings.filterwarnings('ignore',"invalid value encountered in less")
 warnings.filterwarnings('ignore',"Mean of empty slice")
 # MUST ALSO TURN OFF WARNING FILTERS AT END OF SCRIPT !!!!!
 
-temps = { }
+gather_params = None
 for temp_var in ('mint','maxt'):
-    if temp_var == 'mint': daily = [(last_obs_date, last_obs_mint), ]
-    else: daily = [ ]
+    for target in targets:
+        if temp_var == 'mint':
+            daily = [(target['last_obs_date'], target['last_obs_mint']), ]
+        else: daily = [ ]
+        target['temps'][temp_var] = daily
     print '\nupdating forecast for', temp_var 
 
     for time_span in ('001-003','004-007'):
@@ -120,6 +147,14 @@ for temp_var in ('mint','maxt'):
         print '\nreading :', grib_filepath
         gribs = pygrib.open(grib_filepath)
         grib = gribs.select(name=var_name_map[temp_var])
+        if gather_params is None:
+            grib_shape = (grib[0]['Ny'], grib[0]['Nx'])
+            gather_params = [ (gatherIndexes(target['ndfd_indexes'],
+                                             grib_shape),
+                               target['source_shape'], None)
+                              for target in targets ]
+        messages = [ ]
+        fcast_dates = [ ]
         for message_num in range(len(grib)):
             message = grib[message_num]
             if debug: print message
@@ -134,55 +169,73 @@ for temp_var in ('mint','maxt'):
             if verbose: print '        forecast datetime =', fcast_time
             fcast_date = fcast_time.date()
             
-            if fcast_date > last_obs_date:
-                data = message.values[ndfd_indexes].data
-                data = data.reshape(source_shape)
-                data[N.where(data == 9999)] = N.nan
-                data = convertUnits(data, 'K', 'F')
-                daily.append((fcast_date, data))
+            if fcast_date > first_obs_date:
+                messages.append(message)
+                fcast_dates.append(fcast_date)
             else: print '        ignoring fcast for', fcast_date
+
+        # decode each message once for all of the targets
+        if len(messages) > 0:
+            blocks = decodeGribMessagesToTargets(messages, 9999,
+                                                 gather_params, None, float)
+            for target, block in zip(targets, blocks):
+                daily = target['temps'][temp_var]
+                for index, fcast_date in enumerate(fcast_dates):
+                    if fcast_date > target['last_obs_date']:
+                        data = convertUnits(block[index], 'K', 'F')
+                        daily.append((fcast_date, data))
+            del blocks
+        del messages
         gribs.close()
 
-        if len(daily) == 0:
-            print 'NO TEMPERATURE DATAIN NDFD FORECAST FILE'
-            sys.exit(99)
+        for target in targets:
+            if len(target['temps'][temp_var]) == 0:
+                print 'NO TEMPERATURE DATAIN NDFD FORECAST FILE'
+                sys.exit(99)
 
-    temps[temp_var] = tuple(sorted(daily, key=lambda x: x[0]))
-    if verbose: print temp_var, [item[0] for item in temps[temp_var]]
+    for target in targets:
+        temps = target['temps']
+        temps[temp_var] = tuple(sorted(temps[temp_var], key=lambda x: x[0]))
+        if verbose: print temp_var, [item[0] for item in temps[temp_var]]
 
 #target_year = fcast_date.year
 target_year = target_date.year
-manager = \
-factory.getSourceFileManager(source, target_year, region, 'temps', mode='r')
-manager.close()
-print '\nsaving forecast to', manager.filepath
-
-max_temps = temps['maxt']
-min_temps = temps['mint']
-
-print '\n\nmint, maxt date pairs :'
-for indx in range(len(min_temps)):
-    mint_date, mint = min_temps[indx]
-    if mint_date >= last_obs_date:
-        maxt_date, maxt = max_temps[indx]
-        print '    ', mint_date, ',', maxt_date
-        manager.open('a')
-        manager.updateTempGroup(mint_date, mint, maxt, ndfd.tag, forecast=True)
-        manager.close()
+for target in targets:
+    region = target['region']
+    source = target['source']
+    last_obs_date = target['last_obs_date']
+    manager = factory.getSourceFileManager(source, target_year, region,
+                                           'temps', mode='r')
+    manager.close()
+    print '\nsaving forecast to', manager.filepath
+
+    max_temps = target['temps']['maxt']
+    min_temps = target['temps']['mint']
+
+    print '\n\nmint, maxt date pairs :'
+    for indx in range(len(min_temps)):
+        mint_date, mint = min_temps[indx]
+        if mint_date >= last_obs_date:
+            maxt_date, maxt = max_temps[indx]
+            print '    ', mint_date, ',', maxt_date
+            manager.open('a')
+            manager.updateTempGroup(mint_date, mint, maxt, ndfd.tag,
+                                    forecast=True)
+            manager.close()
+
+    # update forecast time span
+    fcast_start = min_temps[0][0]
+    fcast_end = min_temps[-1][0]
+    manager.open('a')
+    manager.setForecastDates('temps.maxt', fcast_start, fcast_end)
+    manager.setForecastDates('temps.mint', fcast_start, fcast_end)
+    manager.setForecastDates('temps.provenance', fcast_start, fcast_end)
+    manager.close()
+    del manager
 
 # turn annoying numpy warnings back on
 warnings.resetwarnings()
 
-# update forecast time span
-fcast_start = min_temps[0][0]
-fcast_end = min_temps[-1][0]
-manager.open('a')
-manager.setForecastDates('temps.maxt', fcast_start, fcast_end)
-manager.setForecastDates('temps.mint', fcast_start, fcast_end)
-manager.setForecastDates('temps.provenance', fcast_start, fcast_end)
-manager.close()
-del manager
-
 elapsed_time = elapsedTime(UPDATE_START_TIME, True)
 msg = '\ncompleted NDFD forecast update for %s thru %s in %s'
 print msg % (fcast_start.strftime('%m-%d'), fcast_end.strftime('%m-%d, %Y'),